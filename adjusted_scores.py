@@ -0,0 +1,129 @@
+"""
+Justerede scores på svar (responses.adjusted_score, field, layer)
+
+Analyse-queries skal kun bruge den justerede score (reverse-scorede
+spørgsmål spejlet: 8 - score), feltet og evt. laget. I stedet for at
+joine questions for hver række for at evaluere
+
+    CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
+
+gemmes værdierne på svaret ved indsættelse. Survey-submit sætter dem
+direkte (response_score_values); andre skrivestier (seed-scripts,
+dev-tools, import) får dem sat af en trigger.
+
+Ændres score/question_id på et svar, eller reverse_scored/field/sequence
+på et spørgsmål, opdateres de gemte værdier også via triggers.
+
+Et dækkende index på (måling, enhed, respondenttype, felt, justeret score)
+gør at gennemsnit per felt kan beregnes alene fra indexet. Det oprettes
+af responses_layout, da den dækkende layout erstatter det.
+"""
+import sqlite3
+from typing import Dict, Optional
+
+from friction_engine import QUESTION_LAYERS, adjust_score
+
+# Spørgsmålets sequence -> lag ('all', 'ydre', 'indre', 'mekanisk', 'oplevet')
+LAYER_BY_SEQUENCE = {
+    seq: layer
+    for layers in QUESTION_LAYERS.values()
+    for layer, sequences in layers.items()
+    for seq in sequences
+}
+
+
+def layer_for_sequence(sequence: Optional[int]) -> Optional[str]:
+    """Lag for et spørgsmål ud fra dets sequence (None for ukendte)"""
+    return LAYER_BY_SEQUENCE.get(sequence)
+
+
+def response_score_values(question: Dict, score: int) -> Dict:
+    """
+    Denormaliserede kolonner til et nyt svar.
+
+    question skal have field, reverse_scored og sequence (fx fra get_questions).
+    """
+    return {
+        'adjusted_score': adjust_score(score, bool(question.get('reverse_scored'))),
+        'field': question.get('field'),
+        'layer': layer_for_sequence(question.get('sequence')),
+    }
+
+
+def _layer_sql(sequence: str) -> str:
+    """CASE-udtryk der mapper sequence til lag (samme som LAYER_BY_SEQUENCE)"""
+    cases = ' '.join(f"WHEN {seq} THEN '{layer}'"
+                     for seq, layer in sorted(LAYER_BY_SEQUENCE.items()))
+    return f"CASE {sequence} {cases} END"
+
+
+def _values_sql(ref: str) -> str:
+    """(adjusted_score, field, layer) for svaret ref slået op i questions"""
+    return f"""(
+        SELECT CASE WHEN q.reverse_scored = 1 THEN 8 - {ref}.score ELSE {ref}.score END,
+               q.field, {_layer_sql('q.sequence')}
+        FROM questions q WHERE q.id = {ref}.question_id
+    )"""
+
+
+def init_adjusted_scores(conn: sqlite3.Connection):
+    """
+    Opret kolonner og triggers (sikkert at køre flere gange).
+
+    Eksisterende svar får værdierne første gang kolonnen tilføjes.
+    """
+    column_added = False
+    for column, definition in (('adjusted_score', 'INTEGER'), ('field', 'TEXT'), ('layer', 'TEXT')):
+        try:
+            conn.execute(f"ALTER TABLE responses ADD COLUMN {column} {definition}")
+            column_added = column_added or column == 'adjusted_score'
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_adjusted_ai
+        AFTER INSERT ON responses
+        WHEN NEW.adjusted_score IS NULL OR NEW.field IS NULL
+        BEGIN
+            UPDATE responses SET (adjusted_score, field, layer) = {_values_sql('NEW')}
+            WHERE id = NEW.id AND EXISTS (SELECT 1 FROM questions WHERE id = NEW.question_id);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_adjusted_au
+        AFTER UPDATE OF score, question_id ON responses
+        BEGIN
+            UPDATE responses SET (adjusted_score, field, layer) = {_values_sql('NEW')}
+            WHERE id = NEW.id AND EXISTS (SELECT 1 FROM questions WHERE id = NEW.question_id);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS questions_adjusted_au
+        AFTER UPDATE OF field, reverse_scored, sequence ON questions
+        BEGIN
+            UPDATE responses SET (adjusted_score, field, layer) = {_values_sql('responses')}
+            WHERE question_id = NEW.id;
+        END
+    """)
+
+    if column_added:
+        rows = backfill_adjusted_scores(conn)
+        if rows:
+            print(f"Migration: Beregnede adjusted_score for {rows} svar")
+
+
+def backfill_adjusted_scores(conn: sqlite3.Connection, only_missing: bool = True) -> int:
+    """
+    Beregn adjusted_score, field og layer fra questions.
+
+    Args:
+        only_missing: Kun svar uden adjusted_score (False = alle svar)
+
+    Returns:
+        Antal opdaterede svar
+    """
+    missing = "AND adjusted_score IS NULL" if only_missing else ""
+    return conn.execute(f"""
+        UPDATE responses SET (adjusted_score, field, layer) = {_values_sql('responses')}
+        WHERE question_id IN (SELECT id FROM questions) {missing}
+    """).rowcount
@@ -46,6 +46,7 @@ from db_multitenant import (
     authenticate_user, create_customer, create_user, list_customers,
     list_users, get_customer_filter, get_customer, update_customer,
     get_domain_config, list_domains, create_domain, update_domain, delete_domain,
+    invalidate_domain_cache, invalidate_api_key_cache,
     generate_email_code, verify_email_code, find_user_by_email, create_b2c_user,
     get_or_create_b2c_customer, authenticate_by_email_code, reset_password_with_code,
     seed_assessment_types, get_all_assessment_types, get_all_presets,
@@ -56,7 +57,7 @@ from csv_upload_hierarchical import (
     validate_csv_format, bulk_upload_from_csv, generate_csv_template
 )
 from mailjet_integration import (
-    send_assessment_batch, get_email_stats, get_email_logs, update_email_status,
+    send_assessment_batch, get_email_stats, get_email_logs_page, update_email_status,
     get_template, save_template, list_templates, DEFAULT_TEMPLATES,
     check_and_notify_assessment_completed, send_login_code
 )
@@ -72,6 +73,11 @@ from oauth import (
     DEFAULT_AUTH_PROVIDERS, get_user_oauth_links, link_oauth_to_user, unlink_oauth_from_user
 )
 from cache import get_cache_stats, invalidate_all, invalidate_assessment_cache, Pagination
+from cache import KeysetOrder, SortKey, keyset_paginate
+from comment_search import combine_comment
+from respondents import new_respondent_id
+from tenant_db import drop_customer_database
+from adjusted_scores import response_score_values
 from audit import log_action, AuditAction, get_audit_logs, get_audit_log_count, get_action_summary
 from extensions import csrf, limiter
 
@@ -943,25 +949,19 @@ def get_individual_scores(target_unit_id, assessment_id):
         )
         """
 
-        # Get all individual employee scores
-        # Use respondent_name if available, otherwise use minute-based session grouping
-        # (assuming all responses from same respondent come within same minute)
+        # Get all individual employee scores (én række per besvarelse og felt)
         employee_query = f"""
         {subtree_cte}
         SELECT
-            COALESCE(r.respondent_name, strftime('%Y-%m-%d %H:%M', r.created_at)) as resp_key,
-            q.field,
-            AVG(CASE
-                WHEN q.reverse_scored = 1 THEN 8 - r.score
-                ELSE r.score
-            END) as avg_score
+            r.respondent_id as resp_key,
+            r.field,
+            AVG(r.adjusted_score) as avg_score
         FROM responses r
-        JOIN questions q ON r.question_id = q.id
         JOIN subtree ON r.unit_id = subtree.id
         WHERE r.assessment_id = ?
           AND r.respondent_type = 'employee'
-          AND q.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
-        GROUP BY resp_key, q.field
+          AND r.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
+        GROUP BY resp_key, r.field
         """
 
         employee_rows = conn.execute(employee_query, [target_unit_id, assessment_id]).fetchall()
@@ -984,18 +984,14 @@ def get_individual_scores(target_unit_id, assessment_id):
         leader_query = f"""
         {subtree_cte}
         SELECT
-            q.field,
-            AVG(CASE
-                WHEN q.reverse_scored = 1 THEN 8 - r.score
-                ELSE r.score
-            END) as avg_score
+            r.field,
+            AVG(r.adjusted_score) as avg_score
         FROM responses r
-        JOIN questions q ON r.question_id = q.id
         JOIN subtree ON r.unit_id = subtree.id
         WHERE r.assessment_id = ?
           AND r.respondent_type = 'leader_self'
-          AND q.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
-        GROUP BY q.field
+          AND r.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
+        GROUP BY r.field
         """
 
         leader_rows = conn.execute(leader_query, [target_unit_id, assessment_id]).fetchall()
@@ -1017,6 +1013,8 @@ from db_profil import (
     get_questions_by_field as get_profil_questions_by_field,
     save_responses as save_profil_responses,
     list_sessions as list_profil_sessions,
+    list_sessions_page as list_profil_sessions_page,
+    get_session_counts as get_profil_session_counts,
     generate_test_profiles,
     # Pair session functions
     create_pair_session,
@@ -1417,8 +1415,17 @@ def profil_admin_list():
     if user['role'] not in ('admin', 'superadmin'):
         customer_id = user.get('customer_id')
 
-    sessions = list_profil_sessions(customer_id=customer_id, include_incomplete=True)
-    return render_template('profil/admin_list.html', sessions=sessions)
+    # Kontekst/status filtreres i SQL, så pagineringen passer til filteret
+    context = request.args.get('context') or None
+    status = request.args.get('status')
+    complete = {'complete': True, 'incomplete': False}.get(status)
+
+    sessions, pagination = list_profil_sessions_page(
+        customer_id=customer_id, context=context, complete=complete,
+        cursor=request.args.get('cursor'))
+    counts = get_profil_session_counts(customer_id)
+    return render_template('profil/admin_list.html', sessions=sessions, pagination=pagination,
+                           counts=counts, context_filter=context or '', status_filter=status or '')
 
 
 @app.route('/profil/compare/<session1>/<session2>')
@@ -1432,16 +1439,29 @@ def profil_compare(session1, session2):
     return render_template('profil/compare.html', comparison=comparison)
 
 
+# Par-sessioner: nyeste først, id som tiebreaker (dækket af idx_pair_sessions_created)
+PAIR_SESSIONS_ORDER = KeysetOrder(
+    SortKey('ps.created_at', 'created_at', descending=True),
+    SortKey('ps.id', 'id', descending=True),
+)
+
+
 @app.route('/admin/pair-sessions')
 @login_required
 def admin_pair_sessions():
-    """Liste alle par-sessioner for admin"""
+    """Liste alle par-sessioner for admin (keyset-pagineret, nyeste først)"""
     user = session['user']
 
+    # For superadmin: Alle par-sessioner med customer info
+    # For andre roller: kun egen kunde
+    if user['role'] == 'superadmin':
+        scope, scope_params = "1 = 1", []
+    else:
+        scope, scope_params = "sa.customer_id = ?", [user.get('customer_id')]
+
     with get_db() as conn:
-        # For superadmin: Alle par-sessioner med customer info
-        if user['role'] == 'superadmin':
-            rows = conn.execute("""
+        def fetch(condition, keyset_params, order_by, limit):
+            return conn.execute(f"""
                 SELECT ps.*,
                        c.name as customer_name,
                        sa.created_at as a_started,
@@ -1450,27 +1470,26 @@ def admin_pair_sessions():
                 LEFT JOIN profil_sessions sa ON ps.person_a_session_id = sa.id
                 LEFT JOIN profil_sessions sb ON ps.person_b_session_id = sb.id
                 LEFT JOIN customers c ON sa.customer_id = c.id
-                ORDER BY ps.created_at DESC
-            """).fetchall()
-        else:
-            # For andre roller: kun egen kunde
-            customer_id = user.get('customer_id')
-            rows = conn.execute("""
-                SELECT ps.*,
-                       c.name as customer_name,
-                       sa.created_at as a_started,
-                       sb.created_at as b_started
-                FROM pair_sessions ps
-                LEFT JOIN profil_sessions sa ON ps.person_a_session_id = sa.id
-                LEFT JOIN profil_sessions sb ON ps.person_b_session_id = sb.id
-                LEFT JOIN customers c ON sa.customer_id = c.id
-                WHERE sa.customer_id = ?
-                ORDER BY ps.created_at DESC
-            """, (customer_id,)).fetchall()
+                WHERE {scope} AND {condition}
+                ORDER BY {order_by}
+                LIMIT ?
+            """, scope_params + keyset_params + [limit]).fetchall()
 
+        rows, pagination = keyset_paginate(
+            fetch, PAIR_SESSIONS_ORDER, request.args.get('cursor'))
         pairs = [dict(row) for row in rows]
 
-    return render_template('admin/pair_sessions.html', pairs=pairs)
+        # Nøgletal for alle sessioner - ikke kun den viste side
+        status_counts = {row['status']: row['count'] for row in conn.execute(f"""
+            SELECT ps.status, COUNT(*) as count
+            FROM pair_sessions ps
+            LEFT JOIN profil_sessions sa ON ps.person_a_session_id = sa.id
+            WHERE {scope}
+            GROUP BY ps.status
+        """, scope_params)}
+
+    return render_template('admin/pair_sessions.html', pairs=pairs, pagination=pagination,
+                           status_counts=status_counts)
 
 
 @app.route('/profil/generate-test-data')
@@ -1844,37 +1863,40 @@ def survey_submit(token):
     free_text_situation = request.form.get('free_text_situation', '').strip()
     free_text_general = request.form.get('free_text_general', '').strip()
 
-    # Combine free text
-    combined_comment = ""
-    if free_text_situation:
-        combined_comment += f"SITUATION: {free_text_situation}"
-    if free_text_general:
-        if combined_comment:
-            combined_comment += "\n\n"
-        combined_comment += f"GENERELT: {free_text_general}"
+    # Combine free text (kombineret felt bevares til eksport/bagudkompatibilitet)
+    combined_comment = combine_comment(free_text_situation, free_text_general)
 
-    # Save all responses
+    # Save all responses (én transaktion - hele besvarelsen gemmes eller intet)
     questions = get_questions()
     saved_count = 0
+    respondent_id = new_respondent_id()
 
-    for question in questions:
-        q_id = question['id']
-        score = request.form.get(f'q_{q_id}')
+    with get_db() as conn:
+        for question in questions:
+            q_id = question['id']
+            score = request.form.get(f'q_{q_id}')
 
-        if score:
-            score = int(score)
+            if score:
+                score = int(score)
 
-            # Save response with respondent_type, name, and free text (only on first response)
-            with get_db() as conn:
-                comment = combined_comment if saved_count == 0 and combined_comment else None
+                # Save response with respondent_type, name, and free text (only on first response)
+                first = saved_count == 0 and combined_comment
+                comment = combined_comment if first else None
+                values = response_score_values(question, score)
 
                 conn.execute("""
                     INSERT INTO responses
-                    (assessment_id, unit_id, question_id, score, respondent_type, respondent_name, comment)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (assessment_id, unit_id, q_id, score, respondent_type, respondent_name, comment))
-
-            saved_count += 1
+                    (assessment_id, unit_id, question_id, score, adjusted_score, field, layer,
+                     respondent_type, respondent_name, respondent_id,
+                     comment, comment_situation, comment_general)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (assessment_id, unit_id, q_id, score,
+                      values['adjusted_score'], values['field'], values['layer'],
+                      respondent_type, respondent_name, respondent_id, comment,
+                      (free_text_situation or None) if first else None,
+                      (free_text_general or None) if first else None))
+
+                saved_count += 1
 
     # Mark token as used
     with get_db() as conn:
@@ -1957,8 +1979,9 @@ def email_stats():
     """Vis email statistik og logs"""
     assessment_id = request.args.get('assessment_id')
     stats = get_email_stats(assessment_id)
-    logs = get_email_logs(assessment_id, limit=100)
-    return render_template('admin/email_stats.html', stats=stats, logs=logs, assessment_id=assessment_id)
+    logs, pagination = get_email_logs_page(assessment_id, cursor=request.args.get('cursor'))
+    return render_template('admin/email_stats.html', stats=stats, logs=logs, pagination=pagination,
+                           assessment_id=assessment_id)
 
 
 @app.route('/api/email-stats')
@@ -2712,6 +2735,13 @@ def admin_gdpr_delete_customer(customer_id):
         from audit import log_action
         log_action('gdpr_delete_customer', f'Slettet kunde: {customer_name} ({customer_id})')
 
+    # CASCADE virker kun i kataloget - en flyttet kundes data ligger i egen fil
+    drop_customer_database(customer_id)
+
+    # Domains peger på kunden (ON DELETE SET NULL), API keys slettes (CASCADE)
+    invalidate_domain_cache()
+    invalidate_api_key_cache()
+
     flash(f'Al data for "{customer_name}" er slettet permanent', 'success')
     return redirect(url_for('admin_gdpr'))
 
@@ -8,6 +8,7 @@ Denne fil wrapper database-operationer og bruger friction_engine funktioner.
 from typing import Dict, List, Optional
 from db_hierarchical import get_db
 from cache import cached
+from comment_search import combine_comment
 
 # Import fra central beregningsmotor
 from friction_engine import (
@@ -81,10 +82,7 @@ def get_unit_stats_with_layers(
                 q.id as question_id,
                 q.field,
                 q.sequence,
-                AVG(CASE
-                    WHEN q.reverse_scored = 1 THEN 8 - r.score
-                    ELSE r.score
-                END) as avg_score,
+                AVG(r.adjusted_score) as avg_score,
                 COUNT(r.id) as response_count
             FROM questions q
             LEFT JOIN responses r ON q.id = r.question_id
@@ -101,18 +99,13 @@ def get_unit_stats_with_layers(
         # Query for individual responses (for std dev calculation per field)
         individual_query = f"""
             {subtree_cte}
-            SELECT
-                q.field,
-                CASE
-                    WHEN q.reverse_scored = 1 THEN 8 - r.score
-                    ELSE r.score
-                END as score
-            FROM questions q
-            JOIN responses r ON q.id = r.question_id
-                AND {unit_filter}
-                AND r.assessment_id = ?
-                AND r.respondent_type = ?
-            WHERE q.is_default = 1
+            SELECT r.field, r.adjusted_score as score
+            FROM responses r
+            WHERE {unit_filter}
+              AND r.assessment_id = ?
+              AND r.respondent_type = ?
+              AND r.field IS NOT NULL
+              AND r.question_id IN (SELECT id FROM questions WHERE is_default = 1)
         """
 
         individual_rows = conn.execute(individual_query, params).fetchall()
@@ -277,9 +270,9 @@ def check_anonymity_threshold(assessment_id: str, unit_id: str) -> Dict:
         if mode == 'identified':
             return {'can_show_results': True, 'mode': 'identified'}
 
-        # Count employee responses
+        # Count employee respondents (besvarelser, ikke enkelte svar)
         response_count = conn.execute("""
-            SELECT COUNT(DISTINCT id) as cnt
+            SELECT COUNT(DISTINCT respondent_id) as cnt
             FROM responses
             WHERE assessment_id = ? AND unit_id = ? AND respondent_type = 'employee'
         """, (assessment_id, unit_id)).fetchone()['cnt']
@@ -392,13 +385,19 @@ def get_layer_interpretation(field: str, layer: str, score: float) -> str:
     return interpretations.get(key, f"{field} {layer} er {level}")
 
 
-def get_free_text_comments(unit_id: str, assessment_id: str, include_children: bool = True) -> List[Dict]:
+def get_free_text_comments(unit_id: str, assessment_id: str, include_children: bool = True,
+                           limit: int = None, cursor: int = None) -> List[Dict]:
     """
-    Hent alle fritekst-kommentarer for en unit/assessment
+    Hent fritekst-kommentarer for en unit/assessment (ældste først)
+
+    SITUATION/GENERELT er opdelt ved indsendelse (se comment_search.py), så
+    her parses ingen tekst. Med limit hentes én side; næste side fås med
+    cursor = id på sidste kommentar.
 
     Returns:
         [
             {
+                'id': 123,
                 'respondent_type': 'employee',
                 'respondent_name': 'Respondent #1',
                 'comment': 'SITUATION: ...\n\nGENERELT: ...',
@@ -420,57 +419,41 @@ def get_free_text_comments(unit_id: str, assessment_id: str, include_children: b
                 )
             """
             unit_filter = "r.unit_id IN (SELECT id FROM subtree)"
-            params = [unit_id, assessment_id]
         else:
             subtree_cte = ""
             unit_filter = "r.unit_id = ?"
-            params = [unit_id, assessment_id]
-
-        query = f"""
+        params = [unit_id, assessment_id]
+
+        cursor_filter = ""
+        if cursor:
+            cursor_filter = "AND r.id > ?"
+            params.append(int(cursor))
+        limit_clause = ""
+        if limit:
+            limit_clause = "LIMIT ?"
+            params.append(int(limit))
+
+        rows = conn.execute(f"""
             {subtree_cte}
-            SELECT DISTINCT
-                r.respondent_type,
-                r.respondent_name,
-                r.comment
+            SELECT r.id, r.respondent_type, r.respondent_name, r.comment,
+                   r.comment_situation, r.comment_general
             FROM responses r
             WHERE {unit_filter}
               AND r.assessment_id = ?
-              AND r.comment IS NOT NULL
-              AND r.comment != ''
-            ORDER BY r.respondent_type, r.respondent_name
-        """
-
-        rows = conn.execute(query, params).fetchall()
-
-        # Parse SITUATION/GENERELT fra combined comment
-        comments = []
-        for row in rows:
-            comment_text = row['comment']
-
-            # Split SITUATION og GENERELT
-            situation = ""
-            general = ""
-
-            if "SITUATION:" in comment_text and "GENERELT:" in comment_text:
-                parts = comment_text.split("GENERELT:")
-                situation = parts[0].replace("SITUATION:", "").strip()
-                general = parts[1].strip()
-            elif "SITUATION:" in comment_text:
-                situation = comment_text.replace("SITUATION:", "").strip()
-            elif "GENERELT:" in comment_text:
-                general = comment_text.replace("GENERELT:", "").strip()
-            else:
-                general = comment_text
-
-            comments.append({
-                'respondent_type': row['respondent_type'],
-                'respondent_name': row['respondent_name'],
-                'comment': comment_text,
-                'situation': situation,
-                'general': general
-            })
-
-        return comments
+              AND (r.comment_situation IS NOT NULL OR r.comment_general IS NOT NULL)
+              {cursor_filter}
+            ORDER BY r.id
+            {limit_clause}
+        """, params).fetchall()
+
+        return [{
+            'id': row['id'],
+            'respondent_type': row['respondent_type'],
+            'respondent_name': row['respondent_name'],
+            'comment': row['comment'] or combine_comment(row['comment_situation'], row['comment_general']),
+            'situation': row['comment_situation'] or '',
+            'general': row['comment_general'] or '',
+        } for row in rows]
 
 
 # ============================================
@@ -1036,16 +1019,10 @@ def get_trend_data(unit_id: str = None, customer_id: str = None) -> Dict:
         for camp in assessments_raw:
             # Get field averages for this assessment
             scores_query = """
-                SELECT
-                    q.field,
-                    AVG(CASE
-                        WHEN q.reverse_scored = 1 THEN 8 - r.score
-                        ELSE r.score
-                    END) as avg_score
+                SELECT r.field, AVG(r.adjusted_score) as avg_score
                 FROM responses r
-                JOIN questions q ON r.question_id = q.id
-                WHERE r.assessment_id = ?
-                GROUP BY q.field
+                WHERE r.assessment_id = ? AND r.field IS NOT NULL
+                GROUP BY r.field
             """
             score_rows = conn.execute(scores_query, (camp['id'],)).fetchall()
 
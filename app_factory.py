@@ -7,7 +7,7 @@ configurations for development, testing, and production environments.
 import os
 import secrets
 from datetime import timedelta
-from flask import Flask, g, session, request, redirect, flash, url_for
+from flask import Flask, Request, current_app, g, session, request, redirect, flash, url_for
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFError
 
@@ -23,7 +23,7 @@ from extensions import csrf, limiter
 # Import translations
 from translations import (
     t, get_user_language, set_language, SUPPORTED_LANGUAGES,
-    seed_translations, clear_translation_cache
+    seed_translations, load_translation_catalog
 )
 
 # Import OAuth
@@ -32,6 +32,16 @@ from oauth import init_oauth
 # Import scheduler
 from scheduler import start_scheduler
 
+# Import performance instrumentation
+import perf
+import tenant_db
+from compression import compress_response
+from page_cache import capture_block
+import template_helpers
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
 
 def copy_seed_database():
     """Copy bundled database to persistent disk if empty/missing."""
@@ -54,6 +64,20 @@ def copy_seed_database():
             print(f"[STARTUP] Seed database copied successfully ({os.path.getsize(persistent_path)} bytes)")
 
 
+# Endpoints der modtager store CSV-filer (læses i chunks, se csv_upload_hierarchical)
+LARGE_UPLOAD_ENDPOINTS = {'units.bulk_upload'}
+
+
+class AppRequest(Request):
+    """Request med højere upload-grænse på LARGE_UPLOAD_ENDPOINTS"""
+
+    @property
+    def max_content_length(self):
+        if current_app and self.endpoint in LARGE_UPLOAD_ENDPOINTS:
+            return current_app.config['CSV_UPLOAD_MAX_LENGTH']
+        return super().max_content_length
+
+
 def create_app(config_name='development'):
     """
     Flask application factory.
@@ -77,6 +101,7 @@ def create_app(config_name='development'):
 
     # Create Flask app
     app = Flask(__name__)
+    app.request_class = AppRequest
 
     # Load configuration based on environment
     _configure_app(app, config_name)
@@ -87,6 +112,13 @@ def create_app(config_name='development'):
     # Register blueprints
     _register_blueprints(app)
 
+    # Statiske filer med fingerprint caches "immutable" (template_helpers.py).
+    # Global frem for context processor, så også importerede macros får den.
+    app.view_functions['static'] = template_helpers.serve_static
+    app.jinja_env.globals['url_for'] = template_helpers.url_for
+    if not app.debug:
+        template_helpers.get_asset_manifest(app.static_folder)
+
     # Register middleware and handlers
     _register_middleware(app)
     _register_error_handlers(app)
@@ -96,9 +128,9 @@ def create_app(config_name='development'):
     if config_name != 'testing':
         start_scheduler()
 
-        # Seed translations and clear cache on startup
+        # Seed translations (bumps the shared version) and preload the catalog
         seed_translations()
-        clear_translation_cache()
+        load_translation_catalog()
 
     return app
 
@@ -135,6 +167,8 @@ def _configure_app(app, config_name):
 
     # Security configuration
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
+    # Organisations-CSV'er (HR-udtræk) streames til disk og læses i chunks
+    app.config['CSV_UPLOAD_MAX_LENGTH'] = int(os.environ.get('CSV_UPLOAD_MAX_MB', '512')) * 1024 * 1024
     app.config['SESSION_COOKIE_SECURE'] = not app.debug  # True in production
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
@@ -203,13 +237,43 @@ def _register_blueprints(app):
 
 def _register_middleware(app):
     """Register middleware functions."""
+    # Performance instrumentation - registreres først så den måler hele requesten
+    @app.before_request
+    def start_request_timing():
+        """Start opsamling af væg-tid, SQL statements og cache-opslag"""
+        perf.start_request()
+
+    @app.after_request
+    def record_request_timing(response):
+        """Gem målingen per route og log langsomme requests med top-queries"""
+        summary = perf.finish_request(request.url_rule.rule if request.url_rule else 'unmatched',
+                                      response.status_code)
+        if summary is None:
+            return response
+
+        response.headers['Server-Timing'] = (
+            f"app;dur={summary['duration_ms']}, db;dur={summary['db_time_ms']}"
+        )
+        if 'top_queries' in summary:
+            logger.warning(f"Slow request {request.method} {request.path}", extra={'extra_data': summary})
+        return response
+
+    # Komprimering - registreres efter målingen, så den kører før (og måles med)
+    app.after_request(compress_response)
+
+    @app.teardown_request
+    def discard_request_timing(exc):
+        """Ryd op hvis requesten fejlede før after_request"""
+        if perf.current_stats() is not None:
+            perf.finish_request(request.url_rule.rule if request.url_rule else 'unmatched', 500)
+
     # Domain middleware - detect domain and load config
     @app.before_request
     def detect_domain():
         """Detect domain and load domain-specific config"""
         host = request.host.split(':')[0].lower()  # Remove port if present
 
-        # Try to get domain config from database
+        # Domain config from the in-process cache (unknown hosts are negatively cached)
         domain_config = get_domain_config(host)
 
         if domain_config:
@@ -224,6 +288,17 @@ def _register_middleware(app):
         else:
             g.domain_config = None
 
+    # Kundens egen database (tenant_db) - efter domænet, som kan sætte kundefilteret
+    @app.before_request
+    def route_tenant_database():
+        """Send requestens get_db() til kundens database, hvis kunden er flyttet"""
+        if tenant_db.TENANT_SHARDING:
+            tenant_db.set_current_tenant(_request_tenant())
+
+    @app.teardown_request
+    def reset_tenant_database(exc):
+        tenant_db.set_current_tenant(None)
+
     # Security headers middleware
     @app.after_request
     def add_security_headers(response):
@@ -249,6 +324,24 @@ def _register_middleware(app):
         return response
 
 
+# Survey-links identificerer kun et token
+SURVEY_ENDPOINTS = {'survey', 'survey_submit'}
+
+
+def _request_tenant():
+    """Kunden requesten handler om (kunde-API'et sættes af customer_api_required)"""
+    view_args = request.view_args or {}
+    if request.endpoint in SURVEY_ENDPOINTS and view_args.get('token'):
+        return tenant_db.find_token_tenant(view_args['token'])
+    user = session.get('user')
+    if not user:
+        return None
+    # Som _user_data_scope: kun admins kan vælge kunde via URL eller kundefilter
+    if user.get('role') not in ('admin', 'superadmin'):
+        return user.get('customer_id')
+    return view_args.get('customer_id') or session.get('customer_filter')
+
+
 def _register_error_handlers(app):
     """Register error handlers."""
     @app.errorhandler(CSRFError)
@@ -275,6 +368,11 @@ def _register_context_processors(app):
             'supported_languages': SUPPORTED_LANGUAGES
         }
 
+    @app.context_processor
+    def inject_page_cache():
+        """Layoutet afleverer sidens blocks til side-cachen (page_cache.py)"""
+        return {'capture_block': capture_block}
+
     @app.context_processor
     def inject_customers():
         """Make customer list available in all templates"""
@@ -0,0 +1,300 @@
+"""
+Forudberegnede scores per måling (assessment_scores)
+
+Oversigtssiderne (analyser, nøgletal, målingsoversigt, org-dashboard og
+kunde-API'et) skal kun bruge gennemsnit per felt - ikke de enkelte svar.
+I stedet for at pivotere responses JOIN questions ved hver visning holdes
+en summary-tabel med én række per (måling, enhed, respondenttype, felt):
+
+    answer_count      antal svar
+    score_sum         sum af justerede scores (responses.adjusted_score)
+    avg_score         score_sum / answer_count
+    respondent_count  antal respondenter (flest svar på ét spørgsmål i feltet)
+
+Triggers på responses holder tabellen opdateret for alle skrivestier
+(survey, import, seed-scripts, dev-tools) ud fra responses.adjusted_score
+og field - også når adjusted_scores.py genberegner dem efter ændringer i
+questions. Summer og antal gør at
+gennemsnit over flere rækker (undertræer, kunder) er eksakte:
+SUM(score_sum) / SUM(answer_count).
+
+Respondenter tælles via assessment_score_questions (svar per spørgsmål),
+så antallet også er korrekt efter sletninger.
+"""
+import sqlite3
+from typing import Optional
+
+SCORES_TABLE = 'assessment_scores'
+QUESTION_COUNTS_TABLE = 'assessment_score_questions'
+
+# Felt-navne i views -> questions.field
+FIELD_COLUMNS = {
+    'mening': 'MENING',
+    'tryghed': 'TRYGHED',
+    'kan': 'KAN',
+    'besvaer': 'BESVÆR',
+}
+
+
+# ========================================
+# SKEMA OG TRIGGERS
+# ========================================
+
+def _slice(ref: str) -> str:
+    """WHERE-betingelse for (måling, enhed, respondenttype) fra NEW/OLD"""
+    return (f"assessment_id = {ref}.assessment_id AND unit_id = {ref}.unit_id "
+            f"AND respondent_type = COALESCE({ref}.respondent_type, '')")
+
+
+def _counted(ref: str) -> str:
+    """Svaret indgår når adjusted_scores.py har sat score og felt"""
+    return f"{ref}.adjusted_score IS NOT NULL AND {ref}.field IS NOT NULL"
+
+
+def _add_response_sql(ref: str) -> str:
+    """Statements der lægger et svar (NEW) til summary-tabellerne"""
+    return f"""
+        INSERT INTO {QUESTION_COUNTS_TABLE}
+            (assessment_id, unit_id, respondent_type, question_id, answer_count)
+        SELECT {ref}.assessment_id, {ref}.unit_id, COALESCE({ref}.respondent_type, ''),
+               {ref}.question_id, 1
+        WHERE {_counted(ref)}
+        ON CONFLICT (assessment_id, unit_id, respondent_type, question_id)
+        DO UPDATE SET answer_count = answer_count + 1;
+
+        INSERT INTO {SCORES_TABLE}
+            (assessment_id, unit_id, respondent_type, field,
+             answer_count, score_sum, avg_score, respondent_count)
+        SELECT {ref}.assessment_id, {ref}.unit_id, COALESCE({ref}.respondent_type, ''), {ref}.field, 1,
+               {ref}.adjusted_score, {ref}.adjusted_score, 1
+        WHERE {_counted(ref)}
+        ON CONFLICT (assessment_id, unit_id, respondent_type, field) DO UPDATE SET
+            answer_count = answer_count + 1,
+            score_sum = score_sum + excluded.score_sum,
+            avg_score = (score_sum + excluded.score_sum) / (answer_count + 1),
+            respondent_count = MAX(respondent_count, (
+                SELECT sq.answer_count FROM {QUESTION_COUNTS_TABLE} sq
+                WHERE sq.assessment_id = {ref}.assessment_id AND sq.unit_id = {ref}.unit_id
+                  AND sq.respondent_type = COALESCE({ref}.respondent_type, '')
+                  AND sq.question_id = {ref}.question_id
+            ));
+    """
+
+
+def _remove_response_sql(ref: str) -> str:
+    """Statements der trækker et svar (OLD) fra summary-tabellerne"""
+    return f"""
+        UPDATE {QUESTION_COUNTS_TABLE} SET answer_count = answer_count - 1
+        WHERE {_counted(ref)} AND {_slice(ref)} AND question_id = {ref}.question_id;
+
+        UPDATE {SCORES_TABLE} SET
+            answer_count = answer_count - 1,
+            score_sum = score_sum - {ref}.adjusted_score,
+            avg_score = CASE WHEN answer_count > 1
+                             THEN (score_sum - {ref}.adjusted_score) / (answer_count - 1) END,
+            respondent_count = (
+                SELECT COALESCE(MAX(sq.answer_count), 0)
+                FROM {QUESTION_COUNTS_TABLE} sq
+                JOIN questions q ON q.id = sq.question_id
+                WHERE sq.assessment_id = {ref}.assessment_id AND sq.unit_id = {ref}.unit_id
+                  AND sq.respondent_type = COALESCE({ref}.respondent_type, '')
+                  AND q.field = {SCORES_TABLE}.field
+            )
+        WHERE {_counted(ref)} AND {_slice(ref)} AND field = {ref}.field;
+
+        DELETE FROM {QUESTION_COUNTS_TABLE} WHERE {_slice(ref)} AND answer_count <= 0;
+        DELETE FROM {SCORES_TABLE} WHERE {_slice(ref)} AND answer_count <= 0;
+    """
+
+
+def init_assessment_scores(conn: sqlite3.Connection):
+    """
+    Opret summary-tabeller og triggers (sikkert at køre flere gange).
+
+    Første gang tabellerne oprettes fyldes de fra eksisterende svar.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SCORES_TABLE,)
+    ).fetchone()
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCORES_TABLE} (
+            assessment_id TEXT NOT NULL,
+            unit_id TEXT NOT NULL,
+            respondent_type TEXT NOT NULL,
+            field TEXT NOT NULL,
+            answer_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            avg_score REAL,
+            respondent_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (assessment_id, unit_id, respondent_type, field),
+            FOREIGN KEY (assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {QUESTION_COUNTS_TABLE} (
+            assessment_id TEXT NOT NULL,
+            unit_id TEXT NOT NULL,
+            respondent_type TEXT NOT NULL,
+            question_id INTEGER NOT NULL,
+            answer_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (assessment_id, unit_id, respondent_type, question_id),
+            FOREIGN KEY (assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
+        )
+    """)
+    # Sortering/rangering af enheder på et felt (fx laveste TRYGHED)
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_assessment_scores_field
+        ON {SCORES_TABLE}(respondent_type, field, avg_score)
+    """)
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_assessment_scores_unit
+        ON {SCORES_TABLE}(unit_id, assessment_id)
+    """)
+
+    changed = False
+    for name, event, body in (
+        ('assessment_scores_ai', 'INSERT', _add_response_sql('NEW')),
+        ('assessment_scores_ad', 'DELETE', _remove_response_sql('OLD')),
+        ('assessment_scores_au',
+         'UPDATE OF assessment_id, unit_id, question_id, respondent_type, adjusted_score, field',
+         _remove_response_sql('OLD') + _add_response_sql('NEW')),
+    ):
+        changed = _create_trigger(conn, name, f"""
+            CREATE TRIGGER {name}
+            AFTER {event} ON responses
+            BEGIN
+                {body}
+            END
+        """) or changed
+
+    if not exists or changed:
+        rows = rebuild_assessment_scores(conn)
+        if rows:
+            print(f"Migration: Beregnede {rows} rækker i {SCORES_TABLE}")
+
+
+def _create_trigger(conn: sqlite3.Connection, name: str, sql: str) -> bool:
+    """Opret triggeren, eller genskab den hvis definitionen er ændret. True hvis oprettet."""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+    ).fetchone()
+    if row and row[0] == sql.strip():
+        return False
+    conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute(sql.strip())
+    return True
+
+
+def rebuild_assessment_scores(conn: sqlite3.Connection, assessment_id: Optional[str] = None) -> int:
+    """
+    Genberegn summary-rækkerne fra responses (alle eller én måling).
+
+    Bruges ved migration og til at rette drift, fx efter en masseopdatering af
+    responses.adjusted_score uden om triggers.
+
+    Returns:
+        Antal rækker i assessment_scores efter genberegningen
+    """
+    where = "WHERE r.assessment_id = ?" if assessment_id else ""
+    params = [assessment_id] if assessment_id else []
+
+    conn.execute(f"DELETE FROM {QUESTION_COUNTS_TABLE} {where.replace('r.', '')}", params)
+    conn.execute(f"DELETE FROM {SCORES_TABLE} {where.replace('r.', '')}", params)
+
+    conn.execute(f"""
+        INSERT INTO {QUESTION_COUNTS_TABLE}
+            (assessment_id, unit_id, respondent_type, question_id, answer_count)
+        SELECT r.assessment_id, r.unit_id, COALESCE(r.respondent_type, ''), r.question_id, COUNT(*)
+        FROM responses r
+        {where} {'AND' if where else 'WHERE'} {_counted('r')}
+        GROUP BY r.assessment_id, r.unit_id, COALESCE(r.respondent_type, ''), r.question_id
+    """, params)
+
+    conn.execute(f"""
+        INSERT INTO {SCORES_TABLE}
+            (assessment_id, unit_id, respondent_type, field,
+             answer_count, score_sum, avg_score, respondent_count)
+        SELECT r.assessment_id, r.unit_id, COALESCE(r.respondent_type, '') as respondent_type, r.field,
+               COUNT(*), SUM(r.adjusted_score), AVG(r.adjusted_score), 0
+        FROM responses r
+        {where} {'AND' if where else 'WHERE'} {_counted('r')}
+        GROUP BY r.assessment_id, r.unit_id, COALESCE(r.respondent_type, ''), r.field
+    """, params)
+
+    conn.execute(f"""
+        UPDATE {SCORES_TABLE} SET respondent_count = (
+            SELECT COALESCE(MAX(sq.answer_count), 0)
+            FROM {QUESTION_COUNTS_TABLE} sq
+            JOIN questions q ON q.id = sq.question_id
+            WHERE sq.assessment_id = {SCORES_TABLE}.assessment_id
+              AND sq.unit_id = {SCORES_TABLE}.unit_id
+              AND sq.respondent_type = {SCORES_TABLE}.respondent_type
+              AND q.field = {SCORES_TABLE}.field
+        )
+        {where.replace('r.', '')}
+    """, params)
+
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {SCORES_TABLE} {where.replace('r.', '')}", params
+    ).fetchone()[0]
+
+
+# ========================================
+# SQL-UDTRYK TIL VIEWS
+# ========================================
+
+def avg_sql(field: Optional[str] = None, respondent_type: Optional[str] = None,
+            alias: str = 's') -> str:
+    """
+    Eksakt gennemsnit over summary-rækker: SUM(score_sum) / SUM(answer_count).
+
+    Svarer til AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ...) over
+    de underliggende svar. field/respondent_type er konstanter fra koden.
+
+        avg_sql('MENING', 'employee') -> gennemsnit for medarbejdernes MENING
+    """
+    conditions = []
+    if respondent_type:
+        conditions.append(f"{alias}.respondent_type = '{respondent_type}'")
+    if field:
+        conditions.append(f"{alias}.field = '{field}'")
+    if not conditions:
+        return f"(SUM({alias}.score_sum) / SUM({alias}.answer_count))"
+    condition = ' AND '.join(conditions)
+    return (f"(SUM(CASE WHEN {condition} THEN {alias}.score_sum END) / "
+            f"SUM(CASE WHEN {condition} THEN {alias}.answer_count END))")
+
+
+def answers_sql(respondent_type: Optional[str] = None, alias: str = 's') -> str:
+    """Antal svar (svarer til COUNT(r.id)) - 0 hvis ingen rækker matcher"""
+    if not respondent_type:
+        return f"COALESCE(SUM({alias}.answer_count), 0)"
+    return (f"COALESCE(SUM(CASE WHEN {alias}.respondent_type = '{respondent_type}' "
+            f"THEN {alias}.answer_count END), 0)")
+
+
+def respondents_sql(respondent_type: Optional[str] = None, alias: str = 's') -> str:
+    """
+    Antal respondenter over flere summary-rækker.
+
+    respondent_count gælder per felt, så summen over enheder/målinger
+    divideres med antallet af felter der indgår.
+    """
+    condition = f"{alias}.respondent_type = '{respondent_type}'" if respondent_type else "1 = 1"
+    return (f"COALESCE(CAST(ROUND(SUM(CASE WHEN {condition} THEN {alias}.respondent_count END) * 1.0 / "
+            f"COUNT(DISTINCT CASE WHEN {condition} THEN {alias}.field END)) AS INTEGER), 0)")
+
+
+def field_avg_columns(respondent_type: Optional[str] = None, prefix: str = '',
+                      alias: str = 's') -> str:
+    """
+    SELECT-kolonner med overall + gennemsnit per felt, fx
+
+        field_avg_columns('employee', 'employee_') ->
+            ... as employee_overall, ... as employee_mening, ...
+    """
+    columns = [f"{avg_sql(None, respondent_type, alias)} as {prefix}overall"]
+    for name, field in FIELD_COLUMNS.items():
+        columns.append(f"{avg_sql(field, respondent_type, alias)} as {prefix}{name}")
+    return ',\n'.join(columns)
@@ -99,6 +99,7 @@ class AuditAction:
     DATA_EXPORTED = "data_exported"
     DATA_IMPORTED = "data_imported"
     DATA_DELETED = "data_deleted"
+    GDPR_DELETE = "gdpr_delete_customer"
     BACKUP_CREATED = "backup_created"
     BACKUP_RESTORED = "backup_restored"
 
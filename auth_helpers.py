@@ -10,6 +10,8 @@ from typing import Any, Dict, Optional, Callable, Tuple
 from flask import session, request, redirect, url_for, flash, jsonify, g
 from werkzeug.wrappers import Response
 
+from tenant_db import set_current_tenant
+
 
 def get_current_user() -> Optional[Dict[str, Any]]:
     """Hent current user fra session"""
@@ -175,6 +177,8 @@ def customer_api_required(f: Callable) -> Callable:
         g.api_permissions = auth['permissions']
         g.api_rate_limit = auth['rate_limit']
         g.api_key_name = auth['key_name']
+        # Nøglens kunde - get_db() bruger kundens egen database (tenant_db)
+        set_current_tenant(auth['customer_id'])
 
         return f(*args, **kwargs)
     return decorated_function
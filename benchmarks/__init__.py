@@ -0,0 +1,3 @@
+"""
+Benchmarks for Friktionskompasset (se run_benchmarks.py)
+"""
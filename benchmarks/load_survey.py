@@ -0,0 +1,384 @@
+"""
+Load-test af survey-intake (/s/<token> og /s/<token>/submit).
+
+Dette script:
+1. Kopierer et skala-datasæt (se run_benchmarks.prepare_dataset) og opretter
+   en ny måling med ét ubrugt token per simuleret respondent
+2. Starter appen under gunicorn med hver worker/tråd-konfiguration
+3. Lader mange samtidige respondenter åbne spørgeskemaet og indsende svar
+4. Rapporterer throughput, p50/p95/p99 latency, "database is locked"-fejl
+   og hvor meget databasen (inkl. WAL) voksede
+
+Hver konfiguration kører mod sin egen friske kopi, så scenariet er det samme.
+
+Brug:
+    python benchmarks/load_survey.py --configs 1x1,1x8,4x1,4x4
+    python benchmarks/load_survey.py --respondents 1000 --concurrency 64 --busy-timeout 5
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.run_benchmarks import RESULTS_DIR, _git_commit, prepare_dataset  # noqa: E402
+
+DEFAULT_CONFIGS = '1x1,1x8,4x1,4x4'
+DEFAULT_RESPONDENTS = 400
+DEFAULT_CONCURRENCY = 32
+REQUEST_TIMEOUT = 60
+SERVER_START_TIMEOUT = 60
+LOCK_ERROR_MARKER = 'database is locked'
+
+
+# ========================================
+# SCENARIE
+# ========================================
+
+def parse_configs(value: str) -> List[Tuple[int, int]]:
+    """'1x1,4x8' -> [(1, 1), (4, 8)] (workers x tråde)"""
+    configs = []
+    for part in value.split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        workers, _, threads = part.partition('x')
+        configs.append((int(workers), int(threads or 1)))
+    return configs
+
+
+def create_load_assessment(db_path: str, respondents: int, seed: int = 42) -> Dict:
+    """
+    Opret en ny måling på rod-enheden med ét ubrugt medarbejder-token per respondent.
+
+    Returns:
+        {'assessment_id', 'tokens', 'question_ids'}
+    """
+    import sqlite3
+
+    rng = random.Random(f"survey-load-{seed}")  # Må ikke kollidere med datasættets tokens
+    conn = sqlite3.connect(db_path)
+    try:
+        root_id = conn.execute("""
+            SELECT id FROM organizational_units
+            WHERE parent_id IS NULL ORDER BY customer_id, id LIMIT 1
+        """).fetchone()[0]
+        assessment_id = f"assess-load-s{seed}"
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn.execute("""
+            INSERT INTO assessments
+            (id, target_unit_id, name, period, sent_at, created_at, status,
+             include_leader_assessment, include_leader_self)
+            VALUES (?, ?, 'Load-test', 'Load-test', ?, ?, 'sent', 0, 0)
+        """, (assessment_id, root_id, now, now))
+
+        tokens = ['%032x' % rng.getrandbits(128) for _ in range(respondents)]
+        conn.executemany("""
+            INSERT INTO tokens (token, assessment_id, unit_id, respondent_type, is_used, created_at)
+            VALUES (?, ?, ?, 'employee', 0, ?)
+        """, [(token, assessment_id, root_id, now) for token in tokens])
+
+        question_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM questions WHERE is_default = 1 ORDER BY sequence")]
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {'assessment_id': assessment_id, 'tokens': tokens, 'question_ids': question_ids}
+
+
+def db_footprint(db_path: str) -> Dict:
+    """Størrelse af databasefil og WAL i bytes"""
+    def size(path):
+        return os.path.getsize(path) if os.path.exists(path) else 0
+    return {'db_bytes': size(db_path), 'wal_bytes': size(db_path + '-wal')}
+
+
+def _count_responses(db_path: str, assessment_id: str) -> int:
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM responses WHERE assessment_id = ?",
+                            (assessment_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+# ========================================
+# SERVER
+# ========================================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, workers: int, threads: int, port: int, log_path: str,
+                 busy_timeout: Optional[float] = None) -> subprocess.Popen:
+    """Start gunicorn (som i Procfile) mod db_path"""
+    env = dict(os.environ)
+    env.update({
+        'DB_PATH': db_path,
+        'RATELIMIT_ENABLED': 'false',
+        'FLASK_DEBUG': 'false',
+        'PYTHONUNBUFFERED': '1',
+    })
+    env.pop('TESTING', None)  # Tests kører uden WAL - load-testen skal måle WAL
+    if busy_timeout is not None:
+        env['DB_BUSY_TIMEOUT'] = str(busy_timeout)
+
+    cmd = [
+        sys.executable, '-m', 'gunicorn', 'admin_app:app',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--worker-class', 'gthread' if threads > 1 else 'sync',
+        '--timeout', str(REQUEST_TIMEOUT * 2),
+    ]
+    log = open(log_path, 'w')
+    try:
+        return subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        log.close()
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen):
+    """Vent til alle workers svarer (ugyldigt token giver en fejlside med 200)"""
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn stoppede med kode {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{base_url}/s/load-test-ping", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Serveren svarede ikke inden for tidsgrænsen")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+# ========================================
+# RESPONDENTER
+# ========================================
+
+def _http(url: str, data: Optional[bytes] = None) -> Tuple[int, float]:
+    """Udfør én request; returnerer (status, ms). Status 0 = forbindelsesfejl"""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, data=data, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = 0
+    return status, (time.perf_counter() - started) * 1000
+
+
+def simulate_respondent(base_url: str, token: str, form: bytes, think_time: float) -> Dict:
+    """Åbn spørgeskemaet, 'udfyld' det og indsend"""
+    get_status, get_ms = _http(f"{base_url}/s/{token}")
+    if think_time:
+        time.sleep(random.uniform(0, think_time))
+    submit_status, submit_ms = _http(f"{base_url}/s/{token}/submit", form)
+    return {'get': (get_status, get_ms), 'submit': (submit_status, submit_ms)}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentil af en sorteret liste"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def _latency(samples: List[Tuple[int, float]]) -> Dict:
+    ok = sorted(ms for status, ms in samples if status == 200)
+    statuses: Dict[str, int] = {}
+    for status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'ok': len(ok),
+        'statuses': statuses,
+        'p50_ms': round(_percentile(ok, 50), 2),
+        'p95_ms': round(_percentile(ok, 95), 2),
+        'p99_ms': round(_percentile(ok, 99), 2),
+        'max_ms': round(ok[-1], 2) if ok else 0.0,
+    }
+
+
+class _WalSampler(threading.Thread):
+    """Følg WAL-filens største størrelse under kørslen"""
+
+    def __init__(self, db_path: str, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, db_footprint(self.db_path)['wal_bytes'])
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ========================================
+# KØRSEL
+# ========================================
+
+def run_scenario(size: str, seed: int, workers: int, threads: int, respondents: int,
+                 concurrency: int, think_time: float = 0.0,
+                 busy_timeout: Optional[float] = None) -> Dict:
+    """Kør ét load-scenarie mod en frisk datasætkopi med én serverkonfiguration"""
+    db_path = prepare_dataset(size, seed)
+    scenario = create_load_assessment(db_path, respondents, seed)
+    form = urllib.parse.urlencode(
+        {**{f"q_{qid}": str((qid % 7) + 1) for qid in scenario['question_ids']},
+         'free_text_general': 'Load-test kommentar'}
+    ).encode()
+
+    fd, log_path = tempfile.mkstemp(suffix='-gunicorn.log')
+    os.close(fd)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(db_path, workers, threads, port, log_path, busy_timeout)
+    try:
+        wait_for_server(base_url, process)
+        before = db_footprint(db_path)
+        sampler = _WalSampler(db_path)
+        sampler.start()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda token: simulate_respondent(base_url, token, form, think_time),
+                scenario['tokens']))
+        elapsed = time.perf_counter() - started
+
+        sampler.stop()
+        during = db_footprint(db_path)
+    finally:
+        stop_server(process)
+
+    try:
+        after = db_footprint(db_path)
+        saved = _count_responses(db_path, scenario['assessment_id'])
+        with open(log_path, errors='replace') as f:
+            lock_errors = sum(1 for line in f if LOCK_ERROR_MARKER in line)
+    finally:
+        for path in (db_path, db_path + '-wal', db_path + '-shm', log_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    submits = _latency([r['submit'] for r in results])
+    pages = _latency([r['get'] for r in results])
+    return {
+        'workers': workers,
+        'threads': threads,
+        'respondents': respondents,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 2),
+        'submissions_per_s': round(submits['ok'] / elapsed, 1) if elapsed else 0.0,
+        'requests_per_s': round((submits['requests'] + pages['requests']) / elapsed, 1) if elapsed else 0.0,
+        'survey_page': pages,
+        'survey_submit': submits,
+        'lock_errors': lock_errors,
+        'responses_saved': saved,
+        'db_growth_bytes': after['db_bytes'] - before['db_bytes'],
+        'wal_peak_bytes': max(sampler.peak, during['wal_bytes']),
+    }
+
+
+def _print_result(result: Dict):
+    submit = result['survey_submit']
+    page = result['survey_page']
+    failed = submit['requests'] - submit['ok']
+    print(f"  {result['workers']}x{result['threads']:<3} "
+          f"{result['submissions_per_s']:>7.1f} submits/s  "
+          f"submit p50/95/99 {submit['p50_ms']:.0f}/{submit['p95_ms']:.0f}/{submit['p99_ms']:.0f} ms  "
+          f"side p95 {page['p95_ms']:.0f} ms  "
+          f"fejl {failed}  låse {result['lock_errors']}  "
+          f"vækst {result['db_growth_bytes'] / 1024:.0f} KiB (WAL max {result['wal_peak_bytes'] / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test af survey-intake under gunicorn")
+    parser.add_argument('--size', default='small', help="Datasæt (se seed_scale_testdata.SIZE_PROFILES)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--configs', default=DEFAULT_CONFIGS,
+                        help="Kommasepareret liste af <workers>x<tråde>")
+    parser.add_argument('--respondents', type=int, default=DEFAULT_RESPONDENTS)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="Antal samtidige simulerede respondenter")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="Maks. sekunder mellem side og indsendelse (tilfældig)")
+    parser.add_argument('--busy-timeout', type=float,
+                        help="SQLite busy timeout i sekunder (DB_BUSY_TIMEOUT, default 30)")
+    parser.add_argument('--output', help="JSON-fil (default: benchmarks/results/load-<tid>-<commit>.json)")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'size': args.size,
+            'seed': args.seed,
+            'think_time': args.think_time,
+            'busy_timeout': args.busy_timeout,
+        },
+        'results': [],
+    }
+    print(f"Survey load-test: {args.respondents} respondenter, {args.concurrency} samtidige, "
+          f"datasæt '{args.size}'")
+    for workers, threads in parse_configs(args.configs):
+        result = run_scenario(args.size, args.seed, workers, threads, args.respondents,
+                              args.concurrency, args.think_time, args.busy_timeout)
+        report['results'].append(result)
+        _print_result(result)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"load-{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultater skrevet til {output}")
+
+
+if __name__ == '__main__':
+    main()
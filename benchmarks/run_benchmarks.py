@@ -0,0 +1,388 @@
+"""
+Benchmark-suite for analyse- og dashboard-hot paths.
+
+Dette script:
+1. Genererer (eller genbruger) skala-datasæt i flere størrelser via
+   seed_scale_testdata.generate_scale_dataset
+2. Måler analysefunktionerne, dashboard/analyser-siderne, eksporterne og
+   survey submit mod hver størrelse
+3. Skriver resultaterne som JSON, så kørsler kan sammenlignes på tværs af commits
+4. Sammenligner valgfrit med en tidligere kørsel og fejler ved regressioner
+
+Brug:
+    python benchmarks/run_benchmarks.py --sizes small,medium
+    python benchmarks/run_benchmarks.py --sizes medium --compare benchmarks/results/baseline.json
+    python benchmarks/run_benchmarks.py --compare-only new.json --baseline old.json
+
+Som standard måles "kolde" kald (in-memory cachen ryddes før hver iteration).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from seed_scale_testdata import SIZE_PROFILES, generate_scale_dataset  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+DEFAULT_ITERATIONS = 5
+DEFAULT_THRESHOLD = 0.20  # 20% langsommere median = regression
+MIN_REGRESSION_MS = 5.0  # Ignorér udsving under 5 ms (støj på små datasæt)
+
+
+# ========================================
+# DATASÆT OG APP
+# ========================================
+
+def prepare_dataset(size: str, seed: int, options: Optional[Dict] = None) -> str:
+    """
+    Returner sti til et friskt arbejds-datasæt for size.
+
+    Selve genereringen caches i benchmarks/.data; hver kørsel arbejder på en
+    kopi, så survey submit ikke ændrer basisdata.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    source = os.path.join(DATA_DIR, f"{size}-seed{seed}.db")
+    if not os.path.exists(source):
+        profile = {**SIZE_PROFILES.get(size, {}), **(options or {}), 'seed': seed}
+        print(f"Genererer datasæt '{size}' -> {source}")
+        generate_scale_dataset(source, profile, verbose=False)
+
+    fd, working = tempfile.mkstemp(suffix=f'-{size}.db')
+    os.close(fd)
+    shutil.copyfile(source, working)
+    return working
+
+
+def _load_app():
+    """Importér Flask-appen i test-konfiguration (ingen scheduler, ingen rate limits)"""
+    os.environ.setdefault('TESTING', 'true')
+    os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+    from admin_app import app
+    return app
+
+
+def _dataset_context(db_path: str) -> Dict:
+    """Find kunde, rod-enhed, seneste måling og ubrugte tokens i datasættet"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        customer = conn.execute("SELECT id FROM customers ORDER BY id LIMIT 1").fetchone()
+        root = conn.execute("""
+            SELECT id FROM organizational_units
+            WHERE customer_id = ? AND parent_id IS NULL
+        """, (customer['id'],)).fetchone()
+        assessment = conn.execute("""
+            SELECT id FROM assessments WHERE target_unit_id = ?
+            ORDER BY created_at DESC LIMIT 1
+        """, (root['id'],)).fetchone()
+        tokens = [row['token'] for row in conn.execute("""
+            SELECT token FROM tokens
+            WHERE is_used = 0 AND respondent_type = 'employee' AND assessment_id = ?
+            LIMIT 200
+        """, (assessment['id'],))]
+        questions = [row['id'] for row in conn.execute(
+            "SELECT id FROM questions WHERE is_default = 1 ORDER BY sequence")]
+    finally:
+        conn.close()
+
+    return {
+        'customer_id': customer['id'],
+        'unit_id': root['id'],
+        'assessment_id': assessment['id'],
+        'tokens': tokens,
+        'question_ids': questions,
+    }
+
+
+# ========================================
+# MÅLING
+# ========================================
+
+def _summarize(durations: List[float], query_counts: List[int]) -> Dict:
+    ordered = sorted(durations)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * len(ordered) + 0.5)) - 1)
+    return {
+        'iterations': len(ordered),
+        'min_ms': round(ordered[0], 2),
+        'median_ms': round(statistics.median(ordered), 2),
+        'mean_ms': round(statistics.mean(ordered), 2),
+        'p95_ms': round(ordered[max(0, p95_index)], 2),
+        'max_ms': round(ordered[-1], 2),
+        'queries': max(query_counts) if query_counts else None,
+    }
+
+
+def measure(func: Callable[[], Optional[int]], iterations: int, warm: bool = False) -> Dict:
+    """
+    Kør func iterations gange (plus én opvarmning) og returnér tidsstatistik.
+
+    func returnerer antallet af SQL statements for kaldet (eller None).
+    """
+    from cache import invalidate_all
+
+    func()  # Opvarmning: imports, templates, SQLite page cache
+    durations, query_counts = [], []
+    for _ in range(iterations):
+        if not warm:
+            invalidate_all()
+        started = time.perf_counter()
+        queries = func()
+        durations.append((time.perf_counter() - started) * 1000)
+        if queries is not None:
+            query_counts.append(queries)
+    return _summarize(durations, query_counts)
+
+
+def _call(func, *args, **kwargs) -> Callable[[], int]:
+    """Pak et funktionskald ind, så antallet af SQL statements registreres"""
+    import perf
+
+    def run():
+        perf.start_request()
+        try:
+            func(*args, **kwargs)
+        finally:
+            summary = perf.finish_request(f"benchmark:{func.__name__}")
+        return summary['query_count'] if summary else None
+    return run
+
+
+def _request(client, method: str, url: str, expect=(200,), **kwargs) -> Callable[[], int]:
+    """Pak en HTTP-request ind; antal statements læses fra perf-middlewaren"""
+    import perf
+
+    def run():
+        perf.reset_route_stats()
+        response = getattr(client, method)(url, **kwargs)
+        if response.status_code not in expect:
+            raise RuntimeError(f"{method.upper()} {url} gav {response.status_code}")
+        response.get_data()
+        stats = perf.get_route_stats()
+        return stats[0]['max_queries'] if stats else None
+    return run
+
+
+def _survey_submit(client, context: Dict) -> Callable[[], int]:
+    """Besvar et nyt ubrugt token per kald"""
+    import perf
+
+    tokens = list(context['tokens'])
+    form = {f"q_{qid}": str((qid % 7) + 1) for qid in context['question_ids']}
+    form['free_text_general'] = 'Benchmark kommentar'
+
+    def run():
+        if not tokens:
+            raise RuntimeError("Ikke flere ubrugte tokens i datasættet")
+        token = tokens.pop()
+        perf.reset_route_stats()
+        response = client.post(f"/s/{token}/submit", data=form)
+        if response.status_code != 200:
+            raise RuntimeError(f"survey submit gav {response.status_code}")
+        stats = perf.get_route_stats()
+        return stats[0]['max_queries'] if stats else None
+    return run
+
+
+def build_benchmarks(app, context: Dict) -> Dict[str, Callable[[], Optional[int]]]:
+    """Alle benchmarks som navn -> kald"""
+    from analysis import get_detailed_breakdown, calculate_substitution_db, get_trend_data
+    from db_hierarchical import get_assessment_overview
+    from db_multitenant import generate_customer_api_key
+
+    unit_id = context['unit_id']
+    assessment_id = context['assessment_id']
+    customer_id = context['customer_id']
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {
+            'id': 1, 'email': 'benchmark@example.com', 'name': 'Benchmark',
+            'role': 'superadmin', 'customer_id': None, 'customer_name': None
+        }
+        sess['customer_filter'] = customer_id
+
+    api_key, _ = generate_customer_api_key(customer_id, 'Benchmark', {'read': True, 'write': False})
+
+    return {
+        'get_detailed_breakdown': _call(get_detailed_breakdown, unit_id, assessment_id),
+        'calculate_substitution_db': _call(calculate_substitution_db, unit_id, assessment_id),
+        'get_trend_data': _call(get_trend_data, customer_id=customer_id),
+        'get_assessment_overview': _call(get_assessment_overview, assessment_id),
+        'org_dashboard': _request(client, 'get', f"/admin/dashboard/{customer_id}"),
+        'admin_analyser': _request(client, 'get', '/admin/analyser'),
+        'export_bulk_json': _request(client, 'post', '/admin/bulk-export/download', data={
+            'customer_id': customer_id, 'format': 'json', 'anonymization': 'pseudonymized',
+            'include_responses': '1', 'include_scores': '1',
+            'include_questions': '1', 'include_units': '1',
+        }),
+        'export_bulk_csv': _request(client, 'post', '/admin/bulk-export/download', data={
+            'customer_id': customer_id, 'format': 'csv', 'anonymization': 'pseudonymized',
+            'include_responses': '1',
+        }),
+        'export_api_v1': _request(client, 'get', '/api/v1/export',
+                                  headers={'X-API-Key': api_key}),
+        'export_pdf': _request(client, 'get', f"/admin/assessment/{assessment_id}/pdf"),
+        'survey_submit': _survey_submit(client, context),
+    }
+
+
+def run_size(app, size: str, seed: int, iterations: int, warm: bool,
+             only: Optional[List[str]] = None) -> Dict:
+    """Kør alle benchmarks mod ét datasæt"""
+    db_path = prepare_dataset(size, seed)
+    os.environ['DB_PATH'] = db_path
+    try:
+        context = _dataset_context(db_path)
+        results = {}
+        for name, func in build_benchmarks(app, context).items():
+            if only and name not in only:
+                continue
+            try:
+                results[name] = measure(func, iterations, warm)
+                print(f"  {size:8} {name:28} median {results[name]['median_ms']:>9.2f} ms"
+                      f"  queries {results[name]['queries']}")
+            except Exception as e:
+                # Fx manglende WeasyPrint - fortsæt med resten
+                results[name] = {'error': str(e)}
+                print(f"  {size:8} {name:28} FEJL: {e}")
+        return results
+    finally:
+        os.remove(db_path)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(sizes: List[str], seed: int = 42, iterations: int = DEFAULT_ITERATIONS,
+                   warm: bool = False, only: Optional[List[str]] = None) -> Dict:
+    """
+    Kør suiten for alle sizes.
+
+    Returns:
+        {'meta': {...}, 'results': {size: {benchmark: stats}}}
+    """
+    app = _load_app()
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'seed': seed,
+            'iterations': iterations,
+            'warm_cache': warm,
+        },
+        'results': {},
+    }
+    for size in sizes:
+        print(f"Datasæt: {size}")
+        report['results'][size] = run_size(app, size, seed, iterations, warm, only)
+    return report
+
+
+# ========================================
+# REGRESSIONS-TJEK
+# ========================================
+
+def compare_reports(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD,
+                    min_delta_ms: float = MIN_REGRESSION_MS) -> List[Dict]:
+    """
+    Find benchmarks hvor medianen er steget mere end threshold (relativt)
+    og mere end min_delta_ms (absolut) i forhold til baseline.
+    """
+    regressions = []
+    for size, benchmarks in current.get('results', {}).items():
+        for name, stats in benchmarks.items():
+            old = baseline.get('results', {}).get(size, {}).get(name)
+            if not old or 'median_ms' not in old or 'median_ms' not in stats:
+                continue
+            delta = stats['median_ms'] - old['median_ms']
+            if delta > min_delta_ms and stats['median_ms'] > old['median_ms'] * (1 + threshold):
+                regressions.append({
+                    'size': size,
+                    'benchmark': name,
+                    'baseline_ms': old['median_ms'],
+                    'current_ms': stats['median_ms'],
+                    'change_percent': round(delta / old['median_ms'] * 100, 1) if old['median_ms'] else None,
+                })
+    return regressions
+
+
+def _print_regressions(regressions: List[Dict], threshold: float) -> int:
+    if not regressions:
+        print(f"Ingen regressioner over {threshold:.0%}")
+        return 0
+    print(f"REGRESSIONER (> {threshold:.0%}):")
+    for r in regressions:
+        print(f"  {r['size']:8} {r['benchmark']:28} {r['baseline_ms']:>9.2f} -> "
+              f"{r['current_ms']:>9.2f} ms (+{r['change_percent']}%)")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analyse- og dashboard-hot paths")
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f"Kommasepareret liste af {', '.join(SIZE_PROFILES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--warm', action='store_true', help="Mål med varm in-memory cache")
+    parser.add_argument('--only', help="Kommasepareret liste af benchmarks")
+    parser.add_argument('--output', help="JSON-fil (default: benchmarks/results/<tid>-<commit>.json)")
+    parser.add_argument('--compare', help="Baseline JSON at sammenligne med")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--compare-only', help="Sammenlign en eksisterende JSON med --compare")
+    args = parser.parse_args()
+
+    if args.compare_only:
+        with open(args.compare_only) as f:
+            current = json.load(f)
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(_print_regressions(compare_reports(current, baseline, args.threshold), args.threshold))
+
+    report = run_benchmarks(
+        sizes=[s.strip() for s in args.sizes.split(',') if s.strip()],
+        seed=args.seed,
+        iterations=args.iterations,
+        warm=args.warm,
+        only=[s.strip() for s in args.only.split(',')] if args.only else None,
+    )
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultater skrevet til {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(_print_regressions(compare_reports(report, baseline, args.threshold), args.threshold))
+
+
+if __name__ == '__main__':
+    main()
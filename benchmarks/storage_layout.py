@@ -0,0 +1,194 @@
+"""
+Benchmark af lagringslayouts for responses (standard vs. dækkende).
+
+Dette script:
+1. Kopierer et skala-datasæt (se run_benchmarks.prepare_dataset)
+2. Skifter layout med responses_layout.set_responses_layout og kører VACUUM
+3. Måler databasestørrelse (fil + sider per tabel/index via dbstat)
+4. Måler analyse-queries der scanner svar og et batch af indsættelser
+   (rulles tilbage, så begge layouts måles på samme data)
+
+Brug:
+    python benchmarks/storage_layout.py --size medium
+    python benchmarks/storage_layout.py --size large --iterations 3
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.run_benchmarks import (  # noqa: E402
+    DEFAULT_ITERATIONS, RESULTS_DIR, _call, _dataset_context, _git_commit, measure, prepare_dataset
+)
+
+LAYOUTS = ('default', 'covering')
+INSERT_RESPONDENTS = 500
+
+
+def storage_footprint(db_path: str) -> Dict:
+    """Filstørrelse og bytes per responses-tabel/index"""
+    conn = sqlite3.connect(db_path)
+    try:
+        objects = {row[0]: row[1] for row in conn.execute("""
+            SELECT s.name, SUM(s.pgsize) FROM dbstat s
+            JOIN sqlite_master m ON m.name = s.name
+            WHERE m.tbl_name = 'responses'
+            GROUP BY s.name ORDER BY s.name
+        """)}
+    finally:
+        conn.close()
+    return {
+        'db_bytes': os.path.getsize(db_path),
+        'responses_bytes': sum(objects.values()),
+        'objects': objects,
+    }
+
+
+def _insert_batch(db_path: str, context: Dict) -> Callable[[], None]:
+    """Indsæt INSERT_RESPONDENTS besvarelser i én transaktion og rul tilbage"""
+    from adjusted_scores import response_score_values
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    questions = [dict(row) for row in conn.execute(
+        "SELECT id, field, reverse_scored, sequence FROM questions WHERE is_default = 1")]
+    unit_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT unit_id FROM responses WHERE assessment_id = ?",
+        (context['assessment_id'],))]
+    conn.close()
+
+    rows = []
+    for i in range(INSERT_RESPONDENTS):
+        for q in questions:
+            score = (i + q['id']) % 7 + 1
+            values = response_score_values(q, score)
+            rows.append((context['assessment_id'], unit_ids[i % len(unit_ids)], q['id'], score,
+                         values['adjusted_score'], values['field'], values['layer'],
+                         'employee', f"resp-bench-{i:06d}"))
+
+    def run():
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.executemany("""
+                INSERT INTO responses (assessment_id, unit_id, question_id, score,
+                                       adjusted_score, field, layer, respondent_type, respondent_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            conn.rollback()
+        finally:
+            conn.close()
+    return run
+
+
+def build_benchmarks(db_path: str, context: Dict) -> Dict[str, Callable]:
+    """Queries der læser svar per måling/enhed - plus skrivestien"""
+    from analysis import get_comparison_by_respondent_type, get_detailed_breakdown
+    from blueprints.assessments import get_individual_scores
+    from db_hierarchical import get_unit_stats
+
+    unit_id = context['unit_id']
+    assessment_id = context['assessment_id']
+    return {
+        'get_unit_stats': _call(get_unit_stats, unit_id, assessment_id),
+        'get_detailed_breakdown': _call(get_detailed_breakdown, unit_id, assessment_id),
+        'get_comparison_by_respondent_type': _call(get_comparison_by_respondent_type,
+                                                   unit_id, assessment_id),
+        'get_individual_scores': _call(get_individual_scores, unit_id, assessment_id),
+        f'insert_{INSERT_RESPONDENTS}_respondents': _insert_batch(db_path, context),
+    }
+
+
+def run_layout(db_path: str, layout: str, iterations: int) -> Dict:
+    """Skift til layout, VACUUM og mål"""
+    from responses_layout import set_responses_layout
+
+    started = time.perf_counter()
+    change = set_responses_layout(layout)
+    switch_ms = (time.perf_counter() - started) * 1000
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("VACUUM")
+    conn.close()
+
+    result = {
+        'switch_ms': round(switch_ms, 1),
+        'created': change['created'],
+        'dropped': change['dropped'],
+        'storage': storage_footprint(db_path),
+        'benchmarks': {},
+    }
+    context = _dataset_context(db_path)
+    for name, func in build_benchmarks(db_path, context).items():
+        result['benchmarks'][name] = measure(func, iterations)
+    return result
+
+
+def _print_comparison(results: Dict):
+    default, covering = results['default'], results['covering']
+
+    def pct(before, after):
+        return f"{(after - before) / before * 100:+.0f}%" if before else '-'
+
+    print(f"\n  {'':36} {'default':>12} {'covering':>12}")
+    for key in ('db_bytes', 'responses_bytes'):
+        before, after = default['storage'][key], covering['storage'][key]
+        print(f"  {key:36} {before / 1e6:>10.1f}MB {after / 1e6:>10.1f}MB  {pct(before, after)}")
+    for name, stats in default['benchmarks'].items():
+        before = stats['median_ms']
+        after = covering['benchmarks'][name]['median_ms']
+        print(f"  {name:36} {before:>10.1f}ms {after:>10.1f}ms  {pct(before, after)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sammenlign lagringslayouts for responses")
+    parser.add_argument('--size', default='medium', help="Datasæt (se seed_scale_testdata.SIZE_PROFILES)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--output', help="JSON-fil (default: benchmarks/results/layout-<tid>-<commit>.json)")
+    args = parser.parse_args()
+
+    db_path = prepare_dataset(args.size, args.seed)
+    os.environ['DB_PATH'] = db_path
+    try:
+        rows = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        print(f"Layout-benchmark: datasæt '{args.size}' ({rows} svar)")
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'sqlite': sqlite3.sqlite_version,
+                'size': args.size,
+                'seed': args.seed,
+                'iterations': args.iterations,
+                'responses': rows,
+            },
+            'results': {},
+        }
+        for layout in LAYOUTS:
+            report['results'][layout] = run_layout(db_path, layout, args.iterations)
+            print(f"  {layout}: skift {report['results'][layout]['switch_ms']:.0f} ms")
+        _print_comparison(report['results'])
+    finally:
+        os.remove(db_path)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"layout-{stamp}-{report['meta']['commit'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultater skrevet til {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,21 +11,60 @@ Routes:
 - /admin/dashboard - Hierarchical organization dashboard (org_dashboard)
 - /admin/dashboard/<customer_id> - Customer-level dashboard
 - /admin/dashboard/<customer_id>/<unit_id> - Unit drill-down dashboard
+- /admin/comments - Free-text comment search with facets
+- /admin/comments/search - Comment search (JSON, cursor pagination)
+- /admin/comments/facets - Comment facets (JSON)
 - /admin/audit-log - Audit log viewer
 - /admin/gdpr - GDPR dashboard
 - /admin/gdpr/delete-customer/<customer_id> - Delete customer data (GDPR)
 """
 
-from flask import Blueprint, render_template, redirect, url_for, session, request, flash
+from flask import Blueprint, render_template, redirect, url_for, session, request, flash, jsonify
 
 from auth_helpers import login_required, admin_required, get_current_user
 from db_hierarchical import get_db
-from db_multitenant import get_customer_filter
+from db_multitenant import get_customer_filter, invalidate_domain_cache, invalidate_api_key_cache
 from analysis import get_trend_data
+from comment_search import COMMENT_FIELDS, search_comments, get_comment_facets
+from assessment_scores import avg_sql, answers_sql, respondents_sql, field_avg_columns
+from stats_counters import get_counters, counter_sql
+from tenant_db import drop_customer_database
+from org_tree import get_org_tree, get_tree_for_unit
+from cache import KeysetOrder, SortKey, capped_count, keyset_paginate
+from data_version import conditional_get
+from page_cache import cached_page
 from audit import log_action, AuditAction, get_audit_logs, get_audit_log_count, get_action_summary
 
 admin_core_bp = Blueprint('admin_core', __name__)
 
+# Score-kolonner til /admin/analyser (fra assessment_scores aliased s)
+ANALYSER_SCORE_COLUMNS = f"""
+    {answers_sql()} as total_responses,
+    {respondents_sql('employee')} as unique_respondents,
+    {field_avg_columns('employee', 'employee_')},
+    {field_avg_columns('leader_assess', 'leader_')}
+"""
+
+# Keyset-paginering af admin-lister (se cache.keyset_paginate)
+# Analyser (mode 1): sortering -> nøgle i det grupperede resultat.
+# Scores uden svar sorterer som NULL (før alle scores ved stigende orden)
+ANALYSER_SORT_KEYS = {
+    'name': SortKey('name', 'name', null_value=''),
+    'responses': SortKey('total_responses', 'total_responses', null_value=0),
+    'employee_overall': SortKey('employee_overall', 'employee_overall', null_value=-1),
+    'mening': SortKey('employee_mening', 'employee_mening', null_value=-1),
+    'tryghed': SortKey('employee_tryghed', 'employee_tryghed', null_value=-1),
+    'kan': SortKey('employee_kan', 'employee_kan', null_value=-1),
+    'besvaer': SortKey('employee_besvaer', 'employee_besvaer', null_value=-1),
+    'gap': SortKey('ABS(employee_overall - leader_overall)', 'leader_gap', null_value=-1),
+}
+
+# Målingsoversigten: nyeste først (dækket af idx_assessments_created)
+ASSESSMENTS_OVERVIEW_ORDER = KeysetOrder(
+    SortKey('c.created_at', 'created_at', descending=True),
+    SortKey('c.id', 'id', descending=True),
+)
+
 
 # ========================================
 # GDPR SUB-PROCESSORS CONSTANT
@@ -91,44 +130,26 @@ def admin_home():
             customer_params = []
             cid = None
 
-        # === KPI Stats ===
-        if cid:
-            total_customers = 1
-            total_units = conn.execute(
-                "SELECT COUNT(*) as cnt FROM organizational_units WHERE customer_id = ?",
-                [cid]
-            ).fetchone()['cnt']
-            total_assessments = conn.execute("""
-                SELECT COUNT(*) as cnt FROM assessments c
-                JOIN organizational_units ou ON c.target_unit_id = ou.id
-                WHERE ou.customer_id = ?
-            """, [cid]).fetchone()['cnt']
-            total_responses = conn.execute("""
-                SELECT COUNT(*) as cnt FROM responses r
-                JOIN assessments c ON r.assessment_id = c.id
-                JOIN organizational_units ou ON c.target_unit_id = ou.id
-                WHERE ou.customer_id = ?
-            """, [cid]).fetchone()['cnt']
-        else:
-            total_customers = conn.execute("SELECT COUNT(*) as cnt FROM customers").fetchone()['cnt']
-            total_units = conn.execute("SELECT COUNT(*) as cnt FROM organizational_units").fetchone()['cnt']
-            total_assessments = conn.execute("SELECT COUNT(*) as cnt FROM assessments").fetchone()['cnt']
-            total_responses = conn.execute("SELECT COUNT(*) as cnt FROM responses").fetchone()['cnt']
+        # === KPI Stats (vedligeholdte tællere) ===
+        counters = get_counters(conn, cid)
+        total_customers = 1 if cid else counters['customers']
+        total_units = counters['units']
+        total_assessments = counters['assessments']
+        total_responses = counters['responses']
 
         # === Field Scores (aggregeret) ===
         field_scores_query = """
             SELECT
-                q.field,
-                AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                COUNT(*) as response_count
-            FROM responses r
-            JOIN questions q ON r.question_id = q.id
-            JOIN assessments c ON r.assessment_id = c.id
+                s.field,
+                {avg_score} as avg_score,
+                SUM(s.answer_count) as response_count
+            FROM assessment_scores s
+            JOIN assessments c ON s.assessment_id = c.id
             JOIN organizational_units ou ON c.target_unit_id = ou.id
             {where}
-            GROUP BY q.field
+            GROUP BY s.field
             ORDER BY avg_score ASC
-        """.format(where=customer_where)
+        """.format(where=customer_where, avg_score=avg_sql())
         field_scores = conn.execute(field_scores_query, customer_params).fetchall()
 
         # === Seneste målinger ===
@@ -139,12 +160,11 @@ def admin_home():
                 c.period,
                 c.created_at,
                 ou.name as unit_name,
-                COUNT(DISTINCT r.id) as response_count
+                (SELECT COALESCE(SUM(s.answer_count), 0) FROM assessment_scores s
+                 WHERE s.assessment_id = c.id) as response_count
             FROM assessments c
             JOIN organizational_units ou ON c.target_unit_id = ou.id
-            LEFT JOIN responses r ON r.assessment_id = c.id
             {where}
-            GROUP BY c.id
             ORDER BY c.created_at DESC
             LIMIT 5
         """.format(where=customer_where)
@@ -180,40 +200,31 @@ def admin_home():
                  JOIN organizational_units ou2 ON a.target_unit_id = ou2.id
                  WHERE ou2.full_path LIKE ou.full_path || '%' AND ou2.customer_id = ou.customer_id) as assessment_count,
 
-                -- Total responses for denne enhed OG børn
-                COUNT(DISTINCT r.id) as total_responses,
-
-                AVG(CASE
-                    WHEN q.field = 'MENING' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                END) as employee_mening,
-
-                AVG(CASE
-                    WHEN q.field = 'TRYGHED' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                END) as employee_tryghed,
-
-                AVG(CASE
-                    WHEN q.field = 'KAN' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                END) as employee_kan,
+                -- Total medarbejder-svar for denne enhed OG børn
+                {total_responses} as total_responses,
 
-                AVG(CASE
-                    WHEN q.field = 'BESVÆR' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                END) as employee_besvaer
+                {employee_mening} as employee_mening,
+                {employee_tryghed} as employee_tryghed,
+                {employee_kan} as employee_kan,
+                {employee_besvaer} as employee_besvaer
 
             FROM organizational_units ou
             -- Join med alle børne-units for at aggregere (filtreret på kunde)
             LEFT JOIN organizational_units children ON children.full_path LIKE ou.full_path || '%' AND children.customer_id = ou.customer_id
             LEFT JOIN assessments c ON c.target_unit_id = children.id
-            LEFT JOIN responses r ON c.id = r.assessment_id AND r.respondent_type = 'employee'
-            LEFT JOIN questions q ON r.question_id = q.id
+            LEFT JOIN assessment_scores s ON s.assessment_id = c.id AND s.respondent_type = 'employee'
             {where}
             GROUP BY ou.id
             HAVING total_responses > 0
             ORDER BY ou.full_path
-        """.format(where=customer_where)
+        """.format(
+            where=customer_where,
+            total_responses=answers_sql(),
+            employee_mening=avg_sql('MENING'),
+            employee_tryghed=avg_sql('TRYGHED'),
+            employee_kan=avg_sql('KAN'),
+            employee_besvaer=avg_sql('BESVÆR'),
+        )
         unit_scores_raw = conn.execute(unit_scores_query, customer_params).fetchall()
 
         # Enrich and build hierarchy
@@ -364,45 +375,30 @@ def admin_noegletal():
             customer_where = ""
             customer_params = []
 
-        # Totale stats
+        # Totale stats (vedligeholdte tællere)
         if customer_filter or user['role'] not in ('admin', 'superadmin'):
             cid = customer_filter or user['customer_id']
-            total_customers = 1
-            total_units = conn.execute(
-                "SELECT COUNT(*) as cnt FROM organizational_units WHERE customer_id = ?",
-                [cid]
-            ).fetchone()['cnt']
-            total_assessments = conn.execute("""
-                SELECT COUNT(*) as cnt FROM assessments c
-                JOIN organizational_units ou ON c.target_unit_id = ou.id
-                WHERE ou.customer_id = ?
-            """, [cid]).fetchone()['cnt']
-            total_responses = conn.execute("""
-                SELECT COUNT(*) as cnt FROM responses r
-                JOIN assessments c ON r.assessment_id = c.id
-                JOIN organizational_units ou ON c.target_unit_id = ou.id
-                WHERE ou.customer_id = ?
-            """, [cid]).fetchone()['cnt']
         else:
-            total_customers = conn.execute("SELECT COUNT(*) as cnt FROM customers").fetchone()['cnt']
-            total_units = conn.execute("SELECT COUNT(*) as cnt FROM organizational_units").fetchone()['cnt']
-            total_assessments = conn.execute("SELECT COUNT(*) as cnt FROM assessments").fetchone()['cnt']
-            total_responses = conn.execute("SELECT COUNT(*) as cnt FROM responses").fetchone()['cnt']
+            cid = None
+        counters = get_counters(conn, cid)
+        total_customers = 1 if cid else counters['customers']
+        total_units = counters['units']
+        total_assessments = counters['assessments']
+        total_responses = counters['responses']
 
         # Gennemsnitlige scores per felt
         field_scores_query = """
             SELECT
-                q.field,
-                AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                COUNT(*) as response_count
-            FROM responses r
-            JOIN questions q ON r.question_id = q.id
-            JOIN assessments c ON r.assessment_id = c.id
+                s.field,
+                {avg_score} as avg_score,
+                SUM(s.answer_count) as response_count
+            FROM assessment_scores s
+            JOIN assessments c ON s.assessment_id = c.id
             JOIN organizational_units ou ON c.target_unit_id = ou.id
             {where}
-            GROUP BY q.field
+            GROUP BY s.field
             ORDER BY avg_score ASC
-        """.format(where=customer_where)
+        """.format(where=customer_where, avg_score=avg_sql())
         field_scores = conn.execute(field_scores_query, customer_params).fetchall()
 
         # Seneste kampagner
@@ -414,14 +410,13 @@ def admin_noegletal():
                 c.created_at,
                 ou.name as unit_name,
                 cust.name as customer_name,
-                COUNT(DISTINCT r.id) as response_count,
+                (SELECT COALESCE(SUM(s.answer_count), 0) FROM assessment_scores s
+                 WHERE s.assessment_id = c.id) as response_count,
                 (SELECT COUNT(*) FROM tokens t WHERE t.assessment_id = c.id) as token_count
             FROM assessments c
             JOIN organizational_units ou ON c.target_unit_id = ou.id
             JOIN customers cust ON ou.customer_id = cust.id
-            LEFT JOIN responses r ON r.assessment_id = c.id
             {where}
-            GROUP BY c.id
             ORDER BY c.created_at DESC
             LIMIT 5
         """.format(where=customer_where)
@@ -430,34 +425,22 @@ def admin_noegletal():
         # Per-kunde stats (kun for admin/superadmin uden filter)
         customer_stats = []
         if user['role'] in ('admin', 'superadmin') and not customer_filter:
-            customer_stats = conn.execute("""
+            customer_stats = conn.execute(f"""
                 SELECT
                     cust.id,
                     cust.name,
-                    COUNT(DISTINCT ou.id) as unit_count,
-                    COUNT(DISTINCT c.id) as assessment_count,
-                    COUNT(DISTINCT r.id) as response_count
+                    {counter_sql('units')} as unit_count,
+                    {counter_sql('assessments')} as assessment_count,
+                    {counter_sql('responses')} as response_count
                 FROM customers cust
-                LEFT JOIN organizational_units ou ON ou.customer_id = cust.id
-                LEFT JOIN assessments c ON c.target_unit_id = ou.id
-                LEFT JOIN responses r ON r.assessment_id = c.id
+                LEFT JOIN stats_counters sc ON sc.scope = cust.id
                 GROUP BY cust.id
                 ORDER BY response_count DESC
             """).fetchall()
 
         # Svarprocent beregning
-        response_rate_data = conn.execute("""
-            SELECT
-                COUNT(DISTINCT CASE WHEN t.is_used = 1 THEN t.token END) as used_tokens,
-                COUNT(DISTINCT t.token) as total_tokens
-            FROM tokens t
-            JOIN assessments c ON t.assessment_id = c.id
-            JOIN organizational_units ou ON c.target_unit_id = ou.id
-            {where}
-        """.format(where=customer_where), customer_params).fetchone()
-
-        if response_rate_data['total_tokens'] > 0:
-            avg_response_rate = (response_rate_data['used_tokens'] / response_rate_data['total_tokens']) * 100
+        if counters['tokens_sent'] > 0:
+            avg_response_rate = (counters['tokens_used'] / counters['tokens_sent']) * 100
         else:
             avg_response_rate = 0
 
@@ -473,8 +456,17 @@ def admin_noegletal():
                          show_customer_stats=(user['role'] in ('admin', 'superadmin') and not customer_filter))
 
 
+def _user_data_scope(customer_id=None, **_):
+    """Kunden hvis data en side viser (None = alle kunder) - til ETags"""
+    user = get_current_user()
+    if user['role'] not in ('admin', 'superadmin'):
+        return user['customer_id']
+    return customer_id or session.get('customer_filter')
+
+
 @admin_core_bp.route('/admin/trend')
 @login_required
+@conditional_get(_user_data_scope)
 def admin_trend():
     """Trend analyse - sammenlign friktionsscores over tid"""
     user = get_current_user()
@@ -516,63 +508,65 @@ def admin_trend():
 @admin_core_bp.route('/admin/assessments-overview')
 @login_required
 def assessments_overview():
-    """Oversigt over alle analyser/kampagner"""
+    """Oversigt over alle analyser/kampagner (keyset-pagineret, nyeste først)"""
     user = get_current_user()
     where_clause, params = get_customer_filter(user['role'], user['customer_id'], session.get('customer_filter'))
 
+    # Manager ser kun kampagner for sine units
+    if user['role'] in ('admin', 'superadmin'):
+        scope, scope_params = "1 = 1", []
+    else:
+        scope, scope_params = "ou.customer_id = ?", [user['customer_id']]
+
     with get_db() as conn:
-        # Hent alle assessments med stats
-        if user['role'] in ('admin', 'superadmin'):
-            assessments = conn.execute("""
+        def fetch(condition, keyset_params, order_by, limit):
+            # Find sidens assessments via idx_assessments_created og beregn
+            # stats (scores fra assessment_scores) kun for dem - GROUP BY på
+            # hele tabellen ville sortere alle rækker for hver side.
+            # CROSS JOIN holder page som yderste løkke.
+            return conn.execute(f"""
+                WITH page AS (
+                    SELECT c.id FROM assessments c
+                    JOIN organizational_units ou ON c.target_unit_id = ou.id
+                    WHERE {scope} AND {condition}
+                    ORDER BY {order_by}
+                    LIMIT ?
+                )
                 SELECT
                     c.*,
                     ou.name as target_name,
-                    COALESCE(COUNT(DISTINCT t.token), 0) as tokens_sent,
-                    COALESCE(COUNT(DISTINCT CASE WHEN t.is_used = 1 THEN t.token END), 0) as tokens_used,
-                    COUNT(DISTINCT r.respondent_name) as unique_respondents,
-                    COUNT(DISTINCT r.id) as total_responses,
-                    AVG(CASE
-                        WHEN q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                    END) as avg_besvaer
-                FROM assessments c
+                    (SELECT COUNT(*) FROM tokens t WHERE t.assessment_id = c.id) as tokens_sent,
+                    (SELECT COUNT(*) FROM tokens t
+                     WHERE t.assessment_id = c.id AND t.is_used = 1) as tokens_used,
+                    {respondents_sql()} as unique_respondents,
+                    {answers_sql()} as total_responses,
+                    {avg_sql('BESVÆR')} as avg_besvaer
+                FROM page
+                CROSS JOIN assessments c ON c.id = page.id
                 JOIN organizational_units ou ON c.target_unit_id = ou.id
-                LEFT JOIN tokens t ON c.id = t.assessment_id
-                LEFT JOIN responses r ON c.id = r.assessment_id
-                LEFT JOIN questions q ON r.question_id = q.id
+                LEFT JOIN assessment_scores s ON s.assessment_id = c.id
                 GROUP BY c.id
-                ORDER BY c.created_at DESC
-            """).fetchall()
-        else:
-            # Manager ser kun kampagner for sine units
-            assessments = conn.execute("""
-                SELECT
-                    c.*,
-                    ou.name as target_name,
-                    COALESCE(COUNT(DISTINCT t.token), 0) as tokens_sent,
-                    COALESCE(COUNT(DISTINCT CASE WHEN t.is_used = 1 THEN t.token END), 0) as tokens_used,
-                    COUNT(DISTINCT r.respondent_name) as unique_respondents,
-                    COUNT(DISTINCT r.id) as total_responses,
-                    AVG(CASE
-                        WHEN q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                    END) as avg_besvaer
-                FROM assessments c
+                ORDER BY {order_by}
+            """, scope_params + keyset_params + [limit]).fetchall()
+
+        def count():
+            return capped_count(conn, f"""
+                SELECT 1 FROM assessments c
                 JOIN organizational_units ou ON c.target_unit_id = ou.id
-                LEFT JOIN tokens t ON c.id = t.assessment_id
-                LEFT JOIN responses r ON c.id = r.assessment_id
-                LEFT JOIN questions q ON r.question_id = q.id
-                WHERE ou.customer_id = ?
-                GROUP BY c.id
-                ORDER BY c.created_at DESC
-            """, [user['customer_id']]).fetchall()
+                WHERE {scope}
+            """, scope_params)
+
+        assessments, pagination = keyset_paginate(
+            fetch, ASSESSMENTS_OVERVIEW_ORDER, request.args.get('cursor'), count_func=count)
 
     return render_template('admin/assessments_overview.html',
-                         assessments=[dict(c) for c in assessments])
+                         assessments=[dict(c) for c in assessments],
+                         pagination=pagination)
 
 
 @admin_core_bp.route('/admin/analyser')
 @login_required
+@cached_page(_user_data_scope)
 def analyser():
     """Analyser: Aggregeret friktionsdata på tværs af organisationen.
 
@@ -595,6 +589,7 @@ def analyser():
         enriched_units = []
         selected_unit_name = None
         show_assessments = False  # Whether we're showing individual assessments
+        pagination = None  # Kun enhedsoversigten (mode 1) pagineres
         trend_data = None  # Trend data for units with multiple assessments
 
         if unit_id:
@@ -621,25 +616,15 @@ def analyser():
 
                 if assessment_count >= 2:
                     # Calculate trend from oldest to newest assessment (only gruppe_friktion)
-                    trend_query = """
+                    trend_query = f"""
                         SELECT
                             a.id,
                             a.name,
                             a.period,
                             a.created_at,
-                            AVG(CASE WHEN r.respondent_type = 'employee' THEN
-                                CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as overall,
-                            AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'MENING' THEN
-                                CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as mening,
-                            AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'TRYGHED' THEN
-                                CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as tryghed,
-                            AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'KAN' THEN
-                                CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as kan,
-                            AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'BESVÆR' THEN
-                                CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as besvaer
+                            {field_avg_columns('employee')}
                         FROM assessments a
-                        JOIN responses r ON a.id = r.assessment_id
-                        JOIN questions q ON r.question_id = q.id
+                        JOIN assessment_scores s ON a.id = s.assessment_id
                         WHERE a.target_unit_id = ? AND a.assessment_type_id = 'gruppe_friktion'
                         GROUP BY a.id
                         ORDER BY a.created_at ASC
@@ -689,7 +674,7 @@ def analyser():
                             'fields': ['TRYGHED', 'MENING', 'KAN', 'BESVÆR'],
                         }
 
-                query = """
+                query = f"""
                     SELECT
                         ou.id,
                         ou.name,
@@ -699,35 +684,11 @@ def analyser():
                         c.name as assessment_name,
                         c.period,
                         c.created_at,
-                        COUNT(DISTINCT r.id) as total_responses,
-                        CAST(SUM(CASE WHEN r.respondent_type = 'employee' THEN 1 ELSE 0 END) AS REAL) / 24 as unique_respondents,
-
-                        AVG(CASE WHEN r.respondent_type = 'employee' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_overall,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'MENING' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_mening,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'TRYGHED' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_tryghed,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'KAN' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_kan,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_besvaer,
-
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_overall,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'MENING' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_mening,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'TRYGHED' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_tryghed,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'KAN' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_kan,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_besvaer
+                        {ANALYSER_SCORE_COLUMNS}
 
                     FROM organizational_units ou
                     JOIN assessments c ON c.target_unit_id = ou.id
-                    JOIN responses r ON c.id = r.assessment_id
-                    JOIN questions q ON r.question_id = q.id
+                    JOIN assessment_scores s ON s.assessment_id = c.id
                     WHERE ou.id = ?
                 """
                 query_params = [unit_id]
@@ -766,7 +727,7 @@ def analyser():
                 # Use recursive CTE to get all descendants' data aggregated per direct child
                 show_assessments = False
 
-                query = """
+                query = f"""
                     WITH RECURSIVE descendants AS (
                         -- Direct children of the selected unit
                         SELECT id, id as root_child_id, name as root_child_name
@@ -786,36 +747,12 @@ def analyser():
                         child.full_path,
                         child.level,
                         COUNT(DISTINCT c.id) as assessment_count,
-                        COUNT(DISTINCT r.id) as total_responses,
-                        CAST(SUM(CASE WHEN r.respondent_type = 'employee' THEN 1 ELSE 0 END) AS REAL) / 24 as unique_respondents,
-
-                        AVG(CASE WHEN r.respondent_type = 'employee' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_overall,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'MENING' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_mening,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'TRYGHED' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_tryghed,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'KAN' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_kan,
-                        AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_besvaer,
-
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_overall,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'MENING' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_mening,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'TRYGHED' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_tryghed,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'KAN' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_kan,
-                        AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'BESVÆR' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_besvaer
+                        {ANALYSER_SCORE_COLUMNS}
 
                     FROM organizational_units child
                     JOIN descendants d ON d.root_child_id = child.id
                     JOIN assessments c ON c.target_unit_id = d.id
-                    JOIN responses r ON c.id = r.assessment_id
-                    JOIN questions q ON r.question_id = q.id
+                    JOIN assessment_scores s ON s.assessment_id = c.id
                     WHERE child.parent_id = ?
                 """
                 query_params = [unit_id, unit_id]
@@ -836,45 +773,20 @@ def analyser():
 
         else:
             # MODE 1: Show units with aggregated scores (no individual assessments)
-            query = """
+            # Sortering kan være på aggregater, så keyset-betingelsen lægges
+            # på det grupperede resultat
+            query = f"""
                 SELECT
                     ou.id,
                     ou.name,
                     ou.full_path,
                     ou.level,
                     COUNT(DISTINCT c.id) as assessment_count,
-                    COUNT(DISTINCT r.id) as total_responses,
-                    -- Calculate respondents: employee responses / 24 questions per respondent
-                    CAST(SUM(CASE WHEN r.respondent_type = 'employee' THEN 1 ELSE 0 END) AS REAL) / 24 as unique_respondents,
-
-                    -- Employee scores (aggregated across ALL assessments)
-                    AVG(CASE WHEN r.respondent_type = 'employee' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_overall,
-                    AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'MENING' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_mening,
-                    AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'TRYGHED' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_tryghed,
-                    AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'KAN' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_kan,
-                    AVG(CASE WHEN r.respondent_type = 'employee' AND q.field = 'BESVÆR' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as employee_besvaer,
-
-                    -- Leader assessment scores
-                    AVG(CASE WHEN r.respondent_type = 'leader_assess' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_overall,
-                    AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'MENING' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_mening,
-                    AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'TRYGHED' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_tryghed,
-                    AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'KAN' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_kan,
-                    AVG(CASE WHEN r.respondent_type = 'leader_assess' AND q.field = 'BESVÆR' THEN
-                        CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as leader_besvaer
+                    {ANALYSER_SCORE_COLUMNS}
 
                 FROM organizational_units ou
                 JOIN assessments c ON c.target_unit_id = ou.id
-                JOIN responses r ON c.id = r.assessment_id
-                JOIN questions q ON r.question_id = q.id
+                JOIN assessment_scores s ON s.assessment_id = c.id
             """
 
             query_params = []
@@ -888,23 +800,24 @@ def analyser():
                 HAVING total_responses > 0
             """
 
-            # Add sorting
-            sort_columns = {
-                'name': 'ou.name',
-                'responses': 'total_responses',
-                'employee_overall': 'employee_overall',
-                'mening': 'employee_mening',
-                'tryghed': 'employee_tryghed',
-                'kan': 'employee_kan',
-                'besvaer': 'employee_besvaer',
-                'gap': 'ABS(employee_overall - leader_overall)'
-            }
-
-            sort_col = sort_columns.get(sort_by, 'ou.name')
-            order = 'DESC' if sort_order == 'desc' else 'ASC'
-            query += f" ORDER BY {sort_col} {order}"
-
-            units = conn.execute(query, query_params).fetchall()
+            sort_key = ANALYSER_SORT_KEYS.get(sort_by, ANALYSER_SORT_KEYS['name'])
+            descending = sort_order == 'desc'
+            order = KeysetOrder(
+                SortKey(sort_key.expr, sort_key.column, descending, sort_key.null_value),
+                SortKey('id', 'id', descending),
+            )
+
+            def fetch(condition, keyset_params, order_by, limit):
+                return conn.execute(f"""
+                    SELECT *, ABS(employee_overall - leader_overall) as leader_gap
+                    FROM ({query})
+                    WHERE {condition}
+                    ORDER BY {order_by}
+                    LIMIT ?
+                """, query_params + keyset_params + [limit]).fetchall()
+
+            units, pagination = keyset_paginate(
+                fetch, order, request.args.get('cursor'))
 
         # Enrich units with indicators
         for unit in units:
@@ -937,13 +850,16 @@ def analyser():
                          show_assessments=show_assessments,
                          sort_by=sort_by,
                          sort_order=sort_order,
-                         trend_data=trend_data)
+                         trend_data=trend_data,
+                         pagination=pagination)
 
 
 @admin_core_bp.route('/admin/dashboard')
 @admin_core_bp.route('/admin/dashboard/<customer_id>')
 @admin_core_bp.route('/admin/dashboard/<customer_id>/<unit_id>')
 @login_required
+@conditional_get(_user_data_scope)
+@cached_page(_user_data_scope)
 def org_dashboard(customer_id=None, unit_id=None):
     """
     Hierarkisk organisations-dashboard med drill-down.
@@ -965,22 +881,18 @@ def org_dashboard(customer_id=None, unit_id=None):
     with get_db() as conn:
         # Niveau 1: Vis alle kunder (kun admin/superadmin uden customer_id)
         if not customer_id and user['role'] in ('admin', 'superadmin'):
-            customers = conn.execute("""
+            customers = conn.execute(f"""
                 SELECT
                     c.id,
                     c.name,
                     COUNT(DISTINCT ou.id) as unit_count,
                     COUNT(DISTINCT camp.id) as assessment_count,
-                    COUNT(DISTINCT r.id) as response_count,
-                    AVG(CASE
-                        WHEN r.respondent_type = 'employee' THEN
-                            CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END
-                    END) as avg_score
+                    {answers_sql()} as response_count,
+                    {avg_sql(respondent_type='employee')} as avg_score
                 FROM customers c
                 LEFT JOIN organizational_units ou ON ou.customer_id = c.id
                 LEFT JOIN assessments camp ON camp.target_unit_id = ou.id
-                LEFT JOIN responses r ON r.assessment_id = camp.id
-                LEFT JOIN questions q ON r.question_id = q.id
+                LEFT JOIN assessment_scores s ON s.assessment_id = camp.id
                 GROUP BY c.id
                 ORDER BY c.name
             """).fetchall()
@@ -1011,15 +923,9 @@ def org_dashboard(customer_id=None, unit_id=None):
             breadcrumb = [{'name': 'Alle Organisationer', 'url': url_for('admin_core.org_dashboard')}]
             breadcrumb.append({'name': customer['name'], 'url': url_for('admin_core.org_dashboard', customer_id=customer_id)})
 
-            # Tilføj parent units til breadcrumb
-            path_units = []
-            current = parent_unit
-            while current:
-                path_units.insert(0, current)
-                if current['parent_id']:
-                    current = conn.execute("SELECT * FROM organizational_units WHERE id = ?", [current['parent_id']]).fetchone()
-                else:
-                    current = None
+            # Tilføj parent units til breadcrumb (fra kundens OrgTree)
+            tree = get_tree_for_unit(unit_id, conn)
+            path_units = tree.path(unit_id)
 
             for pu in path_units[:-1]:  # Alle undtagen sidste (den er current)
                 breadcrumb.append({'name': pu['name'], 'url': url_for('admin_core.org_dashboard', customer_id=customer_id, unit_id=pu['id'])})
@@ -1029,6 +935,7 @@ def org_dashboard(customer_id=None, unit_id=None):
             # Top-level: vis root units for denne kunde
             parent_id_filter = None
             current_level = 0
+            tree = get_org_tree(customer_id, conn)
             breadcrumb = [
                 {'name': 'Alle Organisationer', 'url': url_for('admin_core.org_dashboard')},
                 {'name': customer['name'], 'url': None}
@@ -1040,7 +947,6 @@ def org_dashboard(customer_id=None, unit_id=None):
             # Hent child units med rekursiv aggregering fra underenheder
             child_units = conn.execute("""
                 SELECT id, name, level, leader_name,
-                       (SELECT COUNT(*) FROM organizational_units WHERE parent_id = ou.id) as child_count,
                        (SELECT camp.id FROM assessments camp WHERE camp.target_unit_id = ou.id LIMIT 1) as direct_assessment_id
                 FROM organizational_units ou
                 WHERE ou.parent_id = ?
@@ -1051,7 +957,7 @@ def org_dashboard(customer_id=None, unit_id=None):
             units = []
             for child in child_units:
                 # Rekursiv query der aggregerer fra hele subtræet
-                agg = conn.execute("""
+                agg = conn.execute(f"""
                     WITH RECURSIVE subtree AS (
                         SELECT id FROM organizational_units WHERE id = ?
                         UNION ALL
@@ -1060,16 +966,15 @@ def org_dashboard(customer_id=None, unit_id=None):
                     )
                     SELECT
                         COUNT(DISTINCT camp.id) as assessment_count,
-                        COUNT(DISTINCT r.id) as response_count,
-                        AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                        AVG(CASE WHEN q.field = 'MENING' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_mening,
-                        AVG(CASE WHEN q.field = 'TRYGHED' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_tryghed,
-                        AVG(CASE WHEN q.field = 'KAN' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_kan,
-                        AVG(CASE WHEN q.field = 'BESVÆR' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_besvaer
+                        {answers_sql()} as response_count,
+                        {avg_sql()} as avg_score,
+                        {avg_sql('MENING')} as score_mening,
+                        {avg_sql('TRYGHED')} as score_tryghed,
+                        {avg_sql('KAN')} as score_kan,
+                        {avg_sql('BESVÆR')} as score_besvaer
                     FROM subtree st
                     LEFT JOIN assessments camp ON camp.target_unit_id = st.id
-                    LEFT JOIN responses r ON r.assessment_id = camp.id AND r.respondent_type = 'employee'
-                    LEFT JOIN questions q ON r.question_id = q.id
+                    LEFT JOIN assessment_scores s ON s.assessment_id = camp.id AND s.respondent_type = 'employee'
                 """, [child['id']]).fetchone()
 
                 units.append({
@@ -1077,7 +982,7 @@ def org_dashboard(customer_id=None, unit_id=None):
                     'name': child['name'],
                     'level': child['level'],
                     'leader_name': child['leader_name'],
-                    'child_count': child['child_count'],
+                    'child_count': tree.child_count(child['id']),
                     'direct_assessment_id': child['direct_assessment_id'],
                     'assessment_count': agg['assessment_count'] or 0,
                     'response_count': agg['response_count'] or 0,
@@ -1114,7 +1019,6 @@ def org_dashboard(customer_id=None, unit_id=None):
             # Først hent root units
             root_units = conn.execute("""
                 SELECT id, name, level, leader_name,
-                       (SELECT COUNT(*) FROM organizational_units WHERE parent_id = ou.id) as child_count,
                        (SELECT camp.id FROM assessments camp WHERE camp.target_unit_id = ou.id LIMIT 1) as direct_assessment_id
                 FROM organizational_units ou
                 WHERE ou.customer_id = ? AND ou.parent_id IS NULL
@@ -1125,7 +1029,7 @@ def org_dashboard(customer_id=None, unit_id=None):
             units = []
             for root in root_units:
                 # Rekursiv query der aggregerer fra hele subtræet
-                agg = conn.execute("""
+                agg = conn.execute(f"""
                     WITH RECURSIVE subtree AS (
                         SELECT id FROM organizational_units WHERE id = ?
                         UNION ALL
@@ -1134,16 +1038,15 @@ def org_dashboard(customer_id=None, unit_id=None):
                     )
                     SELECT
                         COUNT(DISTINCT camp.id) as assessment_count,
-                        COUNT(DISTINCT r.id) as response_count,
-                        AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                        AVG(CASE WHEN q.field = 'MENING' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_mening,
-                        AVG(CASE WHEN q.field = 'TRYGHED' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_tryghed,
-                        AVG(CASE WHEN q.field = 'KAN' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_kan,
-                        AVG(CASE WHEN q.field = 'BESVÆR' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as score_besvaer
+                        {answers_sql()} as response_count,
+                        {avg_sql()} as avg_score,
+                        {avg_sql('MENING')} as score_mening,
+                        {avg_sql('TRYGHED')} as score_tryghed,
+                        {avg_sql('KAN')} as score_kan,
+                        {avg_sql('BESVÆR')} as score_besvaer
                     FROM subtree st
                     LEFT JOIN assessments camp ON camp.target_unit_id = st.id
-                    LEFT JOIN responses r ON r.assessment_id = camp.id AND r.respondent_type = 'employee'
-                    LEFT JOIN questions q ON r.question_id = q.id
+                    LEFT JOIN assessment_scores s ON s.assessment_id = camp.id AND s.respondent_type = 'employee'
                 """, [root['id']]).fetchone()
 
                 units.append({
@@ -1151,7 +1054,7 @@ def org_dashboard(customer_id=None, unit_id=None):
                     'name': root['name'],
                     'level': root['level'],
                     'leader_name': root['leader_name'],
-                    'child_count': root['child_count'],
+                    'child_count': tree.child_count(root['id']),
                     'direct_assessment_id': root['direct_assessment_id'],
                     'assessment_count': agg['assessment_count'] or 0,
                     'response_count': agg['response_count'] or 0,
@@ -1178,7 +1081,7 @@ def org_dashboard(customer_id=None, unit_id=None):
         # Beregn samlet score for dette niveau
         if parent_unit:
             # Aggregér for parent unit
-            agg_scores = conn.execute("""
+            agg_scores = conn.execute(f"""
                 WITH RECURSIVE subtree AS (
                     SELECT id FROM organizational_units WHERE id = ?
                     UNION ALL
@@ -1186,33 +1089,31 @@ def org_dashboard(customer_id=None, unit_id=None):
                     JOIN subtree st ON ou.parent_id = st.id
                 )
                 SELECT
-                    AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                    AVG(CASE WHEN q.field = 'MENING' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as mening,
-                    AVG(CASE WHEN q.field = 'TRYGHED' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as tryghed,
-                    AVG(CASE WHEN q.field = 'KAN' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as kan,
-                    AVG(CASE WHEN q.field = 'BESVÆR' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as besvaer,
-                    COUNT(DISTINCT r.id) as response_count
-                FROM responses r
-                JOIN assessments camp ON r.assessment_id = camp.id
-                JOIN questions q ON r.question_id = q.id
+                    {avg_sql()} as avg_score,
+                    {avg_sql('MENING')} as mening,
+                    {avg_sql('TRYGHED')} as tryghed,
+                    {avg_sql('KAN')} as kan,
+                    {avg_sql('BESVÆR')} as besvaer,
+                    {answers_sql()} as response_count
+                FROM assessment_scores s
+                JOIN assessments camp ON s.assessment_id = camp.id
                 JOIN subtree st ON camp.target_unit_id = st.id
-                WHERE r.respondent_type = 'employee'
+                WHERE s.respondent_type = 'employee'
             """, [unit_id]).fetchone()
         else:
             # Aggregér for hele kunden
-            agg_scores = conn.execute("""
+            agg_scores = conn.execute(f"""
                 SELECT
-                    AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                    AVG(CASE WHEN q.field = 'MENING' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as mening,
-                    AVG(CASE WHEN q.field = 'TRYGHED' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as tryghed,
-                    AVG(CASE WHEN q.field = 'KAN' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as kan,
-                    AVG(CASE WHEN q.field = 'BESVÆR' THEN CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END END) as besvaer,
-                    COUNT(DISTINCT r.id) as response_count
-                FROM responses r
-                JOIN assessments camp ON r.assessment_id = camp.id
-                JOIN questions q ON r.question_id = q.id
+                    {avg_sql()} as avg_score,
+                    {avg_sql('MENING')} as mening,
+                    {avg_sql('TRYGHED')} as tryghed,
+                    {avg_sql('KAN')} as kan,
+                    {avg_sql('BESVÆR')} as besvaer,
+                    {answers_sql()} as response_count
+                FROM assessment_scores s
+                JOIN assessments camp ON s.assessment_id = camp.id
                 JOIN organizational_units ou ON camp.target_unit_id = ou.id
-                WHERE ou.customer_id = ? AND r.respondent_type = 'employee'
+                WHERE ou.customer_id = ? AND s.respondent_type = 'employee'
             """, [customer_id]).fetchone()
 
         return render_template('admin/org_dashboard.html',
@@ -1226,6 +1127,63 @@ def org_dashboard(customer_id=None, unit_id=None):
                              profiler=[dict(p) for p in profiler] if profiler else [])
 
 
+# ========================================
+# FRITEKST-KOMMENTARER
+# ========================================
+
+def _comment_search_args():
+    """Søgeparametre fra query string - managers er altid låst til egen kunde"""
+    user = get_current_user()
+    if user['role'] in ('admin', 'superadmin'):
+        customer_id = request.args.get('customer_id') or session.get('customer_filter')
+    else:
+        customer_id = user.get('customer_id')
+    field = request.args.get('field') or None
+    return {
+        'customer_id': customer_id,
+        'query': request.args.get('q', '').strip() or None,
+        'field': field if field in COMMENT_FIELDS else None,
+        'assessment_id': request.args.get('assessment_id') or None,
+        'unit_id': request.args.get('unit_id') or None,
+        'respondent_type': request.args.get('respondent_type') or None,
+    }
+
+
+@admin_core_bp.route('/admin/comments')
+@login_required
+def comments_page():
+    """Søg i fritekst-kommentarer på tværs af kundens målinger"""
+    args = _comment_search_args()
+    cursor = request.args.get('cursor', type=int)
+    results = search_comments(**args, cursor=cursor)
+    facet_args = {k: v for k, v in args.items() if k != 'field'}
+    facets = get_comment_facets(**facet_args)
+    return render_template('admin/comments.html',
+                           args=args,
+                           comments=results['comments'],
+                           next_cursor=results['next_cursor'],
+                           facets=facets)
+
+
+@admin_core_bp.route('/admin/comments/search')
+@login_required
+def comments_search_api():
+    """JSON: én side kommentarer (?cursor= fra next_cursor giver næste side)"""
+    results = search_comments(**_comment_search_args(),
+                              limit=request.args.get('limit', type=int),
+                              cursor=request.args.get('cursor', type=int))
+    return jsonify(results)
+
+
+@admin_core_bp.route('/admin/comments/facets')
+@login_required
+def comments_facets_api():
+    """JSON: antal per felt/respondenttype og hyppigste ord per felt"""
+    args = _comment_search_args()
+    args.pop('field')
+    return jsonify(get_comment_facets(**args))
+
+
 # ========================================
 # AUDIT LOG
 # ========================================
@@ -1289,12 +1247,10 @@ def admin_gdpr():
 
         if is_superadmin:
             # Fuld statistik for superadmin
-            stats['customers'] = conn.execute('SELECT COUNT(*) FROM customers').fetchone()[0]
-            stats['users'] = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
-            stats['units'] = conn.execute('SELECT COUNT(*) FROM organizational_units').fetchone()[0]
-            stats['assessments'] = conn.execute('SELECT COUNT(*) FROM assessments').fetchone()[0]
-            stats['responses'] = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
-            stats['tokens'] = conn.execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+            counters = get_counters(conn)
+            for name in ('customers', 'users', 'units', 'assessments', 'responses'):
+                stats[name] = counters[name]
+            stats['tokens'] = counters['tokens_sent']
             stats['situation_assessments'] = conn.execute('SELECT COUNT(*) FROM situation_assessments').fetchone()[0]
             stats['situation_responses'] = conn.execute('SELECT COUNT(*) FROM situation_responses').fetchone()[0]
 
@@ -1318,15 +1274,9 @@ def admin_gdpr():
             stats['customers_detail'] = [dict(c) for c in customers_with_data]
         else:
             # Begrænset statistik for admin/manager
-            customer_id = user['customer_id']
-            stats['units'] = conn.execute(
-                'SELECT COUNT(*) FROM organizational_units WHERE customer_id = ?',
-                (customer_id,)
-            ).fetchone()[0]
-            stats['users'] = conn.execute(
-                'SELECT COUNT(*) FROM users WHERE customer_id = ?',
-                (customer_id,)
-            ).fetchone()[0]
+            counters = get_counters(conn, user['customer_id'])
+            stats['units'] = counters['units']
+            stats['users'] = counters['users']
 
     return render_template('admin/gdpr.html',
                            stats=stats,
@@ -1364,5 +1314,12 @@ def admin_gdpr_delete_customer(customer_id):
             details=f'Slettet kunde: {customer_name} ({customer_id})'
         )
 
+    # CASCADE virker kun i kataloget - en flyttet kundes data ligger i egen fil
+    drop_customer_database(customer_id)
+
+    # Domains peger på kunden (ON DELETE SET NULL), API keys slettes (CASCADE)
+    invalidate_domain_cache()
+    invalidate_api_key_cache()
+
     flash(f'Al data for "{customer_name}" er slettet permanent', 'success')
     return redirect(url_for('admin_core.admin_gdpr'))
@@ -4,6 +4,8 @@ Admin API blueprint - system administration endpoints.
 Routes:
 - /api/admin/status (GET) - Get system status
 - /api/admin/clear-cache (POST) - Clear all caches
+- /api/admin/reconcile-counters (POST) - Reconcile maintained status counters
+- /api/admin/performance (GET) - Per-route latency percentiles and query counts
 - /api/docs - Swagger UI
 - /api/docs/openapi.yaml - OpenAPI spec
 - /api/docs/openapi.json - OpenAPI spec as JSON
@@ -17,6 +19,8 @@ from auth_helpers import api_or_admin_required
 from db_hierarchical import get_db
 from translations import clear_translation_cache
 from cache import invalidate_all
+from perf import get_route_stats, reset_route_stats, SLOW_REQUEST_MS
+from stats_counters import get_counters, reconcile_stats_counters
 
 api_admin_bp = Blueprint('api_admin', __name__, url_prefix='/api')
 
@@ -31,8 +35,8 @@ def api_admin_status():
              -H "X-Admin-API-Key: YOUR_KEY"
     """
     with get_db() as conn:
-        counts = {}
-        for table in ['customers', 'users', 'assessments', 'responses', 'domains', 'translations']:
+        counts = get_counters(conn)
+        for table in ['domains', 'translations']:
             try:
                 count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
                 counts[table] = count
@@ -50,6 +54,8 @@ def api_admin_status():
             {'endpoint': '/admin/seed-domains', 'method': 'GET/POST', 'description': 'Seed default domains'},
             {'endpoint': '/admin/seed-translations', 'method': 'GET/POST', 'description': 'Seed translations'},
             {'endpoint': '/api/admin/clear-cache', 'method': 'POST', 'description': 'Clear all caches'},
+            {'endpoint': '/api/admin/reconcile-counters', 'method': 'POST', 'description': 'Reconcile status counters'},
+            {'endpoint': '/api/admin/performance', 'method': 'GET', 'description': 'Per-route latency and query counts'},
         ]
     })
 
@@ -69,6 +75,45 @@ def api_admin_clear_cache():
     return jsonify({'success': True, 'message': 'All caches cleared'})
 
 
+@api_admin_bp.route('/admin/reconcile-counters', methods=['POST'])
+@csrf.exempt
+@api_or_admin_required
+def api_admin_reconcile_counters():
+    """Afstem statustællerne mod tabellerne og ret drift.
+
+    Kører også natligt i scheduleren.
+
+    API Usage:
+        curl -X POST https://friktionskompasset.dk/api/admin/reconcile-counters \
+             -H "X-Admin-API-Key: YOUR_KEY"
+    """
+    drift = reconcile_stats_counters()
+    return jsonify({'success': True, 'corrected': drift})
+
+
+@api_admin_bp.route('/admin/performance')
+@api_or_admin_required
+def api_admin_performance():
+    """Per-route latency percentiles, query counts and SQLite time.
+
+    Målingerne er per worker-proces og dækker de seneste requests per route.
+    Tilføj ?reset=1 for at nulstille efter udlæsning.
+
+    API Usage:
+        curl https://friktionskompasset.dk/api/admin/performance \
+             -H "X-Admin-API-Key: YOUR_KEY"
+    """
+    routes = get_route_stats()
+    if request.args.get('reset'):
+        reset_route_stats()
+
+    return jsonify({
+        'pid': os.getpid(),
+        'slow_request_ms': SLOW_REQUEST_MS,
+        'routes': routes
+    })
+
+
 def _is_english_domain():
     """Check if request is from English domain (frictioncompass.com)."""
     host = request.host.lower()
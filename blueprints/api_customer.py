@@ -22,6 +22,8 @@ from extensions import csrf, limiter
 from auth_helpers import customer_api_required, customer_api_write_required
 from db_hierarchical import get_db, get_unit_stats, get_assessment_overview
 from friction_engine import score_to_percent, get_severity
+from assessment_scores import avg_sql
+from data_version import conditional_get
 
 api_customer_bp = Blueprint('api_customer', __name__, url_prefix='/api/v1')
 
@@ -171,6 +173,7 @@ def api_v1_get_assessment(assessment_id):
 @csrf.exempt
 @limiter.limit("100 per minute")
 @customer_api_required
+@conditional_get(lambda assessment_id: g.api_customer_id, html=False, check_modified_since=True)
 def api_v1_get_assessment_results(assessment_id):
     """Get assessment results with friction scores."""
     customer_id = g.api_customer_id
@@ -452,15 +455,14 @@ def api_v1_export():
 
         if include_scores:
             scores = conn.execute(f"""
-                SELECT a.id as assessment_id, ou.id as unit_id, ou.name as unit_name, q.field,
-                       AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                       COUNT(DISTINCT r.respondent_name) as response_count
-                FROM responses r
-                JOIN assessments a ON r.assessment_id = a.id
-                JOIN organizational_units ou ON r.unit_id = ou.id
-                JOIN questions q ON r.question_id = q.id
+                SELECT a.id as assessment_id, ou.id as unit_id, ou.name as unit_name, s.field,
+                       {avg_sql()} as avg_score,
+                       SUM(s.respondent_count) as response_count
+                FROM assessment_scores s
+                JOIN assessments a ON s.assessment_id = a.id
+                JOIN organizational_units ou ON s.unit_id = ou.id
                 WHERE {where_clause}
-                GROUP BY a.id, ou.id, q.field
+                GROUP BY a.id, ou.id, s.field
             """, params).fetchall()
 
             export_data['aggregated_scores'] = [
@@ -9,7 +9,9 @@ Routes:
 - /admin/assessment/<assessment_id> - View assessment results
 - /admin/assessment/<assessment_id>/delete - Delete an assessment
 - /admin/assessment/<assessment_id>/detailed - Detailed analysis with layering
-- /admin/assessment/<assessment_id>/pdf - Export assessment to PDF
+- /admin/assessment/<assessment_id>/pdf - Export assessment to PDF (cached, rendered in background)
+- /admin/assessment/<assessment_id>/pdf/bulk - Render PDFs for every unit under the target
+- /admin/assessment/<assessment_id>/pdf/bulk/download - Zip of rendered unit PDFs
 - /admin/rename-assessments - Rename assessments (dev tool)
 - /admin/recreate-assessments - Recreate missing assessments from responses
 - /admin/seed-assessments - Seed assessments from JSON
@@ -23,7 +25,10 @@ Routes:
 - /admin/situation-assessments/<assessment_id> - View situation assessment results
 """
 
-from flask import Blueprint, render_template, redirect, url_for, session, request, flash, Response, jsonify
+from flask import (
+    Blueprint, render_template, redirect, url_for, session, request, flash, Response, jsonify,
+    send_file, current_app
+)
 from datetime import datetime
 from io import BytesIO
 
@@ -62,6 +67,13 @@ from analysis import (
     get_start_here_recommendation,
     get_alerts_and_findings
 )
+from pdf_reports import (
+    request_pdf,
+    request_bulk_pdfs,
+    get_cached_pdf,
+    get_data_version,
+    get_subtree_unit_ids
+)
 from mailjet_integration import send_assessment_batch
 from scheduler import (
     get_scheduled_assessments,
@@ -70,9 +82,14 @@ from scheduler import (
 )
 from translations import get_user_language
 from audit import log_action, AuditAction
+from data_version import conditional_get
+from page_cache import cached_page
 
 assessments_bp = Blueprint('assessments', __name__)
 
+# Så længe ventes der på en PDF før brugeren får en "genereres"-side
+PDF_INLINE_WAIT_SECONDS = 3
+
 
 def get_individual_scores(target_unit_id, assessment_id):
     """
@@ -99,25 +116,19 @@ def get_individual_scores(target_unit_id, assessment_id):
         )
         """
 
-        # Get all individual employee scores
-        # Use respondent_name if available, otherwise use minute-based session grouping
-        # (assuming all responses from same respondent come within same minute)
+        # Get all individual employee scores (én række per besvarelse og felt)
         employee_query = f"""
         {subtree_cte}
         SELECT
-            COALESCE(r.respondent_name, strftime('%Y-%m-%d %H:%M', r.created_at)) as resp_key,
-            q.field,
-            AVG(CASE
-                WHEN q.reverse_scored = 1 THEN 8 - r.score
-                ELSE r.score
-            END) as avg_score
+            r.respondent_id as resp_key,
+            r.field,
+            AVG(r.adjusted_score) as avg_score
         FROM responses r
-        JOIN questions q ON r.question_id = q.id
         JOIN subtree ON r.unit_id = subtree.id
         WHERE r.assessment_id = ?
           AND r.respondent_type = 'employee'
-          AND q.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
-        GROUP BY resp_key, q.field
+          AND r.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
+        GROUP BY resp_key, r.field
         """
 
         employee_rows = conn.execute(employee_query, [target_unit_id, assessment_id]).fetchall()
@@ -140,18 +151,14 @@ def get_individual_scores(target_unit_id, assessment_id):
         leader_query = f"""
         {subtree_cte}
         SELECT
-            q.field,
-            AVG(CASE
-                WHEN q.reverse_scored = 1 THEN 8 - r.score
-                ELSE r.score
-            END) as avg_score
+            r.field,
+            AVG(r.adjusted_score) as avg_score
         FROM responses r
-        JOIN questions q ON r.question_id = q.id
         JOIN subtree ON r.unit_id = subtree.id
         WHERE r.assessment_id = ?
           AND r.respondent_type = 'leader_self'
-          AND q.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
-        GROUP BY q.field
+          AND r.field IN ('MENING', 'TRYGHED', 'KAN', 'BESVÆR')
+        GROUP BY r.field
         """
 
         leader_rows = conn.execute(leader_query, [target_unit_id, assessment_id]).fetchall()
@@ -466,8 +473,21 @@ def delete_assessment(assessment_id):
     return redirect(url_for('admin_core.assessments_overview'))
 
 
+def _assessment_data_scope(assessment_id):
+    """Målingens kunde - til ETags (ukendt måling giver alle kunder)"""
+    with get_db() as conn:
+        row = conn.execute("""
+            SELECT ou.customer_id FROM assessments a
+            JOIN organizational_units ou ON a.target_unit_id = ou.id
+            WHERE a.id = ?
+        """, [assessment_id]).fetchone()
+    return row['customer_id'] if row else None
+
+
 @assessments_bp.route('/admin/assessment/<assessment_id>/detailed')
 @login_required
+@conditional_get(_assessment_data_scope)
+@cached_page(_assessment_data_scope)
 def assessment_detailed_analysis(assessment_id):
     """Detaljeret analyse med lagdeling og respondent-sammenligning"""
     import traceback
@@ -564,113 +584,167 @@ def assessment_detailed_analysis(assessment_id):
         return f"<h1>Fejl i assessment_detailed_analysis</h1><pre>{error_details}</pre>", 500
 
 
+def _get_assessment_for_user(assessment_id, user):
+    """Hent målingen hvis brugeren har adgang - admin/superadmin ser alt"""
+    with get_db() as conn:
+        if user['role'] in ('admin', 'superadmin'):
+            return conn.execute("""
+                SELECT c.*, ou.customer_id FROM assessments c
+                JOIN organizational_units ou ON c.target_unit_id = ou.id
+                WHERE c.id = ?
+            """, [assessment_id]).fetchone()
+        return conn.execute("""
+            SELECT c.*, ou.customer_id FROM assessments c
+            JOIN organizational_units ou ON c.target_unit_id = ou.id
+            WHERE c.id = ? AND ou.customer_id = ?
+        """, [assessment_id, user['customer_id']]).fetchone()
+
+
+def _pdf_filename(assessment, unit_name=None):
+    name = f"{assessment['name']} {unit_name}" if unit_name else assessment['name']
+    safe_name = name.replace(' ', '_').replace('/', '-')
+    return f"Friktionsmaaling_{safe_name}_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+
 @assessments_bp.route('/admin/assessment/<assessment_id>/pdf')
 @login_required
 def assessment_pdf_export(assessment_id):
-    """Eksporter måling til PDF"""
+    """
+    Eksporter måling til PDF.
+
+    PDF'en renderes i baggrunden og caches per dataversion (se pdf_reports.py);
+    er den aktuel, sendes den med det samme, ellers vises en side der genindlæser.
+    ?unit_id= giver rapporten for en enhed under målingens target.
+    """
     user = get_current_user()
 
     try:
-        with get_db() as conn:
-            # Hent assessment - admin/superadmin ser alt
-            if user['role'] in ('admin', 'superadmin'):
-                assessment = conn.execute("""
-                    SELECT c.*, ou.customer_id FROM assessments c
-                    JOIN organizational_units ou ON c.target_unit_id = ou.id
-                    WHERE c.id = ?
-                """, [assessment_id]).fetchone()
-            else:
-                assessment = conn.execute("""
-                    SELECT c.*, ou.customer_id FROM assessments c
-                    JOIN organizational_units ou ON c.target_unit_id = ou.id
-                    WHERE c.id = ? AND ou.customer_id = ?
-                """, [assessment_id, user['customer_id']]).fetchone()
-
-            if not assessment:
-                flash("Måling ikke fundet eller ingen adgang", 'error')
-                return redirect(url_for('admin_core.admin_home'))
+        assessment = _get_assessment_for_user(assessment_id, user)
+        if not assessment:
+            flash("Måling ikke fundet eller ingen adgang", 'error')
+            return redirect(url_for('admin_core.admin_home'))
 
         target_unit_id = assessment['target_unit_id']
+        unit_id = request.args.get('unit_id') or target_unit_id
+        if unit_id != target_unit_id and unit_id not in get_subtree_unit_ids(target_unit_id):
+            flash("Enheden er ikke en del af målingen", 'error')
+            return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
 
         # Check anonymity
-        anonymity = check_anonymity_threshold(assessment_id, target_unit_id)
+        anonymity = check_anonymity_threshold(assessment_id, unit_id)
         if not anonymity.get('can_show_results'):
             flash("Ikke nok svar til at generere PDF", 'warning')
             return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
 
-        # Get all data
-        breakdown = get_detailed_breakdown(target_unit_id, assessment_id, include_children=True)
-        substitution = calculate_substitution_db(target_unit_id, assessment_id, 'employee')
-        free_text_comments = get_free_text_comments(target_unit_id, assessment_id, include_children=True)
+        status = request_pdf(current_app._get_current_object(), assessment_id, unit_id,
+                             wait=PDF_INLINE_WAIT_SECONDS)
+
+        if status['status'] == 'ready':
+            unit_name = None
+            if unit_id != target_unit_id:
+                with get_db() as conn:
+                    unit = conn.execute("SELECT name FROM organizational_units WHERE id = ?",
+                                        [unit_id]).fetchone()
+                unit_name = unit['name'] if unit else unit_id
+            return send_file(status['path'], mimetype='application/pdf', as_attachment=True,
+                             download_name=_pdf_filename(assessment, unit_name))
+
+        if status['status'] == 'failed':
+            if status.get('missing_library'):
+                flash("PDF bibliotek ikke installeret. Kontakt administrator.", 'error')
+            else:
+                flash(f"Fejl ved PDF eksport: {status['error']}", 'error')
+            return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
 
-        employee_stats = breakdown.get('employee', {})
-        comparison = breakdown.get('comparison', {})
-        kkc_recommendations = get_kkc_recommendations(employee_stats, comparison)
-        start_here = get_start_here_recommendation(kkc_recommendations)
+        return render_template('admin/pdf_pending.html',
+                               assessment=dict(assessment),
+                               retry_url=request.full_path), 202
 
-        alerts = get_alerts_and_findings(breakdown, comparison, substitution)
+    except Exception as e:
+        import traceback
+        print(f"PDF export error: {traceback.format_exc()}")
+        flash(f"Fejl ved PDF eksport: {str(e)}", 'error')
+        return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
 
-        # Token stats
-        with get_db() as conn:
-            token_stats = conn.execute("""
-                SELECT
-                    COUNT(*) as tokens_sent,
-                    SUM(CASE WHEN is_used = 1 THEN 1 ELSE 0 END) as tokens_used
-                FROM tokens
-                WHERE assessment_id = ?
-            """, (assessment_id,)).fetchone()
-
-        # Calculate overall score
-        emp = breakdown.get('employee', {})
-        if emp:
-            fields = ['TRYGHED', 'MENING', 'KAN', 'BESVÆR']
-            scores = [emp.get(f, {}).get('avg_score', 3) for f in fields]
-            avg_score = sum(scores) / len(scores)
-            overall_score = (avg_score - 1) / 4 * 100
-        else:
-            overall_score = 0
 
-        response_rate = (token_stats['tokens_used'] / token_stats['tokens_sent'] * 100) if token_stats['tokens_sent'] > 0 else 0
+@assessments_bp.route('/admin/assessment/<assessment_id>/pdf/bulk', methods=['GET', 'POST'])
+@login_required
+def assessment_pdf_bulk(assessment_id):
+    """
+    Bulk-PDF: én rapport per enhed under målingens target (eller ?unit_id=).
 
-        # Render HTML template
-        html = render_template('admin/assessment_pdf.html',
-            assessment=dict(assessment),
-            breakdown=breakdown,
-            alerts=alerts,
-            start_here=start_here,
-            free_text_comments=free_text_comments,
-            token_stats=dict(token_stats),
-            overall_score=overall_score,
-            response_rate=response_rate,
-            generated_date=datetime.now().strftime('%d-%m-%Y %H:%M')
-        )
+    POST starter rendering i baggrunden, GET returnerer status.
+    """
+    user = get_current_user()
+    assessment = _get_assessment_for_user(assessment_id, user)
+    if not assessment:
+        return jsonify({'error': 'Måling ikke fundet eller ingen adgang'}), 404
 
-        # Generate PDF
-        try:
-            from weasyprint import HTML
+    target_unit_id = assessment['target_unit_id']
+    root_unit_id = request.values.get('unit_id') or target_unit_id
+    if root_unit_id != target_unit_id and root_unit_id not in get_subtree_unit_ids(target_unit_id):
+        return jsonify({'error': 'Enheden er ikke en del af målingen'}), 400
 
-            pdf_buffer = BytesIO()
-            HTML(string=html).write_pdf(pdf_buffer)
-            pdf_buffer.seek(0)
+    results = request_bulk_pdfs(current_app._get_current_object(), assessment_id, root_unit_id,
+                                start=request.method == 'POST')
 
-            # Create filename
-            safe_name = assessment['name'].replace(' ', '_').replace('/', '-')
-            filename = f"Friktionsmaaling_{safe_name}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
 
-            return Response(
-                pdf_buffer.getvalue(),
-                mimetype='application/pdf',
-                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
-            )
-        except ImportError:
-            flash("PDF bibliotek ikke installeret. Kontakt administrator.", 'error')
-            return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
+    return jsonify({
+        'assessment_id': assessment_id,
+        'unit_id': root_unit_id,
+        'summary': summary,
+        'units': [{'unit_id': r['unit_id'], 'status': r['status'], 'error': r['error']}
+                  for r in results],
+        'download_url': url_for('assessments.assessment_pdf_bulk_download',
+                                assessment_id=assessment_id, unit_id=root_unit_id),
+    }), 202 if request.method == 'POST' else 200
 
-    except Exception as e:
-        import traceback
-        print(f"PDF export error: {traceback.format_exc()}")
-        flash(f"Fejl ved PDF eksport: {str(e)}", 'error')
-        return redirect(url_for('assessments.view_assessment', assessment_id=assessment_id))
+
+@assessments_bp.route('/admin/assessment/<assessment_id>/pdf/bulk/download')
+@login_required
+def assessment_pdf_bulk_download(assessment_id):
+    """Zip med alle færdige enhedsrapporter fra bulk-kørslen"""
+    import zipfile
+
+    user = get_current_user()
+    assessment = _get_assessment_for_user(assessment_id, user)
+    if not assessment:
+        return jsonify({'error': 'Måling ikke fundet eller ingen adgang'}), 404
+
+    target_unit_id = assessment['target_unit_id']
+    root_unit_id = request.args.get('unit_id') or target_unit_id
+    unit_ids = get_subtree_unit_ids(target_unit_id)
+    if root_unit_id not in unit_ids:
+        return jsonify({'error': 'Enheden er ikke en del af målingen'}), 400
+
+    version = get_data_version(assessment_id)
+    with get_db() as conn:
+        unit_names = {row['id']: row['name'] for row in conn.execute("""
+            SELECT id, name FROM organizational_units WHERE id IN ({})
+        """.format(','.join('?' * len(unit_ids))), unit_ids)}
+
+    buffer = BytesIO()
+    added = 0
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:  # PDF'er er allerede komprimerede
+        for unit_id in get_subtree_unit_ids(root_unit_id):
+            path = get_cached_pdf(assessment_id, unit_id, version)
+            if path:
+                unit_name = unit_names.get(unit_id) if unit_id != target_unit_id else None
+                archive.write(path, _pdf_filename(assessment, unit_name))
+                added += 1
+
+    if not added:
+        return jsonify({'error': 'Ingen færdige PDF-rapporter - start bulk-kørslen først'}), 404
+
+    safe_name = assessment['name'].replace(' ', '_').replace('/', '-')
+    return Response(
+        buffer.getvalue(),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="Friktionsmaaling_{safe_name}_enheder.zip"'}
+    )
 
 
 @assessments_bp.route('/admin/rename-assessments', methods=['POST'])
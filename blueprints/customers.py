@@ -28,15 +28,16 @@ import os
 from auth_helpers import admin_required, superadmin_required, get_current_user
 from db_hierarchical import get_db
 from db_multitenant import (
-    list_customers, list_users, create_customer, get_customer, update_customer,
+    list_customers, list_customers_page, list_customer_names, list_users, create_customer, get_customer, update_customer,
     list_domains, create_domain, update_domain, delete_domain,
     list_customer_api_keys, generate_customer_api_key, revoke_customer_api_key,
     delete_customer_api_key, get_customer_assessment_config, get_all_presets,
-    set_customer_assessment_types
+    set_customer_assessment_types, invalidate_domain_cache, invalidate_api_key_cache
 )
 from oauth import save_auth_providers, DEFAULT_AUTH_PROVIDERS
 from audit import log_action, AuditAction
 from translations import t
+from tenant_db import drop_customer_database
 
 customers_bp = Blueprint('customers', __name__)
 
@@ -49,10 +50,12 @@ customers_bp = Blueprint('customers', __name__)
 @admin_required
 def manage_customers():
     """Customer management - kun admin"""
-    customers = list_customers()
+    customers, pagination = list_customers_page(request.args.get('cursor'))
     users = list_users()  # Alle users
     return render_template('admin/customers.html',
                          customers=customers,
+                         pagination=pagination,
+                         customer_options=list_customer_names(),
                          users=users)
 
 
@@ -101,6 +104,13 @@ def delete_customer(customer_id):
             details=f"Deleted customer: {customer_name}"
         )
 
+    # CASCADE virker kun i kataloget - en flyttet kundes data ligger i egen fil
+    drop_customer_database(customer_id)
+
+    # Domains peger på kunden (ON DELETE SET NULL), API keys slettes (CASCADE)
+    invalidate_domain_cache()
+    invalidate_api_key_cache()
+
     flash(f'Kunde "{customer_name}" og alle tilhørende data er slettet', 'success')
     return redirect(url_for('admin_core.admin_home'))
 
@@ -34,10 +34,11 @@ from datetime import datetime
 
 from auth_helpers import login_required, admin_required, superadmin_required, api_or_admin_required, get_current_user
 from db_hierarchical import get_db, create_assessment, get_questions, get_all_leaf_units_under, DB_PATH
-from db_multitenant import get_customer_filter, seed_assessment_types
+from db_multitenant import get_customer_filter, seed_assessment_types, invalidate_domain_cache
 from csv_upload_hierarchical import bulk_upload_from_csv
 from translations import seed_translations, clear_translation_cache
 from cache import get_cache_stats, invalidate_all
+from stats_counters import get_counters
 from extensions import csrf
 
 dev_tools_bp = Blueprint('dev_tools', __name__)
@@ -162,6 +163,8 @@ def admin_seed_domains():
 
         conn.commit()
 
+    invalidate_domain_cache()
+
     # Return JSON for API requests
     if is_api_request():
         return jsonify({
@@ -836,9 +839,8 @@ def db_status():
         # Assessments
         assessments = conn.execute("SELECT id, name, target_unit_id FROM assessments").fetchall()
 
-        # Response count and respondent_name check
-        resp_count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
-        resp_with_name = conn.execute("SELECT COUNT(*) FROM responses WHERE respondent_name IS NOT NULL AND respondent_name != ''").fetchone()[0]
+        # Svar og respondenter fra de vedligeholdte tællere
+        counters = get_counters(conn)
         resp_sample = conn.execute("SELECT respondent_name, respondent_type FROM responses LIMIT 5").fetchall()
 
         # Questions check
@@ -896,8 +898,9 @@ def db_status():
     {''.join(f"<tr><td>{c['id']}</td><td>{c['name']}</td><td>{c['target_unit_id'][:12]}...</td></tr>" for c in assessments)}
     </table>
 
-    <p><b>Responses:</b> {resp_count}</p>
-    <p><b>Responses with respondent_name:</b> {resp_with_name}</p>
+    <p><b>Responses:</b> {counters['responses']}</p>
+    <p><b>Respondents:</b> {counters['respondents']}</p>
+    <p><b>Tokens sent / used:</b> {counters['tokens_sent']} / {counters['tokens_used']}</p>
     <p><b>Sample responses:</b></p>
     <ul>{''.join(f"<li>{r['respondent_name']} ({r['respondent_type']})</li>" for r in resp_sample)}</ul>
 
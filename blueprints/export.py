@@ -27,7 +27,9 @@ from auth_helpers import (
 )
 from db_hierarchical import get_db
 from db_multitenant import get_customer_filter
+from stats_counters import get_counters, reconcile_stats_counters
 from audit import log_action, AuditAction
+from friction_engine import score_to_percent
 
 export_bp = Blueprint('export', __name__)
 
@@ -223,15 +225,14 @@ def bulk_export_download():
                     a.period,
                     ou.id as unit_id,
                     ou.name as unit_name,
-                    q.field,
-                    AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
-                    COUNT(DISTINCT r.respondent_name) as response_count
+                    r.field,
+                    AVG(r.adjusted_score) as avg_score,
+                    COUNT(DISTINCT r.respondent_id) as response_count
                 FROM responses r
                 JOIN assessments a ON r.assessment_id = a.id
                 JOIN organizational_units ou ON r.unit_id = ou.id
-                JOIN questions q ON r.question_id = q.id
-                WHERE {where_clause}
-                GROUP BY a.id, ou.id, q.field
+                WHERE {where_clause} AND r.field IS NOT NULL
+                GROUP BY a.id, ou.id, r.field
             """
             scores = conn.execute(scores_query, params).fetchall()
 
@@ -353,15 +354,10 @@ def bulk_export_download():
 def backup_page():
     """Backup/restore side"""
     with get_db() as conn:
-        stats = {
-            'customers': conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0],
-            'users': conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
-            'units': conn.execute("SELECT COUNT(*) FROM organizational_units").fetchone()[0],
-            'assessments': conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0],
-            'responses': conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
-            'contacts': conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0],
-            'tokens': conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0],
-        }
+        counters = get_counters(conn)
+    stats = {name: counters[name] for name in
+             ('customers', 'users', 'units', 'assessments', 'responses', 'contacts')}
+    stats['tokens'] = counters['tokens_sent']
     return render_template('admin/backup.html', stats=stats)
 
 
@@ -502,6 +498,9 @@ def backup_restore():
                 except Exception as e:
                     stats['errors'] += 1
 
+        # INSERT OR REPLACE og slåede-fra foreign keys går uden om tællernes triggers
+        reconcile_stats_counters(conn)
+
         conn.execute("PRAGMA foreign_keys=ON")
         conn.commit()
 
@@ -677,6 +676,9 @@ def cleanup_empty_units():
                       resp['score'], resp.get('respondent_type'), resp.get('respondent_name'),
                       resp.get('comment'), resp.get('category_comment'), resp.get('created_at')))
 
+            # Statustællere afstemmes med det importerede data
+            reconcile_stats_counters(conn)
+
             # Nu commit - alt eller intet
             conn.commit()
 
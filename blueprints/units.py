@@ -11,6 +11,7 @@ Routes:
 - /admin/units/bulk-delete (POST) - Delete multiple units at once (admin only)
 - /api/units/<unit_id>/move (POST) - Move unit to new parent (admin only)
 - /admin/bulk-upload (GET, POST) - Bulk upload units from CSV with hierarchical structure
+- /admin/bulk-upload/progress/<upload_id> (GET) - Progress while an upload is validated and staged
 - /admin/bulk-upload/confirm (POST) - Confirm and execute bulk upload
 - /admin/csv-template (GET) - Download CSV template for bulk upload
 - /admin/generate-test-csv (GET) - Generate test CSV with sample organizational data
@@ -21,7 +22,6 @@ from flask import Blueprint, render_template, redirect, url_for, session, \
 import csv
 import io
 import json
-import base64
 
 from auth_helpers import login_required, admin_required, get_current_user
 from db_hierarchical import (
@@ -30,7 +30,8 @@ from db_hierarchical import (
 )
 from db_multitenant import get_customer_filter
 from csv_upload_hierarchical import (
-    validate_csv_format, bulk_upload_from_csv, generate_csv_template
+    generate_csv_template, new_upload_id, stage_org_csv, get_staging_progress,
+    import_staged_org_csv
 )
 from audit import log_action, AuditAction
 
@@ -354,77 +355,39 @@ def bulk_upload():
             flash('Ingen fil valgt', 'error')
             return redirect(request.url)
 
-        # Læs fil
-        content = file.stream.read().decode('UTF-8')
-
-        # Valider først
-        validation = validate_csv_format(content)
-        if not validation['valid']:
-            for error in validation['errors']:
+        # Valider, byg preview og stage kontakter i ét gennemløb af filen
+        user = get_current_user()
+        staged = stage_org_csv(file.stream, customer_id=user['customer_id'], user_id=user['id'],
+                               upload_id=request.form.get('upload_id'),
+                               total_bytes=request.content_length)
+        if not staged['valid']:
+            for error in staged['errors']:
                 flash(error, 'error')
             return redirect(request.url)
 
-        # Parse hele filen for at få bedre preview
-        if content.startswith('\ufeff'):
-            content_clean = content[1:]
-        else:
-            content_clean = content
-
-        stream = io.StringIO(content_clean)
-        csv_reader = csv.DictReader(stream, delimiter=';')
-
-        all_rows = []
-        org_paths = set()
-        for row_num, row in enumerate(csv_reader, start=2):
-            org_path = row.get('Organisation', '').strip()
-            if org_path:
-                org_paths.add(org_path)
-                firstname = row.get('FirstName', '').strip()
-                lastname = row.get('Lastname', '').strip()
-                all_rows.append({
-                    'row': row_num,
-                    'path': org_path,
-                    'levels': len(org_path.split('//')),
-                    'name': f"{firstname} {lastname}".strip() or '-',
-                    'email': row.get('Email', '').strip() or '-',
-                })
-
-        # Byg hierarki preview
-        hierarchy = {}
-        for path in sorted(org_paths):
-            parts = path.split('//')
-            for i, part in enumerate(parts):
-                key = '//'.join(parts[:i+1])
-                if key not in hierarchy:
-                    hierarchy[key] = {'name': part, 'indent': i, 'count': 0}
-
-        # Tæl personer per organisation
-        for row in all_rows:
-            if row['path'] in hierarchy:
-                hierarchy[row['path']]['count'] += 1
-
-        hierarchy_preview = list(hierarchy.values())
-        for i, item in enumerate(hierarchy_preview):
-            item['last'] = (i == len(hierarchy_preview) - 1)
-
-        # Encode CSV data til hidden field
-        csv_data_encoded = base64.b64encode(content.encode('utf-8')).decode('ascii')
-
-        # Max dybde
-        max_depth = max((r['levels'] for r in all_rows), default=0)
-
         return render_template('admin/bulk_upload.html',
-            preview=all_rows[:20],  # Vis max 20 rækker i preview
-            total_rows=len(all_rows),
-            unique_orgs=len(org_paths),
-            max_depth=max_depth,
-            hierarchy_preview=hierarchy_preview[:30],  # Max 30 hierarki items
-            warnings=validation['warnings'],
-            csv_data_encoded=csv_data_encoded
+            preview=staged['preview'],
+            total_rows=staged['total_rows'],
+            unique_orgs=staged['unique_orgs'],
+            max_depth=staged['max_depth'],
+            hierarchy_preview=staged['hierarchy_preview'],
+            warnings=staged['warnings'] + _summarize_errors(staged),
+            import_diff=staged['diff'],
+            upload_id=staged['upload_id']
         )
 
     # GET: Vis upload form
-    return render_template('admin/bulk_upload.html')
+    return render_template('admin/bulk_upload.html', upload_id=new_upload_id())
+
+
+@units_bp.route('/admin/bulk-upload/progress/<upload_id>')
+@login_required
+def bulk_upload_progress(upload_id):
+    """Fremdrift mens en upload valideres og stages (polles fra upload-siden)"""
+    progress = get_staging_progress(upload_id, get_current_user()['id'])
+    if progress is None:
+        return jsonify({'error': 'Ukendt upload'}), 404
+    return jsonify(progress)
 
 
 @units_bp.route('/admin/bulk-upload/confirm', methods=['POST'])
@@ -433,28 +396,27 @@ def bulk_upload_confirm():
     """Bulk upload af units fra CSV - Step 2: Bekræft og importer"""
     user = get_current_user()
 
-    csv_data_encoded = request.form.get('csv_data', '')
-    if not csv_data_encoded:
-        flash('Ingen data at importere', 'error')
-        return redirect(url_for('units.bulk_upload'))
-
-    try:
-        content = base64.b64decode(csv_data_encoded).decode('utf-8')
-    except Exception as e:
-        flash(f'Fejl ved dekodning af data: {str(e)}', 'error')
+    # Importer det staged resultat fra step 1 - CSV'en parses ikke igen
+    stats = import_staged_org_csv(request.form.get('upload_id', ''), user_id=user['id'])
+    if stats is None:
+        flash('Uploaden findes ikke længere - upload filen igen', 'error')
         return redirect(url_for('units.bulk_upload'))
 
-    # Upload med customer_id
-    stats = bulk_upload_from_csv(content, customer_id=user['customer_id'])
-
-    if stats['errors']:
-        for error in stats['errors']:
-            flash(error, 'warning')
+    for error in _summarize_errors(stats):
+        flash(error, 'warning')
 
     flash(f"{stats['units_created']} organisationer oprettet! {stats['contacts_created']} kontakter tilføjet.", 'success')
     return redirect(url_for('admin_core.admin_home'))
 
 
+def _summarize_errors(stats: dict, limit: int = 10) -> list:
+    """De første fejl plus antallet af resten"""
+    errors = stats['errors'][:limit]
+    if stats['error_count'] > len(errors):
+        errors.append(f"... og {stats['error_count'] - len(errors)} fejl mere")
+    return errors
+
+
 @units_bp.route('/admin/csv-template')
 @login_required
 def download_csv_template():
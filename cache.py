@@ -2,13 +2,19 @@
 Caching modul for Friktionskompasset
 Håndterer caching af aggregerede data og tunge beregninger
 """
+import base64
 import time
 import hashlib
 import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
 from functools import wraps
-from typing import Any, Callable, Optional, Dict
+from typing import Any, Callable, Optional, Dict, List, Sequence, Tuple
 from threading import Lock
 
+from perf import record_cache
+
 # Simple in-memory cache med TTL
 _cache: Dict[str, dict] = {}
 _cache_lock = Lock()
@@ -43,11 +49,14 @@ def cached(ttl: int = DEFAULT_TTL, prefix: str = ""):
                 if cache_key in _cache:
                     entry = _cache[cache_key]
                     if time.time() < entry['expires']:
+                        record_cache(hit=True)
                         return entry['value']
                     else:
                         # Expired - fjern
                         del _cache[cache_key]
 
+            record_cache(hit=False)
+
             # Kald funktionen
             result = func(*args, **kwargs)
 
@@ -71,6 +80,36 @@ def cached(ttl: int = DEFAULT_TTL, prefix: str = ""):
     return decorator
 
 
+def get_cached_value(cache_key: str) -> Optional[Any]:
+    """Hent en gyldig værdi fra cachen (None hvis den mangler eller er udløbet)"""
+    with _cache_lock:
+        entry = _cache.get(cache_key)
+        if entry is not None and time.time() >= entry['expires']:
+            del _cache[cache_key]
+            entry = None
+    record_cache(hit=entry is not None)
+    return entry['value'] if entry is not None else None
+
+
+def set_cached_value(cache_key: str, value: Any, ttl: int = DEFAULT_TTL, max_entries: int = 0):
+    """
+    Gem en værdi i cachen.
+
+    max_entries > 0 begrænser antallet af entries med samme prefix (før
+    første ':') - de ældste fjernes først.
+    """
+    now = time.time()
+    with _cache_lock:
+        _cache[cache_key] = {'value': value, 'expires': now + ttl, 'created': now}
+        if max_entries:
+            prefix = cache_key.split(':', 1)[0] + ':'
+            keys = [k for k in _cache if k.startswith(prefix)]
+            if len(keys) > max_entries:
+                keys.sort(key=lambda k: _cache[k]['created'])
+                for key in keys[:len(keys) - max_entries]:
+                    del _cache[key]
+
+
 def invalidate_cached(cache_key: str) -> bool:
     """Invalider en specifik cache entry"""
     with _cache_lock:
@@ -135,6 +174,7 @@ def invalidate_assessment_cache(assessment_id: str):
     invalidate_prefix(f"stats:")
     invalidate_prefix(f"analysis:")
     invalidate_prefix(f"breakdown:")
+    invalidate_prefix("page:")  # Renderede sider (page_cache)
 
 
 def invalidate_unit_cache(unit_id: str):
@@ -142,6 +182,7 @@ def invalidate_unit_cache(unit_id: str):
     invalidate_prefix(f"stats:")
     invalidate_prefix(f"analysis:")
     invalidate_prefix(f"breakdown:")
+    invalidate_prefix("page:")  # Renderede sider (page_cache)
 
 
 # ============================================
@@ -275,3 +316,364 @@ def paginate_query(query_func: Callable, count_func: Callable,
     pagination = Pagination(total=total, page=page, per_page=per_page)
     items = query_func(pagination.offset, pagination.per_page)
     return items, pagination
+
+
+# ============================================
+# KEYSET PAGINATION
+# ============================================
+#
+# OFFSET skal læse og smide alle tidligere rækker væk, så side 200 koster
+# en scanning af 200 sider. Keyset-paginering husker i stedet sorterings-
+# nøglen for sidste række på siden (en cursor) og henter næste side med
+#
+#     WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT n
+#
+# som kan slås op direkte i et index - lige hurtigt på alle sider.
+
+# Standard sidestørrelse for admin-lister
+DEFAULT_PAGE_SIZE = 50
+
+@dataclass(frozen=True)
+class SortKey:
+    """
+    Én kolonne i en keyset-sortering.
+
+    expr er SQL-udtrykket der sorteres på, column navnet i resultatrækken.
+    Kolonner der kan være NULL skal have en null_value der sorterer som NULL
+    (fx -1 for scores) - NULL kan ikke sammenlignes med < og >. COALESCE
+    kan ikke bruge et index på kolonnen, så sorteringer der skal gå via et
+    index bør i stedet bruge en kolonne der aldrig er NULL (ensure_created_at).
+    """
+    expr: str
+    column: str
+    descending: bool = False
+    null_value: Any = None
+
+    @property
+    def sql(self) -> str:
+        if self.null_value is None:
+            return self.expr
+        return f"COALESCE({self.expr}, {_sql_literal(self.null_value)})"
+
+    def value(self, row) -> Any:
+        value = row[self.column]
+        return self.null_value if value is None else value
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class KeysetOrder:
+    """
+    Sortering for keyset-paginering. Sidste nøgle skal være unik (typisk id),
+    så rækker med samme sorteringsværdi ikke springes over eller gentages.
+
+    Brug:
+        order = KeysetOrder(SortKey('c.created_at', 'created_at', descending=True),
+                            SortKey('c.id', 'id', descending=True))
+    """
+
+    def __init__(self, *keys: SortKey):
+        if not keys:
+            raise ValueError("KeysetOrder kræver mindst én SortKey")
+        self.keys = keys
+        # Cursors fra en anden sortering (fx efter skift af sortering) afvises
+        self.fingerprint = hashlib.md5(
+            '|'.join(f"{k.sql} {k.descending}" for k in keys).encode()
+        ).hexdigest()[:8]
+
+    def order_by(self, backwards: bool = False) -> str:
+        """ORDER BY-liste (uden 'ORDER BY') - vendt når der bladres tilbage"""
+        return ', '.join(
+            f"{k.sql} {'DESC' if k.descending != backwards else 'ASC'}" for k in self.keys
+        )
+
+    def condition(self, values: List[Any], backwards: bool = False) -> Tuple[str, List[Any]]:
+        """WHERE/HAVING-betingelse for rækkerne efter (eller før) values"""
+        ops = ['<' if k.descending != backwards else '>' for k in self.keys]
+        if len(set(ops)) == 1:
+            # Samme retning på alle nøgler: row-value sammenligning (bruger index)
+            columns = ', '.join(k.sql for k in self.keys)
+            marks = ', '.join('?' for _ in self.keys)
+            return f"({columns}) {ops[0]} ({marks})", list(values)
+
+        # Blandede retninger: (a > ?) OR (a = ? AND b < ?) OR ...
+        terms, params = [], []
+        for i, key in enumerate(self.keys):
+            equal = [f"{k.sql} = ?" for k in self.keys[:i]]
+            terms.append('(' + ' AND '.join(equal + [f"{key.sql} {ops[i]} ?"]) + ')')
+            params.extend(values[:i] + [values[i]])
+        return '(' + ' OR '.join(terms) + ')', params
+
+    def values(self, row) -> List[Any]:
+        return [k.value(row) for k in self.keys]
+
+    def encode_cursor(self, row, backwards: bool = False) -> str:
+        payload = {'o': self.fingerprint, 'v': self.values(row)}
+        if backwards:
+            payload['b'] = 1
+        raw = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: Optional[str]) -> Tuple[Optional[List[Any]], bool]:
+        """(values, backwards) - (None, False) for første side eller ugyldig cursor"""
+        if not cursor:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = payload['v']
+        except (ValueError, TypeError, KeyError):
+            return None, False
+        if payload.get('o') != self.fingerprint or len(values) != len(self.keys):
+            return None, False
+        return values, bool(payload.get('b'))
+
+
+class KeysetPagination:
+    """
+    Resultat af keyset_paginate - til templates (macros/pagination.html) og API'er.
+
+    total er None når der ikke tælles. total_kind er 'exact', 'at_least'
+    (loftet optælling, vis "1000+") eller 'approx' (estimat, vis "ca.").
+    """
+
+    def __init__(self, per_page: int, next_cursor: Optional[str] = None,
+                 prev_cursor: Optional[str] = None, total: Optional[int] = None,
+                 total_kind: str = 'exact'):
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_kind = total_kind
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    @property
+    def total_label(self) -> Optional[str]:
+        if self.total is None:
+            return None
+        if self.total_kind == 'at_least':
+            return f"{self.total}+"
+        if self.total_kind == 'approx':
+            return f"ca. {self.total}"
+        return str(self.total)
+
+    def to_dict(self) -> Dict:
+        return {
+            'per_page': self.per_page,
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'has_prev': self.has_prev,
+            'total': self.total,
+            'total_kind': self.total_kind,
+        }
+
+
+def keyset_paginate(fetch: Callable, order: KeysetOrder, cursor: Optional[str] = None,
+                    per_page: int = DEFAULT_PAGE_SIZE, count_func: Optional[Callable] = None) -> tuple:
+    """
+    Helper til keyset-paginering af database queries
+
+    Args:
+        fetch: Funktion der tager (condition, params, order_by, limit) og returnerer
+               rækker. condition er altid et gyldigt SQL-udtryk ('1 = 1' på første
+               side), så queryen kan skrive "WHERE ... AND {condition}"
+        order: Sorteringen (se KeysetOrder)
+        cursor: Cursor fra forrige side (next_cursor/prev_cursor) eller None
+        per_page: Antal per side
+        count_func: Valgfri; returnerer total som int eller (total, total_kind)
+
+    Returns:
+        (items, pagination)
+    """
+    values, backwards = order.decode_cursor(cursor)
+    if values is None:
+        condition, params = '1 = 1', []
+    else:
+        condition, params = order.condition(values, backwards)
+
+    rows = list(fetch(condition, params, order.order_by(backwards), per_page + 1))
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        if not rows:
+            # Alt før cursoren er slettet - start forfra
+            return keyset_paginate(fetch, order, None, per_page, count_func)
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = values is not None, more
+
+    total, total_kind = None, 'exact'
+    if count_func is not None:
+        total = count_func()
+        if isinstance(total, tuple):
+            total, total_kind = total
+
+    pagination = KeysetPagination(
+        per_page=per_page,
+        next_cursor=order.encode_cursor(rows[-1]) if has_next and rows else None,
+        prev_cursor=order.encode_cursor(rows[0], backwards=True) if has_prev and rows else None,
+        total=total,
+        total_kind=total_kind,
+    )
+    return rows, pagination
+
+
+def capped_count(conn, sql: str, params: Sequence = (), cap: int = 1000) -> Tuple[int, str]:
+    """
+    Tæl rækker i sql men stop ved cap - i stedet for en fuld COUNT(*).
+
+    Returns:
+        (antal, 'exact') eller (cap, 'at_least') hvis der er flere
+    """
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM ({sql} LIMIT {int(cap) + 1})", list(params)
+    ).fetchone()[0]
+    return (cap, 'at_least') if count > cap else (count, 'exact')
+
+
+def estimated_row_count(conn, table: str) -> Tuple[Optional[int], str]:
+    """
+    Estimeret antal rækker i en hel tabel uden at scanne den.
+
+    Bruger ANALYZE-statistik (sqlite_stat1) hvis den findes, ellers største
+    rowid (slettede rækker tælles med).
+
+    Returns:
+        (antal, 'approx') eller (None, 'approx') hvis tabellen er tom
+    """
+    try:
+        row = conn.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None  # Ingen ANALYZE-statistik
+    if row and row[0]:
+        return int(str(row[0]).split()[0]), 'approx'
+    return conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0], 'approx'
+
+
+def ensure_created_at(conn, table: str):
+    """
+    Hold created_at udfyldt, så kolonnen kan være keyset-nøgle uden COALESCE.
+
+    DEFAULT CURRENT_TIMESTAMP dækker ikke en eksplicit NULL (fx fra import).
+    Eksisterende NULL udfyldes, og triggers udfylder fremtidige - samme
+    værdi som hvis kolonnen var udeladt.
+    """
+    conn.execute(f"UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    for event in ('INSERT', 'UPDATE OF created_at'):
+        name = f"trg_{table}_created_at_{event.split()[0].lower()}"
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}
+            AFTER {event} ON {table}
+            WHEN NEW.created_at IS NULL
+            BEGIN
+                UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid;
+            END
+        """)
+
+
+# ============================================
+# DELTE CACHE-VERSIONER (invalidering på tværs af workers)
+# ============================================
+
+def _ensure_cache_versions_table(conn, table: str = 'cache_versions'):
+    """Opret cache_versions tabellen hvis den mangler"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _versions_table(conn, catalog: bool) -> str:
+    """Katalogets tæller via en kundefils forbindelse ligger i catalog.cache_versions"""
+    if catalog and getattr(conn, 'tenant_id', None):
+        from tenant_db import CATALOG_ALIAS
+        return f"{CATALOG_ALIAS}.cache_versions"
+    return 'cache_versions'
+
+
+@contextmanager
+def _versions_db(catalog: bool):
+    """get_db() - for katalogets caches altid kataloget, uanset aktuel kunde"""
+    from db import get_db
+    from tenant_db import tenant_scope
+
+    if not catalog:
+        with get_db() as c:
+            yield c
+        return
+    with tenant_scope(None), get_db() as c:
+        yield c
+
+
+def get_cache_version(name: str, conn=None, catalog: bool = False) -> int:
+    """
+    Hent den delte versionstæller for en cache (0 hvis den ikke findes).
+
+    Hver gunicorn-worker har sin egen in-memory cache; tælleren i databasen
+    er det fælles signal om at data er ændret og cachen skal genindlæses.
+
+    catalog=True for caches over katalogets tabeller (API-nøgler, domæner,
+    oversættelser): med kundedatabaser har hver kundefil sine egne
+    cache_versions, men disse caches læses og invalideres altid i kataloget.
+    """
+    def _read(c):
+        try:
+            row = c.execute(
+                f"SELECT version FROM {_versions_table(c, catalog)} WHERE name = ?", (name,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return 0  # Tabellen findes ikke endnu
+        return row[0] if row else 0
+
+    if conn is not None:
+        return _read(conn)
+    with _versions_db(catalog) as c:
+        return _read(c)
+
+
+def bump_cache_version(name: str, conn=None, catalog: bool = False) -> int:
+    """
+    Tæl versionen for en cache op, så alle workers genindlæser den.
+
+    catalog=True tæller katalogets version op (se get_cache_version).
+
+    Returns:
+        Den nye version
+    """
+    def _bump(c):
+        table = _versions_table(c, catalog)
+        _ensure_cache_versions_table(c, table)
+        c.execute(f"""
+            INSERT INTO {table} (name, version, updated_at)
+            VALUES (?, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP
+        """, (name,))
+        return c.execute(
+            f"SELECT version FROM {table} WHERE name = ?", (name,)
+        ).fetchone()[0]
+
+    if conn is not None:
+        return _bump(conn)
+    with _versions_db(catalog) as c:
+        return _bump(c)
@@ -0,0 +1,404 @@
+"""
+Søgning i fritekst-kommentarer fra målinger
+
+Kommentarer fra survey gemmes i responses.comment som
+"SITUATION: ...\\n\\nGENERELT: ..." (bagudkompatibelt) og desuden opdelt i
+comment_situation og comment_general. De to kolonner er indekseret i en
+FTS5-tabel (response_comments_fts), så admins kan søge på tværs af en kunde,
+se hyppige ord per felt (facetter) og bladre med cursor-paginering.
+
+Triggers holder FTS-indekset opdateret, og rækker der indsættes med kun
+comment (imports, seed-scripts) opdeles automatisk i SQL.
+"""
+import re
+import sqlite3
+from collections import Counter
+from typing import Dict, Optional
+
+from db import get_db
+
+FTS_TABLE = 'response_comments_fts'
+
+COMMENT_FIELDS = {
+    'situation': 'comment_situation',
+    'general': 'comment_general',
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Almindelige danske ord der ikke giver mening som facetter
+STOPWORDS = {
+    'at', 'af', 'alle', 'alt', 'andre', 'bare', 'blev', 'bliver', 'da', 'de', 'dem', 'den',
+    'der', 'det', 'dig', 'din', 'dog', 'du', 'efter', 'eller', 'en', 'end', 'er', 'et',
+    'for', 'fordi', 'fra', 'få', 'godt', 'har', 'have', 'hele', 'her', 'hos', 'hvad',
+    'hvis', 'hvor', 'hvordan', 'i', 'ikke', 'ind', 'jeg', 'kan', 'kun', 'kunne', 'lidt',
+    'man', 'mange', 'med', 'meget', 'men', 'mere', 'mig', 'min', 'mine', 'må', 'ned', 'noget',
+    'nogle', 'når', 'nu', 'og', 'også', 'om', 'op', 'os', 'over', 'på', 'sig', 'sin', 'skal',
+    'skulle', 'som', 'så', 'til', 'ud', 'under', 'var', 'vi', 'vil', 'ville', 'være', 'været',
+}
+MIN_TERM_LENGTH = 3
+
+# Opdeling af "SITUATION: ...\n\nGENERELT: ..." i SQL (samme regler som survey submit)
+_WS = "' ' || char(9) || char(10) || char(13)"
+SPLIT_SITUATION_SQL = f"""
+    CASE WHEN instr({{c}}, 'SITUATION:') > 0 THEN NULLIF(trim(substr({{c}},
+        instr({{c}}, 'SITUATION:') + 10,
+        CASE WHEN instr({{c}}, 'GENERELT:') > instr({{c}}, 'SITUATION:')
+             THEN instr({{c}}, 'GENERELT:') - instr({{c}}, 'SITUATION:') - 10
+             ELSE length({{c}}) END), {_WS}), '') END
+"""
+SPLIT_GENERAL_SQL = f"""
+    CASE WHEN instr({{c}}, 'GENERELT:') > 0
+              THEN NULLIF(trim(substr({{c}}, instr({{c}}, 'GENERELT:') + 9), {_WS}), '')
+         WHEN instr({{c}}, 'SITUATION:') = 0 THEN NULLIF(trim({{c}}, {_WS}), '')
+    END
+"""
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+# Som FTS5's unicode61-tokenizer: bogstaver og tal, underscore skiller ord
+_term_re = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def combine_comment(situation: str, general: str) -> str:
+    """Saml de to fritekstfelter til det gamle kombinerede format"""
+    combined = ""
+    if situation:
+        combined += f"SITUATION: {situation}"
+    if general:
+        if combined:
+            combined += "\n\n"
+        combined += f"GENERELT: {general}"
+    return combined
+
+
+# ========================================
+# SKEMA
+# ========================================
+
+def init_comment_search(conn: sqlite3.Connection):
+    """
+    Opret kommentar-kolonner, FTS5-indeks og triggers (sikkert at køre flere gange).
+
+    Eksisterende kommentarer opdeles og indekseres første gang.
+    """
+    # Triggers og migration læser det kombinerede felt - ældre/forenklede skemaer mangler det
+    try:
+        conn.execute("ALTER TABLE responses ADD COLUMN comment TEXT")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    columns_added = False
+    for column in COMMENT_FIELDS.values():
+        try:
+            conn.execute(f"ALTER TABLE responses ADD COLUMN {column} TEXT")
+            columns_added = True
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+
+    fts_exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone() is not None
+
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                comment_situation, comment_general,
+                content='responses', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 0'
+            )
+        """)
+        # Facetter tælles nu fra scopets rækker; fjern den gamle fts5vocab-tabel
+        conn.execute("DROP TABLE IF EXISTS response_comments_vocab")
+    except sqlite3.OperationalError:
+        # SQLite uden FTS5 - søgning falder tilbage til LIKE
+        fts_exists = None
+
+    # Rækker indsat med kun det kombinerede felt opdeles af databasen
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_comment_split
+        AFTER INSERT ON responses
+        WHEN NEW.comment IS NOT NULL AND NEW.comment != ''
+             AND NEW.comment_situation IS NULL AND NEW.comment_general IS NULL
+        BEGIN
+            UPDATE responses SET
+                comment_situation = {SPLIT_SITUATION_SQL.format(c='NEW.comment')},
+                comment_general = {SPLIT_GENERAL_SQL.format(c='NEW.comment')}
+            WHERE id = NEW.id;
+        END
+    """)
+
+    if fts_exists is not None:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS responses_comments_fts_ai
+            AFTER INSERT ON responses
+            WHEN NEW.comment_situation IS NOT NULL OR NEW.comment_general IS NOT NULL
+            BEGIN
+                INSERT INTO {FTS_TABLE} (rowid, comment_situation, comment_general)
+                VALUES (NEW.id, NEW.comment_situation, NEW.comment_general);
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS responses_comments_fts_ad
+            AFTER DELETE ON responses
+            WHEN OLD.comment_situation IS NOT NULL OR OLD.comment_general IS NOT NULL
+            BEGIN
+                INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, comment_situation, comment_general)
+                VALUES ('delete', OLD.id, OLD.comment_situation, OLD.comment_general);
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS responses_comments_fts_au
+            AFTER UPDATE OF comment_situation, comment_general ON responses
+            BEGIN
+                INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, comment_situation, comment_general)
+                SELECT 'delete', OLD.id, OLD.comment_situation, OLD.comment_general
+                WHERE OLD.comment_situation IS NOT NULL OR OLD.comment_general IS NOT NULL;
+                INSERT INTO {FTS_TABLE} (rowid, comment_situation, comment_general)
+                SELECT NEW.id, NEW.comment_situation, NEW.comment_general
+                WHERE NEW.comment_situation IS NOT NULL OR NEW.comment_general IS NOT NULL;
+            END
+        """)
+
+    if columns_added:
+        # Opdel eksisterende kommentarer - update-triggeren indekserer dem
+        updated = conn.execute(f"""
+            UPDATE responses SET
+                comment_situation = {SPLIT_SITUATION_SQL.format(c='comment')},
+                comment_general = {SPLIT_GENERAL_SQL.format(c='comment')}
+            WHERE comment IS NOT NULL AND comment != ''
+        """).rowcount
+        if updated:
+            print(f"Migration: Opdelte {updated} fritekst-kommentarer i situation/generelt")
+    elif fts_exists is False:
+        conn.execute(f"""
+            INSERT INTO {FTS_TABLE} (rowid, comment_situation, comment_general)
+            SELECT id, comment_situation, comment_general FROM responses
+            WHERE comment_situation IS NOT NULL OR comment_general IS NOT NULL
+        """)
+
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_responses_assessment_comments
+        ON responses(assessment_id, id)
+        WHERE comment_situation IS NOT NULL OR comment_general IS NOT NULL
+    """)
+
+
+def _has_fts(conn) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)
+    ).fetchone() is not None
+
+
+# ========================================
+# SØGNING
+# ========================================
+
+def build_match_query(query: str, field: str = None) -> Optional[str]:
+    """
+    Brugerens søgetekst -> FTS5 MATCH-udtryk.
+
+    Hvert ord matches som præfiks og alle ord skal forekomme; FTS5-syntaks i
+    input ignoreres, så brugere ikke kan lave ugyldige udtryk.
+    """
+    terms = _token_re.findall((query or '').lower())
+    if not terms:
+        return None
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    if field:
+        expression = f"{COMMENT_FIELDS[field]} : ({expression})"
+    return expression
+
+
+def _clamp_limit(limit: Optional[int]) -> int:
+    try:
+        limit = int(limit or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _scope_filters(customer_id: str = None, assessment_id: str = None, unit_id: str = None,
+                   respondent_type: str = None, include_children: bool = True):
+    """Fælles WHERE-betingelser (og CTE for undertræ) for søgning og facetter"""
+    cte = ""
+    where = []
+    params = []
+    if unit_id and include_children:
+        cte = """
+            WITH RECURSIVE subtree AS (
+                SELECT id FROM organizational_units WHERE id = ?
+                UNION ALL
+                SELECT ou.id FROM organizational_units ou
+                JOIN subtree st ON ou.parent_id = st.id
+            )
+        """
+        params.append(unit_id)
+        where.append("r.unit_id IN (SELECT id FROM subtree)")
+    elif unit_id:
+        where.append("r.unit_id = ?")
+        params.append(unit_id)
+    if customer_id:
+        where.append("ou.customer_id = ?")
+        params.append(customer_id)
+    if assessment_id:
+        where.append("r.assessment_id = ?")
+        params.append(assessment_id)
+    if respondent_type:
+        where.append("r.respondent_type = ?")
+        params.append(respondent_type)
+    return cte, where, params
+
+
+def search_comments(customer_id: str = None, query: str = None, field: str = None,
+                    assessment_id: str = None, unit_id: str = None,
+                    respondent_type: str = None, include_children: bool = True,
+                    limit: int = DEFAULT_PAGE_SIZE, cursor: int = None) -> Dict:
+    """
+    Søg i kommentarer med cursor-paginering (nyeste først).
+
+    Args:
+        customer_id: Begræns til kundens enheder (None = alle, kun superadmin)
+        query: Fritekst - alle ord skal forekomme (præfiks-match)
+        field: 'situation' eller 'general' for kun at søge i ét felt
+        cursor: next_cursor fra forrige side
+
+    Returns:
+        {'comments': [...], 'next_cursor': int|None}
+    """
+    if field and field not in COMMENT_FIELDS:
+        raise ValueError(f"Ukendt felt: {field}")
+    limit = _clamp_limit(limit)
+    cte, where, params = _scope_filters(customer_id, assessment_id, unit_id,
+                                        respondent_type, include_children)
+
+    with get_db() as conn:
+        match = build_match_query(query, field)
+        if match and _has_fts(conn):
+            source = f"{FTS_TABLE} f JOIN responses r ON r.id = f.rowid"
+            where.insert(0, f"{FTS_TABLE} MATCH ?")
+            params.insert(1 if cte else 0, match)
+        else:
+            source = "responses r"
+            if field:
+                where.append(f"r.{COMMENT_FIELDS[field]} IS NOT NULL")
+            else:
+                where.append("(r.comment_situation IS NOT NULL OR r.comment_general IS NOT NULL)")
+            if match:
+                # Fallback uden FTS5
+                columns = [COMMENT_FIELDS[field]] if field else list(COMMENT_FIELDS.values())
+                for term in _token_re.findall(query.lower()):
+                    where.append("(" + " OR ".join(f"lower(r.{c}) LIKE ?" for c in columns) + ")")
+                    params.extend([f"%{term}%"] * len(columns))
+
+        if cursor:
+            where.append("r.id < ?")
+            params.append(int(cursor))
+
+        rows = conn.execute(f"""
+            {cte}
+            SELECT r.id, r.assessment_id, r.unit_id, r.respondent_type, r.respondent_name,
+                   r.comment_situation, r.comment_general, r.created_at,
+                   ou.name as unit_name, a.name as assessment_name
+            FROM {source}
+            JOIN organizational_units ou ON ou.id = r.unit_id
+            JOIN assessments a ON a.id = r.assessment_id
+            WHERE {' AND '.join(where)}
+            ORDER BY r.id DESC
+            LIMIT ?
+        """, params + [limit + 1]).fetchall()
+
+    comments = [{
+        'id': row['id'],
+        'assessment_id': row['assessment_id'],
+        'assessment_name': row['assessment_name'],
+        'unit_id': row['unit_id'],
+        'unit_name': row['unit_name'],
+        'respondent_type': row['respondent_type'],
+        'respondent_name': row['respondent_name'],
+        'situation': row['comment_situation'] or '',
+        'general': row['comment_general'] or '',
+        'created_at': row['created_at'],
+    } for row in rows[:limit]]
+
+    return {
+        'comments': comments,
+        'next_cursor': comments[-1]['id'] if len(rows) > limit else None,
+    }
+
+
+def get_comment_facets(customer_id: str = None, query: str = None,
+                       assessment_id: str = None, unit_id: str = None,
+                       respondent_type: str = None, include_children: bool = True,
+                       top_terms: int = 20) -> Dict:
+    """
+    Facetter for kommentarerne i et scope (evt. begrænset af en søgning).
+
+    Returns:
+        {
+            'total': 120,
+            'fields': {'situation': 80, 'general': 95},
+            'respondent_types': {'employee': 110, 'leader_self': 10},
+            'terms': {'situation': [{'term': 'møder', 'count': 41, 'comments': 30}, ...],
+                      'general': [...]}
+        }
+    """
+    cte, where, params = _scope_filters(customer_id, assessment_id, unit_id,
+                                        respondent_type, include_children)
+
+    with get_db() as conn:
+        match = build_match_query(query)
+        has_fts = _has_fts(conn)
+        if match and has_fts:
+            where.insert(0, f"r.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)")
+            params.insert(1 if cte else 0, match)
+        where.append("(r.comment_situation IS NOT NULL OR r.comment_general IS NOT NULL)")
+        scope_sql = f"""
+            FROM responses r
+            JOIN organizational_units ou ON ou.id = r.unit_id
+            WHERE {' AND '.join(where)}
+        """
+
+        counts = conn.execute(f"""
+            {cte}
+            SELECT COUNT(*) as total,
+                   COUNT(r.comment_situation) as situation,
+                   COUNT(r.comment_general) as general
+            {scope_sql}
+        """, params).fetchone()
+        respondent_types = {row['respondent_type']: row['cnt'] for row in conn.execute(f"""
+            {cte}
+            SELECT r.respondent_type, COUNT(*) as cnt
+            {scope_sql}
+            GROUP BY r.respondent_type
+            ORDER BY cnt DESC
+        """, params)}
+
+        # Ordene tælles kun i scopets rækker - fts5vocab ville gennemløbe hele indekset
+        term_counts = {field: Counter() for field in COMMENT_FIELDS}
+        term_docs = {field: Counter() for field in COMMENT_FIELDS}
+        for row in conn.execute(f"""
+            {cte}
+            SELECT r.comment_situation, r.comment_general
+            {scope_sql}
+        """, params):
+            for field, column in COMMENT_FIELDS.items():
+                words = [word for word in _term_re.findall((row[column] or '').lower())
+                         if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS]
+                term_counts[field].update(words)
+                term_docs[field].update(set(words))
+
+    terms = {
+        field: [{'term': term, 'count': count, 'comments': term_docs[field][term]}
+                for term, count in sorted(term_counts[field].items(),
+                                          key=lambda item: (-item[1], item[0]))[:top_terms]]
+        for field in COMMENT_FIELDS
+    }
+
+    return {
+        'total': counts['total'],
+        'fields': {'situation': counts['situation'], 'general': counts['general']},
+        'respondent_types': respondent_types,
+        'terms': terms,
+    }
+
@@ -0,0 +1,112 @@
+"""
+Komprimering af dynamiske svar (gzip / brotli)
+
+HTML-sider, trend-data og eksporter sendes ellers ukomprimeret - en
+eksport kan være flere MB. compress_response() kører som after_request og
+komprimerer tekst-svar over COMPRESSION_MIN_SIZE efter klientens
+Accept-Encoding: brotli hvis modulet er installeret (valgfri afhængighed),
+ellers gzip.
+
+Svaret får Vary: Accept-Encoding, og et stærkt ETag får encodingen som
+suffix ("abc-gzip"), så de komprimerede og ukomprimerede bytes aldrig har
+samme ETag. data_version.conditional_get genkender suffixet ved
+revalidering.
+
+Statiske filer, streamede svar og svar der allerede har en
+Content-Encoding røres ikke.
+"""
+import gzip
+import os
+from typing import Optional
+
+from flask import Response, request
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Valgfri - uden brotli bruges gzip
+    brotli = None
+
+# Mindre svar fylder ofte mere komprimeret og passer i én TCP-pakke alligevel
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1400'))
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() != 'false'
+
+# Hurtige niveauer - svarene komprimeres per request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'application/x-yaml', 'application/yaml', 'image/svg+xml',
+)
+
+# Encodings i prioriteret rækkefølge
+ENCODINGS = ('br', 'gzip')
+
+
+def _is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES
+
+
+def choose_encoding(accept_encoding) -> Optional[str]:
+    """Bedste encoding klienten accepterer (q=0 betyder nej), eller None"""
+    for encoding in ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept_encoding[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag (uden anførselstegn) for den komprimerede repræsentation"""
+    return f"{etag}-{encoding}"
+
+
+def compress_response(response: Response) -> Response:
+    """after_request: komprimer tekst-svar efter Accept-Encoding"""
+    if not COMPRESSION_ENABLED:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or request.method == 'HEAD'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+            or not _is_compressible(response.mimetype)):
+        return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    try:
+        compressed = compress(data, encoding)
+    except Exception as e:
+        logger.warning(f"Komprimering fejlede ({encoding}): {e}")
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(encoded_etag(etag, encoding))
+    return response
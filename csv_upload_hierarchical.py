@@ -2,10 +2,298 @@
 CSV Bulk Upload for Friktionskompas V3
 Importer hierarkiske organisationer fra CSV med // separator
 Format matcher UserExport.csv (semikolon separator, UTF-8 BOM)
+
+Store HR-udtræk (flere hundrede MB) læses af stage_org_csv() i chunks:
+validering, preview og sti-trie bygges i samme gennemløb, og kontakterne
+skrives løbende til en midlertidig SQLite-fil (staging). Bekræft-trinnet
+importerer fra staging med import_staged_org_csv() uden at parse CSV'en
+igen. Fremdriften kan læses undervejs med get_staging_progress().
 """
+import codecs
 import csv
 import io
-from db_hierarchical import create_unit_from_path, get_db, add_contacts_bulk
+import json
+import os
+import re
+import secrets
+import sqlite3
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from db_hierarchical import get_db
+
+REQUIRED_COLUMNS = ['Organisation']
+PREVIEW_ROWS = 20
+HIERARCHY_PREVIEW_ITEMS = 30
+# Fejl ud over dette antal tælles kun (error_count)
+MAX_REPORTED_ERRORS = 100
+
+# Staging af uploads mellem preview og bekræft
+STAGING_DIR = os.environ.get('CSV_STAGING_DIR',
+                             os.path.join(tempfile.gettempdir(), 'friktion_csv_staging'))
+STAGING_TTL = 24 * 3600
+CHUNK_SIZE = 1024 * 1024
+# Kontakter per executemany og rækker mellem progress-opdateringer
+STAGING_BATCH = 5000
+
+_UPLOAD_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+_STAGING_SCHEMA = """
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE units (path TEXT PRIMARY KEY, name TEXT, parent_path TEXT,
+                        leader_name TEXT, leader_email TEXT, contacts INTEGER);
+    CREATE TABLE contacts (path TEXT, email TEXT, phone TEXT);
+"""
+
+
+class _PathNode:
+    """Ét niveau i en organisationssti - knude i importens sti-trie"""
+    __slots__ = ('name', 'path', 'children', 'unit_id', 'leader_name', 'leader_email',
+                 'row_count', 'contact_count')
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.children: Dict[str, '_PathNode'] = {}
+        self.unit_id: Optional[str] = None  # Sat hvis enheden findes i forvejen
+        self.leader_name: Optional[str] = None
+        self.leader_email: Optional[str] = None
+        self.row_count = 0  # Rækker hvis sti ender her
+        self.contact_count = 0
+
+    def walk(self, level: int = 0, parent: '_PathNode' = None):
+        """(knude, parent, niveau) i pre-order - parents før children"""
+        yield self, parent, level
+        for child in self.children.values():
+            yield from child.walk(level + 1, self)
+
+
+def _walk_trie(roots: Dict[str, _PathNode]):
+    for root in roots.values():
+        yield from root.walk()
+
+
+def _add_path(roots: Dict[str, _PathNode], parts: List[str]) -> _PathNode:
+    """Find eller opret stiens knuder og returner den sidste"""
+    level_nodes, path, node = roots, '', None
+    for part in parts:
+        path = f"{path}//{part}" if path else part
+        node = level_nodes.get(part)
+        if node is None:
+            node = level_nodes[part] = _PathNode(part, path)
+        level_nodes = node.children
+    return node
+
+
+def _new_stats() -> dict:
+    return {
+        'valid': True,
+        'rows': 0,            # Alle datarækker
+        'total_rows': 0,      # Rækker med organisation
+        'max_depth': 0,
+        'units_skipped': 0,
+        'errors': [],
+        'error_count': 0,
+        'warnings': [],
+    }
+
+
+def _row_error(stats: dict, message: str):
+    stats['error_count'] += 1
+    if len(stats['errors']) < MAX_REPORTED_ERRORS:
+        stats['errors'].append(message)
+
+
+def _read_org_rows(rows: Iterable[Dict], roots: Dict[str, _PathNode], stats: dict,
+                   add_contact: Callable[[str, Optional[str], Optional[str]], None],
+                   preview: Optional[List[Dict]] = None):
+    """
+    Ét gennemløb af CSV-rækkerne: valider, byg sti-trie og aflever kontakter.
+
+    Første person på en sti bliver leder af enheden; alle med email eller
+    telefon bliver kontakter via add_contact(path, email, phone).
+    """
+    for row_num, row in enumerate(rows, start=2):  # Start på 2 (efter header)
+        stats['rows'] += 1
+        org_path = (row.get('Organisation') or '').strip()
+        if not org_path:
+            stats['units_skipped'] += 1
+            continue
+
+        parts = [part.strip() for part in org_path.split('//')]
+        if not all(parts):
+            _row_error(stats, f"Række {row_num}: Tomt niveau i organisation '{org_path}'")
+            continue
+
+        if stats['total_rows'] == 0 and len(parts) == 1:
+            stats['warnings'].append(
+                "Ingen '//' separatorer fundet. "
+                "Husk at bruge '//' til at adskille niveauer (f.eks. 'Virksomhed//Afdeling//Team')"
+            )
+        stats['total_rows'] += 1
+        stats['max_depth'] = max(stats['max_depth'], len(parts))
+
+        node = _add_path(roots, parts)
+        firstname = (row.get('FirstName') or '').strip()
+        lastname = (row.get('Lastname') or '').strip()
+        email = (row.get('Email') or '').strip() or None
+        phone = (row.get('phone') or '').strip() or None
+
+        if node.row_count == 0:
+            node.leader_name = f"{firstname} {lastname}".strip() or None
+            node.leader_email = email
+        node.row_count += 1
+        if email or phone:
+            node.contact_count += 1
+            add_contact(node.path, email, phone)
+
+        if preview is not None and len(preview) < PREVIEW_ROWS:
+            preview.append({
+                'row': row_num,
+                'path': org_path,
+                'levels': len(parts),
+                'name': f"{firstname} {lastname}".strip() or '-',
+                'email': email or '-',
+            })
+
+
+def _hierarchy_preview(roots: Dict[str, _PathNode]) -> List[Dict]:
+    """De første enheder i træet (alfabetisk) til preview"""
+    items = []
+
+    def visit(nodes: Dict[str, _PathNode], indent: int):
+        for name in sorted(nodes):
+            if len(items) >= HIERARCHY_PREVIEW_ITEMS:
+                return
+            node = nodes[name]
+            items.append({'name': name, 'indent': indent, 'count': node.row_count})
+            visit(node.children, indent + 1)
+
+    visit(roots, 0)
+    for i, item in enumerate(items):
+        item['last'] = (i == len(items) - 1)
+    return items
+
+
+def parse_org_csv(file_content: str) -> Tuple[Dict[str, _PathNode], List[Tuple], dict]:
+    """
+    Læs CSV'en ind i en sti-trie (uden database-opslag).
+
+    Returns:
+        (rod-knuder efter navn, kontakter som (path, email, phone), stats)
+    """
+    if file_content.startswith('\ufeff'):
+        file_content = file_content[1:]
+
+    csv_reader = csv.DictReader(io.StringIO(file_content), delimiter=';')
+    roots: Dict[str, _PathNode] = {}
+    contacts: List[Tuple] = []
+    stats = _new_stats()
+    _read_org_rows(csv_reader, roots, stats,
+                   lambda path, email, phone: contacts.append((path, email, phone)))
+    return roots, contacts, stats
+
+
+def _existing_unit_ids(conn, customer_id: Optional[str]) -> Dict[str, str]:
+    """full_path -> unit_id for kundens enheder (ét query)"""
+    if customer_id:
+        rows = conn.execute(
+            "SELECT id, full_path FROM organizational_units WHERE customer_id = ?", (customer_id,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT id, full_path FROM organizational_units WHERE customer_id IS NULL"
+        ).fetchall()
+    return {row['full_path']: row['id'] for row in rows}
+
+
+def _write_org_trie(roots: Dict[str, _PathNode], contacts: Iterable[Tuple],
+                    customer_id: Optional[str], dry_run: bool, stats: dict) -> dict:
+    """
+    Gem triens nye enheder og kontakterne i én transaktion.
+
+    Kundens eksisterende enheder slås op i ét query; alt andet skrives med
+    executemany. Fejler en indsættelse, rulles hele importen tilbage.
+    """
+    stats.update({
+        'units_created': 0,
+        'contacts_created': 0,
+        'dry_run': dry_run,
+        'diff': {'new_units': [], 'updated_units': [], 'existing_units': 0},
+    })
+    diff = stats['diff']
+
+    units, employee_counts, unit_ids = [], [], {}
+    try:
+        with get_db() as conn:
+            existing = _existing_unit_ids(conn, customer_id)
+
+            for node, parent, level in _walk_trie(roots):
+                node.unit_id = existing.get(node.path)
+                if node.unit_id:
+                    diff['existing_units'] += 1
+                    if node.contact_count:
+                        diff['updated_units'].append(node.path)
+                        employee_counts.append((node.contact_count, node.unit_id))
+                else:
+                    node.unit_id = f"unit-{secrets.token_urlsafe(8)}"
+                    diff['new_units'].append(node.path)
+                    units.append((
+                        node.unit_id, parent.unit_id if parent else None, node.name,
+                        node.path, level, node.leader_name, node.leader_email,
+                        node.contact_count, 0, customer_id,
+                    ))
+                unit_ids[node.path] = node.unit_id
+                stats['contacts_created'] += node.contact_count
+
+            stats['units_created'] = len(units)
+            if dry_run:
+                return stats
+
+            conn.executemany("""
+                INSERT INTO organizational_units
+                (id, parent_id, name, full_path, level, leader_name, leader_email,
+                 employee_count, sick_leave_percent, customer_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, units)
+            conn.executemany(
+                "INSERT INTO contacts (unit_id, email, phone) VALUES (?, ?, ?)",
+                ((unit_ids[path], email, phone) for path, email, phone in contacts)
+            )
+            conn.executemany(
+                "UPDATE organizational_units SET employee_count = ? WHERE id = ?", employee_counts
+            )
+    except sqlite3.Error as e:
+        # get_db committer kun ved succes - intet er gemt
+        stats['units_created'] = stats['contacts_created'] = 0
+        stats['rolled_back'] = True
+        _row_error(stats, f"Import afbrudt, intet er gemt: {str(e)}")
+
+    return stats
+
+
+def import_org_csv(file_content: str, customer_id: str = None, dry_run: bool = False) -> dict:
+    """
+    Importer organisationer fra CSV i én transaktion.
+
+    CSV'en parses til en sti-trie, kundens eksisterende enheder slås op i
+    ét query, og alle nye enheder og kontakter indsættes med executemany.
+    Fejler en indsættelse, rulles hele importen tilbage.
+
+    Args:
+        file_content: CSV content as string (se bulk_upload_from_csv)
+        customer_id: Customer ID to assign to created units (for multi-tenant)
+        dry_run: Beregn kun forskellen - intet gemmes
+
+    Returns:
+        dict med statistik og 'diff':
+            new_units: stier der oprettes
+            updated_units: eksisterende stier der får kontakter/employee_count
+            existing_units: antal stier i CSV'en der findes i forvejen
+    """
+    roots, contacts, stats = parse_org_csv(file_content)
+    return _write_org_trie(roots, contacts, customer_id, dry_run, stats)
 
 
 def bulk_upload_from_csv(file_content: str, customer_id: str = None) -> dict:
@@ -22,89 +310,232 @@ def bulk_upload_from_csv(file_content: str, customer_id: str = None) -> dict:
         customer_id: Customer ID to assign to created units (for multi-tenant)
 
     Returns:
-        dict med statistik over import
+        dict med statistik over import (se import_org_csv)
     """
+    return import_org_csv(file_content, customer_id=customer_id)
 
-    # Fjern BOM hvis den findes
-    if file_content.startswith('\ufeff'):
-        file_content = file_content[1:]
 
-    stream = io.StringIO(file_content)
-    # Brug semikolon som delimiter (Excel standard i Danmark)
-    csv_reader = csv.DictReader(stream, delimiter=';')
+# ========================================
+# STREAMING UPLOAD MED STAGING
+# ========================================
 
-    stats = {
-        'units_created': 0,
-        'contacts_created': 0,
-        'units_skipped': 0,
-        'errors': []
-    }
+def new_upload_id() -> str:
+    """Id til en ny upload (sendes med formularen, så fremdriften kan følges)"""
+    return secrets.token_urlsafe(16)
+
+
+def _staging_path(upload_id: Optional[str]) -> Optional[str]:
+    if not upload_id or not _UPLOAD_ID_RE.match(upload_id):
+        return None
+    return os.path.join(STAGING_DIR, f"{upload_id}.db")
+
+
+def _open_staging(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
 
-    # Track units og kontakter
-    units_by_path = {}  # path -> unit_id
-    contacts_by_unit = {}  # unit_id -> [contacts]
 
-    for row_num, row in enumerate(csv_reader, start=2):  # Start på 2 (efter header)
+def _set_meta(conn: sqlite3.Connection, **values):
+    conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                     [(key, json.dumps(value)) for key, value in values.items()])
+    conn.commit()
+
+
+def _get_meta(conn: sqlite3.Connection) -> dict:
+    return {row['key']: json.loads(row['value'])
+            for row in conn.execute("SELECT key, value FROM meta")}
+
+
+def _read_staging_meta(upload_id: str, user_id) -> Optional[dict]:
+    """Meta for en staged upload - kun til brugeren der uploadede den"""
+    path = _staging_path(upload_id)
+    if not path or not os.path.exists(path):
+        return None
+    conn = _open_staging(path)
+    try:
+        meta = _get_meta(conn)
+    except sqlite3.Error:
+        return None  # Under oprettelse
+    finally:
+        conn.close()
+    return meta if meta.get('user_id') == user_id else None
+
+
+def _cleanup_staging():
+    """Slet staged uploads der aldrig blev bekræftet"""
+    cutoff = time.time() - STAGING_TTL
+    for name in os.listdir(STAGING_DIR):
+        path = os.path.join(STAGING_DIR, name)
         try:
-            org_path = row.get('Organisation', '').strip()
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def discard_staged_upload(upload_id: str):
+    path = _staging_path(upload_id)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _iter_lines(stream, progress: dict) -> Iterator[str]:
+    """Læs en binær stream i chunks og dekod til linjer (UTF-8, BOM fjernes)"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        progress['bytes_read'] += len(chunk)
+        # Kun '\n' deler linjer - csv-modulet håndterer '\r' og citerede linjeskift
+        lines = (pending + decoder.decode(chunk, final=not chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+
+def stage_org_csv(stream, customer_id: Optional[str], user_id, upload_id: Optional[str] = None,
+                  total_bytes: Optional[int] = None) -> dict:
+    """
+    Valider og stage en uploadet CSV i ét gennemløb.
 
-            if not org_path:
-                stats['units_skipped'] += 1
-                continue
+    Filen læses i chunks fra stream (fx request.files['file'].stream), så
+    hele filen aldrig ligger i hukommelsen. Sti-trien (unikke stier) holdes
+    i hukommelsen, kontakterne skrives til staging-filen i batches.
 
-            # Opret unit hvis den ikke findes
-            if org_path not in units_by_path:
-                # Parse unit data
-                parts = org_path.split('//')
-                leaf_name = parts[-1] if parts else org_path
-
-                # Opret unit (første person i denne path bliver leder)
-                firstname = row.get('FirstName', '').strip()
-                lastname = row.get('Lastname', '').strip()
-                leader_name = f"{firstname} {lastname}".strip() if firstname or lastname else None
-                leader_email = row.get('Email', '').strip() or None
-
-                unit_id = create_unit_from_path(
-                    path=org_path,
-                    leader_name=leader_name,
-                    leader_email=leader_email,
-                    employee_count=0,  # Beregnes fra antal kontakter
-                    sick_leave_percent=0,
-                    customer_id=customer_id
-                )
+    Args:
+        stream: Binær fil-stream
+        customer_id: Kunden enhederne oprettes under
+        user_id: Brugeren der uploader (kun den bruger kan følge og bekræfte)
+        upload_id: Id fra formularen (ellers oprettes et nyt)
+        total_bytes: Forventet størrelse til fremdriften
 
-                units_by_path[org_path] = unit_id
-                contacts_by_unit[unit_id] = []
-                stats['units_created'] += 1
+    Returns:
+        Stats som import_org_csv(dry_run=True) plus preview, hierarchy_preview,
+        unique_orgs og upload_id. valid=False hvis filen ikke kan læses.
+    """
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    _cleanup_staging()
+    if not _staging_path(upload_id):
+        upload_id = new_upload_id()
+    path = _staging_path(upload_id)
+    discard_staged_upload(upload_id)
+
+    roots: Dict[str, _PathNode] = {}
+    stats = _new_stats()
+    preview: List[Dict] = []
+    progress = {'bytes_read': 0, 'total_bytes': total_bytes, 'rows': 0, 'done': False}
+    batch: List[Tuple] = []
+
+    conn = _open_staging(path)
+    try:
+        conn.executescript(_STAGING_SCHEMA)
+        _set_meta(conn, customer_id=customer_id, user_id=user_id, progress=progress)
 
-            # Tilføj kontakt til unit
-            unit_id = units_by_path[org_path]
-            email = row.get('Email', '').strip() or None
-            phone = row.get('phone', '').strip() or None
+        def flush_contacts():
+            conn.executemany("INSERT INTO contacts (path, email, phone) VALUES (?, ?, ?)", batch)
+            batch.clear()
 
-            if email or phone:
-                contacts_by_unit[unit_id].append({
-                    'email': email,
-                    'phone': phone
-                })
-                stats['contacts_created'] += 1
+        def add_contact(contact_path, email, phone):
+            batch.append((contact_path, email, phone))
+            if len(batch) >= STAGING_BATCH:
+                flush_contacts()
 
-        except Exception as e:
-            stats['errors'].append(f"Række {row_num}: {str(e)}")
+        def rows_with_progress(reader):
+            for row in reader:
+                yield row
+                progress['rows'] += 1
+                if progress['rows'] % STAGING_BATCH == 0:
+                    _set_meta(conn, progress=progress)
 
-    # Gem kontakter og opdater employee_count
-    with get_db() as conn:
-        for unit_id, contacts in contacts_by_unit.items():
-            if contacts:
-                # Gem kontakter (send connection videre for at undgå nested connections)
-                add_contacts_bulk(unit_id, contacts, conn=conn)
+        try:
+            csv_reader = csv.DictReader(_iter_lines(stream, progress), delimiter=';')
+            missing_cols = [col for col in REQUIRED_COLUMNS if col not in (csv_reader.fieldnames or [])]
+            if missing_cols:
+                stats['valid'] = False
+                stats['errors'].append(f"Manglende kolonner: {', '.join(missing_cols)}")
+            else:
+                _read_org_rows(rows_with_progress(csv_reader), roots, stats, add_contact, preview)
+                flush_contacts()
+        except (UnicodeDecodeError, csv.Error) as e:
+            stats['valid'] = False
+            stats['errors'].append(f"CSV parse fejl: {str(e)}")
+
+        if stats['valid']:
+            conn.executemany("""
+                INSERT INTO units (path, name, parent_path, leader_name, leader_email, contacts)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(node.path, node.name, parent.path if parent else None,
+                   node.leader_name, node.leader_email, node.contact_count)
+                  for node, parent, _ in _walk_trie(roots)])
+
+            # Forskellen mod databasen beregnes nu, så preview kan vise den
+            _write_org_trie(roots, (), customer_id, True, stats)
+            stats.update({
+                'upload_id': upload_id,
+                'preview': preview,
+                'hierarchy_preview': _hierarchy_preview(roots),
+                'unique_orgs': sum(1 for node, _, _ in _walk_trie(roots) if node.row_count),
+            })
+            progress['done'] = True
+            _set_meta(conn, progress=progress, stats={
+                key: stats[key] for key in ('rows', 'units_skipped', 'errors', 'error_count', 'warnings')
+            })
+    finally:
+        conn.close()
+
+    if not stats['valid']:
+        discard_staged_upload(upload_id)
+    return stats
 
-                # Opdater employee_count
-                conn.execute(
-                    "UPDATE organizational_units SET employee_count = ? WHERE id = ?",
-                    (len(contacts), unit_id)
-                )
 
+def get_staging_progress(upload_id: str, user_id) -> Optional[dict]:
+    """Fremdrift for en upload under staging (bytes_read, total_bytes, rows, done)"""
+    meta = _read_staging_meta(upload_id, user_id)
+    return meta.get('progress') if meta else None
+
+
+def import_staged_org_csv(upload_id: str, user_id, dry_run: bool = False) -> Optional[dict]:
+    """
+    Importer en upload staged af stage_org_csv() - uden at parse CSV'en igen.
+
+    Returns:
+        Stats som import_org_csv(), eller None hvis uploaden ikke findes
+        (udløbet, allerede importeret eller en anden brugers)
+    """
+    meta = _read_staging_meta(upload_id, user_id)
+    if not meta or not meta.get('progress', {}).get('done'):
+        return None
+
+    stats = _new_stats()
+    stats.update(meta.get('stats', {}))
+
+    conn = _open_staging(_staging_path(upload_id))
+    try:
+        roots: Dict[str, _PathNode] = {}
+        nodes: Dict[str, _PathNode] = {}
+        for row in conn.execute("""
+            SELECT path, name, parent_path, leader_name, leader_email, contacts
+            FROM units ORDER BY rowid
+        """):
+            node = _PathNode(row['name'], row['path'])
+            node.leader_name, node.leader_email = row['leader_name'], row['leader_email']
+            node.contact_count = row['contacts']
+            siblings = nodes[row['parent_path']].children if row['parent_path'] else roots
+            siblings[node.name] = nodes[node.path] = node
+
+        contacts = conn.execute("SELECT path, email, phone FROM contacts ORDER BY rowid")
+        _write_org_trie(roots, contacts, meta['customer_id'], dry_run, stats)
+    finally:
+        conn.close()
+
+    # Efter en tilbagerulning kan importen prøves igen
+    if not dry_run and not stats.get('rolled_back'):
+        discard_staged_upload(upload_id)
     return stats
 
 
@@ -5,9 +5,14 @@ GDPR Phase 2: Automated cleanup of old logs
 Retention Policy:
 - email_logs: 90 days
 - audit_log: 1 year (365 days)
+
+Sletning sker i små batches med korte transaktioner, så write-locken
+frigives mellem hver batch og survey-svar ikke blokeres af et stort DELETE.
+Frigjorte sider returneres med incremental vacuum (hvis slået til).
 """
 import sqlite3
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Tuple
 
@@ -23,56 +28,223 @@ logger = get_logger(__name__)
 EMAIL_LOGS_RETENTION_DAYS = 90
 AUDIT_LOG_RETENTION_DAYS = 365
 
+# Batch-størrelse og pause (sekunder) mellem batches
+RETENTION_BATCH_SIZE = 1000
+RETENTION_BATCH_PAUSE = 0.05
+
+# Antal sider der frigives pr. incremental_vacuum kald (0 = alle)
+INCREMENTAL_VACUUM_PAGES = 0
+
+# PRAGMA auto_vacuum værdi for INCREMENTAL
+_AUTO_VACUUM_INCREMENTAL = 2
 
-def cleanup_email_logs(days: int = EMAIL_LOGS_RETENTION_DAYS) -> Dict:
+
+def _delete_in_batches(conn: sqlite3.Connection, table: str, date_column: str,
+                       cutoff_date: str, batch_size: int = None,
+                       pause: float = None) -> int:
     """
-    Delete email_logs older than N days.
+    Slet rækker ældre end cutoff i batches af batch_size.
 
-    Args:
-        days: Number of days to retain (default: 90)
+    Hver batch er sin egen transaktion, og der holdes en kort pause
+    mellem batches, så andre writers kan komme til.
 
     Returns:
-        dict with cleanup stats
+        Antal slettede rækker
+    """
+    if batch_size is None:
+        batch_size = RETENTION_BATCH_SIZE
+    if pause is None:
+        pause = RETENTION_BATCH_PAUSE
+
+    deleted = 0
+    while True:
+        result = conn.execute(f"""
+            DELETE FROM {table}
+            WHERE rowid IN (
+                SELECT rowid FROM {table}
+                WHERE {date_column} < ?
+                ORDER BY {date_column}
+                LIMIT ?
+            )
+        """, (cutoff_date, batch_size))
+        conn.commit()
+
+        batch_deleted = result.rowcount
+        deleted += batch_deleted
+
+        if batch_deleted < batch_size:
+            break
+
+        # Giv write-locken fri til survey-svar mv.
+        if pause:
+            time.sleep(pause)
+
+    return deleted
+
+
+def _estimate_row_count(conn: sqlite3.Connection, table: str) -> int:
+    """
+    Estimer antal rækker ud fra rowid-grænserne (O(log n) i stedet for COUNT(*)).
+
+    Retention sletter altid fra den ældste ende, så rowid-intervallet
+    forbliver tæt og estimatet ligger tæt på det faktiske antal.
+    """
+    row = conn.execute(
+        f"SELECT MIN(rowid) AS lo, MAX(rowid) AS hi FROM {table}"
+    ).fetchone()
+    if row[0] is None:
+        return 0
+    return row[1] - row[0] + 1
+
+
+def _estimate_rows_before(conn: sqlite3.Connection, table: str,
+                          date_column: str, cutoff_date: str) -> int:
+    """
+    Estimer antal rækker ældre end cutoff ud fra det indekserede dato-grænsepunkt.
+
+    Finder første række på/efter cutoff via indekset på date_column og
+    bruger dens rowid som grænse.
+    """
+    bounds = conn.execute(
+        f"SELECT MIN(rowid) AS lo, MAX(rowid) AS hi FROM {table}"
+    ).fetchone()
+    if bounds[0] is None:
+        return 0
+
+    boundary = conn.execute(f"""
+        SELECT rowid FROM {table}
+        WHERE {date_column} >= ?
+        ORDER BY {date_column} ASC
+        LIMIT 1
+    """, (cutoff_date,)).fetchone()
+
+    if boundary is None:
+        return bounds[1] - bounds[0] + 1
+    return max(0, boundary[0] - bounds[0])
+
+
+def _incremental_vacuum(conn: sqlite3.Connection, pages: int = None) -> int:
+    """
+    Returner frie sider til filsystemet hvis databasen kører auto_vacuum=INCREMENTAL.
+
+    Returns:
+        Antal frigjorte sider (0 hvis incremental vacuum ikke er slået til)
+    """
+    if pages is None:
+        pages = INCREMENTAL_VACUUM_PAGES
+
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != _AUTO_VACUUM_INCREMENTAL:
+        return 0
+
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # executescript kører pragmaen til ende - execute() stepper kun én side
+    if pages:
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    else:
+        conn.executescript("PRAGMA incremental_vacuum;")
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return max(0, free_before - free_after)
+
+
+def enable_incremental_vacuum() -> Dict:
+    """
+    Slå auto_vacuum=INCREMENTAL til på databasen.
+
+    Kræver en fuld VACUUM én gang (låser databasen mens den kører),
+    så den skal køres manuelt i et servicevindue - ikke fra cleanup-jobbet.
     """
     try:
         conn = get_db_connection()
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == _AUTO_VACUUM_INCREMENTAL:
+            conn.close()
+            return {'changed': False, 'auto_vacuum': 'incremental', 'success': True}
+
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        conn.close()
+
+        logger.info("Enabled incremental vacuum", extra={'extra_data': {
+            'auto_vacuum': mode
+        }})
 
-        # Count before deletion
-        count_before = conn.execute("SELECT COUNT(*) FROM email_logs").fetchone()[0]
+        return {
+            'changed': True,
+            'auto_vacuum': 'incremental' if mode == _AUTO_VACUUM_INCREMENTAL else mode,
+            'success': mode == _AUTO_VACUUM_INCREMENTAL
+        }
+
+    except Exception as e:
+        logger.error("Error enabling incremental vacuum", exc_info=True)
+        return {'changed': False, 'error': str(e), 'success': False}
 
-        # Delete old records
-        result = conn.execute("""
-            DELETE FROM email_logs
-            WHERE created_at < ?
-        """, (cutoff_date,))
 
-        deleted = result.rowcount
-        conn.commit()
+def _cleanup_table(table: str, date_column: str, days: int,
+                   batch_size: int = None, pause: float = None) -> Dict:
+    """
+    Fælles retention-logik: batch-slet, incremental vacuum og statistik.
+
+    Returns:
+        dict med deleted, remaining (estimat), rows_per_second mv.
+    """
+    conn = get_db_connection()
+    try:
+        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
 
-        # Count after deletion
-        count_after = conn.execute("SELECT COUNT(*) FROM email_logs").fetchone()[0]
+        started = time.perf_counter()
+        deleted = _delete_in_batches(conn, table, date_column, cutoff_date,
+                                     batch_size=batch_size, pause=pause)
+        duration = time.perf_counter() - started
 
+        pages_freed = _incremental_vacuum(conn) if deleted > 0 else 0
+        remaining = _estimate_row_count(conn, table)
+    finally:
         conn.close()
 
+    return {
+        'deleted': deleted,
+        'remaining': remaining,
+        'retention_days': days,
+        'cutoff_date': cutoff_date,
+        'duration_seconds': round(duration, 3),
+        'rows_per_second': round(deleted / duration, 1) if duration > 0 else 0,
+        'pages_freed': pages_freed,
+        'success': True
+    }
+
+
+def cleanup_email_logs(days: int = EMAIL_LOGS_RETENTION_DAYS,
+                       batch_size: int = None) -> Dict:
+    """
+    Delete email_logs older than N days.
+
+    Args:
+        days: Number of days to retain (default: 90)
+        batch_size: Rows per delete batch (default: RETENTION_BATCH_SIZE)
+
+    Returns:
+        dict with cleanup stats
+    """
+    try:
+        result = _cleanup_table('email_logs', 'created_at', days, batch_size=batch_size)
+        deleted = result['deleted']
+
         # Log the cleanup action
         if deleted > 0:
             from audit import log_action, AuditAction
             log_action(
                 AuditAction.DATA_DELETED,
                 entity_type="email_logs",
-                details=f"Auto-cleanup: Deleted {deleted} email logs older than {days} days",
+                details=f"Auto-cleanup: Deleted {deleted} email logs older than {days} days "
+                        f"({result['rows_per_second']} rows/s)",
                 user_id="system",
                 username="data_retention_job"
             )
 
-        return {
-            'deleted': deleted,
-            'remaining': count_after,
-            'retention_days': days,
-            'cutoff_date': cutoff_date,
-            'success': True
-        }
+        return result
 
     except Exception as e:
         logger.error("Error cleaning email_logs", exc_info=True, extra={'extra_data': {
@@ -87,36 +259,21 @@ def cleanup_email_logs(days: int = EMAIL_LOGS_RETENTION_DAYS) -> Dict:
         }
 
 
-def cleanup_audit_logs(days: int = AUDIT_LOG_RETENTION_DAYS) -> Dict:
+def cleanup_audit_logs(days: int = AUDIT_LOG_RETENTION_DAYS,
+                       batch_size: int = None) -> Dict:
     """
     Delete audit_log entries older than N days.
 
     Args:
         days: Number of days to retain (default: 365)
+        batch_size: Rows per delete batch (default: RETENTION_BATCH_SIZE)
 
     Returns:
         dict with cleanup stats
     """
     try:
-        conn = get_db_connection()
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-
-        # Count before deletion
-        count_before = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
-
-        # Delete old records
-        result = conn.execute("""
-            DELETE FROM audit_log
-            WHERE timestamp < ?
-        """, (cutoff_date,))
-
-        deleted = result.rowcount
-        conn.commit()
-
-        # Count after deletion
-        count_after = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
-
-        conn.close()
+        result = _cleanup_table('audit_log', 'timestamp', days, batch_size=batch_size)
+        deleted = result['deleted']
 
         # Log the cleanup action (if any were deleted)
         # We do this AFTER the deletion so we don't delete the log entry we just created
@@ -125,18 +282,13 @@ def cleanup_audit_logs(days: int = AUDIT_LOG_RETENTION_DAYS) -> Dict:
             log_action(
                 AuditAction.DATA_DELETED,
                 entity_type="audit_log",
-                details=f"Auto-cleanup: Deleted {deleted} audit logs older than {days} days",
+                details=f"Auto-cleanup: Deleted {deleted} audit logs older than {days} days "
+                        f"({result['rows_per_second']} rows/s)",
                 user_id="system",
                 username="data_retention_job"
             )
 
-        return {
-            'deleted': deleted,
-            'remaining': count_after,
-            'retention_days': days,
-            'cutoff_date': cutoff_date,
-            'success': True
-        }
+        return result
 
     except Exception as e:
         logger.error("Error cleaning audit_log", exc_info=True, extra={'extra_data': {
@@ -169,8 +321,10 @@ def run_all_cleanups() -> Dict:
         'total_deleted': total_deleted,
         'email_logs_deleted': email_result['deleted'],
         'email_logs_remaining': email_result['remaining'],
+        'email_logs_rows_per_second': email_result.get('rows_per_second', 0),
         'audit_logs_deleted': audit_result['deleted'],
-        'audit_logs_remaining': audit_result['remaining']
+        'audit_logs_remaining': audit_result['remaining'],
+        'audit_logs_rows_per_second': audit_result.get('rows_per_second', 0)
     }})
 
     return {
@@ -191,13 +345,10 @@ def get_cleanup_status() -> Dict:
     try:
         conn = get_db_connection()
 
-        # Email logs stats
+        # Email logs stats - estimater fra rowid/dato-indeks i stedet for COUNT(*)
         email_cutoff = (datetime.now() - timedelta(days=EMAIL_LOGS_RETENTION_DAYS)).isoformat()
-        email_eligible = conn.execute(
-            "SELECT COUNT(*) FROM email_logs WHERE created_at < ?",
-            (email_cutoff,)
-        ).fetchone()[0]
-        email_total = conn.execute("SELECT COUNT(*) FROM email_logs").fetchone()[0]
+        email_eligible = _estimate_rows_before(conn, 'email_logs', 'created_at', email_cutoff)
+        email_total = _estimate_row_count(conn, 'email_logs')
 
         # Get oldest and newest email log
         email_oldest = conn.execute(
@@ -209,11 +360,8 @@ def get_cleanup_status() -> Dict:
 
         # Audit logs stats
         audit_cutoff = (datetime.now() - timedelta(days=AUDIT_LOG_RETENTION_DAYS)).isoformat()
-        audit_eligible = conn.execute(
-            "SELECT COUNT(*) FROM audit_log WHERE timestamp < ?",
-            (audit_cutoff,)
-        ).fetchone()[0]
-        audit_total = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
+        audit_eligible = _estimate_rows_before(conn, 'audit_log', 'timestamp', audit_cutoff)
+        audit_total = _estimate_row_count(conn, 'audit_log')
 
         # Get oldest and newest audit log
         audit_oldest = conn.execute(
@@ -223,6 +371,9 @@ def get_cleanup_status() -> Dict:
             "SELECT timestamp FROM audit_log ORDER BY timestamp DESC LIMIT 1"
         ).fetchone()
 
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        freelist_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
         conn.close()
 
         return {
@@ -242,6 +393,9 @@ def get_cleanup_status() -> Dict:
                 'oldest': audit_oldest[0] if audit_oldest else None,
                 'newest': audit_newest[0] if audit_newest else None
             },
+            'counts_are_estimates': True,
+            'incremental_vacuum': auto_vacuum == _AUTO_VACUUM_INCREMENTAL,
+            'freelist_pages': freelist_pages,
             'timestamp': datetime.now().isoformat()
         }
 
@@ -298,15 +452,22 @@ def get_last_cleanup_run() -> Dict:
 
 
 if __name__ == "__main__":
+    import sys
+
     # Test/manual run
     print("=== Data Retention Cleanup ===")
     print()
 
+    if '--enable-incremental-vacuum' in sys.argv:
+        print("Enabling auto_vacuum=INCREMENTAL (runs a full VACUUM once)...")
+        print(enable_incremental_vacuum())
+        print()
+
     # Show status first
     print("Status before cleanup:")
     status = get_cleanup_status()
-    print(f"Email logs: {status['email_logs']['total']} total, {status['email_logs']['eligible_for_cleanup']} eligible for cleanup")
-    print(f"Audit logs: {status['audit_log']['total']} total, {status['audit_log']['eligible_for_cleanup']} eligible for cleanup")
+    print(f"Email logs: ~{status['email_logs']['total']} total, ~{status['email_logs']['eligible_for_cleanup']} eligible for cleanup")
+    print(f"Audit logs: ~{status['audit_log']['total']} total, ~{status['audit_log']['eligible_for_cleanup']} eligible for cleanup")
     print()
 
     # Run cleanup
@@ -314,3 +475,7 @@ if __name__ == "__main__":
     print()
     print("Cleanup complete!")
     print(f"Total deleted: {results['total_deleted']}")
+    for name in ('email_logs', 'audit_log'):
+        r = results[name]
+        print(f"  {name}: {r['deleted']} deleted, {r.get('rows_per_second', 0)} rows/s, "
+              f"{r.get('pages_freed', 0)} pages freed")
@@ -0,0 +1,285 @@
+"""
+Data-versioner og conditional GET (ETag / Last-Modified)
+
+Dashboards og kunde-API'et polles ofte, men data ændrer sig sjældent.
+Hver kunde har en versionstæller i cache_versions ('data:<customer_id>'),
+som triggers tæller op når kundens data ændres:
+
+- responses og tokens (nye svar, udsendelser, brugte tokens)
+- assessments og organizational_units (målinger og enheder)
+
+Ændringer der rammer alle kunder (customers-navne i kundevælgeren,
+spørgsmål) tæller den fælles 'data:*' op. Et opslag på tværs af kunder
+bruger summen af alle 'data:'-tællere.
+
+@conditional_get bygger et stærkt ETag af tællerne, URL'en og det der
+ellers påvirker svaret (session, sprog, deploy). Matcher If-None-Match,
+svares 304 før view'et kører - altså før analyse og rendering.
+"""
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import time
+from calendar import timegm
+from email.utils import formatdate
+from functools import wraps
+from typing import Callable, List, Optional, Tuple
+
+from flask import Response, make_response, request, session
+
+from compression import ENCODINGS, encoded_etag
+from tenant_db import CATALOG_ALIAS
+
+VERSION_PREFIX = 'data:'
+GLOBAL_VERSION = 'data:*'
+
+# HTML-sider indeholder CSRF-tokens med begrænset levetid, så deres ETag
+# skifter med dette interval (sekunder)
+HTML_ETAG_INTERVAL = 1800
+
+# Samme deploy giver samme ETag i alle workers. Uden deploy-id (lokalt)
+# bruges et id per proces - så matcher ETags kun inden for samme worker.
+BUILD_ID = (os.environ.get('APP_BUILD_ID') or os.environ.get('RENDER_GIT_COMMIT')
+            or secrets.token_hex(8))
+
+
+# ========================================
+# VERSIONSTÆLLERE OG TRIGGERS
+# ========================================
+
+def _bump_sql(name_sql: str) -> str:
+    # Første version er tilfældig, så et ETag fra en tidligere database på
+    # samme sti (fx genskabt testdatabase) ikke kan matche ved et uheld.
+    # Rækker uden kunde (fx cascade-sletning hvor enheden er væk) springes over.
+    return f"""
+        INSERT INTO cache_versions (name, version, updated_at)
+        SELECT name, abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP
+        FROM (SELECT {name_sql} as name) WHERE name IS NOT NULL
+        ON CONFLICT(name) DO UPDATE SET
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP;"""
+
+
+def _customer_name_sql(customer_sql: str) -> str:
+    return f"'{VERSION_PREFIX}' || ({customer_sql})"
+
+
+def _unit_customer(unit_ref: str) -> str:
+    return f"SELECT customer_id FROM organizational_units WHERE id = {unit_ref}"
+
+
+def _assessment_customer(assessment_ref: str) -> str:
+    return (f"SELECT ou.customer_id FROM assessments a "
+            f"JOIN organizational_units ou ON ou.id = a.target_unit_id "
+            f"WHERE a.id = {assessment_ref}")
+
+
+# Tabel -> funktion der giver kunde-versionens navn for NEW/OLD
+_CUSTOMER_TABLES = {
+    'responses': lambda ref: _customer_name_sql(_unit_customer(f'{ref}.unit_id')),
+    'tokens': lambda ref: _customer_name_sql(_assessment_customer(f'{ref}.assessment_id')),
+    'assessments': lambda ref: _customer_name_sql(_unit_customer(f'{ref}.target_unit_id')),
+    'organizational_units': lambda ref: _customer_name_sql(f'SELECT {ref}.customer_id'),
+}
+
+_GLOBAL_TABLES = ('customers', 'questions')
+
+
+def _trigger_definitions() -> dict:
+    """Trigger-navn -> CREATE TRIGGER statement"""
+    definitions = {}
+    for table, name_sql in _CUSTOMER_TABLES.items():
+        definitions[f'data_version_{table}_ai'] = (
+            f"AFTER INSERT ON {table} BEGIN {_bump_sql(name_sql('NEW'))} END")
+        definitions[f'data_version_{table}_ad'] = (
+            f"AFTER DELETE ON {table} BEGIN {_bump_sql(name_sql('OLD'))} END")
+        # En flyttet enhed/måling ændrer både den gamle og den nye kunde
+        definitions[f'data_version_{table}_au'] = (
+            f"AFTER UPDATE ON {table} BEGIN {_bump_sql(name_sql('OLD'))} "
+            f"{_bump_sql(name_sql('NEW'))} END")
+
+    global_sql = _bump_sql(f"'{GLOBAL_VERSION}'")
+    for table in _GLOBAL_TABLES:
+        for suffix, event in (('ai', 'INSERT'), ('ad', 'DELETE'), ('au', 'UPDATE')):
+            definitions[f'data_version_{table}_{suffix}'] = (
+                f"AFTER {event} ON {table} BEGIN {global_sql} END")
+    return definitions
+
+
+def init_data_versions(conn: sqlite3.Connection):
+    """
+    Opret triggers der tæller data-versionerne op (sikkert at køre flere gange).
+
+    Kræver organizational_units.customer_id. Kunder uden tæller får en.
+    """
+    from cache import _ensure_cache_versions_table
+    _ensure_cache_versions_table(conn)
+
+    for trigger_name, definition in _trigger_definitions().items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+
+    conn.execute(f"""
+        INSERT OR IGNORE INTO cache_versions (name, version, updated_at)
+        SELECT DISTINCT '{VERSION_PREFIX}' || customer_id,
+               abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP
+        FROM organizational_units WHERE customer_id IS NOT NULL
+    """)
+    conn.execute(f"""
+        INSERT OR IGNORE INTO cache_versions (name, version, updated_at)
+        VALUES ('{GLOBAL_VERSION}', abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP)
+    """)
+
+
+def get_data_version(customer_id: Optional[str],
+                     conn: Optional[sqlite3.Connection] = None) -> Tuple[int, Optional[str]]:
+    """
+    Data-version for en kunde (inkl. fælles ændringer og oversættelser).
+
+    customer_id=None giver versionen på tværs af alle kunder.
+
+    Returns:
+        (version, updated_at) - version 0 hvis der ingen tællere er
+    """
+    # Oversatte tekster påvirker alle svar (import her - translations importerer db_multitenant)
+    from translations import TRANSLATION_CACHE_NAME
+
+    def _read(c):
+        try:
+            if customer_id and getattr(c, 'tenant_id', None):
+                # Kundens egen database (tenant_db): fælles ændringer og
+                # oversættelser tælles i kataloget
+                row = c.execute(f"""
+                    SELECT SUM(version), MAX(updated_at) FROM (
+                        SELECT version, updated_at FROM main.cache_versions WHERE name IN (?, ?, ?)
+                        UNION ALL
+                        SELECT version, updated_at FROM {CATALOG_ALIAS}.cache_versions WHERE name IN (?, ?, ?)
+                    )
+                """, (VERSION_PREFIX + customer_id, GLOBAL_VERSION, TRANSLATION_CACHE_NAME) * 2).fetchone()
+            elif customer_id:
+                row = c.execute("""
+                    SELECT SUM(version), MAX(updated_at) FROM cache_versions
+                    WHERE name IN (?, ?, ?)
+                """, (VERSION_PREFIX + customer_id, GLOBAL_VERSION,
+                      TRANSLATION_CACHE_NAME)).fetchone()
+            else:
+                # Intervallet bruger primærnøglen (LIKE gør ikke uden NOCASE)
+                row = c.execute("""
+                    SELECT SUM(version), MAX(updated_at) FROM cache_versions
+                    WHERE (name >= ? AND name < ?) OR name = ?
+                """, (VERSION_PREFIX, VERSION_PREFIX[:-1] + ';', TRANSLATION_CACHE_NAME)).fetchone()
+        except sqlite3.OperationalError:
+            return 0, None  # Tabellen findes ikke endnu
+        return row[0] or 0, row[1]
+
+    if conn is not None:
+        return _read(conn)
+    from db import get_db
+    with get_db(customer_id) as c:
+        return _read(c)
+
+
+def request_data_version(customer_id: Optional[str]) -> Tuple[int, Optional[str]]:
+    """get_data_version() husket for resten af requesten (ETag og side-cache deler opslaget)"""
+    # I environ frem for g - app-konteksten (og g) kan overleve flere requests
+    versions = request.environ.setdefault('friktion.data_versions', {})
+    if customer_id not in versions:
+        versions[customer_id] = get_data_version(customer_id)
+    return versions[customer_id]
+
+
+# ========================================
+# CONDITIONAL GET
+# ========================================
+
+def _epoch(timestamp: Optional[str]) -> Optional[int]:
+    """SQLite CURRENT_TIMESTAMP (UTC) -> sekunder siden epoch"""
+    try:
+        return timegm(time.strptime(timestamp[:19], '%Y-%m-%d %H:%M:%S'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _session_fingerprint() -> str:
+    """Alt i sessionen der kan påvirke et renderet svar (bruger, rolle, filter, sprog, CSRF)"""
+    state = {key: value for key, value in session.items() if key != '_flashes'}
+    return json.dumps(state, sort_keys=True, default=str)
+
+
+def make_etag(parts: List) -> str:
+    """Stærkt ETag (uden anførselstegn) af de givne dele"""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+    return digest[:24]
+
+
+def _etag_variants(etag: str) -> List[str]:
+    """ETag'et og dets komprimerede varianter"""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ENCODINGS]
+
+
+def conditional_get(scope: Callable[..., Optional[str]], html: bool = True,
+                    check_modified_since: bool = False):
+    """
+    Decorator: svar 304 Not Modified hvis klientens ETag stadig er gyldigt.
+
+    Args:
+        scope: Kaldes med view'ets argumenter og returnerer customer_id
+               for de data svaret bygger på (None = alle kunder)
+        html: Renderet side - ETag afhænger også af sessionen og skifter
+              med HTML_ETAG_INTERVAL (CSRF-tokens i siden udløber)
+        check_modified_since: Svar også 304 på If-Modified-Since. Kun til
+              svar der ikke afhænger af sessionen (fx kunde-API'et), da
+              browserens cache ikke skelner mellem brugere.
+
+    Brug den under login-/API-decoratoren, så scope kender brugeren.
+    Kun 200-svar får ETag; redirects og fejl sendes uændret.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Ventende flash-beskeder skal vises - lad view'et rendere dem
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            version, updated_at = request_data_version(scope(*args, **kwargs))
+            if not version:
+                return view(*args, **kwargs)
+
+            def current_etag():
+                parts = [BUILD_ID, request.endpoint, request.full_path, version]
+                if html:
+                    parts += [_session_fingerprint(), int(time.time() // HTML_ETAG_INTERVAL)]
+                return make_etag(parts)
+
+            modified = _epoch(updated_at)
+            etag = current_etag()
+
+            # Komprimerede svar har encodingen som ETag-suffix (compression.py)
+            matched = next((candidate for candidate in _etag_variants(etag)
+                            if request.if_none_match.contains_weak(candidate)), None)
+            not_modified = matched is not None
+            # If-Modified-Since bruges kun når klienten ikke sender If-None-Match
+            if (check_modified_since and not request.if_none_match and modified is not None
+                    and request.if_modified_since is not None):
+                not_modified = request.if_modified_since.timestamp() >= modified
+
+            if not_modified:
+                response = Response(status=304)
+                etag = matched or etag
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Renderingen kan have ændret sessionen (fx nyt CSRF-token) -
+                # ETag'et skal matche den session klienten kommer tilbage med
+                etag = current_etag()
+
+            response.set_etag(etag)
+            if modified is not None:
+                response.headers['Last-Modified'] = formatdate(modified, usegmt=True)
+            # Må gemmes af browseren, men skal altid revalideres
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
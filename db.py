@@ -5,6 +5,10 @@ Provides canonical get_db() function and database path resolution
 import sqlite3
 import os
 from contextlib import contextmanager
+from urllib.request import pathname2url
+
+import tenant_db
+from perf import InstrumentedConnection
 
 
 def _get_db_path():
@@ -32,32 +36,31 @@ def _get_db_path():
 # Global DB_PATH constant - can be imported by other modules
 DB_PATH = _get_db_path()
 
+# Sekunder en forbindelse venter på en skrivelås før "database is locked"
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', '30'))
 
-@contextmanager
-def get_db():
-    """
-    Context manager for database connection.
 
-    Features:
-    - Enables foreign keys (for CASCADE DELETE)
-    - Sets WAL mode (for better concurrent access)
-    - Provides Row factory (for dict-like access)
-    - Auto-commits on success, auto-closes connection
-    - Respects DB_PATH environment variable at runtime (for tests)
-
-    Usage:
-        with get_db() as conn:
-            cursor = conn.execute("SELECT * FROM users")
-            rows = cursor.fetchall()
+def _connect(customer_id=None):
+    """
+    Open a connection with the shared pragmas.
 
-    Yields:
-        sqlite3.Connection: Database connection with Row factory
+    With tenant sharding (tenant_db.py) a customer whose data has been moved
+    gets their own database file, with the shared database attached as
+    'catalog' so shared tables (customers, users, ...) still resolve.
     """
     # Check environment at runtime for test support
     db_path = os.environ.get('DB_PATH', DB_PATH)
+    shard = tenant_db.route(db_path, customer_id)
 
-    conn = sqlite3.connect(db_path, timeout=30.0)
+    # mode=rw: en slettet kundes fil (registeret er op til REGISTRY_TTL gammelt
+    # i andre workers) må ikke genopstå som en tom database
+    target = f"file:{pathname2url(os.path.abspath(shard.path))}?mode=rw" if shard else db_path
+    conn = sqlite3.connect(target, timeout=DB_BUSY_TIMEOUT, uri=bool(shard),
+                           factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row
+    conn.tenant_id = shard.customer_id if shard else None
+    if shard:
+        conn.execute(f"ATTACH DATABASE ? AS {tenant_db.CATALOG_ALIAS}", (db_path,))
 
     # CRITICAL: Enable foreign keys for CASCADE DELETE to work
     # SQLite has foreign keys DISABLED by default!
@@ -72,6 +75,33 @@ def get_db():
     else:
         conn.execute("PRAGMA journal_mode=WAL")
 
+    return conn
+
+
+@contextmanager
+def get_db(customer_id=None):
+    """
+    Context manager for database connection.
+
+    Features:
+    - Enables foreign keys (for CASCADE DELETE)
+    - Sets WAL mode (for better concurrent access)
+    - Provides Row factory (for dict-like access)
+    - Reports statements and SQLite time to the active request (perf.py)
+    - Auto-commits on success, auto-closes connection
+    - Respects DB_PATH environment variable at runtime (for tests)
+    - Routes to the customer's own database when sharding is enabled
+      (customer_id, or the current request's customer - see tenant_db.py)
+
+    Usage:
+        with get_db() as conn:
+            cursor = conn.execute("SELECT * FROM users")
+            rows = cursor.fetchall()
+
+    Yields:
+        sqlite3.Connection: Database connection with Row factory
+    """
+    conn = _connect(customer_id)
     try:
         yield conn
         conn.commit()
@@ -79,7 +109,7 @@ def get_db():
         conn.close()
 
 
-def get_db_connection():
+def get_db_connection(customer_id=None):
     """
     Get a database connection (non-context-manager version).
 
@@ -91,16 +121,4 @@ def get_db_connection():
     Returns:
         sqlite3.Connection: Database connection with Row factory
     """
-    db_path = os.environ.get('DB_PATH', DB_PATH)
-
-    conn = sqlite3.connect(db_path, timeout=30.0)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys=ON")
-    # Enable WAL mode for better concurrent access (but not during tests)
-    if os.environ.get('TESTING'):
-        conn.execute("PRAGMA journal_mode=DELETE")
-        conn.execute("PRAGMA read_uncommitted=0")
-    else:
-        conn.execute("PRAGMA journal_mode=WAL")
-
-    return conn
+    return _connect(customer_id)
@@ -11,6 +11,13 @@ from datetime import datetime
 
 # Import centralized database functions
 from db import get_db, DB_PATH
+from comment_search import init_comment_search
+from respondents import init_respondent_ids
+from adjusted_scores import init_adjusted_scores
+from responses_layout import init_responses_layout
+from assessment_scores import init_assessment_scores
+from org_tree import get_tree_for_unit
+from cache import ensure_created_at
 
 
 def migrate_campaign_to_assessment():
@@ -244,6 +251,13 @@ def init_db():
             )
         """)
 
+        # Keyset-paginering af målingsoversigten (nyeste først)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_assessments_created
+            ON assessments(created_at, id)
+        """)
+        ensure_created_at(conn, 'assessments')
+
         # Tilføj kolonner hvis de mangler (migration)
         try:
             conn.execute("ALTER TABLE assessments ADD COLUMN min_responses INTEGER DEFAULT 5")
@@ -345,12 +359,6 @@ def init_db():
             )
         """)
         
-        # Index for aggregering
-        conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_responses_assessment_unit
-            ON responses(assessment_id, unit_id)
-        """)
-
         # Composite index for N+1 query optimization (audit 2025-12-20)
         conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_responses_unit_assess_type
@@ -363,6 +371,21 @@ def init_db():
             ON responses(respondent_type)
         """)
 
+        # Respondent-id per besvarelse (sat ved submit, heuristik for gamle svar)
+        init_respondent_ids(conn)
+
+        # Justeret score, felt og lag på svaret (sparer join til questions)
+        init_adjusted_scores(conn)
+
+        # Aggregerings-indexes for den aktive layout (standard eller dækkende)
+        init_responses_layout(conn)
+
+        # Fritekst-kommentarer opdelt i situation/generelt + FTS5-indeks
+        init_comment_search(conn)
+
+        # Forudberegnede scores per måling/enhed/respondenttype/felt
+        init_assessment_scores(conn)
+
         # Email logs for delivery tracking
         conn.execute("""
             CREATE TABLE IF NOT EXISTS email_logs (
@@ -384,6 +407,20 @@ def init_db():
             )
         """)
 
+        # Index for retention cleanup (batch-sletning og dato-grænser)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_logs_created_at
+            ON email_logs(created_at)
+        """)
+        # Keyset-paginering af logs for én måling (nyeste først).
+        # Erstatter idx_email_logs_assessment_created uden id-kolonnen.
+        conn.execute("DROP INDEX IF EXISTS idx_email_logs_assessment_created")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_logs_assessment_page
+            ON email_logs(assessment_id, created_at, id)
+        """)
+        ensure_created_at(conn, 'email_logs')
+
         # Email templates per customer
         conn.execute("""
             CREATE TABLE IF NOT EXISTS email_templates (
@@ -677,51 +714,28 @@ def get_unit_children(unit_id: str, recursive: bool = False) -> List[Dict]:
 def get_leaf_units(parent_unit_id: Optional[str] = None) -> List[Dict]:
     """
     Hent alle leaf units (units uden children)
-    Hvis parent_unit_id angives, kun under den
+    Hvis parent_unit_id angives, kun under den (fra kundens OrgTree)
     """
+    if parent_unit_id:
+        tree = get_tree_for_unit(parent_unit_id)
+        return tree.leaves(parent_unit_id) if tree else []
+
     with get_db() as conn:
-        if parent_unit_id:
-            # Leaf units under specifik parent
-            rows = conn.execute("""
-                WITH RECURSIVE subtree AS (
-                    SELECT * FROM organizational_units WHERE id = ?
-                    UNION ALL
-                    SELECT ou.* FROM organizational_units ou
-                    JOIN subtree st ON ou.parent_id = st.id
-                )
-                SELECT st.* FROM subtree st
-                LEFT JOIN organizational_units children ON st.id = children.parent_id
-                WHERE children.id IS NULL
-                ORDER BY st.full_path
-            """, (parent_unit_id,)).fetchall()
-        else:
-            # Alle leaf units
-            rows = conn.execute("""
-                SELECT ou.* FROM organizational_units ou
-                LEFT JOIN organizational_units children ON ou.id = children.parent_id
-                WHERE children.id IS NULL
-                ORDER BY ou.full_path
-            """).fetchall()
-        
+        # Alle leaf units på tværs af kunder
+        rows = conn.execute("""
+            SELECT ou.* FROM organizational_units ou
+            LEFT JOIN organizational_units children ON ou.id = children.parent_id
+            WHERE children.id IS NULL
+            ORDER BY ou.full_path
+        """).fetchall()
+
         return [dict(row) for row in rows]
 
 
 def get_unit_path(unit_id: str) -> List[Dict]:
     """Hent path fra root til unit (breadcrumbs)"""
-    with get_db() as conn:
-        # Recursive CTE backwards til root
-        rows = conn.execute("""
-            WITH RECURSIVE ancestors AS (
-                SELECT * FROM organizational_units WHERE id = ?
-                UNION ALL
-                SELECT ou.* FROM organizational_units ou
-                JOIN ancestors a ON ou.id = a.parent_id
-            )
-            SELECT * FROM ancestors
-            ORDER BY level
-        """, (unit_id,)).fetchall()
-        
-        return [dict(row) for row in rows]
+    tree = get_tree_for_unit(unit_id)
+    return tree.path(unit_id) if tree else []
 
 
 # ========================================
@@ -915,34 +929,26 @@ def get_unit_stats(unit_id: str, assessment_id: str, include_children: bool = Tr
                     JOIN subtree st ON ou.parent_id = st.id
                 )
                 SELECT
-                    q.field,
-                    AVG(CASE
-                        WHEN q.reverse_scored = 1 THEN 8 - r.score
-                        ELSE r.score
-                    END) as avg_score,
-                    COUNT(r.id) as response_count
-                FROM questions q
-                LEFT JOIN responses r ON q.id = r.question_id
-                    AND r.unit_id IN (SELECT id FROM subtree)
-                    AND r.assessment_id = ?
-                WHERE q.is_default = 1
-                GROUP BY q.field
+                    r.field,
+                    AVG(r.adjusted_score) as avg_score,
+                    COUNT(r.adjusted_score) as response_count
+                FROM responses r
+                WHERE r.unit_id IN (SELECT id FROM subtree)
+                  AND r.assessment_id = ?
+                  AND r.question_id IN (SELECT id FROM questions WHERE is_default = 1)
+                GROUP BY r.field
             """, (unit_id, assessment_id)).fetchall()
         else:
             # Kun denne unit
             rows = conn.execute("""
                 SELECT
-                    q.field,
-                    AVG(CASE
-                        WHEN q.reverse_scored = 1 THEN 8 - r.score
-                        ELSE r.score
-                    END) as avg_score,
-                    COUNT(r.id) as response_count
-                FROM questions q
-                LEFT JOIN responses r ON q.id = r.question_id
-                    AND r.unit_id = ? AND r.assessment_id = ?
-                WHERE q.is_default = 1
-                GROUP BY q.field
+                    r.field,
+                    AVG(r.adjusted_score) as avg_score,
+                    COUNT(r.adjusted_score) as response_count
+                FROM responses r
+                WHERE r.unit_id = ? AND r.assessment_id = ?
+                  AND r.question_id IN (SELECT id FROM questions WHERE is_default = 1)
+                GROUP BY r.field
             """, (unit_id, assessment_id)).fetchall()
         
         # Returner i fast rækkefølge
@@ -1004,18 +1010,13 @@ def get_assessment_overview(assessment_id: str) -> List[Dict]:
                 GROUP BY unit_id
             ),
             besvær_scores AS (
-                -- Calculate besvær score per unit
+                -- Besvær score per unit (fra assessment_scores)
                 SELECT
-                    r.unit_id,
-                    ROUND(AVG(CASE
-                        WHEN q.field = 'BESVÆR' AND q.reverse_scored = 0 THEN r.score
-                        WHEN q.field = 'BESVÆR' AND q.reverse_scored = 1 THEN 8 - r.score
-                        ELSE NULL
-                    END), 1) as besvær_score
-                FROM responses r
-                JOIN questions q ON r.question_id = q.id
-                WHERE r.assessment_id = ? AND q.field = 'BESVÆR'
-                GROUP BY r.unit_id
+                    unit_id,
+                    ROUND(SUM(score_sum) / SUM(answer_count), 1) as besvær_score
+                FROM assessment_scores
+                WHERE assessment_id = ? AND field = 'BESVÆR'
+                GROUP BY unit_id
             )
             -- Join all CTEs together
             SELECT
@@ -1092,22 +1093,7 @@ def get_all_leaf_units_under(parent_unit_id: str) -> List[Dict]:
     Returns:
         Liste af dicts med unit info inkl. employee_count
     """
-    with get_db() as conn:
-        # Recursive CTE til at finde alle descendants
-        rows = conn.execute("""
-            WITH RECURSIVE subtree AS (
-                SELECT * FROM organizational_units WHERE id = ?
-                UNION ALL
-                SELECT ou.* FROM organizational_units ou
-                JOIN subtree st ON ou.parent_id = st.id
-            )
-            SELECT st.* FROM subtree st
-            LEFT JOIN organizational_units children ON st.id = children.parent_id
-            WHERE children.id IS NULL
-            ORDER BY st.full_path
-        """, (parent_unit_id,)).fetchall()
-
-        return [dict(row) for row in rows]
+    return get_leaf_units(parent_unit_id)
 
 
 # ========================================
@@ -5,13 +5,22 @@ Tilføjer customer isolation og user authentication
 import sqlite3
 import secrets
 import os
+import time
+import atexit
+import hmac
+import hashlib
+import threading
 import bcrypt
 from contextlib import contextmanager
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 
 # Import centralized database functions
 from db import get_db, DB_PATH
+from stats_counters import init_stats_counters, get_counters
+from cache import DEFAULT_PAGE_SIZE, KeysetOrder, KeysetPagination, SortKey, keyset_paginate
+from org_tree import init_org_tree
+from data_version import init_data_versions
 
 
 def init_multitenant_db():
@@ -28,6 +37,12 @@ def init_multitenant_db():
             )
         """)
 
+        # Keyset-paginering af kundelisten (sorteret på navn)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_customers_name
+            ON customers(name, id)
+        """)
+
         # Users tabel med authentication
         # Roles: superadmin (global), admin (kunde-admin), manager (enheds-leder), user (B2C bruger)
         conn.execute("""
@@ -70,6 +85,15 @@ def init_multitenant_db():
             ON translations(key, language)
         """)
 
+        # Delte versionstællere til in-memory caches (invalidering på tværs af workers)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
         # Customer API Keys tabel for REST API access
         conn.execute("""
             CREATE TABLE IF NOT EXISTS customer_api_keys (
@@ -437,6 +461,15 @@ def init_multitenant_db():
             ON domain_assessment_types(domain_id)
         """)
 
+        # Tællere til statussider (efter migrationer der genskaber tabeller)
+        init_stats_counters(conn)
+
+        # Versionstæller for OrgTree (efter migrationer der genskaber tabeller)
+        init_org_tree(conn)
+
+        # Data-versioner til ETags på dashboards og kunde-API
+        init_data_versions(conn)
+
 
 def hash_password(password: str) -> str:
     """Hash password med bcrypt (sikker og langsom)"""
@@ -497,10 +530,120 @@ def generate_customer_api_key(customer_id: str, name: str = None, permissions: d
     return (full_key, key_id)
 
 
+# Cache over verificerede API keys, så bcrypt kun køres én gang per key per
+# TTL. Nøglen er en HMAC af den præsenterede key med en hemmelighed der kun
+# findes i processens hukommelse - klartekst-keys gemmes aldrig.
+API_KEY_CACHE_NAME = 'api_keys'
+API_KEY_CACHE_TTL = 60  # Sekunder en verificeret key genbruges
+API_KEY_LAST_USED_FLUSH_INTERVAL = 60  # Sekunder mellem batch-skrivning af last_used_at
+
+_api_key_cache_secret = secrets.token_bytes(32)
+_api_key_cache: Dict[str, Dict] = {}
+_api_key_cache_lock = threading.Lock()
+_pending_last_used: Dict[int, str] = {}
+_last_used_flushed_at = time.time()
+
+
+def _api_key_cache_key(api_key: str) -> str:
+    """Keyed hash af den præsenterede API key"""
+    return hmac.new(_api_key_cache_secret, api_key.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _get_cached_api_key(cache_key: str, conn) -> Optional[Dict]:
+    """Returner cachet verifikation hvis den er gyldig og versionen uændret"""
+    from cache import get_cache_version
+
+    with _api_key_cache_lock:
+        entry = _api_key_cache.get(cache_key)
+    if entry is None:
+        return None
+
+    # Versionstælleren er et PK-opslag - langt billigere end bcrypt - og
+    # sikrer at revoke i en anden worker slår igennem med det samme
+    if (time.time() >= entry['expires']
+            or entry['db_path'] != os.environ.get('DB_PATH', DB_PATH)
+            or get_cache_version(API_KEY_CACHE_NAME, conn, catalog=True) != entry['version']):
+        with _api_key_cache_lock:
+            _api_key_cache.pop(cache_key, None)
+        return None
+
+    return entry['result']
+
+
+def _evict_api_key(key_id: int = None):
+    """Fjern cachede verifikationer for en key (eller alle) i denne proces"""
+    with _api_key_cache_lock:
+        if key_id is None:
+            _api_key_cache.clear()
+            return
+        for cache_key in [k for k, e in _api_key_cache.items() if e['result']['key_id'] == key_id]:
+            del _api_key_cache[cache_key]
+
+
+def invalidate_api_key_cache(key_id: int = None):
+    """Invalider API key cachen i alle workers (kald efter revoke/sletning)"""
+    from cache import bump_cache_version
+
+    try:
+        bump_cache_version(API_KEY_CACHE_NAME, catalog=True)
+    finally:
+        _evict_api_key(key_id)
+
+
+def _record_api_key_usage(key_id: int):
+    """Notér brug af en key - skrives samlet af flush_api_key_usage()"""
+    now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    with _api_key_cache_lock:
+        _pending_last_used[key_id] = now
+
+
+def flush_api_key_usage(force: bool = True) -> int:
+    """
+    Skriv opsamlede last_used_at værdier i én batch.
+
+    Args:
+        force: Skriv med det samme, også hvis intervallet ikke er gået
+
+    Returns:
+        Antal keys der blev opdateret
+    """
+    global _last_used_flushed_at
+
+    with _api_key_cache_lock:
+        if not _pending_last_used:
+            return 0
+        if not force and time.time() - _last_used_flushed_at < API_KEY_LAST_USED_FLUSH_INTERVAL:
+            return 0
+        pending = list(_pending_last_used.items())
+        _pending_last_used.clear()
+        _last_used_flushed_at = time.time()
+
+    with get_db() as conn:
+        conn.executemany("""
+            UPDATE customer_api_keys
+            SET last_used_at = ?
+            WHERE id = ?
+        """, [(used_at, key_id) for key_id, used_at in pending])
+
+    return len(pending)
+
+
+@atexit.register
+def _flush_api_key_usage_at_exit():
+    """Mist ikke opsamlede last_used_at når processen stopper"""
+    try:
+        flush_api_key_usage()
+    except Exception:
+        pass
+
+
 def validate_customer_api_key(api_key: str) -> Optional[Dict]:
     """
     Validér API key og returner customer info.
 
+    Succesfulde verifikationer caches i API_KEY_CACHE_TTL sekunder, og
+    last_used_at skrives i batches i stedet for ved hvert kald.
+
     Args:
         api_key: Den fulde API key fra request header
 
@@ -518,8 +661,18 @@ def validate_customer_api_key(api_key: str) -> Optional[Dict]:
         return None
 
     key_prefix = f"{parts[0]}_{parts[1]}_{parts[2]}"
+    cache_key = _api_key_cache_key(api_key)
 
     with get_db() as conn:
+        cached = _get_cached_api_key(cache_key, conn)
+        if cached is not None:
+            _record_api_key_usage(cached['key_id'])
+            flush_api_key_usage(force=False)
+            return dict(cached, permissions=dict(cached['permissions']))
+
+        from cache import get_cache_version
+        version = get_cache_version(API_KEY_CACHE_NAME, conn, catalog=True)
+
         # Find key by prefix
         row = conn.execute("""
             SELECT cak.*, c.name as customer_name
@@ -535,20 +688,13 @@ def validate_customer_api_key(api_key: str) -> Optional[Dict]:
         if not verify_password(api_key, row['key_hash']):
             return None
 
-        # Update last_used_at
-        conn.execute("""
-            UPDATE customer_api_keys
-            SET last_used_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (row['id'],))
-
         # Parse permissions
         try:
             permissions = json.loads(row['permissions']) if row['permissions'] else {"read": True, "write": False}
         except json.JSONDecodeError:
             permissions = {"read": True, "write": False}
 
-        return {
+        result = {
             'key_id': row['id'],
             'customer_id': row['customer_id'],
             'customer_name': row['customer_name'],
@@ -557,6 +703,20 @@ def validate_customer_api_key(api_key: str) -> Optional[Dict]:
             'rate_limit': row['rate_limit']
         }
 
+    with _api_key_cache_lock:
+        _api_key_cache[cache_key] = {
+            'result': result,
+            'version': version,
+            'db_path': os.environ.get('DB_PATH', DB_PATH),
+            'expires': time.time() + API_KEY_CACHE_TTL
+        }
+
+    # Update last_used_at (batched)
+    _record_api_key_usage(result['key_id'])
+    flush_api_key_usage(force=False)
+
+    return dict(result, permissions=dict(permissions))
+
 
 def revoke_customer_api_key(key_id: int) -> bool:
     """Deaktivér en API key"""
@@ -566,7 +726,10 @@ def revoke_customer_api_key(key_id: int) -> bool:
             SET is_active = 0
             WHERE id = ?
         """, (key_id,))
-        return result.rowcount > 0
+        revoked = result.rowcount > 0
+
+    invalidate_api_key_cache(key_id)
+    return revoked
 
 
 def list_customer_api_keys(customer_id: str) -> list:
@@ -613,7 +776,12 @@ def delete_customer_api_key(key_id: int) -> bool:
         result = conn.execute("""
             DELETE FROM customer_api_keys WHERE id = ?
         """, (key_id,))
-        return result.rowcount > 0
+        deleted = result.rowcount > 0
+
+    with _api_key_cache_lock:
+        _pending_last_used.pop(key_id, None)
+    invalidate_api_key_cache(key_id)
+    return deleted
 
 
 # ========================================
@@ -660,6 +828,11 @@ def update_customer(customer_id: str, **kwargs) -> bool:
             UPDATE customers SET {set_clause} WHERE id = ?
         """, values)
 
+    # Domain config og cachede API keys indeholder customer_name
+    if 'name' in updates:
+        invalidate_domain_cache()
+    if 'name' in updates or 'is_active' in updates:
+        invalidate_api_key_cache()
     return True
 
 
@@ -710,6 +883,44 @@ def list_customers() -> list:
         return [dict(row) for row in rows]
 
 
+# Kundelisten: sorteret på navn, id som tiebreaker (dækket af idx_customers_name)
+CUSTOMERS_ORDER = KeysetOrder(SortKey('c.name', 'name'), SortKey('c.id', 'id'))
+
+
+def list_customers_page(cursor: Optional[str] = None,
+                        per_page: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], KeysetPagination]:
+    """
+    Én side af kunderne (keyset-pagineret, kun for admin).
+
+    unit_count tælles kun for kunderne på siden, og total kommer fra
+    stats_counters i stedet for COUNT(*).
+    """
+    with get_db() as conn:
+        def fetch(condition, keyset_params, order_by, limit):
+            rows = conn.execute(f"""
+                SELECT c.*,
+                       (SELECT COUNT(*) FROM organizational_units ou
+                        WHERE ou.customer_id = c.id) as unit_count
+                FROM customers c
+                WHERE {condition}
+                ORDER BY {order_by}
+                LIMIT ?
+            """, keyset_params + [limit]).fetchall()
+            return [dict(row) for row in rows]
+
+        def count():
+            return get_counters(conn)['customers']
+
+        return keyset_paginate(fetch, CUSTOMERS_ORDER, cursor, per_page, count_func=count)
+
+
+def list_customer_names() -> List[Dict]:
+    """Id og navn på alle kunder (til dropdowns)"""
+    with get_db() as conn:
+        rows = conn.execute("SELECT id, name FROM customers ORDER BY name").fetchall()
+        return [dict(row) for row in rows]
+
+
 # ========================================
 # DOMAIN FUNCTIONS
 # ========================================
@@ -734,22 +945,81 @@ def create_domain(domain: str, customer_id: Optional[str] = None,
             branding.get('company_name') if branding else None
         ))
 
+    invalidate_domain_cache()
     return domain_id
 
 
-def get_domain_config(domain: str) -> Optional[Dict]:
-    """Hent domain konfiguration baseret på hostname"""
+# In-process domain -> config map. Hele domains-tabellen er lille, så den
+# indlæses samlet; ukendte hosts giver None uden et DB-opslag (negativ cache).
+DOMAIN_CACHE_NAME = 'domains'
+DOMAIN_CACHE_TTL = 300  # Genindlæs senest efter 5 minutter
+DOMAIN_VERSION_CHECK_INTERVAL = 5  # Tjek delt versionstæller hvert 5. sekund
+
+_domain_cache: Optional[Dict[str, Dict]] = None
+_domain_cache_version = None
+_domain_cache_db_path = None
+_domain_cache_loaded_at = 0.0
+_domain_cache_checked_at = 0.0
+
+
+def _load_domain_cache() -> Dict[str, Dict]:
+    """Indlæs alle aktive domains i ét query"""
+    global _domain_cache, _domain_cache_version, _domain_cache_db_path
+    global _domain_cache_loaded_at, _domain_cache_checked_at
+    from cache import get_cache_version
+
     with get_db() as conn:
-        row = conn.execute("""
+        version = get_cache_version(DOMAIN_CACHE_NAME, conn, catalog=True)
+        rows = conn.execute("""
             SELECT d.*, c.name as customer_name
             FROM domains d
             LEFT JOIN customers c ON d.customer_id = c.id
-            WHERE d.domain = ? AND d.is_active = 1
-        """, (domain.lower(),)).fetchone()
+            WHERE d.is_active = 1
+        """).fetchall()
 
-        if row:
-            return dict(row)
-        return None
+    now = time.time()
+    _domain_cache = {row['domain']: dict(row) for row in rows}
+    _domain_cache_version = version
+    _domain_cache_db_path = os.environ.get('DB_PATH', DB_PATH)
+    _domain_cache_loaded_at = now
+    _domain_cache_checked_at = now
+    return _domain_cache
+
+
+def _get_domain_cache() -> Dict[str, Dict]:
+    """Returner domain-mappet - genindlæs ved udløbet TTL eller ny version"""
+    global _domain_cache_checked_at
+    from cache import get_cache_version
+
+    now = time.time()
+    if (_domain_cache is None
+            or _domain_cache_db_path != os.environ.get('DB_PATH', DB_PATH)
+            or now - _domain_cache_loaded_at >= DOMAIN_CACHE_TTL):
+        return _load_domain_cache()
+
+    if now - _domain_cache_checked_at >= DOMAIN_VERSION_CHECK_INTERVAL:
+        _domain_cache_checked_at = now
+        if get_cache_version(DOMAIN_CACHE_NAME, catalog=True) != _domain_cache_version:
+            return _load_domain_cache()
+
+    return _domain_cache
+
+
+def invalidate_domain_cache():
+    """Invalider domain-cachen i alle workers (kald efter ændringer i domains)"""
+    global _domain_cache
+    from cache import bump_cache_version
+
+    try:
+        bump_cache_version(DOMAIN_CACHE_NAME, catalog=True)
+    finally:
+        _domain_cache = None
+
+
+def get_domain_config(domain: str) -> Optional[Dict]:
+    """Hent domain konfiguration baseret på hostname (fra in-process cache)"""
+    config = _get_domain_cache().get(domain.lower())
+    return dict(config) if config else None
 
 
 def list_domains() -> list:
@@ -783,6 +1053,7 @@ def update_domain(domain_id: str, **kwargs) -> bool:
             UPDATE domains SET {set_clause} WHERE id = ?
         """, values)
 
+    invalidate_domain_cache()
     return True
 
 
@@ -790,6 +1061,7 @@ def delete_domain(domain_id: str) -> bool:
     """Slet domain"""
     with get_db() as conn:
         conn.execute("DELETE FROM domains WHERE id = ?", (domain_id,))
+    invalidate_domain_cache()
     return True
 
 
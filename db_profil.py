@@ -6,11 +6,13 @@ import sqlite3
 import secrets
 import os
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 # Import centralized database functions
 from db import get_db, DB_PATH
+from cache import (DEFAULT_PAGE_SIZE, KeysetOrder, KeysetPagination, SortKey, capped_count,
+                   ensure_created_at, keyset_paginate)
 
 
 # ========================================
@@ -206,6 +208,17 @@ def init_profil_tables():
             CREATE INDEX IF NOT EXISTS idx_pair_sessions_code
             ON pair_sessions(pair_code)
         """)
+        # Keyset-paginering af admin-lister (nyeste først)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_profil_sessions_created
+            ON profil_sessions(created_at, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_pair_sessions_created
+            ON pair_sessions(created_at, id)
+        """)
+        ensure_created_at(conn, 'profil_sessions')
+        ensure_created_at(conn, 'pair_sessions')
 
         # Indsæt default spørgsmål hvis tom
         count = conn.execute("SELECT COUNT(*) as cnt FROM profil_questions").fetchone()['cnt']
@@ -941,6 +954,76 @@ def list_sessions(
         return [dict(row) for row in rows]
 
 
+# Admin-listen: nyeste først, id som tiebreaker (dækket af idx_profil_sessions_created)
+SESSIONS_ORDER = KeysetOrder(
+    SortKey('created_at', 'created_at', descending=True),
+    SortKey('id', 'id', descending=True),
+)
+
+
+def list_sessions_page(
+    customer_id: Optional[str] = None,
+    context: Optional[str] = None,
+    complete: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    per_page: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Dict], KeysetPagination]:
+    """
+    Én side af sessionerne (keyset-pagineret, nyeste først).
+
+    Args:
+        customer_id: Kun sessioner for denne kunde
+        context: Kun denne kontekst (fx 'mus')
+        complete: True/False = kun afsluttede/igangværende, None = alle
+        cursor: next_cursor/prev_cursor fra forrige side
+
+    Returns:
+        (sessions, pagination) - se cache.keyset_paginate
+    """
+    filters, params = ["1 = 1"], []
+    if customer_id:
+        filters.append("customer_id = ?")
+        params.append(customer_id)
+    if context:
+        filters.append("COALESCE(context, 'general') = ?")
+        params.append(context)
+    if complete is not None:
+        filters.append("is_complete = ?" if complete else "COALESCE(is_complete, 0) = ?")
+        params.append(1 if complete else 0)
+    where = ' AND '.join(filters)
+
+    with get_db() as conn:
+        def fetch(condition, keyset_params, order_by, limit):
+            rows = conn.execute(f"""
+                SELECT * FROM profil_sessions
+                WHERE {where} AND {condition}
+                ORDER BY {order_by}
+                LIMIT ?
+            """, params + keyset_params + [limit]).fetchall()
+            return [dict(row) for row in rows]
+
+        def count():
+            return capped_count(conn, f"SELECT 1 FROM profil_sessions WHERE {where}", params)
+
+        return keyset_paginate(fetch, SESSIONS_ORDER, cursor, per_page, count_func=count)
+
+
+def get_session_counts(customer_id: Optional[str] = None) -> Dict[str, int]:
+    """Antal sessioner i alt, afsluttede og MUS-samtaler (til admin-listens nøgletal)"""
+    with get_db() as conn:
+        query = """
+            SELECT COUNT(*) as total,
+                   COALESCE(SUM(is_complete = 1), 0) as complete,
+                   COALESCE(SUM(context = 'mus'), 0) as mus
+            FROM profil_sessions
+        """
+        params = []
+        if customer_id:
+            query += " WHERE customer_id = ?"
+            params.append(customer_id)
+        return dict(conn.execute(query, params).fetchone())
+
+
 def delete_session(session_id: str) -> bool:
     """Slet en profil-session og alle tilhørende svar (legacy system)"""
     with get_db() as conn:
@@ -4,7 +4,7 @@ Send emails og SMS via Mailjet
 """
 import os
 import sqlite3
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from mailjet_rest import Client
 from datetime import datetime
@@ -14,6 +14,8 @@ load_dotenv()
 
 # Import logging
 from logging_config import get_logger
+from cache import (DEFAULT_PAGE_SIZE, KeysetOrder, KeysetPagination, SortKey, capped_count,
+                   estimated_row_count, keyset_paginate)
 
 logger = get_logger(__name__)
 
@@ -202,6 +204,50 @@ def get_email_logs(assessment_id: str = None, limit: int = 100) -> List[Dict]:
         return []
 
 
+# Email-logs: nyeste først, id som tiebreaker (dækket af idx_email_logs_*)
+EMAIL_LOGS_ORDER = KeysetOrder(
+    SortKey('created_at', 'created_at', descending=True),
+    SortKey('id', 'id', descending=True),
+)
+
+
+def get_email_logs_page(assessment_id: str = None, cursor: str = None,
+                        per_page: int = DEFAULT_PAGE_SIZE) -> Tuple[List[Dict], KeysetPagination]:
+    """
+    Hent én side email logs (keyset-pagineret, nyeste først).
+
+    Total er estimeret for alle logs og loftet (1000+) for én måling,
+    så siden ikke tæller hele tabellen.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        where, params = ("assessment_id = ?", [assessment_id]) if assessment_id else ("1 = 1", [])
+
+        def fetch(condition, keyset_params, order_by, limit):
+            rows = conn.execute(f"""
+                SELECT * FROM email_logs
+                WHERE {where} AND {condition}
+                ORDER BY {order_by} LIMIT ?
+            """, params + keyset_params + [limit]).fetchall()
+            return [dict(row) for row in rows]
+
+        def count():
+            if assessment_id:
+                return capped_count(conn, f"SELECT 1 FROM email_logs WHERE {where}", params)
+            return estimated_row_count(conn, 'email_logs')
+
+        try:
+            return keyset_paginate(fetch, EMAIL_LOGS_ORDER, cursor, per_page, count_func=count)
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error("Error getting email logs page", exc_info=True, extra={'extra_data': {
+            'assessment_id': assessment_id
+        }})
+        return [], KeysetPagination(per_page)
+
+
 def check_mailjet_status(message_id: str) -> Optional[Dict]:
     """Tjek delivery status via Mailjet API"""
     if not message_id:
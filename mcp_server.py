@@ -12,6 +12,7 @@ import os
 
 # Import centralized database functions
 from db import get_db_connection as get_db, DB_PATH
+from stats_counters import get_counters
 
 def handle_request(request: dict) -> dict:
     """Handle incoming MCP request"""
@@ -43,7 +44,7 @@ def handle_request(request: dict) -> dict:
                 "tools": [
                     {
                         "name": "db_status",
-                        "description": "Get database status: counts of units, assessments, responses, customers",
+                        "description": "Get database status: counts of units, assessments, responses, respondents, tokens, customers",
                         "inputSchema": {
                             "type": "object",
                             "properties": {},
@@ -183,20 +184,29 @@ def call_tool(name: str, args: dict) -> Any:
                 "size_bytes": os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0
             }
 
+            # Vedligeholdte tællere (stats_counters) - falder tilbage til COUNT(*)
+            # hvis databasen ikke er migreret endnu
+            try:
+                counters = get_counters(conn)
+            except sqlite3.OperationalError:
+                counters = {}
+            counter_names = {"organizational_units": "units", "assessments": "assessments",
+                             "responses": "responses", "customers": "customers", "users": "users"}
+
             # Count tables
             for table in ["organizational_units", "assessments", "responses", "customers", "users", "profil_sessions", "profil_questions"]:
+                if counter_names.get(table) in counters:
+                    result[table] = counters[counter_names[table]]
+                    continue
                 try:
                     count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
                     result[table] = count
                 except Exception:
                     result[table] = "table not found"
 
-            # Check respondent_name
-            try:
-                with_name = conn.execute("SELECT COUNT(*) FROM responses WHERE respondent_name IS NOT NULL").fetchone()[0]
-                result["responses_with_name"] = with_name
-            except Exception:
-                pass  # Column may not exist in older schema
+            for name in ("respondents", "tokens_sent", "tokens_used"):
+                if name in counters:
+                    result[name] = counters[name]
 
             return result
 
@@ -264,7 +274,7 @@ def call_tool(name: str, args: dict) -> Any:
             resp_stats = conn.execute("""
                 SELECT
                     respondent_type,
-                    COUNT(DISTINCT respondent_name) as unique_respondents,
+                    COUNT(DISTINCT respondent_id) as unique_respondents,
                     COUNT(*) as total_responses
                 FROM responses
                 WHERE assessment_id = ?
@@ -463,6 +463,10 @@ def save_auth_providers(entity_type: str, entity_id: str, providers: Dict) -> bo
 
         conn.commit()
         conn.close()
+
+        if entity_type == 'domain':
+            from db_multitenant import invalidate_domain_cache
+            invalidate_domain_cache()
         return True
 
     except Exception as e:
@@ -0,0 +1,290 @@
+"""
+Organisationstræ i hukommelsen per kunde
+
+Breadcrumbs gik op gennem træet med ét SELECT per niveau, og path-, leaf-
+og subtræ-opslag kørte rekursive CTE'er med anti-join for at finde leaves.
+OrgTree indlæser i stedet en kundes enheder i ét query og bygger:
+
+- parent/children som index-arrays
+- depth og leaf-flag per enhed
+- pre/post-order intervaller: b ligger under a hvis pre[a] <= pre[b] <= post[a]
+
+Path, subtræ, leaves og antal efterkommere er derefter liste-opslag.
+
+Træet invalideres af en versionstæller per kunde i cache_versions
+('org_tree:<customer_id>'). Triggers på organizational_units tæller den op
+når en enhed oprettes, flyttes, ændres eller slettes - uanset skrivesti.
+Et opslag læser tælleren (ét primærnøgle-opslag), så alle workers ser
+ændringer med det samme.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+VERSION_PREFIX = 'org_tree:'
+
+# (db-sti, customer_id) -> OrgTree
+_trees: Dict[tuple, 'OrgTree'] = {}
+_trees_lock = threading.Lock()
+
+
+class OrgTree:
+    """
+    Uforanderligt øjebliksbillede af én kundes organisationstræ.
+
+    Enheder hvis parent ikke findes hos kunden behandles som rødder.
+    Metoderne returnerer kopier, så kaldere kan ændre dem frit.
+    """
+
+    def __init__(self, customer_id: Optional[str], rows: List[Dict], version: int = 0):
+        self.customer_id = customer_id
+        self.version = version
+        self.units = rows
+        self.index = {row['id']: i for i, row in enumerate(rows)}
+
+        count = len(rows)
+        self.parent = [self.index.get(row['parent_id'], -1) for row in rows]
+        self.children: List[List[int]] = [[] for _ in range(count)]
+        roots = []
+        for i, parent in enumerate(self.parent):
+            (self.children[parent] if parent >= 0 else roots).append(i)
+
+        def by_name(i):
+            return rows[i]['name'] or ''
+
+        for child_list in self.children:
+            child_list.sort(key=by_name)
+        roots.sort(key=by_name)
+        self.roots = roots
+
+        self.depth = [0] * count
+        self.pre = [-1] * count
+        self.post = [-1] * count
+        self.order: List[int] = []  # Enheder i pre-order
+        for root in roots:
+            self._walk(root)
+        # Enheder i en parent-cyklus nås ikke fra en rod - gør dem til rødder
+        for i in range(count):
+            if self.pre[i] < 0:
+                self.children[self.parent[i]].remove(i)
+                self.parent[i] = -1
+                self.roots.append(i)
+                self._walk(i)
+
+        self.is_leaf = [not child_list for child_list in self.children]
+
+    def _walk(self, root: int):
+        """Iterativ DFS der sætter depth og pre/post-intervaller"""
+        self.depth[root] = 0
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                self.post[node] = len(self.order) - 1
+                continue
+            self.pre[node] = len(self.order)
+            self.order.append(node)
+            stack.append((node, True))
+            for child in reversed(self.children[node]):
+                if self.pre[child] < 0:
+                    self.depth[child] = self.depth[node] + 1
+                    stack.append((child, False))
+
+    def __contains__(self, unit_id: str) -> bool:
+        return unit_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def _rows(self, indexes) -> List[Dict]:
+        return [dict(self.units[i]) for i in indexes]
+
+    def get(self, unit_id: str) -> Optional[Dict]:
+        """Enheden som dict (None hvis ukendt)"""
+        i = self.index.get(unit_id)
+        return dict(self.units[i]) if i is not None else None
+
+    def path(self, unit_id: str) -> List[Dict]:
+        """Enheder fra rod til unit_id (inkl.) - tom liste hvis ukendt"""
+        i = self.index.get(unit_id)
+        chain = []
+        while i is not None and i >= 0:
+            chain.append(i)
+            i = self.parent[i]
+        return self._rows(reversed(chain))
+
+    def get_children(self, unit_id: Optional[str] = None) -> List[Dict]:
+        """Direkte børn sorteret på navn (None = kundens rødder)"""
+        if unit_id is None:
+            return self._rows(self.roots)
+        i = self.index.get(unit_id)
+        return self._rows(self.children[i]) if i is not None else []
+
+    def child_count(self, unit_id: str) -> int:
+        i = self.index.get(unit_id)
+        return len(self.children[i]) if i is not None else 0
+
+    def subtree_ids(self, unit_id: str, include_self: bool = True) -> List[str]:
+        """Id'er i subtræet i pre-order"""
+        i = self.index.get(unit_id)
+        if i is None:
+            return []
+        start = self.pre[i] if include_self else self.pre[i] + 1
+        return [self.units[j]['id'] for j in self.order[start:self.post[i] + 1]]
+
+    def descendant_count(self, unit_id: str) -> int:
+        """Antal efterkommere (uden enheden selv)"""
+        i = self.index.get(unit_id)
+        return self.post[i] - self.pre[i] if i is not None else 0
+
+    def is_descendant(self, unit_id: str, ancestor_id: str) -> bool:
+        """Ligger unit_id under ancestor_id (eller er den samme enhed)?"""
+        i, a = self.index.get(unit_id), self.index.get(ancestor_id)
+        if i is None or a is None:
+            return False
+        return self.pre[a] <= self.pre[i] <= self.post[a]
+
+    def unit_is_leaf(self, unit_id: str) -> bool:
+        i = self.index.get(unit_id)
+        return i is not None and self.is_leaf[i]
+
+    def leaves(self, unit_id: Optional[str] = None) -> List[Dict]:
+        """
+        Leaf-enheder under unit_id (inkl. den selv hvis den er leaf),
+        sorteret på full_path. None = alle kundens leaves.
+        """
+        if unit_id is None:
+            nodes = self.order
+        else:
+            i = self.index.get(unit_id)
+            if i is None:
+                return []
+            nodes = self.order[self.pre[i]:self.post[i] + 1]
+        leaves = [j for j in nodes if self.is_leaf[j]]
+        leaves.sort(key=lambda j: self.units[j]['full_path'] or '')
+        return self._rows(leaves)
+
+
+# ========================================
+# VERSIONSTÆLLER OG TRIGGERS
+# ========================================
+
+def _version_name_sql(ref: str) -> str:
+    return f"'{VERSION_PREFIX}' || COALESCE({ref}.customer_id, '')"
+
+
+def _bump_sql(ref: str) -> str:
+    # Første version er tilfældig, så et træ cachet fra en tidligere database
+    # på samme sti (fx genskabt testdatabase) ikke kan matche ved et uheld
+    return f"""
+        INSERT INTO cache_versions (name, version, updated_at)
+        VALUES ({_version_name_sql(ref)}, abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET
+            version = version + 1,
+            updated_at = CURRENT_TIMESTAMP;"""
+
+
+def init_org_tree(conn: sqlite3.Connection):
+    """
+    Opret triggers der tæller træ-versionen op (sikkert at køre flere gange).
+
+    Kræver organizational_units.customer_id. Kunder uden tæller får en.
+    """
+    from cache import _ensure_cache_versions_table
+    _ensure_cache_versions_table(conn)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS org_tree_version_ai
+        AFTER INSERT ON organizational_units
+        BEGIN {_bump_sql('NEW')} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS org_tree_version_ad
+        AFTER DELETE ON organizational_units
+        BEGIN {_bump_sql('OLD')} END
+    """)
+    # Træet indeholder hele rækken (navne i breadcrumbs, full_path m.m.)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS org_tree_version_au
+        AFTER UPDATE ON organizational_units
+        BEGIN {_bump_sql('OLD')} {_bump_sql('NEW')} END
+    """)
+
+    conn.execute(f"""
+        INSERT OR IGNORE INTO cache_versions (name, version, updated_at)
+        SELECT DISTINCT {_version_name_sql('organizational_units')},
+               abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP
+        FROM organizational_units
+    """)
+
+
+def get_tree_version(customer_id: Optional[str], conn: sqlite3.Connection) -> int:
+    """Træ-versionen for en kunde (0 hvis der ikke er nogen tæller)"""
+    from cache import get_cache_version
+    return get_cache_version(VERSION_PREFIX + (customer_id or ''), conn)
+
+
+# ========================================
+# OPSLAG
+# ========================================
+
+def _load_tree(customer_id: Optional[str], version: int, conn: sqlite3.Connection) -> OrgTree:
+    if customer_id:
+        rows = conn.execute(
+            "SELECT * FROM organizational_units WHERE customer_id = ?", (customer_id,)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM organizational_units WHERE customer_id IS NULL OR customer_id = ''"
+        ).fetchall()
+    return OrgTree(customer_id, [dict(row) for row in rows], version)
+
+
+def _tree(customer_id: Optional[str], conn: sqlite3.Connection) -> OrgTree:
+    from db import DB_PATH
+
+    version = get_tree_version(customer_id, conn)
+    # Kundens egen database (tenant_db) har sine egne versioner
+    key = (os.environ.get('DB_PATH', DB_PATH), getattr(conn, 'tenant_id', None), customer_id or '')
+    with _trees_lock:
+        tree = _trees.get(key)
+    if tree is not None and version and tree.version == version:
+        return tree
+
+    tree = _load_tree(customer_id, version, conn)
+    # Uden tæller (ældre skema uden triggers) kan træet ikke invalideres
+    if version:
+        with _trees_lock:
+            _trees[key] = tree
+    return tree
+
+
+def get_org_tree(customer_id: Optional[str], conn: Optional[sqlite3.Connection] = None) -> OrgTree:
+    """Kundens træ - genindlæses kun når træ-versionen har ændret sig"""
+    if conn is not None:
+        return _tree(customer_id, conn)
+    from db import get_db
+    with get_db(customer_id) as c:
+        return _tree(customer_id, c)
+
+
+def get_tree_for_unit(unit_id: str, conn: Optional[sqlite3.Connection] = None) -> Optional[OrgTree]:
+    """Træet for den kunde unit_id tilhører (None hvis enheden ikke findes)"""
+    def _lookup(c):
+        row = c.execute(
+            "SELECT customer_id FROM organizational_units WHERE id = ?", (unit_id,)
+        ).fetchone()
+        return _tree(row[0], c) if row else None
+
+    if conn is not None:
+        return _lookup(conn)
+    from db import get_db
+    with get_db() as c:
+        return _lookup(c)
+
+
+def invalidate_org_trees():
+    """Glem alle træer i denne proces (fx efter direkte filkopiering af databasen)"""
+    with _trees_lock:
+        _trees.clear()
@@ -0,0 +1,115 @@
+"""
+Cache af renderede admin-sider (opt-in per route)
+
+Selv med analyse-cachen bruger de tunge dashboards det meste af tiden på
+at rendere store templates med løkker over felter, lag og enheder.
+@cached_page gemmer i stedet det renderede indhold af sidens blocks
+(title, extra_css, content, extra_js) komprimeret i cache.py's cache.
+
+Layoutet (navigation, brugernavn, kundevælger, CSRF-token, flash-beskeder)
+renderes stadig per request rundt om det cachede indhold, så brugere med
+samme rolle og kundefilter kan dele en side uden at se hinandens session.
+
+Nøglen består af route, URL, effektiv rolle, visning, kunde/kundefilter,
+sprog, host og data-versionen (data_version.py). Nye svar, ændrede enheder
+og målinger giver derfor en ny nøgle i alle workers. Entries har prefix
+'page:' og ryddes sammen med analyse-cachen af invalidate_assessment_cache()
+og invalidate_unit_cache().
+"""
+import json
+import os
+import zlib
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from flask import g, make_response, render_template, request, session
+from markupsafe import Markup
+
+from auth_helpers import get_current_user, get_effective_role
+from cache import _make_key, get_cached_value, set_cached_value
+from data_version import request_data_version
+from translations import get_user_language
+
+PAGE_CACHE_PREFIX = 'page'
+PAGE_CACHE_TTL = 300
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '200'))
+
+# Slå side-cachen fra uden at fjerne decoratorerne (fx ved fejlsøgning)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() != 'false'
+
+# Genrenderer admin/layout.html rundt om de cachede blocks
+REPLAY_TEMPLATE = 'admin/_cached_page.html'
+
+
+def capture_block(name: str, html: Markup) -> Markup:
+    """
+    Kaldes fra layoutet med hver blocks renderede indhold.
+
+    Under en request med @cached_page gemmes indholdet, så det kan caches.
+    """
+    blocks = g.get('page_blocks')
+    if blocks is not None:
+        blocks[name] = str(html)
+    return html
+
+
+def _page_key(customer_id: Optional[str], version: int) -> str:
+    user = get_current_user() or {}
+    parts = [
+        request.endpoint, request.full_path, request.host,
+        user.get('role'), get_effective_role(), session.get('view_mode'),
+        user.get('customer_id'), session.get('customer_filter'), customer_id,
+        get_user_language(), version,
+    ]
+    return f"{PAGE_CACHE_PREFIX}:{request.endpoint}:{_make_key(*parts)}"
+
+
+def _compress(blocks: Dict[str, str]) -> bytes:
+    return zlib.compress(json.dumps(blocks).encode('utf-8'))
+
+
+def _decompress(data: bytes) -> Dict[str, Markup]:
+    blocks = json.loads(zlib.decompress(data).decode('utf-8'))
+    return {name: Markup(html) for name, html in blocks.items()}
+
+
+def cached_page(scope: Callable[..., Optional[str]], ttl: int = PAGE_CACHE_TTL):
+    """
+    Decorator: genbrug sidens renderede blocks indtil kundens data ændres.
+
+    Args:
+        scope: Kaldes med view'ets argumenter og returnerer customer_id
+               for de data siden bygger på (None = alle kunder)
+        ttl: Sekunder en side højst genbruges
+
+    Kun til GET-sider der extender admin/layout.html og ikke indeholder
+    sessionsdata (CSRF-tokens, brugernavn) i deres egne blocks. Brug den
+    under @login_required (og @conditional_get).
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not PAGE_CACHE_ENABLED or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            customer_id = scope(*args, **kwargs)
+            version, _ = request_data_version(customer_id)
+            if not version:
+                return view(*args, **kwargs)
+
+            key = _page_key(customer_id, version)
+            data = get_cached_value(key)
+            if data is not None:
+                return render_template(REPLAY_TEMPLATE, cached_blocks=_decompress(data))
+
+            g.page_blocks = {}
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                blocks = g.pop('page_blocks', None)
+
+            if response.status_code == 200 and blocks and 'content' in blocks:
+                set_cached_value(key, _compress(blocks), ttl, max_entries=PAGE_CACHE_MAX_ENTRIES)
+            return response
+        return wrapper
+    return decorator
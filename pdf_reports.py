@@ -0,0 +1,500 @@
+"""
+PDF-rapporter for målinger - rendering i baggrunden med fil-cache
+
+PDF'er gemmes under PDF_CACHE_DIR/<assessment_id>/<unit_id>-<version>.pdf, hvor
+version er en hash af målingens svardata og rapport-skabelonen. Så længe data
+er uændret serveres filen direkte; ændres data, giver det en ny version og
+rapporten renderes igen i baggrunden.
+
+WeasyPrint-opsætningen (stylesheet og fonte) parses én gang per tråd/proces
+via PdfRenderContext. Store batches renderes i en procespulje:
+
+    python pdf_reports.py <assessment_id> [--unit <unit_id>] [--processes 8] [--customer <id>]
+
+Brug:
+    status = request_pdf(app, assessment_id, unit_id)
+    if status['status'] == 'ready':
+        return send_file(status['path'])
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from db import get_db, DB_PATH
+from logging_config import get_logger
+from tenant_db import current_tenant, tenant_scope
+
+logger = get_logger(__name__)
+
+# Antal samtidige PDF-renderinger per proces
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', '2'))
+
+# Processer til bulk-rendering (render_bulk_reports)
+PDF_RENDER_PROCESSES = int(os.environ.get('PDF_RENDER_PROCESSES', str(os.cpu_count() or 2)))
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_TEMPLATE = 'admin/assessment_pdf.html'
+PDF_STYLESHEET_PATH = os.path.join(_BASE_DIR, 'static', 'css', 'assessment_pdf.css')
+_TEMPLATE_PATH = os.path.join(_BASE_DIR, 'templates', PDF_TEMPLATE)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_jobs: Dict[str, Future] = {}
+_jobs_lock = threading.Lock()
+_render_local = threading.local()
+
+
+def get_pdf_cache_dir() -> str:
+    """Mappe til PDF-cachen (PDF_CACHE_DIR eller 'pdf_cache' ved siden af databasen)"""
+    if os.environ.get('PDF_CACHE_DIR'):
+        return os.environ['PDF_CACHE_DIR']
+    db_path = os.environ.get('DB_PATH', DB_PATH)
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'pdf_cache')
+
+
+def _template_fingerprint() -> str:
+    """Hash af rapport-skabelon og stylesheet, så et deploy med nyt layout giver nye PDF'er"""
+    digest = hashlib.sha256()
+    for path in (_TEMPLATE_PATH, PDF_STYLESHEET_PATH):
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'none')
+    return digest.hexdigest()[:12]
+
+
+_TEMPLATE_FINGERPRINT = _template_fingerprint()
+
+
+def get_data_version(assessment_id: str) -> str:
+    """
+    Versions-hash for målingens data.
+
+    Bygger på antal svar, højeste svar-id, summen af scores, brugte tokens og
+    målingens navn - ét billigt opslag der ændrer sig når rapporten ville.
+    """
+    with get_db() as conn:
+        responses = conn.execute("""
+            SELECT COUNT(*) as cnt, MAX(id) as max_id, TOTAL(score) as score_sum
+            FROM responses WHERE assessment_id = ?
+        """, (assessment_id,)).fetchone()
+        tokens_used = conn.execute("""
+            SELECT COUNT(*) FROM tokens WHERE assessment_id = ? AND is_used = 1
+        """, (assessment_id,)).fetchone()[0]
+        assessment = conn.execute(
+            "SELECT name, period FROM assessments WHERE id = ?", (assessment_id,)
+        ).fetchone()
+
+    parts = [
+        assessment_id,
+        responses['cnt'], responses['max_id'], responses['score_sum'],
+        tokens_used,
+        assessment['name'] if assessment else None,
+        assessment['period'] if assessment else None,
+        _TEMPLATE_FINGERPRINT,
+    ]
+    return hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+
+def _safe_filename(value: str) -> str:
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in value)
+
+
+def get_pdf_path(assessment_id: str, unit_id: str, version: str) -> str:
+    """Sti til den cachede PDF for en bestemt dataversion"""
+    return os.path.join(get_pdf_cache_dir(), _safe_filename(assessment_id),
+                        f"{_safe_filename(unit_id)}-{version}.pdf")
+
+
+def get_cached_pdf(assessment_id: str, unit_id: str, version: str = None) -> Optional[str]:
+    """Sti til PDF'en hvis den findes for den aktuelle dataversion, ellers None"""
+    version = version or get_data_version(assessment_id)
+    path = get_pdf_path(assessment_id, unit_id, version)
+    return path if os.path.exists(path) else None
+
+
+def _remove_old_versions(assessment_id: str, unit_id: str, keep_path: str):
+    """Slet forældede versioner af samme rapport"""
+    directory = os.path.dirname(keep_path)
+    prefix = f"{_safe_filename(unit_id)}-"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and name.endswith('.pdf') and path != keep_path:
+            # Versionen er altid 20 hex-tegn - undgå at ramme enheder med samme præfiks
+            if len(name) == len(prefix) + 20 + len('.pdf'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+# ========================================
+# RENDERING
+# ========================================
+
+def build_report_html(assessment_id: str, unit_id: str) -> str:
+    """
+    Saml data og render rapport-HTML for unit_id (inkl. underenheder) i målingen.
+
+    Kræver request context (render_template og context processors).
+    """
+    from flask import render_template
+    from analysis import (
+        get_detailed_breakdown, calculate_substitution_db, get_free_text_comments,
+        get_kkc_recommendations, get_start_here_recommendation, get_alerts_and_findings
+    )
+
+    with get_db() as conn:
+        assessment = conn.execute("""
+            SELECT c.*, ou.customer_id FROM assessments c
+            JOIN organizational_units ou ON c.target_unit_id = ou.id
+            WHERE c.id = ?
+        """, (assessment_id,)).fetchone()
+        unit = conn.execute(
+            "SELECT id, name FROM organizational_units WHERE id = ?", (unit_id,)
+        ).fetchone()
+        token_stats = conn.execute("""
+            SELECT
+                COUNT(*) as tokens_sent,
+                SUM(CASE WHEN is_used = 1 THEN 1 ELSE 0 END) as tokens_used
+            FROM tokens
+            WHERE assessment_id = ?
+        """, (assessment_id,)).fetchone()
+
+    breakdown = get_detailed_breakdown(unit_id, assessment_id, include_children=True)
+    substitution = calculate_substitution_db(unit_id, assessment_id, 'employee')
+    free_text_comments = get_free_text_comments(unit_id, assessment_id, include_children=True)
+
+    employee_stats = breakdown.get('employee', {})
+    comparison = breakdown.get('comparison', {})
+    kkc_recommendations = get_kkc_recommendations(employee_stats, comparison)
+    start_here = get_start_here_recommendation(kkc_recommendations)
+
+    alerts = get_alerts_and_findings(breakdown, comparison, substitution)
+
+    # Calculate overall score
+    if employee_stats:
+        fields = ['TRYGHED', 'MENING', 'KAN', 'BESVÆR']
+        scores = [employee_stats.get(f, {}).get('avg_score', 3) for f in fields]
+        avg_score = sum(scores) / len(scores)
+        overall_score = (avg_score - 1) / 4 * 100
+    else:
+        overall_score = 0
+
+    tokens_sent = token_stats['tokens_sent'] or 0
+    tokens_used = token_stats['tokens_used'] or 0
+    response_rate = (tokens_used / tokens_sent * 100) if tokens_sent > 0 else 0
+
+    assessment_data = dict(assessment)
+    if unit and unit_id != assessment['target_unit_id']:
+        # Enhedsrapport i bulk-kørsel: vis enhedens navn i titlen
+        assessment_data['name'] = f"{assessment['name']} - {unit['name']}"
+
+    return render_template(PDF_TEMPLATE,
+        assessment=assessment_data,
+        breakdown=breakdown,
+        alerts=alerts,
+        start_here=start_here,
+        free_text_comments=free_text_comments,
+        token_stats={'tokens_sent': tokens_sent, 'tokens_used': tokens_used},
+        overall_score=overall_score,
+        response_rate=response_rate,
+        generated_date=datetime.now().strftime('%d-%m-%Y %H:%M')
+    )
+
+
+class PdfRenderContext:
+    """
+    Genbrugelig WeasyPrint-opsætning: rapportens stylesheet og fontkonfiguration
+    parses én gang og bruges til alle efterfølgende PDF'er.
+
+    Ikke trådsikker - brug get_render_context() der giver én per tråd.
+    """
+
+    def __init__(self, stylesheet_path: str = PDF_STYLESHEET_PATH):
+        try:
+            from weasyprint import CSS
+            from weasyprint.text.fonts import FontConfiguration
+        except OSError as e:
+            # WeasyPrint er installeret, men systembibliotekerne (pango) mangler
+            raise ImportError(str(e)) from e
+
+        self.font_config = FontConfiguration()
+        self.stylesheet = CSS(filename=stylesheet_path, font_config=self.font_config)
+        self.rendered = 0
+
+    def render(self, html: str) -> bytes:
+        from weasyprint import HTML
+        pdf = HTML(string=html, base_url=_BASE_DIR).write_pdf(
+            stylesheets=[self.stylesheet], font_config=self.font_config)
+        self.rendered += 1
+        return pdf
+
+
+def get_render_context() -> PdfRenderContext:
+    """Trådens rendering context (oprettes ved første brug)"""
+    context = getattr(_render_local, 'context', None)
+    if context is None:
+        context = _render_local.context = PdfRenderContext()
+    return context
+
+
+def render_pdf_bytes(html: str) -> bytes:
+    """HTML -> PDF med den delte rendering context"""
+    return get_render_context().render(html)
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_job(app, assessment_id: str, unit_id: str, version: str,
+                customer_id: Optional[str] = None) -> str:
+    """Baggrundsjob: render og skriv PDF'en atomisk til cachen"""
+    path = get_pdf_path(assessment_id, unit_id, version)
+    if os.path.exists(path):
+        return path
+
+    # Skabelonen og context processors forventer en request - brug en tom.
+    # Den kører ikke before_request, og tråden arver ikke requestens kunde,
+    # så kundens database vælges eksplicit.
+    with tenant_scope(customer_id), app.test_request_context('/'):
+        html = build_report_html(assessment_id, unit_id)
+
+    pdf = render_pdf_bytes(html)
+    _write_atomic(path, pdf)
+    _remove_old_versions(assessment_id, unit_id, path)
+    logger.info(f"PDF renderet: {assessment_id}/{unit_id} ({len(pdf)} bytes)")
+    return path
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PDF_RENDER_WORKERS,
+                                           thread_name_prefix='pdf-render')
+        return _executor
+
+
+def request_pdf(app, assessment_id: str, unit_id: str, version: str = None,
+                start: bool = True, wait: float = 0) -> Dict:
+    """
+    Returner PDF'en hvis den er aktuel, ellers start (eller følg) et baggrundsjob.
+
+    Args:
+        start: Start et job hvis ingen kører (False = kun status)
+        wait: Sekunder der ventes på jobbet før der svares 'pending'
+
+    Returns:
+        {'status': 'ready'|'pending'|'failed'|'missing', 'path', 'error', 'unit_id'}
+    """
+    customer_id = current_tenant()
+    version = version or get_data_version(assessment_id)
+    path = get_cached_pdf(assessment_id, unit_id, version)
+    if path:
+        return {'status': 'ready', 'path': path, 'error': None, 'unit_id': unit_id}
+
+    job_key = f"{get_pdf_cache_dir()}|{assessment_id}|{unit_id}|{version}"
+    with _jobs_lock:
+        job = _jobs.get(job_key)
+        if not start and job is None:
+            return {'status': 'missing', 'path': None, 'error': None, 'unit_id': unit_id}
+        if job is None or (job.done() and job.exception() is not None and _retry_allowed(job)):
+            # Færdige jobs ligger i fil-cachen - hold kun styr på aktive og fejlede
+            for key in [k for k, j in _jobs.items() if j.done() and j.exception() is None]:
+                del _jobs[key]
+            job = _get_executor().submit(_render_job, app, assessment_id, unit_id, version,
+                                         customer_id)
+            job.started_at = datetime.now()
+            _jobs[job_key] = job
+
+    if wait:
+        try:
+            job.result(timeout=wait)
+        except Exception:
+            pass  # Timeout eller fejl - status aflæses nedenfor
+
+    return _job_status(job, unit_id)
+
+
+def _retry_allowed(job: Future) -> bool:
+    """Fejlede jobs startes igen efter et minut (fx efter en midlertidig låsefejl)"""
+    return (datetime.now() - getattr(job, 'started_at', datetime.now())).total_seconds() > 60
+
+
+def _job_status(job: Future, unit_id: str) -> Dict:
+    if not job.done():
+        return {'status': 'pending', 'path': None, 'error': None, 'unit_id': unit_id}
+    error = job.exception()
+    if error is not None:
+        return {'status': 'failed', 'path': None, 'error': str(error) or type(error).__name__,
+                'unit_id': unit_id, 'missing_library': isinstance(error, ImportError)}
+    return {'status': 'ready', 'path': job.result(), 'error': None, 'unit_id': unit_id}
+
+
+def get_subtree_unit_ids(unit_id: str) -> List[str]:
+    """unit_id og alle enheder under den (bredde først)"""
+    with get_db() as conn:
+        rows = conn.execute("""
+            WITH RECURSIVE subtree AS (
+                SELECT id, 0 as depth FROM organizational_units WHERE id = ?
+                UNION ALL
+                SELECT ou.id, st.depth + 1 FROM organizational_units ou
+                JOIN subtree st ON ou.parent_id = st.id
+            )
+            SELECT id FROM subtree ORDER BY depth, id
+        """, (unit_id,)).fetchall()
+    return [row['id'] for row in rows]
+
+
+def request_bulk_pdfs(app, assessment_id: str, root_unit_id: str, start: bool = True) -> List[Dict]:
+    """
+    Start rendering af en PDF for hver enhed under root_unit_id (inkl. den selv).
+
+    Enheder der ikke når anonymitetstærsklen springes over med status 'skipped'.
+    Med start=False returneres kun status.
+    """
+    from analysis import check_anonymity_threshold
+
+    version = get_data_version(assessment_id)
+    results = []
+    for unit_id in get_subtree_unit_ids(root_unit_id):
+        anonymity = check_anonymity_threshold(assessment_id, unit_id)
+        if not anonymity.get('can_show_results'):
+            results.append({'status': 'skipped', 'path': None, 'error': None, 'unit_id': unit_id})
+            continue
+        results.append(request_pdf(app, assessment_id, unit_id, version, start=start))
+    return results
+
+
+def wait_for_jobs(timeout: float = None):
+    """Vent på alle igangværende PDF-jobs (til scripts og tests)"""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        try:
+            job.result(timeout=timeout)
+        except Exception:
+            pass
+
+
+# ========================================
+# BULK-RENDERING I PROCESSER
+# ========================================
+
+def _init_render_worker():
+    """Initializer i hver proces: parse stylesheet og fonte én gang"""
+    try:
+        get_render_context()
+    except ImportError:
+        pass  # Fejlen rapporteres per rapport i stedet for at vælte puljen
+
+
+def _render_html_to_file(html: str, path: str) -> str:
+    _write_atomic(path, render_pdf_bytes(html))
+    return path
+
+
+def render_bulk_reports(app, assessment_id: str, root_unit_id: str,
+                        processes: int = None, customer_id: Optional[str] = None) -> List[Dict]:
+    """
+    Render rapporter for alle enheder under root_unit_id i en procespulje.
+
+    HTML bygges i denne proces (kræver database og app), mens selve WeasyPrint-
+    renderingen - den CPU-tunge del - fordeles på processer der hver genbruger
+    én PdfRenderContext. Rapporter der allerede er aktuelle springes over.
+    Data læses fra customer_id's database (default: den aktuelle kunde).
+    """
+    with tenant_scope(customer_id or current_tenant()):
+        return _render_bulk_reports(app, assessment_id, root_unit_id, processes)
+
+
+def _render_bulk_reports(app, assessment_id: str, root_unit_id: str,
+                         processes: int = None) -> List[Dict]:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from analysis import check_anonymity_threshold
+
+    version = get_data_version(assessment_id)
+    unit_ids = get_subtree_unit_ids(root_unit_id)
+    workers = max(1, min(processes or PDF_RENDER_PROCESSES, len(unit_ids)))
+
+    results = []
+    submitted = []
+    # spawn: undgå at forke en proces med åbne tråde og databaseforbindelser
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_render_worker) as pool:
+        for unit_id in unit_ids:
+            if not check_anonymity_threshold(assessment_id, unit_id).get('can_show_results'):
+                results.append({'status': 'skipped', 'path': None, 'error': None, 'unit_id': unit_id})
+                continue
+            path = get_pdf_path(assessment_id, unit_id, version)
+            if os.path.exists(path):
+                results.append({'status': 'ready', 'path': path, 'error': None, 'unit_id': unit_id})
+                continue
+            with app.test_request_context('/'):
+                html = build_report_html(assessment_id, unit_id)
+            submitted.append((unit_id, path, pool.submit(_render_html_to_file, html, path)))
+
+        for unit_id, path, future in submitted:
+            try:
+                future.result()
+            except Exception as e:
+                results.append({'status': 'failed', 'path': None, 'error': str(e) or type(e).__name__,
+                                'unit_id': unit_id, 'missing_library': isinstance(e, ImportError)})
+                continue
+            _remove_old_versions(assessment_id, unit_id, path)
+            results.append({'status': 'ready', 'path': path, 'error': None, 'unit_id': unit_id})
+
+    return results
+
+
+def main():
+    """Bulk-rendering fra kommandolinjen (fx årsrapporter for alle enheder)"""
+    import argparse
+    import time
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description="Render PDF-rapporter for alle enheder i en måling")
+    parser.add_argument('assessment_id')
+    parser.add_argument('--unit', help="Rod-enhed (default: målingens target)")
+    parser.add_argument('--processes', type=int, default=PDF_RENDER_PROCESSES)
+    parser.add_argument('--customer', help="Kunde med egen database (se tenant_db.py)")
+    args = parser.parse_args()
+
+    with get_db(args.customer) as conn:
+        assessment = conn.execute("SELECT target_unit_id FROM assessments WHERE id = ?",
+                                  (args.assessment_id,)).fetchone()
+    if not assessment:
+        raise SystemExit(f"Måling ikke fundet: {args.assessment_id}")
+
+    # Rapport-skabelonen bruger ingen context processors - en bar app er nok
+    app = Flask(__name__, template_folder=os.path.join(_BASE_DIR, 'templates'))
+    started = time.perf_counter()
+    results = render_bulk_reports(app, args.assessment_id, args.unit or assessment['target_unit_id'],
+                                  args.processes, args.customer)
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+        if result['status'] == 'failed':
+            print(f"  FEJL {result['unit_id']}: {result['error']}")
+    print(f"{len(results)} enheder på {time.perf_counter() - started:.1f}s: {summary}")
+    print(f"PDF'er i {os.path.join(get_pdf_cache_dir(), _safe_filename(args.assessment_id))}")
+
+
+if __name__ == '__main__':
+    main()
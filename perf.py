@@ -0,0 +1,320 @@
+"""
+Performance-instrumentering for Friktionskompasset
+Måler per request: væg-tid, antal SQL statements, tid i SQLite og cache hits/misses
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Slå instrumentering fra med PERF_INSTRUMENTATION=false
+PERF_ENABLED = os.environ.get('PERF_INSTRUMENTATION', 'true').lower() not in ('0', 'false', 'no')
+
+# Requests langsommere end dette logges med deres tungeste queries
+SLOW_REQUEST_MS = float(os.environ.get('PERF_SLOW_REQUEST_MS', '500'))
+
+# Antal målinger der gemmes per route (til percentiler)
+ROUTE_SAMPLE_SIZE = 500
+
+# Antal queries der medtages i log af langsomme requests
+SLOW_REQUEST_TOP_QUERIES = 5
+
+_local = threading.local()
+_trace_local = threading.local()
+_route_stats: Dict[str, deque] = {}
+_route_stats_lock = threading.Lock()
+_query_counters: List['QueryCounter'] = []
+
+_whitespace_re = re.compile(r'\s+')
+
+
+class RequestStats:
+    """Opsamlede målinger for én request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.queries: Dict[str, Dict] = {}
+
+    def record_statement(self):
+        """Tæl et statement (kaldt fra SQLite trace callback)"""
+        self.query_count += 1
+
+    def record_time(self, sql: str, seconds: float, executed: bool = False):
+        """Tilskriv tid brugt i SQLite til et statement"""
+        self.db_time += seconds
+        entry = self._entry(sql)
+        entry['time'] += seconds
+        if executed:
+            entry['count'] += 1
+
+    def _entry(self, sql: str) -> Dict:
+        key = _normalize_sql(sql)
+        entry = self.queries.get(key)
+        if entry is None:
+            entry = self.queries[key] = {'count': 0, 'time': 0.0}
+        return entry
+
+    def top_queries(self, limit: int = SLOW_REQUEST_TOP_QUERIES) -> List[Dict]:
+        """De statements der har brugt mest tid"""
+        ranked = sorted(self.queries.items(), key=lambda item: (item[1]['time'], item[1]['count']),
+                        reverse=True)
+        return [{
+            'sql': sql[:300],
+            'count': entry['count'],
+            'time_ms': round(entry['time'] * 1000, 2)
+        } for sql, entry in ranked[:limit]]
+
+
+def _normalize_sql(sql: str) -> str:
+    return _whitespace_re.sub(' ', sql).strip()
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Målingerne for den aktive request i denne tråd (None udenfor requests)"""
+    return getattr(_local, 'stats', None)
+
+
+def start_request() -> Optional[RequestStats]:
+    """Start opsamling for en ny request i denne tråd"""
+    if not PERF_ENABLED:
+        return None
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request(route: str, status_code: int = None) -> Optional[Dict]:
+    """
+    Afslut opsamling og gem målingen under route.
+
+    Returns:
+        Dict med request-målingerne, eller None hvis intet blev målt
+    """
+    stats = current_stats()
+    if stats is None:
+        return None
+    _local.stats = None
+
+    summary = {
+        'route': route,
+        'status_code': status_code,
+        'duration_ms': round((time.perf_counter() - stats.started) * 1000, 2),
+        'query_count': stats.query_count,
+        'db_time_ms': round(stats.db_time * 1000, 2),
+        'cache_hits': stats.cache_hits,
+        'cache_misses': stats.cache_misses,
+    }
+
+    with _route_stats_lock:
+        samples = _route_stats.get(route)
+        if samples is None:
+            samples = _route_stats[route] = deque(maxlen=ROUTE_SAMPLE_SIZE)
+        samples.append((summary['duration_ms'], summary['query_count'], summary['db_time_ms']))
+
+    if summary['duration_ms'] >= SLOW_REQUEST_MS:
+        summary['top_queries'] = stats.top_queries()
+
+    return summary
+
+
+def record_cache(hit: bool):
+    """Registrér et cache-opslag på den aktive request"""
+    stats = current_stats()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentil af en sorteret liste"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def get_route_stats() -> List[Dict]:
+    """
+    Latency-percentiler og query-antal per route (for denne proces).
+
+    Returns:
+        Liste sorteret efter p95 (langsomste først)
+    """
+    with _route_stats_lock:
+        snapshot = {route: list(samples) for route, samples in _route_stats.items()}
+
+    result = []
+    for route, samples in snapshot.items():
+        durations = sorted(s[0] for s in samples)
+        queries = sorted(s[1] for s in samples)
+        db_times = [s[2] for s in samples]
+        result.append({
+            'route': route,
+            'samples': len(samples),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'p99_ms': _percentile(durations, 99),
+            'max_ms': durations[-1],
+            'avg_queries': round(sum(queries) / len(queries), 1),
+            'max_queries': queries[-1],
+            'avg_db_time_ms': round(sum(db_times) / len(db_times), 2),
+        })
+
+    result.sort(key=lambda r: r['p95_ms'], reverse=True)
+    return result
+
+
+def reset_route_stats():
+    """Nulstil de opsamlede route-målinger"""
+    with _route_stats_lock:
+        _route_stats.clear()
+
+
+# ============================================
+# QUERY-TÆLLING (regressions-tests)
+# ============================================
+
+class QueryCounter:
+    """Statements udført på alle get_db-forbindelser mens tælleren er aktiv"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __repr__(self):
+        return f"<QueryCounter {self.count} statements>"
+
+
+@contextmanager
+def count_queries():
+    """
+    Tæl SQL statements på tværs af alle tråde og forbindelser i en blok.
+
+    Kun forbindelser åbnet efter blokken er startet tælles (get_db åbner en
+    ny forbindelse per kald, så det dækker alt normalt app-kode).
+
+    Brug:
+        with count_queries() as counter:
+            get_trend_data(customer_id='cust-1')
+        assert counter.count <= 10, counter.statements
+    """
+    counter = QueryCounter()
+    _query_counters.append(counter)
+    try:
+        yield counter
+    finally:
+        _query_counters.remove(counter)
+
+
+# ============================================
+# SQLITE INSTRUMENTERING
+# ============================================
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor der tilskriver tid brugt på at hente rækker til sit statement"""
+
+    _perf_sql = ''
+
+    def _timed(self, method, *args, executed=False):
+        stats = current_stats()
+        if stats is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats.record_time(self._perf_sql, time.perf_counter() - started, executed)
+
+    def execute(self, sql, parameters=()):
+        self._perf_sql = sql
+        # Triggers får trace callback til at gentage statementet - tæl det én gang
+        _trace_local.seen = set()
+        try:
+            return self._timed(super().execute, sql, parameters, executed=True)
+        finally:
+            _trace_local.seen = None
+
+    def executemany(self, sql, seq_of_parameters):
+        self._perf_sql = sql
+        return self._timed(super().executemany, sql, seq_of_parameters, executed=True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._timed(super().fetchmany)
+        return self._timed(super().fetchmany, size)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection der rapporterer til den aktive request.
+
+    Trace callback tæller alle statements (også dem fra executescript og
+    BEGIN/COMMIT); tiden måles omkring execute og fetch på cursoren.
+    Udenfor requests er overheaden ét thread-local opslag.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if current_stats() is not None or _query_counters:
+            self.set_trace_callback(_trace_statement)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        stats = current_stats()
+        if stats is None:
+            return super().executescript(sql_script)
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            stats.record_time(sql_script, time.perf_counter() - started, executed=True)
+
+    def commit(self):
+        stats = current_stats()
+        if stats is None:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            stats.record_time('COMMIT', time.perf_counter() - started)
+
+
+def _trace_statement(sql: str):
+    seen = getattr(_trace_local, 'seen', None)
+    if seen is not None:
+        if sql in seen:
+            return
+        seen.add(sql)
+    stats = current_stats()
+    if stats is not None:
+        stats.record_statement()
+    for counter in _query_counters:
+        counter.statements.append(sql)
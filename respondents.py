@@ -0,0 +1,128 @@
+"""
+Respondent-id på svar (responses.respondent_id)
+
+Alle svar fra én besvarelse får samme respondent_id. Survey-submit sætter
+et tilfældigt id (new_respondent_id) - det kan ikke føres tilbage til
+token eller person, så anonyme målinger forbliver anonyme.
+
+Skrivestier der ikke sætter id'et (ældre seed-scripts, dev-tools, import)
+får det tildelt af en trigger med samme heuristik som backfill af gamle
+data: svaret hører til den seneste besvarelse med samme måling, enhed,
+respondenttype og navn (eller minut for anonyme), medmindre den allerede
+har et svar på spørgsmålet - så starter en ny besvarelse.
+
+Dermed bliver per-respondent aggregering, anonymitetstærskler og radar-
+diagrammer til indekserede GROUP BY respondent_id i stedet for gæt på
+tidsstempler.
+"""
+import secrets
+import sqlite3
+
+LEGACY_PREFIX = 'legacy-'
+
+
+def new_respondent_id() -> str:
+    """Tilfældigt id til én besvarelse"""
+    return f"resp-{secrets.token_hex(8)}"
+
+
+def _legacy_key(ref: str) -> str:
+    """Hvem-nøgle for heuristikken: navn hvis kendt, ellers minuttet svaret kom ind"""
+    return (f"COALESCE(NULLIF({ref}.respondent_name, ''), "
+            f"strftime('%Y-%m-%d %H:%M', {ref}.created_at))")
+
+
+def init_respondent_ids(conn: sqlite3.Connection):
+    """
+    Opret respondent_id kolonne, index og trigger (sikkert at køre flere gange).
+
+    Eksisterende svar uden id får et første gang kolonnen tilføjes.
+    """
+    try:
+        conn.execute("ALTER TABLE responses ADD COLUMN respondent_id TEXT")
+        column_added = True
+    except sqlite3.OperationalError:
+        column_added = False  # Column already exists
+
+    # Per-respondent GROUP BY og "har besvarelsen allerede svaret på spørgsmålet"
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_responses_respondent
+        ON responses(assessment_id, respondent_id, question_id)
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS responses_respondent_id
+        AFTER INSERT ON responses
+        WHEN NEW.respondent_id IS NULL
+        BEGIN
+            UPDATE responses SET respondent_id = COALESCE((
+                SELECT CASE WHEN EXISTS (
+                           SELECT 1 FROM responses dup
+                           WHERE dup.assessment_id = NEW.assessment_id
+                             AND dup.respondent_id = prev.respondent_id
+                             AND dup.question_id = NEW.question_id
+                       ) THEN NULL ELSE prev.respondent_id END
+                FROM (
+                    SELECT p.respondent_id FROM responses p
+                    WHERE p.unit_id = NEW.unit_id
+                      AND p.assessment_id = NEW.assessment_id
+                      AND p.respondent_type IS NEW.respondent_type
+                      AND p.id < NEW.id
+                      AND {_legacy_key('p')} IS {_legacy_key('NEW')}
+                    ORDER BY p.id DESC LIMIT 1
+                ) prev
+            ), '{LEGACY_PREFIX}' || NEW.id)
+            WHERE id = NEW.id;
+        END
+    """)
+
+    if column_added:
+        rows = backfill_respondent_ids(conn)
+        if rows:
+            print(f"Migration: Tildelte respondent_id til {rows} svar")
+
+
+def backfill_respondent_ids(conn: sqlite3.Connection) -> int:
+    """
+    Tildel respondent_id til svar uden (heuristik for gamle data).
+
+    Inden for samme måling, enhed, respondenttype og navn/minut hører det
+    n'te svar på et spørgsmål til den n'te besvarelse. Id'et er
+    'legacy-' + første svars id, ligesom triggeren giver.
+
+    Returns:
+        Antal opdaterede svar
+    """
+    key = _legacy_key('r')
+    conn.execute("DROP TABLE IF EXISTS temp.respondent_backfill")
+    conn.execute("""
+        CREATE TEMP TABLE respondent_backfill (
+            id INTEGER PRIMARY KEY,
+            respondent_id TEXT NOT NULL
+        )
+    """)
+    conn.execute(f"""
+        INSERT INTO temp.respondent_backfill (id, respondent_id)
+        SELECT id, '{LEGACY_PREFIX}' || MIN(id) OVER (
+                   PARTITION BY assessment_id, unit_id, respondent_type, who, seq)
+        FROM (
+            SELECT r.id, r.assessment_id, r.unit_id,
+                   COALESCE(r.respondent_type, '') as respondent_type,
+                   {key} as who,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY r.assessment_id, r.unit_id, COALESCE(r.respondent_type, ''),
+                                    {key}, r.question_id
+                       ORDER BY r.id
+                   ) as seq
+            FROM responses r
+            WHERE r.respondent_id IS NULL
+        )
+    """)
+    updated = conn.execute("""
+        UPDATE responses SET respondent_id = (
+            SELECT b.respondent_id FROM temp.respondent_backfill b WHERE b.id = responses.id
+        )
+        WHERE respondent_id IS NULL
+    """).rowcount
+    conn.execute("DROP TABLE temp.respondent_backfill")
+    return updated
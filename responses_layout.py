@@ -0,0 +1,154 @@
+"""
+Lagringslayout for responses (standard eller dækkende)
+
+Analyse-queries læser svar per (måling, enhed, respondenttype) - men i
+rowid-tabellen ligger svarene i den rækkefølge de kom ind, så et opslag
+springer rundt i filen. Den dækkende layout lægger i stedet ét dækkende
+index på
+
+    (assessment_id, unit_id, respondent_type, question_id, respondent_id,
+     field, adjusted_score)
+
+Et SQLite-index er et b-træ sorteret på nøglen - i praksis en WITHOUT
+ROWID-kopi af de analytiske kolonner. Felt-gennemsnit, per-spørgsmål og
+per-respondent aggregering læser dermed sammenhængende sider uden at røre
+tabellen. Indexes der er præfiks af det dækkende (assessment_id, unit_id)
+og (…, field, adjusted_score) droppes, så layouten fylder mindre end
+standard.
+
+Selve tabellen forbliver en rowid-tabel: FTS-indekset bruger
+content_rowid='id', kommentarlister sorterer nyeste først på id, og flere
+skrivestier er afhængige af AUTOINCREMENT. Layouten hed tidligere
+'clustered'; et eksisterende idx_responses_clustered genkendes og omdøbes.
+
+Layouten skiftes online med set_responses_layout() eller
+
+    python responses_layout.py --layout covering [--db sti] [--vacuum]
+
+Nyt index oprettes før de gamle droppes, så queries altid har et index.
+init_db() genkender den aktive layout og genskaber kun dens indexes.
+"""
+import argparse
+import os
+import sqlite3
+from typing import Dict, Optional
+
+DEFAULT_LAYOUT = 'default'
+COVERING_LAYOUT = 'covering'
+
+COVERING_INDEX = 'idx_responses_covering'
+# Navnet før layouten hed 'covering'
+OLD_COVERING_INDEX = 'idx_responses_clustered'
+
+# Layout -> {index: kolonner}. Indexes der er fælles for begge layouts
+# (respondent, unit/assessment/type, kommentarer) oprettes andre steder.
+LAYOUT_INDEXES = {
+    DEFAULT_LAYOUT: {
+        'idx_responses_assessment_unit': '(assessment_id, unit_id)',
+        # Felt-gennemsnit som index-only scan (se adjusted_scores)
+        'idx_responses_adjusted': '(assessment_id, unit_id, respondent_type, field, adjusted_score)',
+    },
+    COVERING_LAYOUT: {
+        COVERING_INDEX: ('(assessment_id, unit_id, respondent_type, question_id, respondent_id, '
+                          'field, adjusted_score)'),
+    },
+}
+
+# Ældre migrationer oprettede (assessment_id) alene - præfiks af alle layouts
+LEGACY_INDEXES = ('idx_responses_assessment', OLD_COVERING_INDEX)
+
+
+def get_responses_layout(conn: sqlite3.Connection) -> str:
+    """Aktiv layout, aflæst af hvilke indexes der findes"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name IN (?, ?)",
+        (COVERING_INDEX, OLD_COVERING_INDEX)
+    ).fetchone()
+    return COVERING_LAYOUT if row else DEFAULT_LAYOUT
+
+
+def init_responses_layout(conn: sqlite3.Connection):
+    """Opret indexes for den aktive layout (sikkert at køre flere gange)"""
+    for name, columns in LAYOUT_INDEXES[get_responses_layout(conn)].items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON responses{columns}")
+    conn.execute(f"DROP INDEX IF EXISTS {OLD_COVERING_INDEX}")
+
+
+def set_responses_layout(layout: str, conn: Optional[sqlite3.Connection] = None) -> Dict:
+    """
+    Skift layout for responses-indexes.
+
+    Uden conn køres hvert trin i sin egen transaktion, så skrivelåsen kun
+    holdes mens ét index bygges/droppes, og læsere (WAL) ikke blokeres.
+
+    Returns:
+        {'layout', 'previous', 'created': [...], 'dropped': [...]}
+    """
+    if layout not in LAYOUT_INDEXES:
+        raise ValueError(f"Ukendt layout: {layout} (vælg {', '.join(LAYOUT_INDEXES)})")
+
+    if conn is None:
+        from db import get_db
+
+        def step(sql, params=()):
+            with get_db() as db_conn:
+                return db_conn.execute(sql, params).fetchall()
+    else:
+        def step(sql, params=()):
+            return conn.execute(sql, params).fetchall()
+
+    existing = {row[0] for row in step(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'responses'"
+    )}
+    previous = (COVERING_LAYOUT if existing & {COVERING_INDEX, OLD_COVERING_INDEX}
+                else DEFAULT_LAYOUT)
+
+    created = []
+    for name, columns in LAYOUT_INDEXES[layout].items():
+        if name not in existing:
+            step(f"CREATE INDEX IF NOT EXISTS {name} ON responses{columns}")
+            created.append(name)
+
+    obsolete = [name for other, indexes in LAYOUT_INDEXES.items() if other != layout
+                for name in indexes]
+    dropped = []
+    for name in obsolete + list(LEGACY_INDEXES):
+        if name in existing:
+            step(f"DROP INDEX IF EXISTS {name}")
+            dropped.append(name)
+
+    # Har databasen planner-statistik, skal de nye indexes også have det
+    if created and step("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"):
+        for name in created:
+            step(f"ANALYZE {name}")
+
+    return {'layout': layout, 'previous': previous, 'created': created, 'dropped': dropped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skift lagringslayout for responses")
+    parser.add_argument('--layout', choices=sorted(LAYOUT_INDEXES), required=True)
+    parser.add_argument('--db', help="Database (default: DB_PATH)")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="VACUUM bagefter for at frigive plads (låser databasen mens det kører)")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ['DB_PATH'] = args.db
+
+    result = set_responses_layout(args.layout)
+    print(f"Layout: {result['previous']} -> {result['layout']}")
+    for name in result['created']:
+        print(f"  Oprettet {name}")
+    for name in result['dropped']:
+        print(f"  Droppet {name}")
+
+    if args.vacuum:
+        from db import get_db
+        with get_db() as conn:
+            conn.execute("VACUUM")
+        print("  VACUUM færdig")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 Scheduler for Friktionskompasset
 Kører planlagte målinger automatisk
 GDPR Phase 2: Includes daily data retention cleanup
+Afstemmer statustællerne dagligt efter cleanup
 """
 import threading
 import time
@@ -165,6 +166,24 @@ def run_daily_cleanup():
         return None
 
 
+def run_counter_reconciliation():
+    """Afstem statustællerne (stats_counters) mod tabellerne og ret drift"""
+    try:
+        from stats_counters import reconcile_stats_counters
+
+        drift = reconcile_stats_counters()
+        if drift:
+            logger.warning("Corrected drifting status counters", extra={'extra_data': {
+                'count': len(drift),
+                'counters': drift[:20]
+            }})
+        return drift
+
+    except Exception as e:
+        logger.error("Error reconciling status counters", exc_info=True)
+        return None
+
+
 def should_run_cleanup() -> bool:
     """Check if cleanup should run today"""
     global _last_cleanup_date
@@ -207,11 +226,16 @@ def scheduler_loop():
             if current_time.hour == cleanup_hour and should_run_cleanup():
                 if not cleanup_checked_today:
                     run_daily_cleanup()
+                    run_counter_reconciliation()
                     cleanup_checked_today = True
             elif current_time.hour != cleanup_hour:
                 # Reset flag when we're past the cleanup hour
                 cleanup_checked_today = False
 
+            # Skriv opsamlede last_used_at for API keys
+            from db_multitenant import flush_api_key_usage
+            flush_api_key_usage()
+
         except Exception as e:
             logger.error("Error in scheduler loop", exc_info=True)
 
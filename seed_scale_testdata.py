@@ -0,0 +1,478 @@
+"""
+Skala-testdata: syntetiske kunder i produktionsstørrelse.
+
+Dette script:
+1. Opretter kunder med dybe organisationstræer (depth x fanout)
+2. Fordeler titusinder af medarbejdere (kontakter) på leaf-enhederne
+3. Opretter kvartalsvise målinger med tokens, email-logs og svar
+   (medarbejdere, leder-vurdering, leder-selvvurdering og kommentarer)
+
+Alt indsættes med executemany i få, store transaktioner, så millioner af
+svar-rækker tager minutter. Samme --seed giver præcis samme database.
+
+Brug:
+    python seed_scale_testdata.py --db /tmp/scale.db --profile large
+    python seed_scale_testdata.py --db /tmp/scale.db --customers 2 --employees 40000 --quarters 12
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from adjusted_scores import response_score_values
+
+
+# Størrelsesprofiler - bruges også af benchmark- og load-scripts
+SIZE_PROFILES = {
+    'small': {
+        'customers': 1, 'depth': 3, 'fanout': 4, 'employees': 800, 'quarters': 4,
+    },
+    'medium': {
+        'customers': 2, 'depth': 4, 'fanout': 5, 'employees': 5000, 'quarters': 6,
+    },
+    'large': {
+        'customers': 3, 'depth': 5, 'fanout': 5, 'employees': 25000, 'quarters': 8,
+    },
+}
+
+DEFAULT_OPTIONS = {
+    'seed': 42,
+    'customers': 1,
+    'depth': 4,
+    'fanout': 5,
+    'employees': 5000,
+    'quarters': 6,
+    'response_rate': 0.7,
+    'leader_response_rate': 0.9,
+    'comment_rate': 0.15,
+    'start_date': '2024-01-15',
+}
+
+# Produktionens spørgsmålssæt (24 spørgsmål, felterne MENING/TRYGHED/KAN/BESVÆR).
+# init_db() seeder kun et ældre 12-spørgsmåls fallback-sæt.
+SEED_QUESTIONS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed_database.db')
+
+# Tabeller hvis sekundære indexes droppes under indlæsning og genopbygges bagefter
+BULK_TABLES = ('responses', 'tokens', 'email_logs', 'contacts')
+
+BATCH_SIZE = 50000
+
+LEVEL_NAMES = ['Forvaltning', 'Område', 'Afdeling', 'Sektion', 'Team', 'Gruppe', 'Hold']
+
+FIRST_NAMES = ['Anne', 'Mette', 'Jens', 'Peter', 'Lise', 'Thomas', 'Susanne', 'Maria',
+               'Lars', 'Sofie', 'Michael', 'Anders', 'Katrine', 'Henrik', 'Louise', 'Pia']
+LAST_NAMES = ['Hansen', 'Nielsen', 'Jensen', 'Pedersen', 'Andersen', 'Christensen',
+              'Larsen', 'Sørensen', 'Rasmussen', 'Petersen', 'Madsen', 'Kristensen']
+
+SITUATION_PHRASES = [
+    'Vi mangler tid til at dokumentere ordentligt',
+    'Overleveringer mellem vagter går ofte tabt',
+    'Systemet er langsomt når vi skal registrere',
+    'Det er uklart hvem der beslutter hvad',
+    'Nye kolleger bliver ikke sat ordentligt ind i opgaverne',
+    'Møderne tager tid fra kerneopgaven',
+    'Vi får ikke svar når vi rejser problemer',
+    'Procedurerne passer ikke til hverdagen',
+]
+GENERAL_PHRASES = [
+    'Godt kollegaskab, men travlt',
+    'Ledelsen lytter, men der sker ikke så meget',
+    'Jeg er glad for mit arbejde',
+    'For mange registreringer',
+    'Bedre end sidste år',
+    'Vi har brug for flere hænder',
+]
+
+EMAIL_STATUSES = ['sent', 'delivered', 'opened', 'clicked', 'bounced']
+EMAIL_STATUS_WEIGHTS = [5, 40, 35, 18, 2]
+
+
+def _timestamp(value: datetime) -> str:
+    """Samme format som SQLite CURRENT_TIMESTAMP"""
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _prepare_connection(db_path: str) -> sqlite3.Connection:
+    """Åbn forbindelse tunet til bulk-indlæsning (ingen fsync, ingen journal)"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MB
+    conn.execute("PRAGMA foreign_keys=OFF")  # Data er konsistent per konstruktion
+    return conn
+
+
+def ensure_schema(db_path: str):
+    """Opret app-skemaet i databasen (tom database -> fuldt skema + spørgsmål)"""
+    # get_db() læser DB_PATH ved hvert kald - peg den midlertidigt på db_path.
+    # Før importen: db_hierarchical kører init_db() ved import og ville ellers
+    # oprette standard-databasen i arbejdsmappen.
+    previous = os.environ.get('DB_PATH')
+    os.environ['DB_PATH'] = db_path
+    try:
+        from db_hierarchical import init_db
+        from db_profil import init_profil_tables
+        from db_multitenant import init_multitenant_db
+
+        # Samme rækkefølge som create_app() (audit.py har sin egen faste DB-sti)
+        init_db()
+        init_profil_tables()
+        init_multitenant_db()
+    finally:
+        if previous is None:
+            del os.environ['DB_PATH']
+        else:
+            os.environ['DB_PATH'] = previous
+
+
+def _install_questions(conn, source: str = SEED_QUESTIONS_DB) -> bool:
+    """
+    Erstat fallback-spørgsmålene med produktionens sæt fra seed-databasen.
+    Kun i en database uden svar; returnerer True hvis spørgsmålene blev skiftet.
+    """
+    if not os.path.exists(source):
+        return False
+    if conn.execute("SELECT 1 FROM responses LIMIT 1").fetchone():
+        return False
+
+    target_columns = {row['name'] for row in conn.execute("PRAGMA table_info(questions)")}
+    src = sqlite3.connect(source)
+    src.row_factory = sqlite3.Row
+    try:
+        source_columns = [row['name'] for row in src.execute("PRAGMA table_info(questions)")]
+        columns = [c for c in source_columns if c in target_columns]
+        rows = src.execute(f"SELECT {', '.join(columns)} FROM questions").fetchall()
+    finally:
+        src.close()
+    if not rows:
+        return False
+
+    conn.execute("DELETE FROM questions")
+    conn.executemany(
+        f"INSERT INTO questions ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [tuple(row) for row in rows]
+    )
+    return True
+
+
+def _drop_secondary_indexes(conn) -> List[str]:
+    """Drop indexes på bulk-tabellerne og returnér deres CREATE-statements"""
+    placeholders = ','.join('?' * len(BULK_TABLES))
+    rows = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, BULK_TABLES).fetchall()
+    for row in rows:
+        conn.execute(f"DROP INDEX IF EXISTS {row['name']}")
+    return [row['sql'] for row in rows]
+
+
+def _insert_batched(conn, sql: str, rows, batch_size: int = BATCH_SIZE) -> int:
+    """executemany i batches så hukommelsesforbruget holdes nede"""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+def _build_tree(rng: random.Random, customer_id: str, customer_name: str, prefix: str,
+                depth: int, fanout: int) -> List[Dict]:
+    """
+    Byg et fuldt træ med depth niveauer. Fanout varierer ±1 per node for at
+    undgå perfekt symmetriske træer.
+    """
+    units = []
+    counter = [0]
+
+    def add(name, parent, level):
+        counter[0] += 1
+        unit_id = f"unit-{prefix}-{counter[0]:06d}"
+        full_path = f"{parent['full_path']}//{name}" if parent else name
+        unit = {
+            'id': unit_id,
+            'parent_id': parent['id'] if parent else None,
+            'name': name,
+            'full_path': full_path,
+            'level': level,
+            'customer_id': customer_id,
+            'children': 0,
+        }
+        if parent:
+            parent['children'] += 1
+        units.append(unit)
+        return unit
+
+    level_nodes = [add(customer_name, None, 0)]
+    for level in range(1, depth):
+        next_nodes = []
+        label = LEVEL_NAMES[min(level - 1, len(LEVEL_NAMES) - 1)]
+        for parent in level_nodes:
+            children = max(1, fanout + rng.randint(-1, 1))
+            for i in range(children):
+                next_nodes.append(add(f"{label} {parent['name'].split()[-1]}.{i + 1}"
+                                      if level > 1 else f"{label} {i + 1}", parent, level))
+        level_nodes = next_nodes
+
+    return units
+
+
+def _random_name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _comment(rng: random.Random) -> str:
+    """Kommentar i samme format som survey_submit gemmer"""
+    parts = []
+    if rng.random() < 0.8:
+        parts.append(f"SITUATION: {rng.choice(SITUATION_PHRASES)}")
+    if not parts or rng.random() < 0.5:
+        parts.append(f"GENERELT: {rng.choice(GENERAL_PHRASES)}")
+    return "\n\n".join(parts)
+
+
+def _score(rng: random.Random, base: float, reverse: int) -> int:
+    """Score 1-7 omkring base; reverse-scorede spørgsmål spejles"""
+    score = max(1, min(7, int(round(rng.gauss(base, 1.0)))))
+    return 8 - score if reverse else score
+
+
+def _generate_customer(conn, rng: random.Random, options: Dict, index: int,
+                       questions: List[Dict], progress) -> Dict:
+    """Generér én kunde med træ, kontakter, målinger, tokens, email-logs og svar"""
+    seed = options['seed']
+    prefix = f"s{seed}c{index + 1}"
+    customer_id = f"cust-scale-{prefix}"
+    customer_name = f"Skalakommune {index + 1}"
+
+    conn.execute("INSERT INTO customers (id, name, contact_email) VALUES (?, ?, ?)",
+                 (customer_id, customer_name, f"hr@skala{index + 1}.example"))
+
+    units = _build_tree(rng, customer_id, customer_name, prefix,
+                        options['depth'], options['fanout'])
+    leaves = [u for u in units if u['children'] == 0]
+
+    # Fordel medarbejdere på leaves (varierende teamstørrelse)
+    weights = [rng.uniform(0.5, 1.5) for _ in leaves]
+    weight_sum = sum(weights)
+    for unit, weight in zip(leaves, weights):
+        unit['employee_count'] = max(1, int(options['employees'] * weight / weight_sum))
+        unit['leader_name'] = _random_name(rng)
+        unit['leader_email'] = f"leder.{unit['id']}@skala{index + 1}.example"
+        # Team-profil: basisscore per felt
+        unit['profile'] = {field: rng.uniform(2.8, 5.8) for field in
+                           {q['field'] for q in questions}}
+
+    conn.executemany("""
+        INSERT INTO organizational_units
+        (id, parent_id, name, full_path, level, leader_name, leader_email,
+         employee_count, customer_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(u['id'], u['parent_id'], u['name'], u['full_path'], u['level'],
+           u.get('leader_name'), u.get('leader_email'), u.get('employee_count', 0),
+           customer_id) for u in units])
+
+    def contact_rows():
+        for unit in leaves:
+            for n in range(unit['employee_count']):
+                yield (unit['id'], f"medarbejder{n + 1}.{unit['id']}@skala{index + 1}.example")
+
+    contacts = _insert_batched(conn, "INSERT INTO contacts (unit_id, email) VALUES (?, ?)",
+                               contact_rows())
+    conn.commit()
+
+    stats = {'units': len(units), 'leaf_units': len(leaves), 'contacts': contacts,
+             'assessments': 0, 'tokens': 0, 'responses': 0, 'comments': 0, 'email_logs': 0}
+
+    start = datetime.strptime(options['start_date'], '%Y-%m-%d')
+    root = units[0]
+
+    for quarter in range(options['quarters']):
+        sent_at = start + timedelta(days=91 * quarter)
+        period = f"Q{(sent_at.month - 1) // 3 + 1} {sent_at.year}"
+        assessment_id = f"assess-{prefix}-q{quarter + 1:02d}"
+        drift = quarter * rng.uniform(-0.05, 0.12)
+
+        conn.execute("""
+            INSERT INTO assessments
+            (id, target_unit_id, name, period, sent_at, created_at, status,
+             include_leader_assessment, include_leader_self)
+            VALUES (?, ?, ?, ?, ?, ?, 'sent', 1, 1)
+        """, (assessment_id, root['id'], f"{customer_name} - {period}", period,
+              _timestamp(sent_at), _timestamp(sent_at)))
+        stats['assessments'] += 1
+
+        tokens, email_logs, responses = [], [], []
+
+        for unit in leaves:
+            invitations = [('employee', None, f"medarbejder{n + 1}.{unit['id']}@skala{index + 1}.example")
+                           for n in range(unit['employee_count'])]
+            invitations += [('leader_assess', unit['leader_name'], unit['leader_email']),
+                            ('leader_self', unit['leader_name'], unit['leader_email'])]
+
+            for respondent_type, respondent_name, email in invitations:
+                token = format(rng.getrandbits(128), '032x')
+                rate = options['response_rate'] if respondent_type == 'employee' \
+                    else options['leader_response_rate']
+                answered = rng.random() < rate
+                answered_at = sent_at + timedelta(minutes=rng.randint(10, 14 * 24 * 60))
+
+                tokens.append((token, assessment_id, unit['id'], respondent_type, respondent_name,
+                               1 if answered else 0, _timestamp(answered_at) if answered else None,
+                               _timestamp(sent_at)))
+
+                status = rng.choices(EMAIL_STATUSES, EMAIL_STATUS_WEIGHTS)[0]
+                email_logs.append((f"msg-{token[:16]}", email, f"Friktionsmåling {period}",
+                                   'invitation', status, assessment_id, token, _timestamp(sent_at)))
+                if not answered and status != 'bounced':
+                    reminder_at = sent_at + timedelta(days=7)
+                    email_logs.append((f"msg-{token[16:]}", email, f"Påmindelse: Friktionsmåling {period}",
+                                       'reminder', 'delivered', assessment_id, token,
+                                       _timestamp(reminder_at)))
+
+                if not answered:
+                    continue
+
+                offset = 0.4 if respondent_type != 'employee' else 0.0
+                comment = _comment(rng) if respondent_type == 'employee' and \
+                    rng.random() < options['comment_rate'] else None
+                if comment:
+                    stats['comments'] += 1
+                created_at = _timestamp(answered_at)
+                respondent_id = f"resp-{prefix}-q{quarter + 1:02d}-{len(tokens):06d}"
+                for i, q in enumerate(questions):
+                    base = unit['profile'][q['field']] + drift + offset
+                    score = _score(rng, base, q['reverse_scored'])
+                    values = response_score_values(q, score)
+                    responses.append((assessment_id, unit['id'], q['id'], score,
+                                      values['adjusted_score'], values['field'], values['layer'],
+                                      comment if i == 0 else None,
+                                      respondent_type, respondent_name, respondent_id, created_at))
+
+        stats['tokens'] += _insert_batched(conn, """
+            INSERT INTO tokens (token, assessment_id, unit_id, respondent_type, respondent_name,
+                                is_used, used_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, tokens)
+        stats['email_logs'] += _insert_batched(conn, """
+            INSERT INTO email_logs (message_id, to_email, subject, email_type, status,
+                                    assessment_id, token, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, email_logs)
+        stats['responses'] += _insert_batched(conn, """
+            INSERT INTO responses (assessment_id, unit_id, question_id, score,
+                                   adjusted_score, field, layer, comment,
+                                   respondent_type, respondent_name, respondent_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, responses)
+        conn.commit()
+
+        progress(f"  {customer_name} {period}: {len(tokens)} tokens, {len(responses)} svar")
+
+    return stats
+
+
+def generate_scale_dataset(db_path: str, options: Optional[Dict] = None,
+                           verbose: bool = True) -> Dict:
+    """
+    Generér et syntetisk datasæt i db_path.
+
+    Args:
+        db_path: Sti til SQLite databasen (oprettes hvis den ikke findes)
+        options: Overskriv DEFAULT_OPTIONS (customers, depth, fanout, employees,
+                 quarters, response_rate, leader_response_rate, comment_rate,
+                 start_date, seed)
+        verbose: Skriv fremdrift til stdout
+
+    Returns:
+        Dict med antal oprettede rækker per type og samlet tid
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    progress = print if verbose else (lambda *args: None)
+    started = time.time()
+
+    ensure_schema(db_path)
+
+    rng = random.Random(options['seed'])
+    conn = _prepare_connection(db_path)
+    try:
+        _install_questions(conn)
+        questions = [dict(row) for row in conn.execute("""
+            SELECT id, field, reverse_scored, sequence FROM questions
+            WHERE is_default = 1 AND field IS NOT NULL
+            ORDER BY sequence
+        """)]
+        if not questions:
+            raise ValueError("Ingen spørgsmål i databasen - kør init_db() først")
+
+        index_sql = _drop_secondary_indexes(conn)
+        conn.commit()
+
+        totals: Dict[str, int] = {}
+        for index in range(options['customers']):
+            progress(f"Kunde {index + 1}/{options['customers']}")
+            stats = _generate_customer(conn, rng, options, index, questions, progress)
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+
+        progress("Genopbygger indexes...")
+        for sql in index_sql:
+            conn.execute(sql)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    totals['seconds'] = round(time.time() - started, 1)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generér syntetiske skala-testdata")
+    parser.add_argument('--db', default=os.environ.get('DB_PATH', 'scale_testdata.db'),
+                        help="Database-fil (default: $DB_PATH eller scale_testdata.db)")
+    parser.add_argument('--profile', choices=sorted(SIZE_PROFILES),
+                        help="Foruddefineret størrelse (enkelte værdier kan overskrives)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--customers', type=int)
+    parser.add_argument('--depth', type=int, help="Antal niveauer i organisationstræet")
+    parser.add_argument('--fanout', type=int, help="Gennemsnitligt antal børn per enhed")
+    parser.add_argument('--employees', type=int, help="Medarbejdere per kunde")
+    parser.add_argument('--quarters', type=int, help="Kvartalsvise målinger per kunde")
+    parser.add_argument('--response-rate', type=float)
+    parser.add_argument('--comment-rate', type=float)
+    parser.add_argument('--start-date', help="Dato for første måling (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    options = dict(SIZE_PROFILES[args.profile]) if args.profile else {}
+    for key in DEFAULT_OPTIONS:
+        value = getattr(args, key, None)
+        if value is not None:
+            options[key] = value
+
+    print("=" * 60)
+    print(f"SKALA-TESTDATA -> {args.db}")
+    print("=" * 60)
+
+    totals = generate_scale_dataset(args.db, options)
+
+    print("-" * 60)
+    for key, value in totals.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Vedligeholdte tællere til statussider (stats_counters)
+
+Nøgletal, /admin/backup, /admin/db-status, /api/admin/status og MCP
+db_status viser antal kunder, enheder, målinger, svar, respondenter og
+tokens. I stedet for COUNT(*) over hele tabellerne ved hver visning holdes
+én række per (scope, navn):
+
+    scope = ''           globale tal
+    scope = customer_id  tal for én kunde
+
+Triggers på tabellerne holder tallene opdateret for alle skrivestier.
+Kundens tal findes via målingens target-enhed (som nøgletal altid har gjort).
+
+Ved cascade-sletninger er forælderen væk når børnenes triggers kører, så
+kunde-opslaget giver NULL. Derfor trækker forælderens BEFORE DELETE trigger
+hele undertræets tal fra kunden, og børnenes triggers opdaterer kun kunden
+når opslaget stadig lykkes. Globale tal opdateres altid af børnene selv.
+
+reconcile_stats_counters() genberegner alt fra tabellerne og retter drift
+(fx efter ændringer med foreign_keys slået fra). Den køres natligt af
+scheduleren og kan kaldes via /api/admin/reconcile-counters.
+"""
+import sqlite3
+from typing import Dict, List, Optional
+
+from assessment_scores import QUESTION_COUNTS_TABLE
+from tenant_db import CATALOG_ALIAS
+
+COUNTERS_TABLE = 'stats_counters'
+GLOBAL_SCOPE = ''
+
+# Tællere der vedligeholdes globalt og per kunde
+CUSTOMER_COUNTERS = ('users', 'units', 'assessments', 'responses', 'respondents',
+                     'tokens_sent', 'tokens_used')
+# Tællere der kun giver mening globalt
+GLOBAL_COUNTERS = ('customers', 'contacts') + CUSTOMER_COUNTERS
+
+
+# ========================================
+# SKEMA OG TRIGGERS
+# ========================================
+
+def _bump(name: str, scope: str, delta: str) -> str:
+    """Statement der lægger delta til tælleren name i scope (springes over hvis scope er NULL)"""
+    return f"""
+        INSERT INTO {COUNTERS_TABLE} (scope, name, value)
+        SELECT scope, '{name}', delta FROM (SELECT {scope} as scope, {delta} as delta)
+        WHERE scope IS NOT NULL AND delta != 0
+        ON CONFLICT (scope, name) DO UPDATE SET value = value + excluded.value;
+    """
+
+
+def _unit_customer(unit_ref: str) -> str:
+    return f"(SELECT ou.customer_id FROM organizational_units ou WHERE ou.id = {unit_ref})"
+
+
+def _assessment_customer(assessment_ref: str) -> str:
+    return (f"(SELECT ou.customer_id FROM assessments a "
+            f"JOIN organizational_units ou ON ou.id = a.target_unit_id "
+            f"WHERE a.id = {assessment_ref})")
+
+
+def _respondents_delta(new: Optional[str], old: Optional[str], ref: str) -> str:
+    """
+    Ændring i antal respondenter for én (måling, enhed, respondenttype).
+
+    Respondenter = flest svar på ét spørgsmål. Når ét spørgsmåls antal
+    ændres fra old til new, ændres maksimum med MAX(new, andre) - MAX(old, andre).
+    """
+    others = (f"COALESCE((SELECT MAX(sq.answer_count) FROM {QUESTION_COUNTS_TABLE} sq "
+              f"WHERE sq.assessment_id = {ref}.assessment_id AND sq.unit_id = {ref}.unit_id "
+              f"AND sq.respondent_type = {ref}.respondent_type "
+              f"AND sq.question_id != {ref}.question_id), 0)")
+    new_max = f"MAX({new}, {others})" if new else others
+    old_max = f"MAX({old}, {others})" if old else others
+    return f"({new_max} - {old_max})"
+
+
+def _assessment_totals(where: str) -> Dict[str, str]:
+    """Subqueries med svar/respondenter/tokens for målingerne der matcher where (alias a)"""
+    return {
+        'responses': f"""(SELECT COUNT(*) FROM responses r
+                          JOIN assessments a ON a.id = r.assessment_id WHERE {where})""",
+        'respondents': f"""(SELECT COALESCE(SUM(slice_max), 0) FROM (
+                               SELECT MAX(sq.answer_count) as slice_max
+                               FROM {QUESTION_COUNTS_TABLE} sq
+                               JOIN assessments a ON a.id = sq.assessment_id
+                               WHERE {where}
+                               GROUP BY sq.assessment_id, sq.unit_id, sq.respondent_type))""",
+        'tokens_sent': f"""(SELECT COUNT(*) FROM tokens t
+                            JOIN assessments a ON a.id = t.assessment_id WHERE {where})""",
+        'tokens_used': f"""(SELECT COUNT(*) FROM tokens t
+                            JOIN assessments a ON a.id = t.assessment_id
+                            WHERE {where} AND t.is_used = 1)""",
+    }
+
+
+def _unit_subtree_sql(unit_ref: str, old_scope: Optional[str], new_scope: Optional[str]) -> str:
+    """Flyt en enheds egne tal (enheden + målinger rettet mod den) fra old_scope til new_scope"""
+    totals = {'units': '1',
+              'assessments': f"(SELECT COUNT(*) FROM assessments a WHERE a.target_unit_id = {unit_ref})"}
+    totals.update(_assessment_totals(f"a.target_unit_id = {unit_ref}"))
+    statements = []
+    for name, total in totals.items():
+        if old_scope:
+            statements.append(_bump(name, old_scope, f"-{total}"))
+        if new_scope:
+            statements.append(_bump(name, new_scope, total))
+    return ''.join(statements)
+
+
+def _trigger_definitions() -> Dict[str, str]:
+    """Trigger-navn -> CREATE TRIGGER statement"""
+    g = f"'{GLOBAL_SCOPE}'"
+    customer_of_new_assessment = _assessment_customer('NEW.assessment_id')
+    customer_of_old_assessment = _assessment_customer('OLD.assessment_id')
+
+    return {
+        # Kunder: kun globalt. Kundens egne rækker fjernes når kunden slettes
+        # (AFTER DELETE kører efter cascade-sletningerne).
+        'stats_customers_ai': f"""
+            AFTER INSERT ON customers BEGIN {_bump('customers', g, '1')} END""",
+        'stats_customers_ad': f"""
+            AFTER DELETE ON customers BEGIN
+                {_bump('customers', g, '-1')}
+                DELETE FROM {COUNTERS_TABLE} WHERE scope = OLD.id;
+            END""",
+
+        'stats_users_ai': f"""
+            AFTER INSERT ON users BEGIN
+                {_bump('users', g, '1')}
+                {_bump('users', 'NEW.customer_id', '1')}
+            END""",
+        'stats_users_ad': f"""
+            AFTER DELETE ON users BEGIN
+                {_bump('users', g, '-1')}
+                {_bump('users', 'OLD.customer_id', '-1')}
+            END""",
+        'stats_users_au': f"""
+            AFTER UPDATE OF customer_id ON users
+            WHEN OLD.customer_id IS NOT NEW.customer_id BEGIN
+                {_bump('users', 'OLD.customer_id', '-1')}
+                {_bump('users', 'NEW.customer_id', '1')}
+            END""",
+
+        # Enheder har customer_id selv. Ved sletning trækkes målinger rettet
+        # mod enheden (og deres svar/tokens) fra kunden mens de kan slås op.
+        'stats_units_ai': f"""
+            AFTER INSERT ON organizational_units BEGIN
+                {_bump('units', g, '1')}
+                {_bump('units', 'NEW.customer_id', '1')}
+            END""",
+        'stats_units_bd': f"""
+            BEFORE DELETE ON organizational_units BEGIN
+                {_unit_subtree_sql('OLD.id', 'OLD.customer_id', None)}
+            END""",
+        'stats_units_ad': f"""
+            AFTER DELETE ON organizational_units BEGIN {_bump('units', g, '-1')} END""",
+        'stats_units_au': f"""
+            AFTER UPDATE OF customer_id ON organizational_units
+            WHEN OLD.customer_id IS NOT NEW.customer_id BEGIN
+                {_unit_subtree_sql('NEW.id', 'OLD.customer_id', 'NEW.customer_id')}
+            END""",
+
+        'stats_assessments_ai': f"""
+            AFTER INSERT ON assessments BEGIN
+                {_bump('assessments', g, '1')}
+                {_bump('assessments', _unit_customer('NEW.target_unit_id'), '1')}
+            END""",
+        'stats_assessments_bd': f"""
+            BEFORE DELETE ON assessments BEGIN
+                {''.join(_bump(name, _unit_customer('OLD.target_unit_id'), f'-{total}')
+                         for name, total in _assessment_totals('a.id = OLD.id').items())}
+            END""",
+        'stats_assessments_ad': f"""
+            AFTER DELETE ON assessments BEGIN
+                {_bump('assessments', g, '-1')}
+                {_bump('assessments', _unit_customer('OLD.target_unit_id'), '-1')}
+            END""",
+
+        'stats_responses_ai': f"""
+            AFTER INSERT ON responses BEGIN
+                {_bump('responses', g, '1')}
+                {_bump('responses', customer_of_new_assessment, '1')}
+            END""",
+        'stats_responses_ad': f"""
+            AFTER DELETE ON responses BEGIN
+                {_bump('responses', g, '-1')}
+                {_bump('responses', customer_of_old_assessment, '-1')}
+            END""",
+
+        # Respondenter følger svar-antal per spørgsmål (vedligeholdt af assessment_scores)
+        'stats_respondents_ai': f"""
+            AFTER INSERT ON {QUESTION_COUNTS_TABLE} BEGIN
+                {_bump('respondents', g, _respondents_delta('NEW.answer_count', None, 'NEW'))}
+                {_bump('respondents', customer_of_new_assessment,
+                       _respondents_delta('NEW.answer_count', None, 'NEW'))}
+            END""",
+        'stats_respondents_au': f"""
+            AFTER UPDATE OF answer_count ON {QUESTION_COUNTS_TABLE} BEGIN
+                {_bump('respondents', g,
+                       _respondents_delta('NEW.answer_count', 'OLD.answer_count', 'NEW'))}
+                {_bump('respondents', customer_of_new_assessment,
+                       _respondents_delta('NEW.answer_count', 'OLD.answer_count', 'NEW'))}
+            END""",
+        'stats_respondents_ad': f"""
+            AFTER DELETE ON {QUESTION_COUNTS_TABLE} BEGIN
+                {_bump('respondents', g, _respondents_delta(None, 'OLD.answer_count', 'OLD'))}
+                {_bump('respondents', customer_of_old_assessment,
+                       _respondents_delta(None, 'OLD.answer_count', 'OLD'))}
+            END""",
+
+        'stats_tokens_ai': f"""
+            AFTER INSERT ON tokens BEGIN
+                {_bump('tokens_sent', g, '1')}
+                {_bump('tokens_sent', customer_of_new_assessment, '1')}
+                {_bump('tokens_used', g, 'COALESCE(NEW.is_used, 0) = 1')}
+                {_bump('tokens_used', customer_of_new_assessment, 'COALESCE(NEW.is_used, 0) = 1')}
+            END""",
+        'stats_tokens_ad': f"""
+            AFTER DELETE ON tokens BEGIN
+                {_bump('tokens_sent', g, '-1')}
+                {_bump('tokens_sent', customer_of_old_assessment, '-1')}
+                {_bump('tokens_used', g, '-(COALESCE(OLD.is_used, 0) = 1)')}
+                {_bump('tokens_used', customer_of_old_assessment, '-(COALESCE(OLD.is_used, 0) = 1)')}
+            END""",
+        'stats_tokens_au': f"""
+            AFTER UPDATE OF is_used ON tokens BEGIN
+                {_bump('tokens_used', g,
+                       '(COALESCE(NEW.is_used, 0) = 1) - (COALESCE(OLD.is_used, 0) = 1)')}
+                {_bump('tokens_used', customer_of_new_assessment,
+                       '(COALESCE(NEW.is_used, 0) = 1) - (COALESCE(OLD.is_used, 0) = 1)')}
+            END""",
+
+        'stats_contacts_ai': f"""
+            AFTER INSERT ON contacts BEGIN {_bump('contacts', g, '1')} END""",
+        'stats_contacts_ad': f"""
+            AFTER DELETE ON contacts BEGIN {_bump('contacts', g, '-1')} END""",
+    }
+
+
+def init_stats_counters(conn: sqlite3.Connection):
+    """
+    Opret tæller-tabel og triggers (sikkert at køre flere gange).
+
+    Kræver at organizational_units.customer_id og assessment_scores findes.
+    Første gang tabellen oprettes fyldes den fra eksisterende data.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (COUNTERS_TABLE,)
+    ).fetchone()
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+            scope TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, name)
+        ) WITHOUT ROWID
+    """)
+
+    for trigger_name, definition in _trigger_definitions().items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {definition}")
+
+    if not exists:
+        drift = reconcile_stats_counters(conn)
+        if drift:
+            print(f"Migration: Beregnede {len(drift)} tællere i {COUNTERS_TABLE}")
+
+
+# ========================================
+# LÆSNING OG AFSTEMNING
+# ========================================
+
+def get_counters(conn: sqlite3.Connection, customer_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Hent tællere for én kunde eller globalt (ét opslag på primærnøglen).
+
+    Returns:
+        Dict med alle tællernavne; manglende tællere er 0
+    """
+    scope = customer_id or GLOBAL_SCOPE
+    names = CUSTOMER_COUNTERS if customer_id else GLOBAL_COUNTERS
+    counters = {name: 0 for name in names}
+    for row in conn.execute(
+        f"SELECT name, value FROM {COUNTERS_TABLE} WHERE scope = ?", (scope,)
+    ).fetchall():
+        if row[0] in counters:
+            counters[row[0]] = row[1]
+    # Brugere ligger i kataloget, også når kunden har egen database (tenant_db)
+    if customer_id and getattr(conn, 'tenant_id', None):
+        row = conn.execute(
+            f"SELECT value FROM {CATALOG_ALIAS}.{COUNTERS_TABLE} WHERE scope = ? AND name = 'users'",
+            (scope,)
+        ).fetchone()
+        counters['users'] = row[0] if row else 0
+    return counters
+
+
+def counter_sql(name: str, alias: str = 'sc') -> str:
+    """
+    Én tæller som kolonne når stats_counters joines per kunde, fx
+
+        SELECT cust.id, counter_sql('units') as unit_count
+        FROM customers cust LEFT JOIN stats_counters sc ON sc.scope = cust.id
+        GROUP BY cust.id
+    """
+    return f"COALESCE(MAX(CASE WHEN {alias}.name = '{name}' THEN {alias}.value END), 0)"
+
+
+def _actual_counters(conn: sqlite3.Connection) -> Dict[tuple, int]:
+    """Genberegn alle tællere direkte fra tabellerne: {(scope, navn): værdi}"""
+    actual = {}
+    g = GLOBAL_SCOPE
+
+    for name, table in (('customers', 'customers'), ('users', 'users'),
+                        ('units', 'organizational_units'), ('assessments', 'assessments'),
+                        ('responses', 'responses'), ('tokens_sent', 'tokens'),
+                        ('contacts', 'contacts')):
+        actual[(g, name)] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    actual[(g, 'tokens_used')] = conn.execute(
+        "SELECT COUNT(*) FROM tokens WHERE is_used = 1"
+    ).fetchone()[0]
+    actual[(g, 'respondents')] = conn.execute(f"""
+        SELECT COALESCE(SUM(slice_max), 0) FROM (
+            SELECT MAX(answer_count) as slice_max FROM {QUESTION_COUNTS_TABLE}
+            GROUP BY assessment_id, unit_id, respondent_type
+        )
+    """).fetchone()[0]
+
+    per_customer = {
+        'users': "SELECT customer_id, COUNT(*) FROM users GROUP BY customer_id",
+        'units': "SELECT customer_id, COUNT(*) FROM organizational_units GROUP BY customer_id",
+        'assessments': """
+            SELECT ou.customer_id, COUNT(*) FROM assessments a
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            GROUP BY ou.customer_id
+        """,
+        'responses': """
+            SELECT ou.customer_id, COUNT(*) FROM responses r
+            JOIN assessments a ON a.id = r.assessment_id
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            GROUP BY ou.customer_id
+        """,
+        'respondents': f"""
+            SELECT ou.customer_id, SUM(slice_max) FROM (
+                SELECT assessment_id, MAX(answer_count) as slice_max
+                FROM {QUESTION_COUNTS_TABLE}
+                GROUP BY assessment_id, unit_id, respondent_type
+            ) s
+            JOIN assessments a ON a.id = s.assessment_id
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            GROUP BY ou.customer_id
+        """,
+        'tokens_sent': """
+            SELECT ou.customer_id, COUNT(*) FROM tokens t
+            JOIN assessments a ON a.id = t.assessment_id
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            GROUP BY ou.customer_id
+        """,
+        'tokens_used': """
+            SELECT ou.customer_id, COUNT(*) FROM tokens t
+            JOIN assessments a ON a.id = t.assessment_id
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            WHERE t.is_used = 1
+            GROUP BY ou.customer_id
+        """,
+    }
+    for name, query in per_customer.items():
+        for customer_id, value in conn.execute(query).fetchall():
+            if customer_id is not None:
+                actual[(customer_id, name)] = value
+
+    return actual
+
+
+def reconcile_stats_counters(conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    Afstem tællerne mod tabellerne og ret afvigelser.
+
+    Tæller og retter i samme skrive-transaktion, så samtidige svar ikke
+    kan snige sig ind imellem.
+
+    Returns:
+        Liste af rettede tællere: {'scope', 'name', 'stored', 'actual'}
+    """
+    if conn is None:
+        from db import get_db
+        with get_db() as db_conn:
+            return reconcile_stats_counters(db_conn)
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+    actual = _actual_counters(conn)
+    stored = {(row[0], row[1]): row[2] for row in conn.execute(
+        f"SELECT scope, name, value FROM {COUNTERS_TABLE}"
+    ).fetchall()}
+
+    drift = []
+    for key in sorted(set(actual) | set(stored)):
+        actual_value = actual.get(key, 0)
+        stored_value = stored.get(key)
+        if stored_value == actual_value:
+            continue
+        if stored_value is None and actual_value == 0:
+            continue
+        scope, name = key
+        drift.append({'scope': scope, 'name': name,
+                      'stored': stored_value, 'actual': actual_value})
+        if actual_value == 0 and scope != GLOBAL_SCOPE:
+            conn.execute(f"DELETE FROM {COUNTERS_TABLE} WHERE scope = ? AND name = ?", key)
+        else:
+            conn.execute(f"""
+                INSERT INTO {COUNTERS_TABLE} (scope, name, value) VALUES (?, ?, ?)
+                ON CONFLICT (scope, name) DO UPDATE SET value = excluded.value
+            """, (scope, name, actual_value))
+
+    return drift
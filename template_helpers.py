@@ -5,7 +5,14 @@ These functions are used both in Jinja2 templates (via context processor)
 and in Python code for consistent score formatting.
 
 OPDATERET TIL 7-POINT SKALA (2025-12-22)
+
+Indeholder også url_for med fingerprint på statiske filer (se nederst).
 """
+import hashlib
+import os
+import re
+from threading import Lock
+from typing import Dict, Tuple
 
 
 def get_score_class(score):
@@ -63,3 +70,110 @@ def to_percent(score):
         return 0
     # Convert 1-7 scale to percent
     return (score / 7) * 100
+
+
+# ========================================
+# STATISKE FILER MED FINGERPRINT
+# ========================================
+#
+# Ved opstart hashes alle filer i static/ til et manifest:
+#     'css/components.css' -> 'css/components.3f2a9c1b7d.css'
+# url_for('static', filename=...) giver den fingerprintede sti, og
+# serve_static() leverer den med "immutable" cache-headers - ny fil-indhold
+# giver en ny URL, så browseren aldrig behøver at revalidere.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_CACHE_CONTROL = f'public, max-age={ASSET_MAX_AGE}, immutable'
+# Ikke-fingerprintede filer (og gamle fingerprints efter deploy)
+PLAIN_STATIC_MAX_AGE = 3600
+
+_FINGERPRINT_RE = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{10})(?P<ext>\.[^./]+)$')
+
+# static-mappe -> (manifest, omvendt manifest)
+_manifests: Dict[str, Tuple[Dict[str, str], Dict[str, str]]] = {}
+_manifest_lock = Lock()
+
+
+def _fingerprinted_name(filename: str, digest: str) -> str:
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{digest[:10]}{ext}" if ext else f"{filename}.{digest[:10]}"
+
+
+def build_asset_manifest(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    """Hash alle filer i static_dir: relativ sti -> fingerprintet sti"""
+    manifest = {}
+    for root, _, files in os.walk(static_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            manifest[filename] = _fingerprinted_name(filename, digest)
+    return manifest
+
+
+def get_asset_manifest(static_dir: str = STATIC_DIR) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """(manifest, omvendt manifest) - bygges første gang og genbruges i processen"""
+    with _manifest_lock:
+        if static_dir not in _manifests:
+            manifest = build_asset_manifest(static_dir)
+            _manifests[static_dir] = (manifest, {v: k for k, v in manifest.items()})
+        return _manifests[static_dir]
+
+
+def clear_asset_manifest():
+    """Glem manifestet (fx efter ændringer i static/ uden genstart)"""
+    with _manifest_lock:
+        _manifests.clear()
+
+
+def url_for(endpoint: str, **values) -> str:
+    """
+    flask.url_for med fingerprint på statiske filer.
+
+    Erstatter url_for i templates som Jinja-global (app_factory), så også
+    importerede macros får den. I debug-mode bruges de almindelige stier,
+    så ændrede filer ikke caches.
+    """
+    from flask import current_app, url_for as flask_url_for
+
+    filename = values.get('filename')
+    if endpoint == 'static' and filename and not current_app.debug:
+        manifest, _ = get_asset_manifest(current_app.static_folder)
+        values['filename'] = manifest.get(filename, filename)
+    return flask_url_for(endpoint, **values)
+
+
+def serve_static(filename: str):
+    """
+    View for /static/<filename> - erstatter Flasks static-view.
+
+    Fingerprintede stier caches i et år (immutable). Et gammelt fingerprint
+    (fx fra en side cachet før en deploy) giver den nuværende fil med kort
+    cache-tid i stedet for 404.
+    """
+    from flask import current_app, send_from_directory
+
+    static_dir = current_app.static_folder
+    _, originals = get_asset_manifest(static_dir)
+
+    if filename in originals:
+        response = send_from_directory(static_dir, originals[filename], max_age=ASSET_MAX_AGE)
+        response.headers['Cache-Control'] = ASSET_CACHE_CONTROL
+        return response
+
+    match = _FINGERPRINT_RE.match(filename)
+    if match and not os.path.isfile(os.path.join(static_dir, filename)):
+        filename = match.group('stem') + match.group('ext')
+    return send_from_directory(static_dir, filename, max_age=PLAIN_STATIC_MAX_AGE)
+
+
+def main():
+    """Vis manifestet (python template_helpers.py)"""
+    for filename, fingerprinted in sorted(build_asset_manifest().items()):
+        print(f"{filename} -> {fingerprinted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,560 @@
+"""
+Kundedatabaser (tenant sharding) - valgfrit
+
+Alle kunder deler friktionskompas_v3.db, så én kundes store import eller
+eksport låser survey-skrivninger for alle, og filen vokser uden grænse.
+Med TENANT_SHARDING=true kan en kundes hierarkiske data flyttes til sin
+egen SQLite-fil (TENANT_DB_DIR, standard tenants/ ved siden af databasen):
+
+    organizational_units, assessments, tokens, responses, contacts,
+    tasks, actions, situation_* og de afledte assessment_scores-tabeller
+
+Den delte database bliver katalog: brugere, domæner, kunder, API-nøgler,
+oversættelser, email-logs og profiler bliver der, og tenant_shards
+registrerer hvilke kunder der har egen fil.
+
+Routing (db.get_db):
+- get_db(customer_id) åbner kundens fil, hvis kunden er flyttet, og
+  ATTACH'er kataloget som 'catalog'. Tabeller kundens fil ikke har
+  (customers, users, ...) slås derfor op i kataloget uden ændringer i SQL.
+- get_db() bruger den aktuelle kunde: requestens (sat i app_factory ud fra
+  survey-token, URL, brugerens kunde/kundefilter eller kunde-API-nøglen)
+  eller tenant_scope() i scripts. Uden kunde bruges kataloget.
+
+Kundens fil har en kopi af spørgsmålene (triggers på responses læser dem)
+og sine egne cache_versions, stats_counters og FTS-indeks over kommentarer,
+da triggers kun kan skrive i samme fil.
+
+Begrænsninger - derfor slået fra som standard:
+- Visninger på tværs af kunder (superadmin uden kundefilter, globale
+  nøgletal, scheduleren) ser kun kunder i kataloget.
+- Ændringer i standard-spørgsmål skal kopieres ud med sync-questions.
+- Fremmednøgler virker ikke på tværs af filer (profil_sessions.unit_id og
+  email_logs.assessment_id kan pege på flyttede rækker).
+- En transaktion der skriver i både kundens fil og kataloget er ikke atomisk.
+- Caches over katalogets tabeller (API-nøgler, domæner, oversættelser) har
+  deres versionstæller i katalogets cache_versions, ikke i kundens fil -
+  kode der invaliderer dem skal bruge get/bump_cache_version(catalog=True).
+- Sletning af en kunde kaskaderer kun i kataloget; kundens fil og
+  registrering fjernes af drop_customer_database(), som alle slette-stier
+  skal kalde. Andre workers kan route til den slettede fil i op til
+  REGISTRY_TTL sekunder og får da en fejl (filen åbnes med mode=rw).
+
+Kommandoer (kør split mens appen er stoppet):
+    python tenant_db.py split <customer_id> [...] | --all
+    python tenant_db.py status
+    python tenant_db.py sync-questions
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional
+
+TENANT_SHARDING = os.environ.get('TENANT_SHARDING', 'false').lower() == 'true'
+
+CATALOG_ALIAS = 'catalog'
+
+# Sekunder før tenant_shards læses igen (nye kunder i andre workers)
+REGISTRY_TTL = 30
+
+# Kundens data - forældre før børn
+TENANT_TABLES = (
+    'organizational_units', 'assessments', 'tokens', 'responses', 'contacts',
+    'assessment_scores', 'assessment_score_questions',
+    'tasks', 'actions', 'situation_assessments', 'situation_tokens', 'situation_responses',
+)
+# Ejes af kataloget, kopieres til kundens fil (kundens egne spørgsmål flyttes)
+REFERENCE_TABLES = ('questions',)
+# Hver fil har sine egne - triggers skriver i dem
+LOCAL_TABLES = ('cache_versions', 'stats_counters')
+
+_UNITS = "SELECT id FROM {db}.organizational_units WHERE customer_id = :customer"
+# Målingens kunde er target-enhedens (som i stats_counters og data_version)
+_ASSESSMENTS = f"SELECT id FROM {{db}}.assessments WHERE target_unit_id IN ({_UNITS})"
+_TASKS = f"SELECT id FROM {{db}}.tasks WHERE customer_id = :customer OR unit_id IN ({_UNITS})"
+_SITUATIONS = (f"SELECT id FROM {{db}}.situation_assessments "
+               f"WHERE task_id IN ({_TASKS}) OR unit_id IN ({_UNITS})")
+
+# Tabel -> WHERE for kundens rækker ({db} er databasen der læses fra)
+_CUSTOMER_ROWS = {
+    'organizational_units': "customer_id = :customer",
+    'assessments': f"target_unit_id IN ({_UNITS})",
+    'tokens': f"assessment_id IN ({_ASSESSMENTS}) OR unit_id IN ({_UNITS})",
+    'responses': f"assessment_id IN ({_ASSESSMENTS}) OR unit_id IN ({_UNITS})",
+    'contacts': f"unit_id IN ({_UNITS})",
+    'assessment_scores': f"assessment_id IN ({_ASSESSMENTS})",
+    'assessment_score_questions': f"assessment_id IN ({_ASSESSMENTS})",
+    'tasks': f"customer_id = :customer OR unit_id IN ({_UNITS})",
+    'actions': f"task_id IN ({_TASKS})",
+    'situation_assessments': f"task_id IN ({_TASKS}) OR unit_id IN ({_UNITS})",
+    'situation_tokens': f"situation_assessment_id IN ({_SITUATIONS})",
+    'situation_responses': f"action_id IN (SELECT id FROM {{db}}.actions WHERE task_id IN ({_TASKS}))",
+    'questions': f"org_unit_id IS NULL OR org_unit_id IN ({_UNITS})",
+}
+# Kun kundens egne spørgsmål fjernes fra kataloget
+_MOVED_QUESTIONS = f"org_unit_id IN ({_UNITS})"
+
+# Sletning i kataloget: børn før forældre (filtrene slår op i forældrene), og
+# svar før assessment_scores, som svarenes triggers ellers genopretter
+_DELETE_ORDER = (
+    'questions', 'situation_responses', 'situation_tokens', 'situation_assessments',
+    'actions', 'tasks', 'responses', 'tokens', 'contacts',
+    'assessment_score_questions', 'assessment_scores', 'assessments', 'organizational_units',
+)
+
+# Vedligeholdes af triggers på responses - sletningen af svarene rydder dem
+_DERIVED_TABLES = ('assessment_scores', 'assessment_score_questions')
+
+_CUSTOMER_ID_RE = re.compile(r'^[\w-]+$')
+
+# Fremmednøgler til tabeller der ikke findes i kundens fil (customers)
+_REFERENCES = (r'REFERENCES\s+["`\[]?(\w+)["`\]]?\s*(?:\([^)]*\))?'
+               r'(?:\s+ON\s+(?:DELETE|UPDATE)\s+(?:SET\s+NULL|SET\s+DEFAULT|CASCADE|RESTRICT|NO\s+ACTION))*')
+_TABLE_FK_RE = re.compile(r',\s*FOREIGN\s+KEY\s*\([^)]*\)\s*' + _REFERENCES, re.IGNORECASE)
+_COLUMN_FK_RE = re.compile(r'\s+' + _REFERENCES, re.IGNORECASE)
+
+
+class Shard(NamedTuple):
+    customer_id: str
+    path: str
+
+
+_current_tenant: ContextVar[Optional[str]] = ContextVar('tenant_db_customer', default=None)
+
+# Katalogets sti -> (indlæst, {customer_id: fil})
+_registry: Dict[str, tuple] = {}
+_registry_lock = threading.Lock()
+
+
+# ========================================
+# AKTUEL KUNDE
+# ========================================
+
+def set_current_tenant(customer_id: Optional[str]):
+    """Kunden som get_db() uden customer_id router til (None = kataloget)"""
+    _current_tenant.set(customer_id or None)
+
+
+def current_tenant() -> Optional[str]:
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_scope(customer_id: Optional[str]):
+    """get_db() inden for blokken bruger kundens database (scripts og jobs)"""
+    token = _current_tenant.set(customer_id or None)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+# ========================================
+# REGISTER OG ROUTING
+# ========================================
+
+def _catalog_path() -> str:
+    from db import DB_PATH
+    return os.environ.get('DB_PATH', DB_PATH)
+
+
+def tenant_dir(catalog_path: str) -> str:
+    return os.environ.get('TENANT_DB_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(catalog_path)), 'tenants')
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    from db import DB_BUSY_TIMEOUT
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_tenant_catalog(conn: sqlite3.Connection):
+    """Opret katalogets register over kundefiler (sikkert at køre flere gange)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tenant_shards (
+            customer_id TEXT PRIMARY KEY,
+            db_path TEXT NOT NULL,
+            migrated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Survey-links kender kun token'et - her findes kunden uden at åbne alle filer
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tenant_tokens (
+            token TEXT PRIMARY KEY,
+            customer_id TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def _load_shards(catalog_path: str) -> Dict[str, str]:
+    base = os.path.dirname(os.path.abspath(catalog_path))
+    conn = _connect(catalog_path)
+    try:
+        rows = conn.execute("SELECT customer_id, db_path FROM tenant_shards").fetchall()
+    except sqlite3.OperationalError:
+        return {}  # Ingen kunder er flyttet
+    finally:
+        conn.close()
+    # Stier gemmes relativt til kataloget, så mappen kan flyttes samlet
+    return {row['customer_id']: os.path.join(base, row['db_path']) for row in rows}
+
+
+def get_shards(catalog_path: Optional[str] = None) -> Dict[str, str]:
+    """Flyttede kunder: {customer_id: fil} (husket i REGISTRY_TTL sekunder)"""
+    catalog_path = catalog_path or _catalog_path()
+    now = time.monotonic()
+    with _registry_lock:
+        cached = _registry.get(catalog_path)
+    if cached is not None and now - cached[0] < REGISTRY_TTL:
+        return cached[1]
+
+    shards = _load_shards(catalog_path)
+    with _registry_lock:
+        _registry[catalog_path] = (now, shards)
+    return shards
+
+
+def invalidate_registry():
+    with _registry_lock:
+        _registry.clear()
+
+
+def route(catalog_path: str, customer_id: Optional[str] = None) -> Optional[Shard]:
+    """Kundens fil hvis kunden (eller den aktuelle kunde) er flyttet, ellers None"""
+    if not TENANT_SHARDING:
+        return None
+    customer_id = customer_id or _current_tenant.get()
+    if not customer_id:
+        return None
+    path = get_shards(catalog_path).get(customer_id)
+    return Shard(customer_id, path) if path else None
+
+
+def find_token_tenant(token: str) -> Optional[str]:
+    """
+    Kunden et survey-token tilhører, hvis kunden er flyttet.
+
+    Tokens oprettet efter flytningen findes ikke i tenant_tokens endnu -
+    de slås op i kundefilerne og gemmes, så næste opslag er ét opslag.
+    """
+    if not TENANT_SHARDING or not token:
+        return None
+    catalog_path = _catalog_path()
+    shards = get_shards(catalog_path)
+    if not shards:
+        return None
+
+    conn = _connect(catalog_path)
+    try:
+        row = conn.execute("SELECT customer_id FROM tenant_tokens WHERE token = ?", (token,)).fetchone()
+        if row:
+            return row['customer_id']
+        if conn.execute("SELECT 1 FROM tokens WHERE token = ?", (token,)).fetchone():
+            return None
+
+        for customer_id, path in shards.items():
+            shard = _connect(path)
+            try:
+                found = shard.execute("SELECT 1 FROM tokens WHERE token = ?", (token,)).fetchone()
+            finally:
+                shard.close()
+            if found:
+                conn.execute("INSERT OR IGNORE INTO tenant_tokens (token, customer_id) VALUES (?, ?)",
+                             (token, customer_id))
+                conn.commit()
+                return customer_id
+        return None
+    finally:
+        conn.close()
+
+
+# ========================================
+# FLYTNING AF EN KUNDE
+# ========================================
+
+def _strip_foreign_keys(sql: str, keep) -> str:
+    """CREATE TABLE uden fremmednøgler til tabeller der ikke er i keep"""
+    def strip(match):
+        return match.group(0) if match.group(1) in keep else ''
+    return _COLUMN_FK_RE.sub(strip, _TABLE_FK_RE.sub(strip, sql))
+
+
+def _existing_tables(conn: sqlite3.Connection, db: str, tables) -> List[str]:
+    present = {row[0] for row in conn.execute(
+        f"SELECT name FROM {db}.sqlite_master WHERE type = 'table'")}
+    return [table for table in tables if table in present]
+
+
+def _columns(conn: sqlite3.Connection, db: str, table: str) -> str:
+    return ', '.join(f'"{row[1]}"' for row in conn.execute(f"PRAGMA {db}.table_info({table})"))
+
+
+def _customer_rows(table: str, db: str) -> str:
+    return _CUSTOMER_ROWS[table].format(db=db)
+
+
+def _build_shard(path: str, catalog_path: str, customer_id: str) -> Dict[str, int]:
+    """Opret kundens fil med skema, data, indexes og triggers fra kataloget"""
+    from comment_search import FTS_TABLE, init_comment_search
+    from data_version import GLOBAL_VERSION, VERSION_PREFIX
+    from org_tree import VERSION_PREFIX as TREE_PREFIX
+
+    params = {'customer': customer_id}
+    shard = _connect(path)
+    try:
+        shard.execute("PRAGMA journal_mode=WAL")
+        shard.execute(f"ATTACH DATABASE ? AS {CATALOG_ALIAS}", (catalog_path,))
+        tables = _existing_tables(shard, CATALOG_ALIAS,
+                                  TENANT_TABLES + REFERENCE_TABLES + LOCAL_TABLES)
+        placeholders = ', '.join('?' * len(tables))
+        schema = shard.execute(f"""
+            SELECT type, name, sql FROM {CATALOG_ALIAS}.sqlite_master
+            WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+        """, tables).fetchall()
+
+        for row in schema:
+            if row['type'] == 'table':
+                shard.execute(_strip_foreign_keys(row['sql'], tables))
+
+        # Data før indexes og triggers - tællere og scores kopieres som de er
+        counts = {}
+        for table in tables:
+            if table in LOCAL_TABLES:
+                continue
+            columns = _columns(shard, CATALOG_ALIAS, table)
+            where = _customer_rows(table, CATALOG_ALIAS)
+            shard.execute(f"""
+                INSERT INTO main.{table} ({columns})
+                SELECT {columns} FROM {CATALOG_ALIAS}.{table} WHERE {where}
+            """, params)
+            counts[table] = shard.execute(
+                f"SELECT COUNT(*) FROM {CATALOG_ALIAS}.{table} WHERE {where}", params).fetchone()[0]
+            copied = shard.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+            if copied != counts[table]:
+                raise RuntimeError(f"{table}: {copied} af {counts[table]} rækker kopieret")
+
+        # Kommentar-søgningens FTS-indeks bygges fra kundens egne svar
+        if shard.execute(f"SELECT 1 FROM {CATALOG_ALIAS}.sqlite_master WHERE name = ?",
+                         (FTS_TABLE,)).fetchone():
+            init_comment_search(shard)
+
+        existing = {row[0] for row in shard.execute("SELECT name FROM main.sqlite_master")}
+        for row in schema:
+            if row['type'] in ('index', 'trigger') and row['name'] not in existing:
+                shard.execute(row['sql'])
+
+        if 'stats_counters' in tables:
+            shard.execute(f"""
+                INSERT INTO main.stats_counters
+                SELECT * FROM {CATALOG_ALIAS}.stats_counters WHERE scope = ?
+            """, (customer_id,))
+        # Nye versioner (tilfældig start), så intet cachet fra kataloget matcher
+        shard.executemany("""
+            INSERT OR IGNORE INTO main.cache_versions (name, version, updated_at)
+            VALUES (?, abs(random() % 1000000000) + 1, CURRENT_TIMESTAMP)
+        """, [(VERSION_PREFIX + customer_id,), (GLOBAL_VERSION,), (TREE_PREFIX + customer_id,)])
+
+        shard.commit()
+        shard.execute(f"DETACH DATABASE {CATALOG_ALIAS}")
+        return counts
+    finally:
+        shard.close()
+
+
+def _remove_from_catalog(catalog_path: str, customer_id: str, path: str, counts: Dict[str, int]):
+    """Slet kundens rækker i kataloget og registrer filen - i én transaktion"""
+    from stats_counters import reconcile_stats_counters
+
+    params = {'customer': customer_id}
+    conn = _connect(catalog_path)
+    try:
+        # Rækker i kataloget der peger på kundens enheder (profil_sessions) bevares
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("ATTACH DATABASE ? AS shard", (path,))
+        init_tenant_catalog(conn)
+        conn.execute("BEGIN IMMEDIATE")
+
+        for table in _existing_tables(conn, 'main', _DELETE_ORDER):
+            if table == 'questions':
+                conn.execute(f"DELETE FROM questions WHERE {_MOVED_QUESTIONS.format(db='main')}", params)
+                continue
+            deleted = conn.execute(
+                f"DELETE FROM {table} WHERE {_customer_rows(table, 'main')}", params).rowcount
+            if deleted != counts[table] and table not in _DERIVED_TABLES:
+                raise RuntimeError(f"{table} ændret under flytningen ({deleted} != {counts[table]})")
+
+        conn.execute("INSERT OR IGNORE INTO tenant_tokens (token, customer_id) "
+                     "SELECT token, ? FROM shard.tokens", (customer_id,))
+        conn.execute("INSERT INTO tenant_shards (customer_id, db_path) VALUES (?, ?)",
+                     (customer_id, os.path.relpath(path, os.path.dirname(os.path.abspath(catalog_path)))))
+        reconcile_stats_counters(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _remove_file(path: str):
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def split_customer(customer_id: str, catalog_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Flyt en kundes data fra kataloget til kundens egen fil.
+
+    Filen bygges og tælles efter først; derefter slettes rækkerne i
+    kataloget og filen registreres i samme transaktion. Fejler noget,
+    fjernes den halve fil og kataloget er uændret.
+
+    Returns:
+        Antal flyttede rækker per tabel
+    """
+    catalog_path = catalog_path or _catalog_path()
+    if not _CUSTOMER_ID_RE.match(customer_id or ''):
+        raise ValueError(f"Ugyldigt customer_id: {customer_id!r}")
+
+    conn = _connect(catalog_path)
+    try:
+        init_tenant_catalog(conn)
+        conn.commit()
+        if not conn.execute("SELECT 1 FROM customers WHERE id = ?", (customer_id,)).fetchone():
+            raise ValueError(f"Kunden {customer_id} findes ikke")
+        if conn.execute("SELECT 1 FROM tenant_shards WHERE customer_id = ?", (customer_id,)).fetchone():
+            raise ValueError(f"Kunden {customer_id} har allerede sin egen database")
+    finally:
+        conn.close()
+
+    directory = tenant_dir(catalog_path)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{customer_id}.db')
+    _remove_file(path)  # Rest fra en fejlet flytning (ikke registreret)
+
+    try:
+        counts = _build_shard(path, catalog_path, customer_id)
+        _remove_from_catalog(catalog_path, customer_id, path, counts)
+    except Exception:
+        _remove_file(path)
+        raise
+    finally:
+        invalidate_registry()
+    return counts
+
+
+def drop_customer_database(customer_id: str, catalog_path: Optional[str] = None) -> bool:
+    """
+    Slet en flyttet kundes fil og katalogets register over den.
+
+    Kaldes når kunden slettes: DELETE FROM customers kaskaderer kun i
+    kataloget, så kundens enheder, målinger og svar ligger i kundens fil.
+    tenant_shards og tenant_tokens ryddes før filen, så intet routes til
+    en fil der er ved at blive slettet.
+
+    Returns:
+        True hvis kunden havde sin egen fil
+    """
+    catalog_path = catalog_path or _catalog_path()
+    # Registeret læses direkte - filen skal slettes selvom routing er slået fra
+    path = _load_shards(catalog_path).get(customer_id)
+    if path is None:
+        return False
+
+    conn = _connect(catalog_path)
+    try:
+        conn.execute("DELETE FROM tenant_tokens WHERE customer_id = ?", (customer_id,))
+        conn.execute("DELETE FROM tenant_shards WHERE customer_id = ?", (customer_id,))
+        conn.commit()
+    finally:
+        conn.close()
+    invalidate_registry()
+    _remove_file(path)
+    return True
+
+
+def sync_questions(catalog_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Kopier standard-spørgsmålene fra kataloget til alle kundefiler.
+
+    Opdaterer eksisterende rækker (så triggers genberegner justerede scores
+    ved ændret reverse_scored) og tilføjer nye.
+
+    Returns:
+        {customer_id: antal spørgsmål}
+    """
+    catalog_path = catalog_path or _catalog_path()
+    synced = {}
+    for customer_id, path in get_shards(catalog_path).items():
+        shard = _connect(path)
+        try:
+            shard.execute(f"ATTACH DATABASE ? AS {CATALOG_ALIAS}", (catalog_path,))
+            columns = [row[1] for row in shard.execute(f"PRAGMA {CATALOG_ALIAS}.table_info(questions)")]
+            updates = ', '.join(f'"{col}" = excluded."{col}"' for col in columns if col != 'id')
+            column_list = ', '.join(f'"{col}"' for col in columns)
+            synced[customer_id] = shard.execute(f"""
+                INSERT INTO main.questions ({column_list})
+                SELECT {column_list} FROM {CATALOG_ALIAS}.questions WHERE org_unit_id IS NULL
+                ON CONFLICT(id) DO UPDATE SET {updates}
+            """).rowcount
+            shard.commit()
+        finally:
+            shard.close()
+    return synced
+
+
+# ========================================
+# KOMMANDOLINJE
+# ========================================
+
+def main(argv: List[str]) -> int:
+    catalog_path = _catalog_path()
+    command = argv[0] if argv else 'status'
+
+    if command == 'split' and len(argv) > 1:
+        if argv[1] == '--all':
+            conn = _connect(catalog_path)
+            try:
+                customer_ids = [row[0] for row in conn.execute("SELECT id FROM customers ORDER BY id")]
+            finally:
+                conn.close()
+            customer_ids = [c for c in customer_ids if c not in get_shards(catalog_path)]
+        else:
+            customer_ids = argv[1:]
+        for customer_id in customer_ids:
+            started = time.perf_counter()
+            counts = split_customer(customer_id, catalog_path)
+            print(f"{customer_id}: {counts.get('organizational_units', 0)} enheder, "
+                  f"{counts.get('responses', 0)} svar flyttet "
+                  f"({time.perf_counter() - started:.1f}s)")
+        return 0
+
+    if command == 'sync-questions':
+        for customer_id, count in sync_questions(catalog_path).items():
+            print(f"{customer_id}: {count} spørgsmål")
+        return 0
+
+    if command == 'status':
+        shards = get_shards(catalog_path)
+        print(f"Katalog: {catalog_path} (routing {'slået til' if TENANT_SHARDING else 'slået fra'})")
+        for customer_id, path in sorted(shards.items()):
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            print(f"  {customer_id}: {path} ({size / 1024 / 1024:.1f} MB)")
+        if not shards:
+            print("  Ingen kunder har egen database")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
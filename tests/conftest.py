@@ -108,6 +108,7 @@ def _init_test_db(db_path):
             respondent_name TEXT,
             field TEXT,
             score INTEGER,
+            comment TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (assessment_id) REFERENCES assessments(id) ON DELETE CASCADE,
             FOREIGN KEY (unit_id) REFERENCES organizational_units(id) ON DELETE CASCADE,
@@ -445,6 +446,32 @@ def _init_test_db(db_path):
         )
     """)
 
+    # Respondent-id per besvarelse (samme trigger som produktion)
+    from respondents import init_respondent_ids
+    init_respondent_ids(conn)
+
+    # Justeret score/felt/lag på svar (samme triggers som produktion)
+    from adjusted_scores import init_adjusted_scores
+    init_adjusted_scores(conn)
+    from responses_layout import init_responses_layout
+    init_responses_layout(conn)
+
+    # Summary-tabel med scores (samme triggers som produktion)
+    from assessment_scores import init_assessment_scores
+    init_assessment_scores(conn)
+
+    # Tællere til statussider
+    from stats_counters import init_stats_counters
+    init_stats_counters(conn)
+
+    # Versionstæller for organisationstræet
+    from org_tree import init_org_tree
+    init_org_tree(conn)
+
+    # Data-versioner til ETags
+    from data_version import init_data_versions
+    init_data_versions(conn)
+
     conn.commit()
     conn.close()
 
@@ -578,6 +605,61 @@ def _reset_database(db_path):
     time.sleep(0.05)
 
 
+# Skaladatasæt (seed_scale_testdata.py) med produktionsskema og -spørgsmål.
+# Moduler vælger størrelse ved at overskrive scale_options.
+SCALE_OPTIONS = {'customers': 1, 'depth': 2, 'fanout': 3, 'employees': 60, 'quarters': 3}
+
+
+@pytest.fixture(scope='session')
+def scale_dataset(tmp_path_factory):
+    """Generér et skaladatasæt per options-sæt (én gang per session) og returnér stien.
+
+    Skabelonen må ikke skrives i - brug scale_db for en kopi.
+    """
+    from seed_scale_testdata import generate_scale_dataset
+    generated = {}
+
+    def build(options):
+        key = tuple(sorted(options.items()))
+        if key not in generated:
+            path = str(tmp_path_factory.mktemp('scale') / 'scale.db')
+            generate_scale_dataset(path, dict(options), verbose=False)
+            generated[key] = path
+        return generated[key]
+
+    return build
+
+
+@pytest.fixture(scope='module')
+def scale_options():
+    """Options til scale_db - overskriv i testmodulet for et andet datasæt."""
+    return SCALE_OPTIONS
+
+
+@pytest.fixture
+def scale_db(scale_dataset, scale_options, tmp_path, monkeypatch):
+    """Frisk kopi af skaladatasættet som DB_PATH, med tomme caches."""
+    import shutil
+    from cache import invalidate_all
+
+    db_path = str(tmp_path / 'scale.db')
+    shutil.copyfile(scale_dataset(scale_options), db_path)
+    monkeypatch.setenv('DB_PATH', db_path)
+    invalidate_all()
+    yield db_path
+    invalidate_all()
+
+
+@pytest.fixture
+def scale_conn(scale_db):
+    """Direkte forbindelse til scale_db (som get_db: Row og foreign keys)."""
+    conn = sqlite3.connect(scale_db)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    yield conn
+    conn.close()
+
+
 @pytest.fixture(scope='function')
 def app():
     """Create application for testing with fresh database per test.
@@ -625,6 +707,20 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture
+def count_queries(app):
+    """Context manager counting SQL statements on all get_db connections.
+
+    Usage:
+        def test_dashboard(authenticated_client, count_queries):
+            with count_queries() as counter:
+                authenticated_client.get('/admin/dashboard')
+            assert counter.count <= 20, counter.statements
+    """
+    from perf import count_queries as _count_queries
+    return _count_queries
+
+
 @pytest.fixture
 def authenticated_client(client):
     """Create an authenticated test client (as admin)."""
@@ -0,0 +1,98 @@
+"""
+Tests for justerede scores på svar (adjusted_scores.py)
+
+adjusted_score/field/layer skal altid svare til et opslag i questions -
+uanset skrivesti - og aggregeringerne skal kunne køre på det dækkende
+index uden join.
+"""
+import pytest
+
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+JOINED_VALUES = """
+    SELECT r.id,
+           CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END as adjusted_score,
+           q.field, q.sequence
+    FROM responses r JOIN questions q ON q.id = r.question_id
+"""
+
+
+def _assert_consistent(conn):
+    from adjusted_scores import layer_for_sequence
+    rows = conn.execute(f"""
+        SELECT j.*, r.adjusted_score as stored_score, r.field as stored_field, r.layer as stored_layer
+        FROM ({JOINED_VALUES}) j JOIN responses r ON r.id = j.id
+    """).fetchall()
+    assert rows
+    for row in rows:
+        assert row['stored_score'] == row['adjusted_score']
+        assert row['stored_field'] == row['field']
+        assert row['stored_layer'] == layer_for_sequence(row['sequence'])
+
+
+class TestMaintenance:
+
+    def test_seeded_values_match_questions(self, scale_conn):
+        _assert_consistent(scale_conn)
+
+    def test_trigger_fills_plain_inserts(self, scale_conn):
+        unit_id = scale_conn.execute(
+            "SELECT unit_id FROM responses WHERE assessment_id = ? LIMIT 1", (ASSESSMENT_ID,)
+        ).fetchone()[0]
+        scale_conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            SELECT ?, ?, id, 2, 'employee' FROM questions WHERE is_default = 1
+        """, (ASSESSMENT_ID, unit_id))
+        assert scale_conn.execute(
+            "SELECT COUNT(*) FROM responses WHERE adjusted_score IS NULL OR layer IS NULL"
+        ).fetchone()[0] == 0
+        _assert_consistent(scale_conn)
+
+    def test_score_and_question_updates(self, scale_conn):
+        scale_conn.execute("UPDATE responses SET score = 8 - score WHERE id % 3 = 0")
+        scale_conn.execute("""
+            UPDATE questions SET reverse_scored = 1 - reverse_scored
+            WHERE id IN (SELECT id FROM questions WHERE is_default = 1 ORDER BY sequence LIMIT 2)
+        """)
+        _assert_consistent(scale_conn)
+
+    def test_backfill_restores_values(self, scale_conn):
+        from adjusted_scores import backfill_adjusted_scores
+        total = scale_conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        scale_conn.execute("UPDATE responses SET adjusted_score = NULL, field = NULL, layer = NULL")
+
+        assert backfill_adjusted_scores(scale_conn) == total
+        _assert_consistent(scale_conn)
+
+    def test_survey_values_match_trigger(self, scale_conn):
+        from adjusted_scores import response_score_values
+        for q in scale_conn.execute("SELECT * FROM questions WHERE is_default = 1"):
+            values = response_score_values(dict(q), 2)
+            assert values['adjusted_score'] == (6 if q['reverse_scored'] else 2)
+            assert values['field'] == q['field']
+            assert values['layer'] is not None
+
+
+class TestQueries:
+
+    def test_field_averages_use_covering_index(self, scale_conn):
+        plan = ' '.join(row['detail'] for row in scale_conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT r.field, AVG(r.adjusted_score), COUNT(r.adjusted_score)
+            FROM responses r WHERE r.unit_id = ? AND r.assessment_id = ?
+            GROUP BY r.field
+        """, (ROOT_UNIT_ID, ASSESSMENT_ID)))
+        assert 'COVERING INDEX idx_responses_adjusted' in plan
+        assert 'questions' not in plan
+
+    def test_unit_stats_match_joined_query(self, scale_db, scale_conn):
+        from db_hierarchical import get_unit_stats
+        expected = {row['field']: row['avg_score'] for row in scale_conn.execute(f"""
+            SELECT j.field, ROUND(AVG(j.adjusted_score), 1) as avg_score
+            FROM ({JOINED_VALUES} WHERE r.assessment_id = '{ASSESSMENT_ID}') j
+            GROUP BY j.field
+        """)}
+
+        stats = get_unit_stats(ROOT_UNIT_ID, ASSESSMENT_ID)
+        assert {s['field']: s['avg_score'] for s in stats} == expected
@@ -488,7 +488,8 @@ class TestGetUnitStatsWithKnownData:
                     text_da TEXT,
                     text_en TEXT,
                     is_default INTEGER DEFAULT 1,
-                    reverse_scored INTEGER DEFAULT 0
+                    reverse_scored INTEGER DEFAULT 0,
+                    sequence INTEGER
                 )
             """)
 
@@ -498,10 +499,15 @@ class TestGetUnitStatsWithKnownData:
                     assessment_id TEXT,
                     unit_id TEXT,
                     question_id INTEGER,
-                    score INTEGER
+                    score INTEGER,
+                    respondent_type TEXT
                 )
             """)
 
+            # adjusted_score/field på svar (samme migration som init_db)
+            from adjusted_scores import init_adjusted_scores
+            init_adjusted_scores(conn)
+
             # Create unit
             conn.execute("INSERT INTO organizational_units (id, name, level) VALUES ('test-unit', 'Test Unit', 0)")
 
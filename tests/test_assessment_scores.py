@@ -0,0 +1,194 @@
+"""
+Tests for den forudberegnede score-tabel (assessment_scores.py)
+
+Triggers på responses skal holde summary-rækkerne identiske med en fuld
+genberegning, og views der læser tabellen skal give samme tal som de gamle
+pivot-queries over responses JOIN questions.
+"""
+import sqlite3
+
+import pytest
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _snapshot(conn):
+    rows = conn.execute("""
+        SELECT assessment_id, unit_id, respondent_type, field, answer_count,
+               ROUND(score_sum, 6), ROUND(avg_score, 6), respondent_count
+        FROM assessment_scores ORDER BY 1, 2, 3, 4
+    """).fetchall()
+    return [tuple(r) for r in rows]
+
+
+class TestMaintenance:
+
+    def test_summary_matches_direct_pivot(self, scale_db):
+        conn = _connect(scale_db)
+        expected = conn.execute("""
+            SELECT q.field,
+                   AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END) as avg_score,
+                   COUNT(*) as cnt
+            FROM responses r JOIN questions q ON q.id = r.question_id
+            WHERE r.assessment_id = ? AND r.respondent_type = 'employee'
+            GROUP BY q.field
+        """, (ASSESSMENT_ID,)).fetchall()
+        actual = {row['field']: row for row in conn.execute("""
+            SELECT field, SUM(score_sum) / SUM(answer_count) as avg_score, SUM(answer_count) as cnt
+            FROM assessment_scores
+            WHERE assessment_id = ? AND respondent_type = 'employee'
+            GROUP BY field
+        """, (ASSESSMENT_ID,))}
+        conn.close()
+
+        assert expected
+        for row in expected:
+            assert actual[row['field']]['cnt'] == row['cnt']
+            assert actual[row['field']]['avg_score'] == pytest.approx(row['avg_score'])
+
+    def test_triggers_match_rebuild_after_writes(self, scale_db):
+        from assessment_scores import rebuild_assessment_scores
+        conn = _connect(scale_db)
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            SELECT assessment_id, unit_id, question_id, 7, 'leader_assess'
+            FROM responses WHERE assessment_id = ? LIMIT 30
+        """, (ASSESSMENT_ID,))
+        conn.execute("UPDATE responses SET score = 8 - score WHERE id % 13 = 0")
+        conn.execute("DELETE FROM responses WHERE id % 17 = 0")
+        incremental = _snapshot(conn)
+
+        rebuild_assessment_scores(conn)
+        assert _snapshot(conn) == incremental
+        conn.close()
+
+    def test_question_changes_reach_summary(self, scale_db):
+        from assessment_scores import rebuild_assessment_scores
+        conn = _connect(scale_db)
+        question_id = conn.execute(
+            "SELECT MIN(id) FROM questions WHERE is_default = 1").fetchone()[0]
+        conn.execute("UPDATE questions SET reverse_scored = 1 - reverse_scored WHERE id = ?", (question_id,))
+        conn.execute("UPDATE questions SET field = 'KAN' WHERE id = ? AND field != 'KAN'", (question_id + 1,))
+        incremental = _snapshot(conn)
+
+        rebuild_assessment_scores(conn)
+        assert _snapshot(conn) == incremental
+        conn.close()
+
+    def test_respondent_count_follows_deletes(self, scale_db):
+        conn = _connect(scale_db)
+        unit_id, before = conn.execute("""
+            SELECT unit_id, respondent_count FROM assessment_scores
+            WHERE assessment_id = ? AND respondent_type = 'employee' AND field = 'MENING'
+            ORDER BY respondent_count DESC LIMIT 1
+        """, (ASSESSMENT_ID,)).fetchone()
+        # Slet én respondents svar (de første rækker for enheden hører til samme respondent)
+        question_count = conn.execute("SELECT COUNT(*) FROM questions WHERE is_default = 1").fetchone()[0]
+        conn.execute("""
+            DELETE FROM responses WHERE id IN (
+                SELECT id FROM responses
+                WHERE assessment_id = ? AND unit_id = ? AND respondent_type = 'employee'
+                ORDER BY id LIMIT ?
+            )
+        """, (ASSESSMENT_ID, unit_id, question_count))
+        after = conn.execute("""
+            SELECT respondent_count FROM assessment_scores
+            WHERE assessment_id = ? AND unit_id = ? AND respondent_type = 'employee' AND field = 'MENING'
+        """, (ASSESSMENT_ID, unit_id)).fetchone()
+        conn.close()
+        assert (after[0] if after else 0) == before - 1
+
+    def test_deleting_assessment_removes_rows(self, scale_db):
+        conn = _connect(scale_db)
+        conn.execute("DELETE FROM assessments WHERE id = ?", (ASSESSMENT_ID,))
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM assessment_scores WHERE assessment_id = ?", (ASSESSMENT_ID,)
+        ).fetchone()[0]
+        conn.close()
+        assert remaining == 0
+
+    def test_init_backfills_missing_table(self, scale_db):
+        from assessment_scores import init_assessment_scores
+        conn = _connect(scale_db)
+        expected = _snapshot(conn)
+        conn.execute("DROP TABLE assessment_scores")
+        init_assessment_scores(conn)
+        assert _snapshot(conn) == expected
+        conn.close()
+
+
+class TestSqlHelpers:
+
+    def test_avg_sql_is_weighted_by_answers(self):
+        from assessment_scores import avg_sql, answers_sql, respondents_sql
+        conn = sqlite3.connect(':memory:')
+        conn.execute("""CREATE TABLE s (respondent_type TEXT, field TEXT, answer_count INT,
+                                        score_sum REAL, respondent_count INT)""")
+        conn.executemany("INSERT INTO s VALUES (?, ?, ?, ?, ?)", [
+            ('employee', 'MENING', 10, 50.0, 5),
+            ('employee', 'KAN', 30, 60.0, 6),
+            ('employee', 'MENING', 2, 14.0, 1),
+            ('leader_assess', 'MENING', 4, 28.0, 1),
+        ])
+        row = conn.execute(f"""
+            SELECT {avg_sql()}, {avg_sql('MENING', 'employee')}, {answers_sql('employee')},
+                   {respondents_sql('employee')}, {avg_sql('TRYGHED')}
+            FROM s
+        """).fetchone()
+        assert row[0] == pytest.approx(152 / 46)
+        assert row[1] == pytest.approx(64 / 12)
+        assert row[2] == 42
+        assert row[3] == 6
+        assert row[4] is None
+
+
+class TestViews:
+
+    @pytest.fixture
+    def admin_client(self, app):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = {
+                'id': 1, 'email': 'admin@test.com', 'name': 'Test Admin',
+                'role': 'superadmin', 'customer_id': None, 'customer_name': None
+            }
+        return client
+
+    @pytest.mark.parametrize('url', [
+        '/admin/analyser',
+        f'/admin/analyser?unit_id={ROOT_UNIT_ID}',
+        '/admin/assessments-overview',
+        '/admin/noegletal',
+        '/admin/dashboard',
+        f'/admin/dashboard/{CUSTOMER_ID}',
+        f'/admin/dashboard/{CUSTOMER_ID}/{ROOT_UNIT_ID}',
+    ])
+    def test_pages_render_from_summary(self, app, scale_db, admin_client, url):
+        response = admin_client.get(url)
+        assert response.status_code == 200
+
+    def test_overview_besvaer_matches_responses(self, scale_db):
+        from db_hierarchical import get_assessment_overview
+        conn = _connect(scale_db)
+        expected = {row['unit_id']: row['score'] for row in conn.execute("""
+            SELECT r.unit_id,
+                   ROUND(AVG(CASE WHEN q.reverse_scored = 1 THEN 8 - r.score ELSE r.score END), 1) as score
+            FROM responses r JOIN questions q ON q.id = r.question_id
+            WHERE r.assessment_id = ? AND q.field = 'BESVÆR'
+            GROUP BY r.unit_id
+        """, (ASSESSMENT_ID,))}
+        conn.close()
+
+        overview = get_assessment_overview(ASSESSMENT_ID)
+        assert overview
+        for unit in overview:
+            assert unit['besvær_score'] == expected.get(unit['id'])
@@ -0,0 +1,53 @@
+"""
+Tests for benchmark-suitens regressions-tjek (benchmarks/run_benchmarks.py)
+"""
+from benchmarks.run_benchmarks import compare_reports, _summarize
+
+
+def _report(**medians):
+    return {'results': {'small': {name: {'median_ms': value} for name, value in medians.items()}}}
+
+
+def test_flags_regression_above_threshold():
+    baseline = _report(org_dashboard=100.0, get_trend_data=50.0)
+    current = _report(org_dashboard=130.0, get_trend_data=55.0)
+
+    regressions = compare_reports(current, baseline, threshold=0.2)
+
+    assert [r['benchmark'] for r in regressions] == ['org_dashboard']
+    assert regressions[0]['change_percent'] == 30.0
+
+
+def test_ignores_small_absolute_changes():
+    baseline = _report(calculate_substitution_db=1.0)
+    current = _report(calculate_substitution_db=3.0)  # +200%, men kun 2 ms
+
+    assert compare_reports(current, baseline, threshold=0.2) == []
+
+
+def test_skips_errors_and_new_benchmarks():
+    baseline = {'results': {'small': {'export_pdf': {'error': 'WeasyPrint mangler'}}}}
+    current = _report(export_pdf=500.0, survey_submit=40.0)
+
+    assert compare_reports(current, baseline) == []
+
+
+def test_summarize():
+    stats = _summarize([5.0, 1.0, 3.0], [10, 12, 11])
+    assert stats['min_ms'] == 1.0
+    assert stats['median_ms'] == 3.0
+    assert stats['max_ms'] == 5.0
+    assert stats['queries'] == 12
+
+
+def test_load_configs_and_latency():
+    from benchmarks.load_survey import parse_configs, _latency
+
+    assert parse_configs('1x1, 4x8,2') == [(1, 1), (4, 8), (2, 1)]
+
+    stats = _latency([(200, 10.0), (200, 30.0), (500, 5.0), (200, 20.0)])
+    assert stats['requests'] == 4
+    assert stats['ok'] == 3
+    assert stats['statuses'] == {'200': 3, '500': 1}
+    assert stats['p50_ms'] == 20.0
+    assert stats['max_ms'] == 30.0
@@ -0,0 +1,197 @@
+"""
+Tests for fritekst-kommentarer: opdelte kolonner, FTS5-søgning, facetter og
+cursor-paginering (comment_search.py)
+"""
+import sqlite3
+
+import pytest
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+@pytest.fixture(scope='module')
+def scale_options():
+    return {'customers': 2, 'depth': 2, 'fanout': 3, 'employees': 80, 'quarters': 3,
+            'comment_rate': 0.5}
+
+
+def _client(app, role='superadmin', customer_id=None):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {
+            'id': 1, 'email': 'user@test.com', 'name': 'Test', 'role': role,
+            'customer_id': customer_id, 'customer_name': None
+        }
+    return client
+
+
+class TestSplitColumns:
+
+    def test_generated_comments_are_split(self, scale_db):
+        conn = sqlite3.connect(scale_db)
+        rows = conn.execute("""
+            SELECT comment, comment_situation, comment_general FROM responses
+            WHERE comment IS NOT NULL AND comment != ''
+        """).fetchall()
+        conn.close()
+
+        assert rows
+        for comment, situation, general in rows:
+            assert situation or general
+            if situation:
+                assert f"SITUATION: {situation}" in comment
+            if general:
+                assert f"GENERELT: {general}" in comment
+
+    def test_trigger_splits_legacy_insert(self, scale_db):
+        conn = sqlite3.connect(scale_db)
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type, comment)
+            SELECT assessment_id, unit_id, question_id, 4, respondent_type,
+                   'SITUATION: Kaffemaskinen driller' || char(10) || char(10) || 'GENERELT: Fint nok'
+            FROM responses WHERE assessment_id = ? LIMIT 1
+        """, (ASSESSMENT_ID,))
+        row = conn.execute("""
+            SELECT comment_situation, comment_general FROM responses ORDER BY id DESC LIMIT 1
+        """).fetchone()
+        conn.commit()
+        conn.close()
+        assert row == ('Kaffemaskinen driller', 'Fint nok')
+
+    def test_init_adds_missing_comment_column(self):
+        from comment_search import init_comment_search
+        conn = sqlite3.connect(':memory:')
+        conn.execute("""CREATE TABLE responses (id INTEGER PRIMARY KEY, assessment_id TEXT,
+                                                unit_id TEXT, score INTEGER)""")
+        init_comment_search(conn)
+        init_comment_search(conn)
+        conn.execute("INSERT INTO responses (assessment_id, comment) VALUES ('a', 'GENERELT: Fint')")
+        assert conn.execute("SELECT comment_general FROM responses").fetchone() == ('Fint',)
+
+    def test_combine_comment_matches_legacy_format(self):
+        from comment_search import combine_comment
+        assert combine_comment('a', 'b') == 'SITUATION: a\n\nGENERELT: b'
+        assert combine_comment('', 'b') == 'GENERELT: b'
+        assert combine_comment('a', '') == 'SITUATION: a'
+        assert combine_comment('', '') == ''
+
+
+class TestSearch:
+
+    def test_search_finds_term_in_field(self, scale_db):
+        from comment_search import search_comments
+        conn = sqlite3.connect(scale_db)
+        situation = conn.execute(
+            "SELECT comment_situation FROM responses WHERE comment_situation IS NOT NULL LIMIT 1"
+        ).fetchone()[0]
+        conn.close()
+        word = max(situation.split(), key=len).strip('.,!?').lower()
+
+        results = search_comments(CUSTOMER_ID, query=word, field='situation', limit=200)
+        assert results['comments']
+        for comment in results['comments']:
+            assert word in comment['situation'].lower()
+
+    def test_search_is_scoped_to_customer(self, scale_db):
+        from comment_search import search_comments
+        results = search_comments(CUSTOMER_ID, limit=200)
+        assert results['comments']
+        assert {c['unit_id'].split('-')[1] for c in results['comments']} == {'s42c1'}
+
+    def test_cursor_pages_do_not_overlap(self, scale_db):
+        from comment_search import search_comments
+        first = search_comments(CUSTOMER_ID, assessment_id=ASSESSMENT_ID, limit=5)
+        assert len(first['comments']) == 5
+        assert first['next_cursor']
+
+        second = search_comments(CUSTOMER_ID, assessment_id=ASSESSMENT_ID, limit=5,
+                                 cursor=first['next_cursor'])
+        first_ids = {c['id'] for c in first['comments']}
+        second_ids = {c['id'] for c in second['comments']}
+        assert second_ids and not first_ids & second_ids
+        assert max(second_ids) < min(first_ids)
+
+    def test_like_fallback_without_fts(self, scale_db, monkeypatch):
+        import comment_search
+        expected = comment_search.search_comments(CUSTOMER_ID, query='møde', limit=200)
+        monkeypatch.setattr(comment_search, '_has_fts', lambda conn: False)
+        fallback = comment_search.search_comments(CUSTOMER_ID, query='møde', limit=200)
+        assert {c['id'] for c in fallback['comments']} >= {c['id'] for c in expected['comments']}
+
+    def test_unknown_field_rejected(self, scale_db):
+        from comment_search import search_comments
+        with pytest.raises(ValueError):
+            search_comments(CUSTOMER_ID, query='x', field='comment')
+
+
+class TestFacets:
+
+    def test_facets_count_fields_and_terms(self, scale_db):
+        from comment_search import get_comment_facets, STOPWORDS
+        facets = get_comment_facets(CUSTOMER_ID, assessment_id=ASSESSMENT_ID)
+
+        assert facets['total'] > 0
+        assert facets['fields']['situation'] + facets['fields']['general'] >= facets['total']
+        assert sum(facets['respondent_types'].values()) == facets['total']
+        for field in ('situation', 'general'):
+            terms = facets['terms'][field]
+            assert terms
+            assert not {t['term'] for t in terms} & STOPWORDS
+            counts = [t['count'] for t in terms]
+            assert counts == sorted(counts, reverse=True)
+
+
+    def test_facet_terms_come_from_scope_only(self, scale_db):
+        from comment_search import get_comment_facets
+        conn = sqlite3.connect(scale_db)
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type, comment)
+            SELECT r.assessment_id, r.unit_id, r.question_id, 4, 'employee',
+                   'GENERELT: Kaffemaskinen kaffemaskinen'
+            FROM responses r JOIN organizational_units ou ON ou.id = r.unit_id
+            WHERE ou.customer_id = 'cust-scale-s42c2' LIMIT 1
+        """)
+        conn.commit()
+        conn.close()
+
+        other = get_comment_facets('cust-scale-s42c2', top_terms=1000)['terms']['general']
+        assert {'term': 'kaffemaskinen', 'count': 2, 'comments': 1} in other
+        own = get_comment_facets(CUSTOMER_ID, top_terms=1000)['terms']['general']
+        assert 'kaffemaskinen' not in {t['term'] for t in own}
+
+class TestRoutes:
+
+    def test_search_api_paginates(self, app, scale_db):
+        client = _client(app)
+        data = client.get(f'/admin/comments/search?customer_id={CUSTOMER_ID}&limit=3').get_json()
+        assert len(data['comments']) == 3
+        more = client.get(f'/admin/comments/search?customer_id={CUSTOMER_ID}&limit=3'
+                          f'&cursor={data["next_cursor"]}').get_json()
+        assert more['comments'][0]['id'] < data['comments'][-1]['id']
+
+    def test_manager_locked_to_own_customer(self, app, scale_db):
+        client = _client(app, role='manager', customer_id='cust-scale-s42c2')
+        data = client.get(f'/admin/comments/search?customer_id={CUSTOMER_ID}&limit=200').get_json()
+        assert data['comments']
+        assert {c['unit_id'].split('-')[1] for c in data['comments']} == {'s42c2'}
+
+    def test_comments_page_renders(self, app, scale_db):
+        client = _client(app)
+        response = client.get(f'/admin/comments?customer_id={CUSTOMER_ID}')
+        assert response.status_code == 200
+        assert 'Fritekst-kommentarer' in response.get_data(as_text=True)
+
+
+class TestFreeTextComments:
+
+    def test_returns_split_parts_with_cursor(self, scale_db):
+        from analysis import get_free_text_comments
+        everything = get_free_text_comments(ROOT_UNIT_ID, ASSESSMENT_ID)
+        assert everything
+        assert all(c['situation'] or c['general'] for c in everything)
+
+        page = get_free_text_comments(ROOT_UNIT_ID, ASSESSMENT_ID, limit=2)
+        rest = get_free_text_comments(ROOT_UNIT_ID, ASSESSMENT_ID, cursor=page[-1]['id'])
+        assert [c['id'] for c in page + rest] == [c['id'] for c in everything]
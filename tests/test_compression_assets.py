@@ -0,0 +1,133 @@
+"""
+Tests for komprimering af dynamiske svar (compression.py) og statiske
+filer med fingerprint (template_helpers.url_for / serve_static)
+"""
+import gzip
+import re
+
+import pytest
+
+DASHBOARD_URL = '/admin/dashboard/cust-test1/unit-test-1'
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(app):
+    from cache import invalidate_all
+    invalidate_all()
+    yield
+    invalidate_all()
+
+
+class TestCompression:
+
+    def test_gzip_html(self, authenticated_client):
+        plain = authenticated_client.get(DASHBOARD_URL)
+        assert 'Content-Encoding' not in plain.headers
+        assert 'Accept-Encoding' in plain.headers['Vary']
+
+        response = authenticated_client.get(DASHBOARD_URL, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert len(response.data) < len(plain.data) / 3
+        assert gzip.decompress(response.data) == plain.data
+
+    def test_brotli_preferred(self, authenticated_client):
+        brotli = pytest.importorskip('brotli')
+        response = authenticated_client.get(DASHBOARD_URL, headers={'Accept-Encoding': 'gzip, br'})
+        assert response.headers['Content-Encoding'] == 'br'
+        assert b'</html>' in brotli.decompress(response.data)
+
+    def test_brotli_refused_or_unavailable(self, authenticated_client, monkeypatch):
+        headers = {'Accept-Encoding': 'br;q=0, gzip'}
+        assert authenticated_client.get(DASHBOARD_URL, headers=headers).headers['Content-Encoding'] == 'gzip'
+
+        import compression
+        monkeypatch.setattr(compression, 'brotli', None)
+        headers = {'Accept-Encoding': 'br'}
+        assert 'Content-Encoding' not in authenticated_client.get(DASHBOARD_URL, headers=headers).headers
+
+    def test_small_and_binary_responses_untouched(self, client):
+        from compression import COMPRESSION_MIN_SIZE
+        response = client.get('/static/robots.txt', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+        from flask import Flask, Response
+        from compression import compress_response
+        app = Flask(__name__)
+        for body, mimetype in ((b'x' * (COMPRESSION_MIN_SIZE - 1), 'text/html'),
+                               (b'x' * 10000, 'application/pdf')):
+            with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+                response = compress_response(Response(body, mimetype=mimetype))
+                assert 'Content-Encoding' not in response.headers
+
+    def test_etag_revalidation_with_encoding(self, authenticated_client):
+        headers = {'Accept-Encoding': 'gzip'}
+        response = authenticated_client.get('/admin/trend', headers=headers)
+        etag = response.headers['ETag']
+        assert etag.endswith('-gzip"')
+
+        not_modified = authenticated_client.get('/admin/trend', headers={'If-None-Match': etag, **headers})
+        assert not_modified.status_code == 304
+        assert not_modified.headers['ETag'] == etag
+
+        # Samme ressource ukomprimeret har sit eget ETag
+        plain = authenticated_client.get('/admin/trend')
+        assert plain.headers['ETag'] == etag.replace('-gzip', '')
+
+    def test_disabled(self, authenticated_client, monkeypatch):
+        import compression
+        monkeypatch.setattr(compression, 'COMPRESSION_ENABLED', False)
+        response = authenticated_client.get(DASHBOARD_URL, headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+
+class TestStaticAssets:
+
+    @pytest.fixture(autouse=True)
+    def production_urls(self, app, monkeypatch):
+        # App'en kan være oprettet i development-mode (debug) afhængigt af testrækkefølgen
+        monkeypatch.setattr(app, 'debug', False)
+
+    def test_manifest(self, app):
+        from template_helpers import build_asset_manifest
+        manifest = build_asset_manifest(app.static_folder)
+        assert re.fullmatch(r'css/components\.[0-9a-f]{10}\.css', manifest['css/components.css'])
+        assert re.fullmatch(r'favicon\.[0-9a-f]{10}\.svg', manifest['favicon.svg'])
+
+    def test_templates_link_fingerprinted_files(self, authenticated_client):
+        body = authenticated_client.get(DASHBOARD_URL).get_data(as_text=True)
+        links = re.findall(r'(?:href|src)="(/static/[^"]+)"', body)
+        assert links
+        assert all(re.search(r'\.[0-9a-f]{10}\.\w+$', link) for link in links)
+
+    def test_fingerprinted_file_is_immutable(self, app, client):
+        from template_helpers import ASSET_CACHE_CONTROL, get_asset_manifest
+        manifest, _ = get_asset_manifest(app.static_folder)
+        response = client.get('/static/' + manifest['css/components.css'])
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == ASSET_CACHE_CONTROL
+        with open(f'{app.static_folder}/css/components.css', 'rb') as f:
+            assert response.data == f.read()
+        response.close()
+
+    def test_plain_and_outdated_names(self, client):
+        plain = client.get('/static/css/components.css')
+        assert plain.status_code == 200
+        assert 'immutable' not in plain.headers['Cache-Control']
+
+        # Fingerprint fra en tidligere deploy giver den nuværende fil, kort cachet
+        old = client.get('/static/css/components.0123456789.css')
+        assert old.status_code == 200
+        assert old.data == plain.data
+        assert 'immutable' not in old.headers['Cache-Control']
+        plain.close()
+        old.close()
+
+        assert client.get('/static/findes-ikke.css').status_code == 404
+
+    def test_debug_uses_plain_names(self, app):
+        from template_helpers import url_for
+        with app.test_request_context():
+            assert url_for('static', filename='favicon.svg') != '/static/favicon.svg'
+            app.debug = True
+            assert url_for('static', filename='favicon.svg') == '/static/favicon.svg'
@@ -0,0 +1,162 @@
+"""
+Tests for data-versioner og conditional GET (data_version.py)
+
+Et uændret dashboard/API-svar skal give 304 før view'et kører, og enhver
+ændring i kundens svar, enheder eller målinger skal give et nyt ETag.
+"""
+import pytest
+
+ASSESSMENT_ID = 'assess-etag-1'
+
+
+@pytest.fixture
+def assessment(app):
+    from db import get_db
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO assessments (id, target_unit_id, name, period)
+            VALUES (?, 'unit-test-2', 'ETag-måling', '2026Q1')
+        """, (ASSESSMENT_ID,))
+    return ASSESSMENT_ID
+
+
+def _add_response(assessment_id=ASSESSMENT_ID, unit_id='unit-test-2'):
+    from db import get_db
+    with get_db() as conn:
+        question_id = conn.execute("SELECT id FROM questions ORDER BY id LIMIT 1").fetchone()[0]
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            VALUES (?, ?, ?, 5, 'employee')
+        """, (assessment_id, unit_id, question_id))
+
+
+def _revalidate(client, url, etag, **kwargs):
+    headers = kwargs.pop('headers', {})
+    return client.get(url, headers={'If-None-Match': etag, **headers}, **kwargs)
+
+
+class TestDataVersion:
+
+    def test_bumped_by_customer_data_only(self, app, assessment):
+        from data_version import get_data_version
+        before = get_data_version('cust-test1')[0]
+        everything = get_data_version(None)[0]
+
+        _add_response()
+        assert get_data_version('cust-test1')[0] > before
+        assert get_data_version(None)[0] > everything
+
+        # En anden kundes enheder ændrer ikke cust-test1
+        from db import get_db
+        with get_db() as conn:
+            conn.execute("INSERT INTO customers (id, name) VALUES ('cust-etag-2', 'Anden kunde')")
+            after_customer = get_data_version('cust-test1', conn)[0]
+            conn.execute("""
+                INSERT INTO organizational_units (id, name, customer_id, level)
+                VALUES ('unit-etag-2', 'Anden enhed', 'cust-etag-2', 0)
+            """)
+            assert get_data_version('cust-test1', conn)[0] == after_customer
+            assert get_data_version('cust-etag-2', conn)[0] > 0
+
+    def test_unit_move_bumps_both_customers(self, app):
+        from data_version import get_data_version
+        from db import get_db
+        with get_db() as conn:
+            conn.execute("INSERT INTO customers (id, name) VALUES ('cust-etag-2', 'Anden kunde')")
+            old, new = get_data_version('cust-test1', conn)[0], get_data_version('cust-etag-2', conn)[0]
+            conn.execute("UPDATE organizational_units SET customer_id = 'cust-etag-2' WHERE id = 'unit-test-2'")
+            assert get_data_version('cust-test1', conn)[0] > old
+            assert get_data_version('cust-etag-2', conn)[0] > new
+
+
+class TestConditionalDashboards:
+
+    @pytest.mark.parametrize('url', [
+        '/admin/dashboard',
+        '/admin/dashboard/cust-test1',
+        '/admin/dashboard/cust-test1/unit-test-1',
+        '/admin/trend',
+    ])
+    def test_not_modified_until_data_changes(self, authenticated_client, url):
+        response = authenticated_client.get(url)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+        assert response.headers['Last-Modified']
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+
+        not_modified = _revalidate(authenticated_client, url, etag)
+        assert not_modified.status_code == 304
+        assert not_modified.data == b''
+        assert not_modified.headers['ETag'] == etag
+
+        from db import get_db
+        with get_db() as conn:
+            conn.execute("UPDATE organizational_units SET name = 'Omdøbt' WHERE id = 'unit-test-2'")
+        changed = _revalidate(authenticated_client, url, etag)
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+
+    def test_304_skips_the_view(self, authenticated_client, monkeypatch):
+        etag = authenticated_client.get('/admin/trend').headers['ETag']
+
+        import blueprints.admin_core as admin_core
+
+        def fail(*args, **kwargs):
+            raise AssertionError('get_trend_data må ikke køre ved 304')
+        monkeypatch.setattr(admin_core, 'get_trend_data', fail)
+        assert _revalidate(authenticated_client, '/admin/trend', etag).status_code == 304
+
+    def test_etag_depends_on_session(self, authenticated_client):
+        etag = authenticated_client.get('/admin/dashboard').headers['ETag']
+        with authenticated_client.session_transaction() as sess:
+            sess['customer_filter'] = 'cust-test1'
+        assert _revalidate(authenticated_client, '/admin/dashboard', etag).status_code == 200
+
+    def test_pending_flash_is_rendered(self, authenticated_client):
+        etag = authenticated_client.get('/admin/dashboard').headers['ETag']
+        with authenticated_client.session_transaction() as sess:
+            sess['_flashes'] = [('success', 'Gemt')]
+        response = _revalidate(authenticated_client, '/admin/dashboard', etag)
+        assert response.status_code == 200
+        assert 'Gemt' in response.get_data(as_text=True)
+
+    def test_redirects_get_no_etag(self, authenticated_client):
+        response = authenticated_client.get('/admin/dashboard/cust-findes-ikke')
+        assert response.status_code == 302
+        assert 'ETag' not in response.headers
+
+
+class TestConditionalResultsApi:
+
+    @pytest.fixture
+    def api_key(self, app):
+        from db_multitenant import generate_customer_api_key, validate_customer_api_key
+        # Nøgler med '_' i den tilfældige del kan ikke valideres (se test_customer_api)
+        for attempt in range(10):
+            full_key, _ = generate_customer_api_key('cust-test1', 'ETag', {'read': True, 'write': False})
+            if validate_customer_api_key(full_key):
+                return full_key
+        pytest.fail('Kunne ikke oprette en gyldig API-nøgle')
+
+    def test_results_revalidation(self, client, api_key, assessment):
+        url = f'/api/v1/assessments/{assessment}/results'
+        headers = {'X-API-Key': api_key}
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+
+        assert _revalidate(client, url, etag, headers=headers).status_code == 304
+        assert client.get(url, headers={'If-Modified-Since': last_modified, **headers}).status_code == 304
+        # Andre query-parametre er en anden repræsentation
+        assert _revalidate(client, url + '?include_units=true', etag, headers=headers).status_code == 200
+
+        _add_response(assessment)
+        response = _revalidate(client, url, etag, headers=headers)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_invalid_key_is_not_revalidated(self, client, assessment):
+        response = client.get(f'/api/v1/assessments/{assessment}/results',
+                              headers={'X-API-Key': 'fk_ugyldig', 'If-None-Match': '*'})
+        assert response.status_code == 401
@@ -192,6 +192,73 @@ class TestAPIKeyManagement:
             assert result['permissions']['write'] == True
 
 
+class TestAPIKeyCache:
+    """Tests for cache af verificerede API keys."""
+
+    def _customer_id(self):
+        from db_multitenant import get_db
+        with get_db() as conn:
+            customer = conn.execute("SELECT id FROM customers LIMIT 1").fetchone()
+        if not customer:
+            pytest.skip("No customers in test database")
+        return customer['id']
+
+    def test_cached_key_skips_bcrypt(self, app, api_key_tracker):
+        """Anden validering af samme key må ikke køre bcrypt igen."""
+        from unittest.mock import patch
+        with app.app_context():
+            import db_multitenant
+            full_key, key_id = api_key_tracker(self._customer_id(), "Cache Test")
+
+            assert db_multitenant.validate_customer_api_key(full_key) is not None
+            with patch.object(db_multitenant, 'verify_password') as verify:
+                result = db_multitenant.validate_customer_api_key(full_key)
+            assert result is not None
+            assert result['key_id'] == key_id
+            verify.assert_not_called()
+
+            # Forkert secret med samme prefix rammer ikke cachen
+            assert db_multitenant.validate_customer_api_key(full_key + 'x') is None
+
+    def test_revoke_evicts_cached_key(self, app, api_key_tracker):
+        """Revoke skal slå igennem selvom keyen ligger i en anden workers cache."""
+        with app.app_context():
+            import db_multitenant
+            from cache import bump_cache_version
+            full_key, key_id = api_key_tracker(self._customer_id(), "Evict Test")
+            assert db_multitenant.validate_customer_api_key(full_key) is not None
+
+            # Simulér revoke fra en anden worker: DB opdateres + version bumpes,
+            # men denne proces' cache ryddes ikke lokalt
+            with db_multitenant.get_db() as conn:
+                conn.execute("UPDATE customer_api_keys SET is_active = 0 WHERE id = ?", (key_id,))
+                bump_cache_version(db_multitenant.API_KEY_CACHE_NAME, conn)
+
+            assert db_multitenant.validate_customer_api_key(full_key) is None
+
+    def test_last_used_at_is_batched(self, app, api_key_tracker):
+        """last_used_at skrives først ved flush."""
+        with app.app_context():
+            import db_multitenant
+            full_key, key_id = api_key_tracker(self._customer_id(), "Usage Test")
+            db_multitenant.flush_api_key_usage()
+
+            db_multitenant._last_used_flushed_at = time.time()
+            db_multitenant.validate_customer_api_key(full_key)
+            db_multitenant.validate_customer_api_key(full_key)
+
+            with db_multitenant.get_db() as conn:
+                row = conn.execute("SELECT last_used_at FROM customer_api_keys WHERE id = ?",
+                                   (key_id,)).fetchone()
+            assert row['last_used_at'] is None
+
+            assert db_multitenant.flush_api_key_usage() == 1
+            with db_multitenant.get_db() as conn:
+                row = conn.execute("SELECT last_used_at FROM customer_api_keys WHERE id = ?",
+                                   (key_id,)).fetchone()
+            assert row['last_used_at'] is not None
+
+
 class TestCustomerAPIAuth:
     """Tests for API authentication."""
 
@@ -629,3 +629,57 @@ class TestBatchCleanup:
 
         assert result['deleted'] == 100
         assert result['remaining'] == 0
+
+    def test_cleanup_deletes_in_batches(self, test_db):
+        """Test that cleanup deletes across several small batches."""
+        conn = sqlite3.connect(test_db)
+
+        old_date = (datetime.now() - timedelta(days=100)).isoformat()
+        recent_date = (datetime.now() - timedelta(days=10)).isoformat()
+        conn.executemany("""
+            INSERT INTO email_logs (to_email, subject, created_at)
+            VALUES (?, 'Test', ?)
+        """, [(f'old{i}@example.com', old_date) for i in range(25)])
+        conn.execute("""
+            INSERT INTO email_logs (to_email, subject, created_at)
+            VALUES ('recent@example.com', 'Test', ?)
+        """, (recent_date,))
+        conn.commit()
+        conn.close()
+
+        from data_retention import cleanup_email_logs
+
+        with patch('data_retention.RETENTION_BATCH_PAUSE', 0):
+            result = cleanup_email_logs(days=90, batch_size=10)
+
+        assert result['success'] is True
+        assert result['deleted'] == 25
+        assert result['remaining'] == 1
+        assert 'rows_per_second' in result
+        assert 'duration_seconds' in result
+
+    def test_cleanup_runs_incremental_vacuum(self, test_db):
+        """Test that freed pages are reclaimed when auto_vacuum is incremental."""
+        conn = sqlite3.connect(test_db)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+        old_date = (datetime.now() - timedelta(days=100)).isoformat()
+        conn.executemany("""
+            INSERT INTO email_logs (to_email, subject, created_at)
+            VALUES (?, ?, ?)
+        """, [(f'old{i}@example.com', 'x' * 500, old_date) for i in range(500)])
+        conn.commit()
+        conn.close()
+
+        from data_retention import cleanup_email_logs, get_cleanup_status
+
+        with patch('data_retention.RETENTION_BATCH_PAUSE', 0):
+            result = cleanup_email_logs(days=90)
+
+        assert result['deleted'] == 500
+        assert result['pages_freed'] > 0
+
+        status = get_cleanup_status()
+        assert status['incremental_vacuum'] is True
+        assert status['freelist_pages'] == 0
@@ -407,3 +407,47 @@ class TestSuperadminAccess:
         """Test superadmin can access seed testdata page."""
         response = superadmin_client.get('/admin/seed-testdata')
         assert response.status_code == 200
+
+
+class TestDomainConfigCache:
+    """Test the in-process domain config cache used by detect_domain."""
+
+    def test_known_domain_is_served_from_cache(self, app):
+        """Test that repeated lookups don't hit the database."""
+        from unittest.mock import patch
+        import db_multitenant
+
+        db_multitenant.invalidate_domain_cache()
+        assert db_multitenant.get_domain_config('test.dk')['customer_id'] == 'cust-test1'
+
+        with patch.object(db_multitenant, 'get_db', side_effect=AssertionError('DB hit')):
+            assert db_multitenant.get_domain_config('TEST.dk')['customer_id'] == 'cust-test1'
+
+    def test_unknown_host_is_negatively_cached(self, app):
+        """Test that unknown hosts return None without a query each time."""
+        from unittest.mock import patch
+        import db_multitenant
+
+        db_multitenant.invalidate_domain_cache()
+        assert db_multitenant.get_domain_config('bot.example.com') is None
+
+        with patch.object(db_multitenant, 'get_db', side_effect=AssertionError('DB hit')):
+            for _ in range(5):
+                assert db_multitenant.get_domain_config('bot.example.com') is None
+
+    def test_domain_changes_invalidate_cache(self, app):
+        """Test that create, update and delete are visible immediately."""
+        from db_multitenant import (
+            get_domain_config, create_domain, update_domain, delete_domain
+        )
+
+        assert get_domain_config('new.example.dk') is None
+
+        domain_id = create_domain('new.example.dk', default_language='en')
+        assert get_domain_config('new.example.dk')['default_language'] == 'en'
+
+        update_domain(domain_id, default_language='da')
+        assert get_domain_config('new.example.dk')['default_language'] == 'da'
+
+        delete_domain(domain_id)
+        assert get_domain_config('new.example.dk') is None
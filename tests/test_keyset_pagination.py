@@ -0,0 +1,172 @@
+"""
+Tests for keyset-paginering (cache.keyset_paginate) og admin-listerne der bruger den
+
+Bladres der frem og tilbage gennem alle sider, skal resultatet være præcis
+den fulde sorterede liste - uden huller eller dubletter, også når mange
+rækker har samme sorteringsværdi.
+"""
+import html
+import re
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def items_conn():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, grp TEXT, score REAL)")
+    conn.executemany(
+        "INSERT INTO items (id, grp, score) VALUES (?, ?, ?)",
+        [(i, f"g{i % 4}", None if i % 5 == 0 else i % 7) for i in range(1, 104)]
+    )
+    yield conn
+    conn.close()
+
+
+def _fetcher(conn):
+    def fetch(condition, params, order_by, limit):
+        return [dict(row) for row in conn.execute(
+            f"SELECT * FROM items WHERE {condition} ORDER BY {order_by} LIMIT ?", params + [limit]
+        )]
+    return fetch
+
+
+def _walk(conn, order, per_page=10):
+    from cache import keyset_paginate
+    pages, cursor = [], None
+    while True:
+        items, pagination = keyset_paginate(_fetcher(conn), order, cursor, per_page)
+        pages.append((items, pagination))
+        if not pagination.has_next:
+            return pages
+        cursor = pagination.next_cursor
+
+
+# Admin-listernes sorteringer: (modul, order, FROM, WHERE, index siden skal hentes via)
+LIST_ORDERS = {
+    'assessments': ('blueprints.admin_core', 'ASSESSMENTS_OVERVIEW_ORDER', 'assessments c', '1 = 1',
+                    'idx_assessments_created'),
+    'pair_sessions': ('admin_app', 'PAIR_SESSIONS_ORDER', 'pair_sessions ps', '1 = 1',
+                      'idx_pair_sessions_created'),
+    'profil_sessions': ('db_profil', 'SESSIONS_ORDER', 'profil_sessions', '1 = 1',
+                        'idx_profil_sessions_created'),
+    'email_logs': ('mailjet_integration', 'EMAIL_LOGS_ORDER', 'email_logs', '1 = 1',
+                   'idx_email_logs_created_at'),
+    'email_logs_assessment': ('mailjet_integration', 'EMAIL_LOGS_ORDER', 'email_logs',
+                              "assessment_id = 'assess-s42c1-q03'", 'idx_email_logs_assessment_page'),
+}
+
+ORDERS = {
+    'grp_desc': ([('grp', True, None), ('id', True, None)], "grp DESC, id DESC"),
+    'mixed': ([('grp', False, None), ('id', True, None)], "grp ASC, id DESC"),
+    'nullable': ([('score', False, -1), ('id', False, None)], "COALESCE(score, -1) ASC, id ASC"),
+}
+
+
+class TestKeysetPaginate:
+
+    @pytest.mark.parametrize('name', sorted(ORDERS))
+    def test_forward_and_back_cover_all_rows(self, items_conn, name):
+        from cache import KeysetOrder, SortKey, keyset_paginate
+        keys, sql_order = ORDERS[name]
+        order = KeysetOrder(*[SortKey(col, col, desc, null) for col, desc, null in keys])
+        expected = [row['id'] for row in items_conn.execute(f"SELECT id FROM items ORDER BY {sql_order}")]
+
+        pages = _walk(items_conn, order)
+        assert [item['id'] for items, _ in pages for item in items] == expected
+        assert not pages[0][1].has_prev and pages[1][1].has_prev
+
+        # Tilbage fra sidste side giver de samme sider i omvendt rækkefølge
+        cursor = pages[-1][1].prev_cursor
+        for items, _ in reversed(pages[:-1]):
+            back, pagination = keyset_paginate(_fetcher(items_conn), order, cursor, 10)
+            assert [i['id'] for i in back] == [i['id'] for i in items]
+            cursor = pagination.prev_cursor
+        assert cursor is None
+
+    def test_invalid_or_foreign_cursor_starts_over(self, items_conn):
+        from cache import KeysetOrder, SortKey, keyset_paginate
+        by_id = KeysetOrder(SortKey('id', 'id'))
+        by_grp = KeysetOrder(SortKey('grp', 'grp'), SortKey('id', 'id'))
+        _, pagination = keyset_paginate(_fetcher(items_conn), by_id, None, 10)
+
+        for cursor in ('ikke-base64!', 'e30', pagination.next_cursor):
+            items, page = keyset_paginate(_fetcher(items_conn), by_grp, cursor, 10)
+            assert not page.has_prev
+            assert items[0]['id'] == 4  # Første række i (grp, id)-orden
+
+    def test_totals(self, items_conn):
+        from cache import capped_count, estimated_row_count
+        assert capped_count(items_conn, "SELECT 1 FROM items", cap=500) == (103, 'exact')
+        assert capped_count(items_conn, "SELECT 1 FROM items WHERE grp = ?", ['g1'], cap=10) == (10, 'at_least')
+        assert estimated_row_count(items_conn, 'items') == (103, 'approx')
+
+        items_conn.execute("ANALYZE")
+        assert estimated_row_count(items_conn, 'items')[0] == 103
+
+    def test_condition_uses_index(self, items_conn):
+        from cache import KeysetOrder, SortKey
+        items_conn.execute("CREATE INDEX idx_items_grp ON items(grp, id)")
+        order = KeysetOrder(SortKey('grp', 'grp', True), SortKey('id', 'id', True))
+        condition, params = order.condition(['g2', 50])
+        plan = ' '.join(row[3] for row in items_conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM items WHERE {condition} "
+            f"ORDER BY {order.order_by()} LIMIT 10", params))
+        assert 'idx_items_grp' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    @pytest.mark.parametrize('name', sorted(LIST_ORDERS))
+    def test_list_orders_use_index(self, app, scale_conn, name):
+        import importlib
+        module, attr, source, where, index = LIST_ORDERS[name]
+        order = getattr(importlib.import_module(module), attr)
+        condition, params = order.condition(['2025-01-01 00:00:00', 'x'])
+        for sql, args in ((f"{where} AND {condition}", params), (where, [])):
+            plan = ' '.join(row[3] for row in scale_conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM {source} WHERE {sql} "
+                f"ORDER BY {order.order_by()} LIMIT 10", args))
+            assert index in plan
+            assert 'TEMP B-TREE' not in plan
+
+    def test_created_at_is_never_null(self, scale_conn):
+        scale_conn.execute("""
+            INSERT INTO email_logs (to_email, created_at) VALUES ('a@example.com', NULL)
+        """)
+        scale_conn.execute("UPDATE email_logs SET created_at = NULL WHERE id = 1")
+        assert scale_conn.execute(
+            "SELECT COUNT(*) FROM email_logs WHERE created_at IS NULL").fetchone()[0] == 0
+
+
+class TestAdminLists:
+
+    def _next_link(self, body):
+        match = re.search(r'href="([^"]*cursor=[^"]*)"[^>]*>Næste', body)
+        return html.unescape(match.group(1)) if match else None
+
+    def test_customers_paged_by_cursor(self, authenticated_client):
+        from db import get_db
+        from cache import DEFAULT_PAGE_SIZE
+        with get_db() as conn:
+            conn.executemany("INSERT INTO customers (id, name) VALUES (?, ?)",
+                             [(f"cust-page-{i:03d}", f"Kunde {i:03d}") for i in range(DEFAULT_PAGE_SIZE + 5)])
+            expected = [row['id'] for row in conn.execute("SELECT id FROM customers ORDER BY name, id")]
+
+        seen, url = [], '/admin/customers'
+        while url:
+            body = authenticated_client.get(url).get_data(as_text=True)
+            seen.extend(re.findall(r'/admin/impersonate/([\w-]+)"', body))
+            url = self._next_link(body)
+
+        assert seen == expected
+
+    @pytest.mark.parametrize('path', [
+        '/admin/assessments-overview',
+        '/admin/analyser?sort=gap&order=desc',
+        '/admin/profiler?context=mus&status=complete',
+        '/admin/pair-sessions',
+        '/admin/email-stats',
+    ])
+    def test_list_pages_render(self, authenticated_client, path):
+        assert authenticated_client.get(path).status_code == 200
@@ -0,0 +1,258 @@
+"""
+Tests for bulk-import af organisationer fra CSV (csv_upload_hierarchical)
+
+Importen skal oprette manglende enheder med korrekte parents, genbruge
+eksisterende enheder, og enten gemme alt eller intet. Uploads valideres og
+stages i ét gennemløb, og bekræft-trinnet importerer fra staging.
+"""
+import io
+import re
+
+import pytest
+
+CUSTOMER_ID = 'cust-test1'
+
+CSV = """\ufeffFirstName;Lastname;Email;phone;Organisation
+Anders;Hansen;anders@test.dk;+4512345678;Import A/S//Salg//Nord
+Mette;Jensen;mette@test.dk;;Import A/S//Salg//Nord
+Lars;Andersen;;+4587654321;Import A/S//Salg//Syd
+Bo;Berg;bo@test.dk;;Import A/S//IT
+;;;;
+Tom;Niveau;tom@test.dk;;Import A/S////Fejl
+"""
+
+
+def _units(conn, prefix='Import A/S'):
+    rows = conn.execute("""
+        SELECT ou.*, p.full_path as parent_path
+        FROM organizational_units ou
+        LEFT JOIN organizational_units p ON p.id = ou.parent_id
+        WHERE ou.full_path LIKE ? || '%'
+    """, (prefix,)).fetchall()
+    return {row['full_path']: dict(row) for row in rows}
+
+
+class TestImportOrgCsv:
+
+    def test_creates_tree_and_contacts(self, app):
+        from csv_upload_hierarchical import import_org_csv
+        from db import get_db
+
+        stats = import_org_csv(CSV, customer_id=CUSTOMER_ID)
+        assert stats['units_created'] == 5
+        assert stats['contacts_created'] == 4
+        assert stats['units_skipped'] == 1
+        assert len(stats['errors']) == 1 and 'Række 7' in stats['errors'][0]
+
+        with get_db() as conn:
+            units = _units(conn)
+            nord = units['Import A/S//Salg//Nord']
+            assert nord['parent_path'] == 'Import A/S//Salg'
+            assert nord['level'] == 2
+            assert nord['customer_id'] == CUSTOMER_ID
+            assert nord['leader_name'] == 'Anders Hansen'
+            assert nord['employee_count'] == 2
+            assert units['Import A/S']['parent_id'] is None
+            assert units['Import A/S//Salg']['leader_name'] is None
+            assert conn.execute("SELECT COUNT(*) FROM contacts WHERE unit_id = ?",
+                                (nord['id'],)).fetchone()[0] == 2
+
+    def test_existing_units_are_reused(self, app):
+        from csv_upload_hierarchical import import_org_csv
+        from db import get_db
+
+        import_org_csv(CSV, customer_id=CUSTOMER_ID)
+        more = CSV + "Ny;Person;ny@test.dk;;Import A/S//Salg//Vest\n"
+        stats = import_org_csv(more, customer_id=CUSTOMER_ID)
+
+        assert stats['diff']['new_units'] == ['Import A/S//Salg//Vest']
+        assert stats['diff']['existing_units'] == 5
+        assert set(stats['diff']['updated_units']) == {
+            'Import A/S//Salg//Nord', 'Import A/S//Salg//Syd', 'Import A/S//IT'}
+        with get_db() as conn:
+            assert len(_units(conn)) == 6
+
+    def test_other_customers_units_not_reused(self, app):
+        from csv_upload_hierarchical import import_org_csv
+        from db import get_db
+
+        import_org_csv(CSV, customer_id=CUSTOMER_ID)
+        with get_db() as conn:
+            conn.execute("INSERT INTO customers (id, name) VALUES ('cust-import-2', 'Anden kunde')")
+        stats = import_org_csv(CSV, customer_id='cust-import-2')
+        assert stats['units_created'] == 5
+        assert stats['diff']['existing_units'] == 0
+
+    def test_dry_run_writes_nothing(self, app):
+        from csv_upload_hierarchical import import_org_csv
+        from db import get_db
+
+        stats = import_org_csv(CSV, customer_id=CUSTOMER_ID, dry_run=True)
+        assert stats['dry_run']
+        assert stats['units_created'] == 5
+        assert stats['diff']['new_units'][0] == 'Import A/S'  # Parents før children
+        with get_db() as conn:
+            assert not _units(conn)
+            assert not conn.execute("SELECT 1 FROM contacts WHERE email = 'anders@test.dk'").fetchone()
+
+    def test_failure_rolls_back_everything(self, app):
+        from csv_upload_hierarchical import import_org_csv
+        from db import get_db
+
+        with get_db() as conn:
+            conn.execute("""
+                CREATE TRIGGER test_fail_contacts BEFORE INSERT ON contacts
+                BEGIN SELECT RAISE(ABORT, 'kontakt afvist'); END
+            """)
+        try:
+            stats = import_org_csv(CSV, customer_id=CUSTOMER_ID)
+        finally:
+            with get_db() as conn:
+                conn.execute("DROP TRIGGER test_fail_contacts")
+
+        assert stats['units_created'] == 0
+        assert 'kontakt afvist' in stats['errors'][-1]
+        with get_db() as conn:
+            assert not _units(conn)
+
+    def test_statement_count_independent_of_rows(self, app, monkeypatch):
+        import csv_upload_hierarchical
+
+        statements = []
+        real_get_db = csv_upload_hierarchical.get_db
+
+        def counting_get_db():
+            ctx = real_get_db()
+
+            class Counting:
+                def __enter__(self):
+                    conn = ctx.__enter__()
+                    conn.set_trace_callback(statements.append)
+                    return conn
+
+                def __exit__(self, *exc):
+                    return ctx.__exit__(*exc)
+            return Counting()
+        monkeypatch.setattr(csv_upload_hierarchical, 'get_db', counting_get_db)
+
+        rows = ''.join(f"P;{i};p{i}@test.dk;;Import A/S//Afd {i % 20}//Team {i}\n" for i in range(500))
+        csv_upload_hierarchical.import_org_csv(CSV.split('\n')[0] + '\n' + rows, customer_id=CUSTOMER_ID)
+        selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 1
+
+
+@pytest.fixture
+def staging_dir(tmp_path, monkeypatch):
+    import csv_upload_hierarchical
+    monkeypatch.setattr(csv_upload_hierarchical, 'STAGING_DIR', str(tmp_path))
+    return tmp_path
+
+
+class TestStaging:
+
+    def test_stage_then_import(self, app, staging_dir, monkeypatch):
+        import csv_upload_hierarchical as upload
+        from db import get_db
+        # Små chunks, så linjer og tegn deles på tværs af chunks
+        monkeypatch.setattr(upload, 'CHUNK_SIZE', 7)
+
+        staged = upload.stage_org_csv(io.BytesIO(CSV.encode('utf-8')), CUSTOMER_ID, user_id=1)
+        assert staged['valid']
+        assert staged['total_rows'] == 4 and staged['unique_orgs'] == 3
+        assert staged['max_depth'] == 3
+        assert [row['path'] for row in staged['preview']][:1] == ['Import A/S//Salg//Nord']
+        assert len(staged['diff']['new_units']) == 5
+        assert staged['error_count'] == 1
+        with get_db() as conn:
+            assert not _units(conn)
+
+        # Bekræft-trinnet læser ikke CSV'en igen
+        monkeypatch.setattr(upload, '_read_org_rows', None)
+        assert upload.import_staged_org_csv(staged['upload_id'], user_id=2) is None
+        stats = upload.import_staged_org_csv(staged['upload_id'], user_id=1)
+        assert stats['units_created'] == 5 and stats['contacts_created'] == 4
+        assert stats['error_count'] == 1
+        with get_db() as conn:
+            assert _units(conn)['Import A/S//Salg//Nord']['employee_count'] == 2
+
+        assert not list(staging_dir.iterdir())
+        assert upload.import_staged_org_csv(staged['upload_id'], user_id=1) is None
+
+    def test_progress_and_large_file(self, app, staging_dir, monkeypatch):
+        import csv_upload_hierarchical as upload
+        monkeypatch.setattr(upload, 'STAGING_BATCH', 100)
+        monkeypatch.setattr(upload, 'CHUNK_SIZE', 4096)
+
+        header = CSV.split('\n')[0] + '\n'
+        rows = ''.join(f"P;{i};p{i}@test.dk;;Import A/S//Afd {i % 5}//Team {i % 50}\n" for i in range(1000))
+        data = (header + rows).encode('utf-8')
+
+        seen = []
+        real_set_meta = upload._set_meta
+
+        def record_progress(conn, **values):
+            real_set_meta(conn, **values)
+            if 'progress' in values:
+                seen.append(dict(values['progress']))
+        monkeypatch.setattr(upload, '_set_meta', record_progress)
+
+        upload_id = upload.new_upload_id()
+        staged = upload.stage_org_csv(io.BytesIO(data), CUSTOMER_ID, user_id=1,
+                                      upload_id=upload_id, total_bytes=len(data))
+        assert staged['upload_id'] == upload_id
+        assert [p['rows'] for p in seen if not p['done']][1:4] == [100, 200, 300]
+        assert 0 < seen[1]['bytes_read'] <= len(data)
+
+        progress = upload.get_staging_progress(upload_id, user_id=1)
+        assert progress == {'bytes_read': len(data), 'total_bytes': len(data), 'rows': 1000, 'done': True}
+        assert upload.get_staging_progress(upload_id, user_id=2) is None
+        assert upload.get_staging_progress('../../etc/passwd', user_id=1) is None
+
+        stats = upload.import_staged_org_csv(upload_id, user_id=1)
+        assert stats['units_created'] == 1 + 5 + 50
+        assert stats['contacts_created'] == 1000
+
+    @pytest.mark.parametrize('content, error', [
+        ('Navn;Email\nA;a@test.dk\n'.encode('utf-8'), 'Manglende kolonner'),
+        ('Organisation\nK\xf8benhavn\n'.encode('latin-1'), 'CSV parse fejl'),
+    ])
+    def test_invalid_files_are_not_staged(self, app, staging_dir, content, error):
+        from csv_upload_hierarchical import stage_org_csv
+        staged = stage_org_csv(io.BytesIO(content), CUSTOMER_ID, user_id=1)
+        assert not staged['valid']
+        assert error in staged['errors'][0]
+        assert not list(staging_dir.iterdir())
+
+
+def test_bulk_upload_preview_and_confirm(authenticated_client, staging_dir):
+    data = {'file': (io.BytesIO(CSV.encode('utf-8')), 'org.csv')}
+    response = authenticated_client.post('/admin/bulk-upload', data=data,
+                                         content_type='multipart/form-data')
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'Nye enheder' in body
+    assert 'Tomt niveau' in body
+
+    upload_id = re.search(r'name="upload_id" value="([^"]+)"', body).group(1)
+    progress = authenticated_client.get(f'/admin/bulk-upload/progress/{upload_id}').get_json()
+    assert progress['done'] and progress['rows'] == 6
+
+    response = authenticated_client.post('/admin/bulk-upload/confirm', data={'upload_id': upload_id})
+    assert response.status_code == 302
+    from db import get_db
+    with get_db() as conn:
+        assert len(_units(conn, prefix='Import A/S')) == 5
+
+
+def test_upload_limit_raised_only_for_bulk_upload(authenticated_client, app, staging_dir, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1000)
+    content = (CSV + 'X;Y;x@test.dk;;Import A/S//Fyld\n' * 100).encode('utf-8')
+    assert len(content) > 1000
+
+    data = {'file': (io.BytesIO(content), 'org.csv')}
+    assert authenticated_client.post('/admin/bulk-upload', data=data,
+                                     content_type='multipart/form-data').status_code == 200
+
+    data = {'file': (io.BytesIO(content), 'kontakter.csv')}
+    assert authenticated_client.post('/admin/unit/unit-test-2/contacts/upload', data=data,
+                                     content_type='multipart/form-data').status_code == 413
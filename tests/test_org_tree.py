@@ -0,0 +1,146 @@
+"""
+Tests for organisationstræet i hukommelsen (org_tree.py)
+
+OrgTree skal give samme svar som de rekursive queries det erstatter, og
+træ-versionen skal tælles op uanset hvordan enheder oprettes, flyttes
+eller slettes.
+"""
+import pytest
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+@pytest.fixture(scope='module')
+def scale_options():
+    return {'customers': 1, 'depth': 3, 'fanout': 3, 'employees': 60, 'quarters': 1}
+
+
+def _subtree_sql(conn, unit_id):
+    return [row['id'] for row in conn.execute("""
+        WITH RECURSIVE subtree AS (
+            SELECT id FROM organizational_units WHERE id = ?
+            UNION ALL
+            SELECT ou.id FROM organizational_units ou JOIN subtree st ON ou.parent_id = st.id
+        )
+        SELECT id FROM subtree
+    """, (unit_id,))]
+
+
+def _deepest_unit(conn):
+    return conn.execute(
+        "SELECT id FROM organizational_units WHERE customer_id = ? ORDER BY level DESC, id LIMIT 1",
+        (CUSTOMER_ID,)
+    ).fetchone()['id']
+
+
+class TestOrgTree:
+
+    def test_matches_recursive_queries(self, scale_conn):
+        from org_tree import get_org_tree
+        tree = get_org_tree(CUSTOMER_ID)
+
+        for unit_id in [row['id'] for row in scale_conn.execute(
+                "SELECT id FROM organizational_units WHERE customer_id = ?", (CUSTOMER_ID,))]:
+            expected = _subtree_sql(scale_conn, unit_id)
+            assert sorted(tree.subtree_ids(unit_id)) == sorted(expected)
+            assert tree.descendant_count(unit_id) == len(expected) - 1
+
+            leaves = {row['id'] for row in scale_conn.execute(
+                f"SELECT id FROM organizational_units WHERE id IN ({','.join('?' * len(expected))})"
+                " AND id NOT IN (SELECT parent_id FROM organizational_units WHERE parent_id IS NOT NULL)",
+                expected)}
+            assert {u['id'] for u in tree.leaves(unit_id)} == leaves
+            assert tree.unit_is_leaf(unit_id) == (unit_id in leaves and len(expected) == 1)
+
+    def test_path_and_intervals(self, scale_conn):
+        from org_tree import get_org_tree
+        tree = get_org_tree(CUSTOMER_ID)
+        deepest = _deepest_unit(scale_conn)
+
+        path = tree.path(deepest)
+        assert path[0]['id'] == ROOT_UNIT_ID
+        assert path[-1]['id'] == deepest
+        assert [u['level'] for u in path] == list(range(len(path)))
+        for ancestor in path:
+            assert tree.is_descendant(deepest, ancestor['id'])
+        assert not tree.is_descendant(ROOT_UNIT_ID, deepest)
+        assert tree.path('unit-findes-ikke') == []
+
+    def test_db_functions_use_tree(self, scale_conn):
+        from db_hierarchical import get_all_leaf_units_under, get_leaf_units, get_unit_path
+        deepest = _deepest_unit(scale_conn)
+
+        assert [u['id'] for u in get_unit_path(deepest)][-1] == deepest
+        leaves = get_leaf_units(ROOT_UNIT_ID)
+        assert leaves == get_all_leaf_units_under(ROOT_UNIT_ID)
+        assert [u['full_path'] for u in leaves] == sorted(u['full_path'] for u in leaves)
+        assert 'employee_count' in leaves[0]
+
+    def test_cycles_and_orphans(self):
+        from org_tree import OrgTree
+        rows = [
+            {'id': 'a', 'parent_id': None, 'name': 'A', 'full_path': 'A'},
+            {'id': 'b', 'parent_id': 'a', 'name': 'B', 'full_path': 'A//B'},
+            {'id': 'c', 'parent_id': 'ukendt', 'name': 'C', 'full_path': 'C'},
+            {'id': 'x', 'parent_id': 'y', 'name': 'X', 'full_path': 'X'},
+            {'id': 'y', 'parent_id': 'x', 'name': 'Y', 'full_path': 'Y'},
+        ]
+        tree = OrgTree('cust', rows)
+        # Ukendt parent -> rod; cyklen brydes ved første enhed i cyklen
+        assert [u['id'] for u in tree.get_children()] == ['a', 'c', 'x']
+        assert [u['id'] for u in tree.leaves()] == ['b', 'c', 'y']
+        assert tree.subtree_ids('x') == ['x', 'y']
+
+
+class TestInvalidation:
+
+    def test_reused_until_changed(self, scale_db):
+        from org_tree import get_org_tree
+        assert get_org_tree(CUSTOMER_ID) is get_org_tree(CUSTOMER_ID)
+
+    def test_create_move_delete(self, scale_conn):
+        from db_hierarchical import create_unit, move_unit
+        from org_tree import get_org_tree
+        from db import get_db
+
+        before = get_org_tree(CUSTOMER_ID)
+        unit_id = create_unit('Ny afdeling', parent_id=ROOT_UNIT_ID)
+        tree = get_org_tree(CUSTOMER_ID)
+        assert tree is not before
+        assert tree.descendant_count(ROOT_UNIT_ID) == before.descendant_count(ROOT_UNIT_ID) + 1
+        assert tree.unit_is_leaf(unit_id)
+
+        deepest = _deepest_unit(scale_conn)
+        move_unit(unit_id, deepest)
+        tree = get_org_tree(CUSTOMER_ID)
+        assert [u['id'] for u in tree.path(unit_id)][-2] == deepest
+        assert not tree.unit_is_leaf(deepest)
+
+        with get_db() as db:
+            db.execute("DELETE FROM organizational_units WHERE id = ?", (unit_id,))
+        tree = get_org_tree(CUSTOMER_ID)
+        assert unit_id not in tree
+        assert tree.unit_is_leaf(deepest)
+
+    def test_rename_updates_breadcrumbs(self, scale_conn):
+        from db_hierarchical import get_unit_path
+        deepest = _deepest_unit(scale_conn)
+        get_unit_path(deepest)
+
+        scale_conn.execute("UPDATE organizational_units SET name = 'Omdøbt' WHERE id = ?", (ROOT_UNIT_ID,))
+        scale_conn.commit()
+        assert get_unit_path(deepest)[0]['name'] == 'Omdøbt'
+
+
+class TestDashboard:
+
+    def test_breadcrumb_from_tree(self, authenticated_client):
+        from db_hierarchical import create_unit
+        child = create_unit('Underafdeling', parent_id='unit-test-2')
+
+        response = authenticated_client.get(f'/admin/dashboard/cust-test1/{child}')
+        html = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert 'Test Organisation' in html
+        assert 'Test Afdeling' in html
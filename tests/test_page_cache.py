@@ -0,0 +1,127 @@
+"""
+Tests for side-cachen (page_cache.py)
+
+En gentaget visning skal springe view'et (analyse og rendering) over og
+give samme HTML, mens layoutet stadig renderes for den aktuelle session.
+"""
+import re
+
+import pytest
+
+DASHBOARD_URL = '/admin/dashboard/cust-test1/unit-test-1'
+
+
+def _main(html):
+    return re.search(r'<main[^>]*>(.*)</main>', html, re.S).group(1)
+
+
+def _page_entries():
+    from cache import _cache
+    return {key: entry for key, entry in _cache.items() if key.startswith('page:')}
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(app):
+    from cache import invalidate_all
+    invalidate_all()
+    yield
+    invalidate_all()
+
+
+class TestCachedPage:
+
+    def test_repeat_view_skips_the_view(self, authenticated_client, monkeypatch):
+        first = authenticated_client.get(DASHBOARD_URL).get_data(as_text=True)
+        assert len(_page_entries()) == 1
+
+        import blueprints.admin_core as admin_core
+
+        def fail(*args, **kwargs):
+            raise AssertionError('view må ikke køre ved cache-hit')
+        monkeypatch.setattr(admin_core, 'get_tree_for_unit', fail)
+
+        second = authenticated_client.get(DASHBOARD_URL)
+        assert second.status_code == 200
+        assert second.get_data(as_text=True) == first
+
+    @pytest.mark.parametrize('url', ['/admin/analyser', '/admin/analyser?sort=gap&order=desc'])
+    def test_analyser_cached_per_url(self, authenticated_client, monkeypatch, url):
+        first = authenticated_client.get(url).get_data(as_text=True)
+
+        import blueprints.admin_core as admin_core
+        monkeypatch.setattr(admin_core, 'get_customer_filter', None)
+        assert authenticated_client.get(url).get_data(as_text=True) == first
+
+    def test_entries_are_compressed(self, authenticated_client):
+        import json
+        import zlib
+        html = authenticated_client.get(DASHBOARD_URL).get_data(as_text=True)
+        (entry,) = _page_entries().values()
+        raw = zlib.decompress(entry['value'])
+        assert len(entry['value']) < len(raw) / 3
+        assert json.loads(raw)['content'].strip() in _main(html)
+
+    def test_layout_rendered_per_session(self, app):
+        pages = []
+        for user_id, name in ((1, 'Admin Et'), (3, 'Admin To')):
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user'] = {'id': user_id, 'email': f'{user_id}@test.com', 'name': name,
+                                'role': 'admin', 'customer_id': None, 'customer_name': None}
+            pages.append(client.get(DASHBOARD_URL).get_data(as_text=True))
+
+        assert len(_page_entries()) == 1
+        assert _main(pages[0]) == _main(pages[1])
+        assert 'Admin Et' in pages[0] and 'Admin Et' not in pages[1]
+        assert 'Admin To' in pages[1]
+
+    def test_key_includes_customer_filter_and_language(self, authenticated_client):
+        authenticated_client.get(DASHBOARD_URL)
+        with authenticated_client.session_transaction() as sess:
+            sess['customer_filter'] = 'cust-test1'
+        authenticated_client.get(DASHBOARD_URL)
+        with authenticated_client.session_transaction() as sess:
+            sess['language'] = 'en'
+        authenticated_client.get(DASHBOARD_URL)
+        assert len(_page_entries()) == 3
+
+
+class TestInvalidation:
+
+    def test_data_change_renders_again(self, authenticated_client):
+        authenticated_client.get(DASHBOARD_URL)
+
+        from db import get_db
+        with get_db() as conn:
+            conn.execute("UPDATE organizational_units SET name = 'Omdøbt afdeling' WHERE id = 'unit-test-2'")
+
+        assert 'Omdøbt afdeling' in authenticated_client.get(DASHBOARD_URL).get_data(as_text=True)
+        assert len(_page_entries()) == 2
+
+    def test_cleared_with_analysis_cache(self, authenticated_client):
+        from cache import invalidate_assessment_cache, invalidate_unit_cache
+        authenticated_client.get(DASHBOARD_URL)
+        invalidate_assessment_cache('assess-1')
+        assert not _page_entries()
+
+        authenticated_client.get(DASHBOARD_URL)
+        invalidate_unit_cache('unit-test-1')
+        assert not _page_entries()
+
+    def test_disabled(self, authenticated_client, monkeypatch):
+        import page_cache
+        monkeypatch.setattr(page_cache, 'PAGE_CACHE_ENABLED', False)
+        authenticated_client.get(DASHBOARD_URL)
+        assert not _page_entries()
+
+    def test_redirects_not_cached(self, authenticated_client):
+        assert authenticated_client.get('/admin/dashboard/cust-findes-ikke').status_code == 302
+        assert not _page_entries()
+
+
+def test_max_entries_evicts_oldest():
+    from cache import get_cached_value, set_cached_value, invalidate_prefix
+    for i in range(5):
+        set_cached_value(f'pagetest:{i}', i, max_entries=3)
+    assert [get_cached_value(f'pagetest:{i}') for i in range(5)] == [None, None, 2, 3, 4]
+    invalidate_prefix('pagetest:')
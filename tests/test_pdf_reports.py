@@ -0,0 +1,229 @@
+"""
+Tests for PDF-rendering i baggrunden med fil-cache (pdf_reports.py)
+
+WeasyPrint er ikke nødvendigvis installeret i test-miljøet, så selve
+HTML -> PDF-trinnet erstattes; data og HTML bygges som i produktion.
+"""
+import io
+import sqlite3
+import zipfile
+
+import pytest
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+@pytest.fixture
+def pdf_env(app, scale_db, tmp_path, monkeypatch):
+    """Frisk kopi af datasættet, tom PDF-cache og en falsk renderer"""
+    import pdf_reports
+
+    monkeypatch.setenv('PDF_CACHE_DIR', str(tmp_path / 'pdf_cache'))
+
+    rendered = []
+
+    def fake_render(html):
+        rendered.append(html)
+        return b'%PDF-1.4 test'
+
+    monkeypatch.setattr(pdf_reports, 'render_pdf_bytes', fake_render)
+    return {'db_path': scale_db, 'rendered': rendered}
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {
+            'id': 1, 'email': 'admin@test.com', 'name': 'Test Admin',
+            'role': 'superadmin', 'customer_id': None, 'customer_name': None
+        }
+    return client
+
+
+def _leaf_unit(db_path):
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("""
+        SELECT unit_id FROM responses
+        WHERE assessment_id = ? AND respondent_type = 'employee'
+        GROUP BY unit_id ORDER BY COUNT(*) DESC LIMIT 1
+    """, (ASSESSMENT_ID,)).fetchone()
+    conn.close()
+    return row[0]
+
+
+class TestPdfCache:
+
+    def test_renders_once_and_serves_from_cache(self, app, pdf_env, admin_client):
+        import pdf_reports
+        unit_id = _leaf_unit(pdf_env['db_path'])
+        url = f'/admin/assessment/{ASSESSMENT_ID}/pdf?unit_id={unit_id}'
+
+        first = admin_client.get(url)
+        assert first.status_code in (200, 202)
+        pdf_reports.wait_for_jobs(timeout=30)
+
+        second = admin_client.get(url)
+        assert second.status_code == 200
+        assert second.mimetype == 'application/pdf'
+        assert second.data == b'%PDF-1.4 test'
+        assert len(pdf_env['rendered']) == 1
+        assert 'Friktionsmåling' in pdf_env['rendered'][0]
+
+    def test_new_data_gives_new_version(self, app, pdf_env):
+        import os
+        import pdf_reports
+        unit_id = _leaf_unit(pdf_env['db_path'])
+
+        status = pdf_reports.request_pdf(app, ASSESSMENT_ID, unit_id, wait=30)
+        assert status['status'] == 'ready'
+        old_path = status['path']
+
+        conn = sqlite3.connect(pdf_env['db_path'])
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            SELECT assessment_id, unit_id, question_id, 5, respondent_type
+            FROM responses WHERE assessment_id = ? LIMIT 1
+        """, (ASSESSMENT_ID,))
+        conn.commit()
+        conn.close()
+
+        assert pdf_reports.get_cached_pdf(ASSESSMENT_ID, unit_id) is None
+        status = pdf_reports.request_pdf(app, ASSESSMENT_ID, unit_id, wait=30)
+        assert status['status'] == 'ready'
+        assert status['path'] != old_path
+        assert not os.path.exists(old_path)
+        assert len(pdf_env['rendered']) == 2
+
+    def test_missing_library_redirects(self, app, pdf_env, admin_client, monkeypatch):
+        import pdf_reports
+
+        def no_weasyprint(html):
+            raise ImportError('weasyprint')
+
+        monkeypatch.setattr(pdf_reports, 'render_pdf_bytes', no_weasyprint)
+        unit_id = _leaf_unit(pdf_env['db_path'])
+        response = admin_client.get(f'/admin/assessment/{ASSESSMENT_ID}/pdf?unit_id={unit_id}')
+        assert response.status_code == 302
+
+    def test_rejects_unit_outside_assessment(self, app, pdf_env, admin_client):
+        response = admin_client.get(f'/admin/assessment/{ASSESSMENT_ID}/pdf?unit_id=unit-other')
+        assert response.status_code == 302
+        assert pdf_env['rendered'] == []
+
+
+class TestBulkPdf:
+
+    def test_bulk_render_and_download(self, app, pdf_env, admin_client):
+        import pdf_reports
+        url = f'/admin/assessment/{ASSESSMENT_ID}/pdf/bulk'
+
+        started = admin_client.post(url)
+        assert started.status_code == 202
+        data = started.get_json()
+        rendered_units = [u['unit_id'] for u in data['units'] if u['status'] != 'skipped']
+        assert rendered_units
+        assert data['units'][0]['unit_id'] == ROOT_UNIT_ID
+
+        pdf_reports.wait_for_jobs(timeout=60)
+        status = admin_client.get(url).get_json()
+        assert status['summary'].get('ready') == len(rendered_units)
+
+        download = admin_client.get(f'{url}/download')
+        assert download.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(download.data))
+        assert len(archive.namelist()) == len(rendered_units)
+
+    def test_status_does_not_start_jobs(self, app, pdf_env, admin_client):
+        status = admin_client.get(f'/admin/assessment/{ASSESSMENT_ID}/pdf/bulk').get_json()
+        assert 'ready' not in status['summary']
+        assert 'pending' not in status['summary']
+        assert pdf_env['rendered'] == []
+
+
+class TestSplitCustomer:
+
+    @pytest.fixture
+    def split(self, pdf_env, tmp_path, monkeypatch):
+        import tenant_db
+        unit_id = _leaf_unit(pdf_env['db_path'])
+        monkeypatch.setattr(tenant_db, 'TENANT_SHARDING', True)
+        monkeypatch.setenv('TENANT_DB_DIR', str(tmp_path / 'tenants'))
+        tenant_db.split_customer(CUSTOMER_ID)
+        yield unit_id
+        tenant_db.invalidate_registry()
+
+    def test_job_reads_customer_database(self, app, pdf_env, split):
+        import pdf_reports
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = {
+                'id': 2, 'email': 'manager@test.com', 'name': 'Test Manager',
+                'role': 'manager', 'customer_id': CUSTOMER_ID, 'customer_name': None
+            }
+        url = f'/admin/assessment/{ASSESSMENT_ID}/pdf?unit_id={split}'
+
+        assert client.get(url).status_code in (200, 202)
+        pdf_reports.wait_for_jobs(timeout=30)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/pdf'
+        assert 'Friktionsmåling' in pdf_env['rendered'][0]
+
+    def test_bulk_reads_customer_database(self, app, pdf_env, split):
+        import pdf_reports
+        results = pdf_reports.render_bulk_reports(app, ASSESSMENT_ID, ROOT_UNIT_ID, processes=1,
+                                                  customer_id=CUSTOMER_ID)
+        assert results[0]['unit_id'] == ROOT_UNIT_ID
+        assert {r['status'] for r in results} <= {'ready', 'failed', 'skipped'}
+        assert any(r['status'] != 'skipped' for r in results)
+
+
+class TestRenderContext:
+
+    def test_context_is_reused_per_thread(self, monkeypatch):
+        import pdf_reports
+
+        created = []
+
+        class FakeContext:
+            def __init__(self):
+                created.append(self)
+
+            def render(self, html):
+                return b'%PDF'
+
+        monkeypatch.setattr(pdf_reports, 'PdfRenderContext', FakeContext)
+        monkeypatch.setattr(pdf_reports._render_local, 'context', None, raising=False)
+
+        pdf_reports.render_pdf_bytes('<p>a</p>')
+        pdf_reports.render_pdf_bytes('<p>b</p>')
+        assert len(created) == 1
+
+    def test_real_context_parses_stylesheet_once(self):
+        import pdf_reports
+        try:
+            context = pdf_reports.PdfRenderContext()
+        except ImportError:
+            pytest.skip("WeasyPrint ikke tilgængelig")
+
+        stylesheet = context.stylesheet
+        assert context.render('<h1>A</h1>').startswith(b'%PDF')
+        assert context.render('<h1>B</h1>').startswith(b'%PDF')
+        assert context.stylesheet is stylesheet
+        assert context.rendered == 2
+
+    def test_bulk_reports_in_process_pool(self, app, pdf_env):
+        import pdf_reports
+
+        results = pdf_reports.render_bulk_reports(app, ASSESSMENT_ID, ROOT_UNIT_ID, processes=2)
+
+        assert results
+        statuses = {r['status'] for r in results}
+        assert statuses <= {'ready', 'failed', 'skipped'}
+        # Uden WeasyPrint fejler renderingen i processerne - men pipelinen skal nå hele vejen
+        for result in results:
+            if result['status'] == 'failed':
+                assert result['missing_library']
@@ -0,0 +1,94 @@
+"""
+Tests for per-request performance-instrumentering (perf.py)
+"""
+
+
+class TestRequestStats:
+    """Tests for opsamling af SQL statements og cache-opslag"""
+
+    def test_counts_statements_and_db_time(self, app):
+        import perf
+        from db import get_db
+
+        perf.start_request()
+        with get_db() as conn:
+            conn.execute("SELECT COUNT(*) FROM customers").fetchone()
+            conn.execute("SELECT id FROM customers WHERE id = ?", ('cust-test1',)).fetchall()
+        stats = perf.current_stats()
+        summary = perf.finish_request('/test')
+
+        # PRAGMAs fra get_db tælles også
+        assert summary['query_count'] >= 2
+        assert summary['db_time_ms'] >= 0
+        assert "SELECT id FROM customers WHERE id = ?" in stats.queries
+        assert perf.current_stats() is None
+
+    def test_no_collection_outside_requests(self, app):
+        import perf
+        from db import get_db
+
+        assert perf.current_stats() is None
+        with get_db() as conn:
+            assert conn.execute("SELECT 1").fetchone()[0] == 1
+
+    def test_records_cache_hits_and_misses(self, app):
+        import perf
+        from cache import cached
+
+        calls = []
+
+        @cached(ttl=60, prefix="perftest")
+        def compute(x):
+            calls.append(x)
+            return x * 2
+
+        compute.invalidate_all()
+        perf.start_request()
+        compute(21)
+        compute(21)
+        summary = perf.finish_request('/test')
+
+        assert calls == [21]
+        assert summary['cache_misses'] == 1
+        assert summary['cache_hits'] == 1
+
+    def test_slow_request_includes_top_queries(self, app, monkeypatch):
+        import perf
+        from db import get_db
+
+        monkeypatch.setattr(perf, 'SLOW_REQUEST_MS', 0)
+        perf.start_request()
+        with get_db() as conn:
+            conn.execute("SELECT * FROM organizational_units").fetchall()
+        summary = perf.finish_request('/test')
+
+        assert summary['top_queries']
+        assert 'sql' in summary['top_queries'][0]
+
+
+class TestPerformanceEndpoint:
+    """Tests for /api/admin/performance"""
+
+    def test_route_percentiles(self, authenticated_client):
+        import perf
+        perf.reset_route_stats()
+
+        for _ in range(3):
+            authenticated_client.get('/api/admin/status')
+        response = authenticated_client.get('/api/admin/performance')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        routes = {r['route']: r for r in data['routes']}
+        status = routes['/api/admin/status']
+        assert status['samples'] == 3
+        assert status['p50_ms'] <= status['p95_ms'] <= status['p99_ms'] <= status['max_ms']
+        assert status['max_queries'] > 0
+
+    def test_server_timing_header(self, authenticated_client):
+        response = authenticated_client.get('/api/admin/status')
+        assert 'db;dur=' in response.headers.get('Server-Timing', '')
+
+    def test_requires_admin(self, client):
+        response = client.get('/api/admin/performance')
+        assert response.status_code in (302, 401, 403)
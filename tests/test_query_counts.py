@@ -0,0 +1,187 @@
+"""
+Query-count regressions-tests for de vigtigste routes og analysefunktioner
+
+Hver test kører mod to genererede datasæt af forskellig størrelse (se
+seed_scale_testdata.py) og fejler hvis antallet af SQL statements overstiger
+budgettet, eller - for routes der ikke må afhænge af datamængden - hvis
+antallet vokser med datasættet (N+1).
+
+Tællingerne inkluderer PRAGMAs ved hver get_db-forbindelse samt BEGIN/COMMIT.
+Hæv kun et budget bevidst, og skriv hvorfor i commit-beskeden.
+"""
+import pytest
+
+SCALE_SIZES = {
+    'small': {'customers': 1, 'depth': 3, 'fanout': 2, 'employees': 48, 'quarters': 3},
+    'larger': {'customers': 1, 'depth': 3, 'fanout': 4, 'employees': 192, 'quarters': 3},
+}
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+ASSESSMENT_ID = 'assess-s42c1-q03'
+
+
+@pytest.fixture(scope='module')
+def scale_dbs(scale_dataset, tmp_path_factory):
+    """Kopier af to datasæt med produktionsskema og -spørgsmål (se conftest.scale_dataset)"""
+    import shutil
+
+    directory = tmp_path_factory.mktemp('querycount')
+    paths = {}
+    for name, options in SCALE_SIZES.items():
+        paths[name] = str(directory / f'{name}.db')
+        shutil.copyfile(scale_dataset(options), paths[name])
+    return paths
+
+
+@pytest.fixture
+def run_counted(app, scale_dbs, monkeypatch, count_queries):
+    """Kør en funktion mod hvert datasæt og returnér antal statements per datasæt"""
+    from cache import invalidate_all
+
+    def run(func):
+        counts = {}
+        for name, path in scale_dbs.items():
+            monkeypatch.setenv('DB_PATH', path)
+            invalidate_all()
+            with count_queries() as counter:
+                func()
+            counts[name] = counter.count
+        return counts
+
+    return run
+
+
+def _admin_get(app, path):
+    """GET som superadmin med kundefilter - returnerer en funktion til run_counted"""
+    def call():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = {
+                'id': 'admin-1',
+                'username': 'admin',
+                'name': 'Test Admin',
+                'email': 'admin@test.com',
+                'role': 'superadmin',
+                'customer_id': None,
+                'customer_name': None,
+            }
+            sess['customer_filter'] = CUSTOMER_ID
+        response = client.get(path)
+        assert response.status_code == 200, path
+    return call
+
+
+# Routes hvor antallet af statements er uafhængigt af datamængden.
+# Dashboards og analyser bruger 3 statements på data-versionen til ETag og
+# side-cache (data_version: forbindelse + versionsopslag)
+SCALE_INVARIANT_ROUTES = [
+    ('/admin/dashboard', 28),
+    (f'/admin/dashboard/{CUSTOMER_ID}', 28),
+    ('/admin/analyser', 24),
+    (f'/admin/analyser?unit_id={ROOT_UNIT_ID}', 28),
+    (f'/admin/assessment/{ASSESSMENT_ID}', 38),
+    ('/admin/assessments-overview', 21),
+    ('/admin/noegletal', 26),
+]
+
+
+class TestAdminRouteQueryCounts:
+    """Admin-dashboards og analyser"""
+
+    @pytest.mark.parametrize('path,budget', SCALE_INVARIANT_ROUTES)
+    def test_route_budget_and_no_n_plus_one(self, app, run_counted, path, budget):
+        counts = run_counted(_admin_get(app, path))
+
+        assert counts['small'] == counts['larger'], f"{path} vokser med datasættet: {counts}"
+        assert counts['larger'] <= budget, f"{path}: {counts['larger']} statements (budget {budget})"
+
+    def test_unit_drilldown_budget(self, app, run_counted):
+        # Drill-down laver ét aggregat og ét profil-opslag per underenhed,
+        # så her er budgettet sat efter det største datasæt (fanout 4)
+        counts = run_counted(_admin_get(app, f'/admin/dashboard/{CUSTOMER_ID}/{ROOT_UNIT_ID}'))
+
+        assert counts['larger'] - counts['small'] <= 2 * (4 - 2), counts
+        assert counts['larger'] <= 38, counts
+
+
+class TestSurveyQueryCounts:
+    """Survey-intake (den offentlige del med flest requests)"""
+
+    def _token(self, db_path, offset=0):
+        import sqlite3
+        conn = sqlite3.connect(db_path)
+        row = conn.execute("""
+            SELECT token FROM tokens
+            WHERE is_used = 0 AND respondent_type = 'employee'
+            ORDER BY token LIMIT 1 OFFSET ?
+        """, (offset,)).fetchone()
+        conn.close()
+        return row[0]
+
+    def test_survey_page_budget(self, app, scale_dbs, run_counted):
+        tokens = {name: self._token(path) for name, path in scale_dbs.items()}
+
+        def call():
+            name = next(n for n, p in scale_dbs.items() if p == _current_db_path())
+            response = app.test_client().get(f'/s/{tokens[name]}')
+            assert response.status_code == 200
+
+        counts = run_counted(call)
+
+        assert counts['small'] == counts['larger'], counts
+        assert counts['larger'] <= 20, counts
+
+    def test_survey_submit_budget(self, app, scale_dbs, run_counted):
+        import sqlite3
+
+        tokens = {name: self._token(path, offset=1) for name, path in scale_dbs.items()}
+        conn = sqlite3.connect(scale_dbs['small'])
+        question_ids = [r[0] for r in conn.execute("SELECT id FROM questions ORDER BY id")]
+        conn.close()
+        form = {f'q_{qid}': '4' for qid in question_ids}
+        form['free_text_general'] = 'Tælletest'
+
+        def call():
+            name = next(n for n, p in scale_dbs.items() if p == _current_db_path())
+            response = app.test_client().post(f'/s/{tokens[name]}/submit', data=form)
+            assert response.status_code in (200, 302)
+
+        counts = run_counted(call)
+
+        assert counts['small'] == counts['larger'], counts
+        # Alle svar gemmes i én transaktion: ét INSERT per spørgsmål + faste opslag
+        assert counts['larger'] <= 60, counts
+
+
+class TestAnalysisQueryCounts:
+    """Analysefunktioner brugt af dashboards og eksport"""
+
+    def test_detailed_breakdown(self, run_counted):
+        from analysis import get_detailed_breakdown
+        counts = run_counted(lambda: get_detailed_breakdown(ROOT_UNIT_ID, ASSESSMENT_ID))
+        assert counts['small'] == counts['larger'], counts
+        assert counts['larger'] <= 16, counts
+
+    def test_substitution(self, run_counted):
+        from analysis import calculate_substitution_db
+        counts = run_counted(lambda: calculate_substitution_db(ROOT_UNIT_ID, ASSESSMENT_ID))
+        assert counts['small'] == counts['larger'], counts
+        assert counts['larger'] <= 5, counts
+
+    def test_trend_data(self, run_counted):
+        from analysis import get_trend_data
+        counts = run_counted(lambda: get_trend_data(customer_id=CUSTOMER_ID))
+        assert counts['small'] == counts['larger'], counts
+        assert counts['larger'] <= 8, counts
+
+    def test_assessment_overview(self, run_counted):
+        from db_hierarchical import get_assessment_overview
+        counts = run_counted(lambda: get_assessment_overview(ASSESSMENT_ID))
+        assert counts['small'] == counts['larger'], counts
+        assert counts['larger'] <= 6, counts
+
+
+def _current_db_path():
+    import os
+    return os.environ['DB_PATH']
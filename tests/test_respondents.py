@@ -0,0 +1,119 @@
+"""
+Tests for respondent_id på svar (respondents.py)
+
+Survey-submit skal give alle svar i én besvarelse samme id, skrivestier
+uden id skal få det tildelt af triggeren, og backfill skal genskabe
+besvarelserne i gamle data.
+"""
+import pytest
+
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+def _submissions(conn, where='1 = 1'):
+    """Besvarelser som mængder af svar-id'er"""
+    groups = {}
+    for row in conn.execute(f"SELECT id, respondent_id FROM responses WHERE {where}"):
+        groups.setdefault(row['respondent_id'], set()).add(row['id'])
+    return {frozenset(ids) for ids in groups.values()}
+
+
+def _leaf_unit(conn):
+    return conn.execute("""
+        SELECT DISTINCT unit_id FROM responses WHERE assessment_id = ? ORDER BY unit_id LIMIT 1
+    """, (ASSESSMENT_ID,)).fetchone()[0]
+
+
+class TestAssignment:
+
+    def test_survey_submit_uses_one_id(self, app, scale_db, scale_conn):
+        token = scale_conn.execute("""
+            SELECT token FROM tokens WHERE is_used = 0 AND respondent_type = 'employee'
+            ORDER BY token LIMIT 1
+        """).fetchone()[0]
+        question_ids = [r[0] for r in scale_conn.execute("SELECT id FROM questions WHERE is_default = 1")]
+        before = scale_conn.execute("SELECT MAX(id) FROM responses").fetchone()[0]
+
+        response = app.test_client().post(f'/s/{token}/submit',
+                                          data={f'q_{qid}': '4' for qid in question_ids})
+        assert response.status_code in (200, 302)
+
+        ids = {row[0] for row in scale_conn.execute(
+            "SELECT respondent_id FROM responses WHERE id > ?", (before,))}
+        assert len(ids) == 1
+        assert ids.pop().startswith('resp-')
+
+    def test_trigger_splits_anonymous_inserts(self, scale_conn):
+        unit_id = _leaf_unit(scale_conn)
+        question_ids = [r[0] for r in scale_conn.execute("SELECT id FROM questions WHERE is_default = 1")]
+        before = scale_conn.execute("SELECT MAX(id) FROM responses").fetchone()[0]
+
+        # Tre anonyme besvarelser i samme minut, indsat som dev-tools gør det
+        for _ in range(3):
+            for qid in question_ids:
+                scale_conn.execute("""
+                    INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+                    VALUES (?, ?, ?, 4, 'employee')
+                """, (ASSESSMENT_ID, unit_id, qid))
+
+        submissions = _submissions(scale_conn, f"id > {before}")
+        assert len(submissions) == 3
+        assert {len(s) for s in submissions} == {len(question_ids)}
+
+    def test_trigger_separates_named_respondents(self, scale_conn):
+        unit_id = _leaf_unit(scale_conn)
+        question_ids = [r[0] for r in scale_conn.execute("SELECT id FROM questions WHERE is_default = 1")][:4]
+        before = scale_conn.execute("SELECT MAX(id) FROM responses").fetchone()[0]
+
+        for qid in question_ids:
+            for name in ('Leder A', 'Leder B'):
+                scale_conn.execute("""
+                    INSERT INTO responses (assessment_id, unit_id, question_id, score,
+                                           respondent_type, respondent_name)
+                    VALUES (?, ?, ?, 5, 'leader_assess', ?)
+                """, (ASSESSMENT_ID, unit_id, qid, name))
+
+        rows = scale_conn.execute("""
+            SELECT respondent_name, COUNT(DISTINCT respondent_id) as ids, COUNT(*) as answers
+            FROM responses WHERE id > ? GROUP BY respondent_name
+        """, (before,)).fetchall()
+        assert [(r['ids'], r['answers']) for r in rows] == [(1, 4), (1, 4)]
+
+    def test_backfill_restores_submissions(self, scale_conn):
+        from respondents import backfill_respondent_ids
+        expected = _submissions(scale_conn)
+
+        scale_conn.execute("UPDATE responses SET respondent_id = NULL")
+        assert backfill_respondent_ids(scale_conn) == sum(len(s) for s in expected)
+
+        assert _submissions(scale_conn) == expected
+        assert scale_conn.execute(
+            "SELECT COUNT(*) FROM responses WHERE respondent_id NOT LIKE 'legacy-%'"
+        ).fetchone()[0] == 0
+
+
+class TestConsumers:
+
+    def test_anonymity_counts_people(self, scale_db, scale_conn):
+        from analysis import check_anonymity_threshold
+        unit_id = _leaf_unit(scale_conn)
+        people = scale_conn.execute("""
+            SELECT COUNT(*) FROM tokens
+            WHERE assessment_id = ? AND unit_id = ? AND respondent_type = 'employee' AND is_used = 1
+        """, (ASSESSMENT_ID, unit_id)).fetchone()[0]
+
+        result = check_anonymity_threshold(ASSESSMENT_ID, unit_id)
+        assert result['response_count'] == people
+
+    def test_individual_scores_one_per_respondent(self, scale_db, scale_conn):
+        from blueprints.assessments import get_individual_scores
+        people = scale_conn.execute("""
+            SELECT COUNT(*) FROM tokens
+            WHERE assessment_id = ? AND respondent_type = 'employee' AND is_used = 1
+        """, (ASSESSMENT_ID,)).fetchone()[0]
+
+        result = get_individual_scores(ROOT_UNIT_ID, ASSESSMENT_ID)
+        assert len(result['employees']) == people
+        assert all(set(scores) == {'MENING', 'TRYGHED', 'KAN', 'BESVÆR'}
+                   for scores in result['employees'])
@@ -0,0 +1,111 @@
+"""
+Tests for lagringslayouts på responses (responses_layout.py)
+
+Skift mellem standard og dækkende layout skal ændre indexes - ikke
+resultater - og init_db() må ikke genskabe den anden layouts indexes.
+"""
+import sqlite3
+
+import pytest
+
+ASSESSMENT_ID = 'assess-s42c1-q03'
+ROOT_UNIT_ID = 'unit-s42c1-000001'
+
+
+def _indexes(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'responses'")}
+    finally:
+        conn.close()
+
+
+def _breakdown():
+    from analysis import get_detailed_breakdown
+    from cache import invalidate_all
+    invalidate_all()
+    return get_detailed_breakdown(ROOT_UNIT_ID, ASSESSMENT_ID)
+
+
+class TestLayouts:
+
+    def test_default_layout_after_init(self, scale_db):
+        from responses_layout import LAYOUT_INDEXES, COVERING_INDEX
+        indexes = _indexes(scale_db)
+        assert set(LAYOUT_INDEXES['default']) <= indexes
+        assert COVERING_INDEX not in indexes
+
+    def test_switch_to_covering_and_back(self, scale_db):
+        from responses_layout import set_responses_layout, LAYOUT_INDEXES, COVERING_INDEX
+
+        result = set_responses_layout('covering')
+        assert result['previous'] == 'default'
+        assert result['created'] == [COVERING_INDEX]
+        assert set(result['dropped']) == set(LAYOUT_INDEXES['default'])
+        assert not set(LAYOUT_INDEXES['default']) & _indexes(scale_db)
+
+        result = set_responses_layout('default')
+        assert result['previous'] == 'covering'
+        assert result['dropped'] == [COVERING_INDEX]
+        assert set(LAYOUT_INDEXES['default']) <= _indexes(scale_db)
+
+    def test_init_keeps_active_layout(self, scale_db):
+        from responses_layout import set_responses_layout, init_responses_layout, get_responses_layout
+        set_responses_layout('covering')
+        before = _indexes(scale_db)
+
+        conn = sqlite3.connect(scale_db)
+        init_responses_layout(conn)
+        assert get_responses_layout(conn) == 'covering'
+        conn.close()
+        assert _indexes(scale_db) == before
+
+    def test_init_renames_clustered_index(self, scale_db):
+        from responses_layout import (LAYOUT_INDEXES, COVERING_INDEX, OLD_COVERING_INDEX,
+                                      init_responses_layout, get_responses_layout)
+        conn = sqlite3.connect(scale_db)
+        for name in LAYOUT_INDEXES['default']:
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute(f"CREATE INDEX {OLD_COVERING_INDEX} ON responses"
+                     f"{LAYOUT_INDEXES['covering'][COVERING_INDEX]}")
+        assert get_responses_layout(conn) == 'covering'
+        init_responses_layout(conn)
+        conn.commit()
+        conn.close()
+
+        indexes = _indexes(scale_db)
+        assert COVERING_INDEX in indexes
+        assert OLD_COVERING_INDEX not in indexes
+        assert not set(LAYOUT_INDEXES['default']) & indexes
+
+    def test_unknown_layout(self, scale_db):
+        from responses_layout import set_responses_layout
+        with pytest.raises(ValueError):
+            set_responses_layout('without_rowid')
+
+
+class TestQueries:
+
+    def test_results_identical_across_layouts(self, scale_db):
+        from responses_layout import set_responses_layout
+        expected = _breakdown()
+        set_responses_layout('covering')
+        assert _breakdown() == expected
+
+    def test_per_question_scan_is_index_only(self, scale_db):
+        from responses_layout import set_responses_layout
+        set_responses_layout('covering')
+
+        conn = sqlite3.connect(scale_db)
+        plan = ' '.join(row[3] for row in conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT q.id, AVG(r.adjusted_score), COUNT(r.id)
+            FROM questions q
+            LEFT JOIN responses r ON q.id = r.question_id
+                AND r.unit_id = ? AND r.assessment_id = ? AND r.respondent_type = 'employee'
+            WHERE q.is_default = 1
+            GROUP BY q.id
+        """, (ROOT_UNIT_ID, ASSESSMENT_ID)))
+        conn.close()
+        assert 'COVERING INDEX idx_responses_covering' in plan
@@ -0,0 +1,54 @@
+"""
+Tests for skala-testdata generatoren (seed_scale_testdata.py)
+"""
+import hashlib
+import sqlite3
+
+from seed_scale_testdata import generate_scale_dataset
+
+TINY = {'customers': 2, 'depth': 3, 'fanout': 2, 'employees': 40, 'quarters': 2}
+
+
+def _responses_digest(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT assessment_id, unit_id, question_id, score, comment, respondent_type, created_at
+        FROM responses ORDER BY id
+    """).fetchall()
+    conn.close()
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+
+def test_generates_configured_structure(tmp_path):
+    db_path = str(tmp_path / 'scale.db')
+    totals = generate_scale_dataset(db_path, TINY, verbose=False)
+
+    assert totals['assessments'] == 4
+    assert totals['responses'] > 0
+    assert totals['email_logs'] >= totals['tokens']
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 2
+    assert conn.execute("SELECT MAX(level) FROM organizational_units").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == totals['responses']
+    leader_rows = conn.execute(
+        "SELECT COUNT(*) FROM responses WHERE respondent_type IN ('leader_assess', 'leader_self')"
+    ).fetchone()[0]
+    assert leader_rows > 0
+    # Indexes genopbygges efter bulk-indlæsning
+    indexes = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'responses'")}
+    assert 'idx_responses_assessment_unit' in indexes
+    conn.close()
+
+
+def test_same_seed_gives_same_data(tmp_path):
+    first = str(tmp_path / 'a.db')
+    second = str(tmp_path / 'b.db')
+    generate_scale_dataset(first, TINY, verbose=False)
+    generate_scale_dataset(second, TINY, verbose=False)
+    assert _responses_digest(first) == _responses_digest(second)
+
+    third = str(tmp_path / 'c.db')
+    generate_scale_dataset(third, {**TINY, 'seed': 7}, verbose=False)
+    assert _responses_digest(first) != _responses_digest(third)
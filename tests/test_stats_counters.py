@@ -0,0 +1,125 @@
+"""
+Tests for de vedligeholdte statustællere (stats_counters.py)
+
+Triggers skal holde tællerne identiske med en fuld optælling - også ved
+cascade-sletninger og flytning af enheder - og statussiderne skal læse dem.
+"""
+import pytest
+
+CUSTOMER_ID = 'cust-scale-s42c1'
+OTHER_CUSTOMER_ID = 'cust-scale-s42c2'
+ASSESSMENT_ID = 'assess-s42c1-q03'
+
+
+@pytest.fixture(scope='module')
+def scale_options():
+    return {'customers': 2, 'depth': 2, 'fanout': 3, 'employees': 60, 'quarters': 3}
+
+
+def _assert_no_drift(conn):
+    from stats_counters import reconcile_stats_counters
+    assert reconcile_stats_counters(conn) == []
+    conn.commit()
+
+
+class TestMaintenance:
+
+    def test_seeded_counters_match_tables(self, scale_conn):
+        from stats_counters import get_counters
+        _assert_no_drift(scale_conn)
+
+        counters = get_counters(scale_conn, CUSTOMER_ID)
+        responses = scale_conn.execute("""
+            SELECT COUNT(*) FROM responses r
+            JOIN assessments a ON a.id = r.assessment_id
+            JOIN organizational_units ou ON ou.id = a.target_unit_id
+            WHERE ou.customer_id = ?
+        """, (CUSTOMER_ID,)).fetchone()[0]
+        assert counters['responses'] == responses > 0
+        # Seed-data: én brugt token per respondent
+        assert counters['respondents'] == counters['tokens_used'] > 0
+
+    def test_response_and_token_writes(self, scale_conn):
+        scale_conn.execute("DELETE FROM responses WHERE id % 7 = 0")
+        scale_conn.execute("UPDATE tokens SET is_used = 1 - is_used WHERE rowid % 5 = 0")
+        scale_conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            SELECT assessment_id, unit_id, question_id, 3, 'leader_assess'
+            FROM responses WHERE assessment_id = ? LIMIT 40
+        """, (ASSESSMENT_ID,))
+        _assert_no_drift(scale_conn)
+
+    @pytest.mark.parametrize('statement, params', [
+        ("DELETE FROM assessments WHERE id = ?", (ASSESSMENT_ID,)),
+        ("DELETE FROM organizational_units WHERE customer_id = ? AND level = 1", (CUSTOMER_ID,)),
+        ("DELETE FROM customers WHERE id = ?", (CUSTOMER_ID,)),
+        ("UPDATE organizational_units SET customer_id = ? WHERE customer_id = ? AND level = 1",
+         (OTHER_CUSTOMER_ID, CUSTOMER_ID)),
+    ])
+    def test_cascades_and_moves(self, scale_conn, statement, params):
+        scale_conn.execute(statement, params)
+        _assert_no_drift(scale_conn)
+
+    def test_deleted_customer_leaves_no_rows(self, scale_conn):
+        scale_conn.execute("DELETE FROM customers WHERE id = ?", (CUSTOMER_ID,))
+        remaining = scale_conn.execute(
+            "SELECT COUNT(*) FROM stats_counters WHERE scope = ?", (CUSTOMER_ID,)
+        ).fetchone()[0]
+        assert remaining == 0
+
+    def test_reconcile_corrects_drift(self, scale_conn):
+        from stats_counters import get_counters, reconcile_stats_counters
+        expected = get_counters(scale_conn, CUSTOMER_ID)['responses']
+        scale_conn.execute("UPDATE stats_counters SET value = 7 WHERE scope = ? AND name = 'responses'",
+                     (CUSTOMER_ID,))
+
+        drift = reconcile_stats_counters(scale_conn)
+        assert drift == [{'scope': CUSTOMER_ID, 'name': 'responses', 'stored': 7, 'actual': expected}]
+        assert get_counters(scale_conn, CUSTOMER_ID)['responses'] == expected
+
+    def test_init_backfills_missing_table(self, scale_conn):
+        from stats_counters import init_stats_counters, get_counters
+        expected = get_counters(scale_conn)
+        scale_conn.execute("DROP TABLE stats_counters")
+        init_stats_counters(scale_conn)
+        assert get_counters(scale_conn) == expected
+
+    def test_unknown_customer_is_zero(self, scale_conn):
+        from stats_counters import get_counters, CUSTOMER_COUNTERS
+        assert get_counters(scale_conn, 'cust-unknown') == {name: 0 for name in CUSTOMER_COUNTERS}
+
+
+class TestStatusPages:
+
+    @pytest.fixture
+    def admin_client(self, app):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = {
+                'id': 1, 'email': 'admin@test.com', 'name': 'Test Admin',
+                'role': 'superadmin', 'customer_id': None, 'customer_name': None
+            }
+        return client
+
+    @pytest.mark.parametrize('url', ['/admin/noegletal', '/admin/backup', '/admin/db-status',
+                                     '/admin/gdpr', '/admin'])
+    def test_pages_render_from_counters(self, scale_db, admin_client, url):
+        response = admin_client.get(url)
+        assert response.status_code == 200
+
+    def test_api_status_reads_counters(self, scale_db, admin_client, scale_conn):
+        data = admin_client.get('/api/admin/status').get_json()
+        assert data['database']['responses'] == scale_conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        assert data['database']['tokens_used'] > 0
+
+    def test_reconcile_endpoint(self, scale_db, admin_client, scale_conn):
+        scale_conn.execute("UPDATE stats_counters SET value = 0 WHERE scope = '' AND name = 'units'")
+        scale_conn.commit()
+        data = admin_client.post('/api/admin/reconcile-counters').get_json()
+        assert [d['name'] for d in data['corrected']] == ['units']
+
+    def test_mcp_db_status(self, scale_db):
+        from mcp_server import call_tool
+        result = call_tool('db_status', {})
+        assert result['responses'] > 0
+        assert result['respondents'] > 0
@@ -0,0 +1,289 @@
+"""
+Tests for kundedatabaser (tenant_db.py)
+
+En flyttet kunde skal have sine rækker i egen fil og ingen i kataloget,
+get_db() skal route requests og survey-svar dertil, og en skrivelås i én
+kundes fil må ikke blokere kataloget.
+"""
+import sqlite3
+
+import pytest
+
+CUSTOMER_ID = 'cust-test1'
+SCALE_CUSTOMER_ID = 'cust-scale-s42c1'
+
+
+@pytest.fixture(scope='module')
+def scale_options():
+    return {'customers': 2, 'depth': 2, 'fanout': 2, 'employees': 20, 'quarters': 1}
+
+
+@pytest.fixture
+def sharded(app, tmp_path, monkeypatch):
+    import tenant_db
+    from cache import invalidate_all
+    from db import get_db
+
+    monkeypatch.setattr(tenant_db, 'TENANT_SHARDING', True)
+    monkeypatch.setenv('TENANT_DB_DIR', str(tmp_path))
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO assessments (id, name, target_unit_id, customer_id)
+            VALUES ('assess-tenant', 'Måling', 'unit-test-2', 'cust-test1')
+        """)
+        conn.executemany("""
+            INSERT INTO tokens (token, assessment_id, unit_id)
+            VALUES (?, 'assess-tenant', 'unit-test-2')
+        """, [('tok-tenant-1',), ('tok-tenant-2',)])
+        conn.execute("""
+            INSERT INTO responses (assessment_id, unit_id, question_id, score, respondent_type)
+            SELECT 'assess-tenant', 'unit-test-2', id, 4, 'employee' FROM questions
+        """)
+    invalidate_all()
+    yield tenant_db
+    tenant_db.invalidate_registry()
+    invalidate_all()
+
+
+def _count(conn, table, where='1 = 1', params=()):
+    return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+
+class TestSplit:
+
+    def test_rows_move_to_customer_database(self, sharded, tmp_path):
+        from db import get_db
+        from stats_counters import get_counters
+
+        with get_db() as conn:
+            responses = _count(conn, 'responses')
+            questions = _count(conn, 'questions')
+            counters = get_counters(conn, CUSTOMER_ID)
+
+        counts = sharded.split_customer(CUSTOMER_ID)
+        assert counts['organizational_units'] == 2
+        assert counts['responses'] == responses
+        assert (tmp_path / f'{CUSTOMER_ID}.db').exists()
+
+        with get_db() as conn:
+            assert conn.tenant_id is None
+            assert _count(conn, 'organizational_units', 'customer_id = ?', (CUSTOMER_ID,)) == 0
+            assert _count(conn, 'responses') == 0
+            assert _count(conn, 'questions') == questions
+            assert _count(conn, 'customers', 'id = ?', (CUSTOMER_ID,)) == 1
+            assert get_counters(conn, CUSTOMER_ID)['units'] == 0
+
+        with get_db(CUSTOMER_ID) as conn:
+            assert conn.tenant_id == CUSTOMER_ID
+            assert _count(conn, 'responses') == responses
+            # Fælles tabeller slås op i kataloget
+            name = conn.execute("""
+                SELECT c.name FROM organizational_units ou JOIN customers c ON c.id = ou.customer_id
+                WHERE ou.id = 'unit-test-1'
+            """).fetchone()[0]
+            assert name == 'Test Kunde'
+            assert get_counters(conn, CUSTOMER_ID) == counters
+
+        with pytest.raises(ValueError):
+            sharded.split_customer(CUSTOMER_ID)
+
+    def test_failed_split_leaves_catalog_untouched(self, sharded, tmp_path, monkeypatch):
+        from db import get_db
+
+        def fail(*args):
+            raise RuntimeError('afbrudt')
+        monkeypatch.setattr(sharded, '_remove_from_catalog', fail)
+        with pytest.raises(RuntimeError):
+            sharded.split_customer(CUSTOMER_ID)
+
+        assert not list(tmp_path.iterdir())
+        assert sharded.get_shards() == {}
+        with get_db(CUSTOMER_ID) as conn:
+            assert conn.tenant_id is None
+            assert _count(conn, 'organizational_units', 'customer_id = ?', (CUSTOMER_ID,)) == 2
+
+    @pytest.mark.parametrize('url', [
+        f'/admin/customer/{CUSTOMER_ID}/delete',
+        f'/admin/gdpr/delete-customer/{CUSTOMER_ID}',
+    ])
+    def test_deleting_customer_drops_customer_database(self, sharded, superadmin_client, tmp_path, url):
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+        assert (tmp_path / f'{CUSTOMER_ID}.db').exists()
+
+        response = superadmin_client.post(url)
+        assert response.status_code == 302
+
+        assert not list(tmp_path.glob(f'{CUSTOMER_ID}.db*'))
+        assert sharded.get_shards() == {}
+        with get_db() as conn:
+            assert _count(conn, 'customers', 'id = ?', (CUSTOMER_ID,)) == 0
+            assert _count(conn, 'tenant_shards') == 0
+            assert _count(conn, 'tenant_tokens') == 0
+        assert not sharded.drop_customer_database(CUSTOMER_ID)
+
+    def test_dropped_database_is_not_recreated(self, sharded, tmp_path, monkeypatch):
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+        stale = sharded.get_shards()
+        sharded.drop_customer_database(CUSTOMER_ID)
+
+        # En anden worker med registeret fra før sletningen
+        monkeypatch.setattr(sharded, 'get_shards', lambda catalog_path=None: stale)
+        with pytest.raises(sqlite3.OperationalError):
+            with get_db(CUSTOMER_ID):
+                pass
+        assert not list(tmp_path.glob(f'{CUSTOMER_ID}.db*'))
+
+    def test_strip_foreign_keys(self):
+        from tenant_db import _strip_foreign_keys
+        sql = """CREATE TABLE t (
+            customer_id TEXT REFERENCES customers(id) ON DELETE CASCADE,
+            parent_id TEXT,
+            FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
+            FOREIGN KEY (parent_id) REFERENCES organizational_units(id) ON DELETE SET NULL
+        )"""
+        stripped = _strip_foreign_keys(sql, ['organizational_units'])
+        assert 'customers' not in stripped
+        assert 'REFERENCES organizational_units(id) ON DELETE SET NULL' in stripped
+        sqlite3.connect(':memory:').execute(stripped)
+
+    def test_sharding_disabled(self, sharded, monkeypatch):
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+        monkeypatch.setattr(sharded, 'TENANT_SHARDING', False)
+        with get_db(CUSTOMER_ID) as conn:
+            assert conn.tenant_id is None
+            assert _count(conn, 'organizational_units', 'customer_id = ?', (CUSTOMER_ID,)) == 0
+
+
+class TestRouting:
+
+    def test_customer_requests_use_customer_database(self, sharded, manager_client):
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+        with get_db(CUSTOMER_ID) as conn:
+            conn.execute("UPDATE organizational_units SET name = 'Kun i kundefilen' WHERE id = 'unit-test-2'")
+
+        response = manager_client.get(f'/admin/dashboard/{CUSTOMER_ID}/unit-test-1')
+        assert response.status_code == 200
+        assert 'Kun i kundefilen' in response.get_data(as_text=True)
+        assert sharded.current_tenant() is None
+
+    @pytest.mark.parametrize('role, customer_filter, url, expected', [
+        ('manager', None, '/admin/dashboard/cust-test2', CUSTOMER_ID),
+        ('manager', 'cust-test2', '/admin', CUSTOMER_ID),
+        ('admin', None, '/admin/dashboard/cust-test2', 'cust-test2'),
+        ('superadmin', 'cust-test2', '/admin', 'cust-test2'),
+        ('superadmin', None, '/admin', None),
+    ])
+    def test_request_tenant_follows_role(self, app, role, customer_filter, url, expected):
+        from flask import session
+        from app_factory import _request_tenant
+        with app.test_request_context(url):
+            session['user'] = {'id': 2, 'role': role, 'customer_id': CUSTOMER_ID}
+            if customer_filter:
+                session['customer_filter'] = customer_filter
+            assert _request_tenant() == expected
+
+    def test_data_version_includes_catalog_changes(self, sharded):
+        from data_version import get_data_version
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+
+        version, _ = get_data_version(CUSTOMER_ID)
+        with get_db() as conn:
+            conn.execute("UPDATE customers SET name = 'Nyt navn' WHERE id = 'cust-test2'")
+        assert get_data_version(CUSTOMER_ID)[0] == version + 1
+
+        with get_db(CUSTOMER_ID) as conn:
+            conn.execute("UPDATE tokens SET is_used = 1 WHERE token = 'tok-tenant-2'")
+        assert get_data_version(CUSTOMER_ID)[0] > version + 1
+
+    def test_catalog_caches_bump_catalog_version(self, sharded):
+        from cache import get_cache_version
+        from db import get_db
+        from db_multitenant import (API_KEY_CACHE_NAME, DOMAIN_CACHE_NAME, generate_customer_api_key,
+                                    invalidate_domain_cache, revoke_customer_api_key,
+                                    validate_customer_api_key)
+        sharded.split_customer(CUSTOMER_ID)
+        full_key, key_id = generate_customer_api_key(CUSTOMER_ID)
+        assert validate_customer_api_key(full_key) is not None
+
+        def versions(name):
+            with get_db() as catalog, get_db(CUSTOMER_ID) as shard:
+                return get_cache_version(name, catalog), get_cache_version(name, shard)
+
+        before = {name: versions(name) for name in (API_KEY_CACHE_NAME, DOMAIN_CACHE_NAME)}
+        with sharded.tenant_scope(CUSTOMER_ID):
+            assert revoke_customer_api_key(key_id)
+            invalidate_domain_cache()
+
+        for name, (catalog, shard) in before.items():
+            assert versions(name) == (catalog + 1, shard)
+        # API-nøgler valideres uden session, dvs. mod kataloget
+        assert validate_customer_api_key(full_key) is None
+
+    def test_sync_questions(self, sharded):
+        from db import get_db
+        sharded.split_customer(CUSTOMER_ID)
+        with get_db() as conn:
+            question_id = conn.execute("SELECT MIN(id) FROM questions").fetchone()[0]
+            conn.execute("UPDATE questions SET text_da = 'Ny tekst' WHERE id = ?", (question_id,))
+            total = _count(conn, 'questions')
+
+        assert sharded.sync_questions() == {CUSTOMER_ID: total}
+        with get_db(CUSTOMER_ID) as conn:
+            assert conn.execute("SELECT text_da FROM questions WHERE id = ?",
+                                (question_id,)).fetchone()[0] == 'Ny tekst'
+
+
+def test_customer_write_lock_does_not_block_catalog(sharded, monkeypatch):
+    import db
+    from db import get_db
+    sharded.split_customer(CUSTOMER_ID)
+    monkeypatch.setattr(db, 'DB_BUSY_TIMEOUT', 0.2)
+
+    # En import i kundens fil holder skrivelåsen til commit
+    with get_db(CUSTOMER_ID) as locked:
+        locked.execute("UPDATE organizational_units SET name = 'Import' WHERE id = 'unit-test-1'")
+
+        with get_db('cust-test2') as conn:
+            conn.execute("INSERT INTO organizational_units (id, name, customer_id) "
+                         "VALUES ('unit-other', 'Anden kunde', 'cust-test2')")
+
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            with get_db(CUSTOMER_ID) as conn:
+                conn.execute("UPDATE organizational_units SET name = 'X' WHERE id = 'unit-test-2'")
+
+
+def test_survey_submit_writes_to_customer_database(app, sharded, scale_db, tmp_path, monkeypatch):
+    from db import get_db
+    monkeypatch.setenv('TENANT_DB_DIR', str(tmp_path / 'tenants'))
+
+    with get_db() as conn:
+        total = _count(conn, 'responses')
+    counts = sharded.split_customer(SCALE_CUSTOMER_ID)
+
+    with get_db(SCALE_CUSTOMER_ID) as conn:
+        assert _count(conn, 'responses') == counts['responses'] > 0
+        old_token, assessment_id, unit_id = conn.execute(
+            "SELECT token, assessment_id, unit_id FROM tokens WHERE is_used = 0 LIMIT 1").fetchone()
+        # Token oprettet efter flytningen findes via kundefilen
+        conn.execute("""
+            INSERT INTO tokens (token, assessment_id, unit_id, respondent_type)
+            VALUES ('tok-tenant-new', ?, ?, 'employee')
+        """, (assessment_id, unit_id))
+        question_ids = [row[0] for row in conn.execute("SELECT id FROM questions WHERE is_default = 1")]
+
+    client = app.test_client()
+    for token in (old_token, 'tok-tenant-new'):
+        response = client.post(f'/s/{token}/submit', data={f'q_{qid}': '3' for qid in question_ids})
+        assert response.status_code == 200
+
+    with get_db(SCALE_CUSTOMER_ID) as conn:
+        assert _count(conn, 'responses') == counts['responses'] + 2 * len(question_ids)
+        assert _count(conn, 'tokens', 'token IN (?, ?) AND is_used = 1', (old_token, 'tok-tenant-new')) == 2
+    with get_db() as conn:
+        assert _count(conn, 'responses') == total - counts['responses']
+        assert _count(conn, 'tenant_tokens', "token = 'tok-tenant-new'") == 1
@@ -244,3 +244,69 @@ class TestTranslationCompleteness:
 
         for key in form_keys:
             assert key in INITIAL_TRANSLATIONS, f"Missing form label: {key}"
+
+
+class TestTranslationCatalog:
+    """Test the in-memory translation catalog."""
+
+    def test_catalog_loads_all_languages_in_one_query(self, app):
+        """Test that the catalog holds both languages after loading."""
+        from translations import load_translation_catalog
+
+        catalog = load_translation_catalog()
+
+        assert 'da' in catalog
+        assert 'en' in catalog
+        assert len(catalog['da']) > 0
+
+    def test_get_translation_falls_back_to_danish(self, app):
+        """Test fallback to Danish when the English value is missing."""
+        import sqlite3
+        import os
+        from translations import get_translation, clear_translation_cache
+
+        conn = sqlite3.connect(os.environ['DB_PATH'])
+        conn.execute(
+            "INSERT INTO translations (key, language, value) VALUES ('only.danish', 'da', 'Kun dansk')"
+        )
+        conn.commit()
+        conn.close()
+        clear_translation_cache()
+
+        assert get_translation('only.danish', 'en') == 'Kun dansk'
+        assert get_translation('missing.key', 'en') == '[missing.key]'
+
+    def test_version_bump_invalidates_catalog(self, app):
+        """Test that a version bump from another worker reloads the catalog."""
+        import sqlite3
+        import os
+        from unittest.mock import patch
+        from translations import get_translation, load_translation_catalog
+        from cache import bump_cache_version
+
+        load_translation_catalog()
+        assert get_translation('other.worker', 'da') == '[other.worker]'
+
+        # Simulate another worker updating translations
+        conn = sqlite3.connect(os.environ['DB_PATH'])
+        conn.execute(
+            "INSERT INTO translations (key, language, value) VALUES ('other.worker', 'da', 'Ny tekst')"
+        )
+        conn.commit()
+        conn.close()
+        bump_cache_version('translations')
+
+        with patch('translations.TRANSLATION_VERSION_CHECK_INTERVAL', 0):
+            assert get_translation('other.worker', 'da') == 'Ny tekst'
+
+    def test_language_resolved_once_per_request(self, app):
+        """Test that t() resolves the user language only once per request."""
+        from unittest.mock import patch
+        from translations import t
+
+        with app.test_request_context():
+            with patch('translations.get_user_language', return_value='da') as mock_lang:
+                t('btn.create')
+                t('btn.save')
+                t('btn.cancel')
+                assert mock_lang.call_count == 1
@@ -1,13 +1,35 @@
 """
 Translation helper for Friktionskompasset i18n support.
+
+Hele translations-tabellen indlæses i ét query til et in-memory katalog
+({sprog: {key: value}}). En delt versionstæller i databasen
+(cache_versions 'translations') sørger for at clear_translation_cache()
+invaliderer kataloget i alle workers.
 """
-from functools import lru_cache
-from flask import session, g, request
+import os
+import time
+from threading import Lock
+from flask import session, g, request, has_request_context
+from db import DB_PATH
 from db_multitenant import get_db
+from cache import get_cache_version, bump_cache_version
 
 SUPPORTED_LANGUAGES = ['da', 'en']
 DEFAULT_LANGUAGE = 'da'
 
+# Navn på versionstælleren i cache_versions
+TRANSLATION_CACHE_NAME = 'translations'
+
+# Hvor ofte (sekunder) en worker tjekker versionstælleren i databasen
+TRANSLATION_VERSION_CHECK_INTERVAL = 5
+
+# In-memory katalog: {'da': {key: value}, 'en': {...}}
+_catalog = None
+_catalog_version = None
+_catalog_db_path = None
+_catalog_checked_at = 0.0
+_catalog_lock = Lock()
+
 
 def get_user_language():
     """Hent brugerens valgte sprog fra session, domæne eller browser"""
@@ -48,7 +70,7 @@ def t(key, default=None, **kwargs):
         t('nav.planlagte', 'Planlagte')  # med default værdi
         t('welcome', name='John')
     """
-    lang = get_user_language()
+    lang = _get_request_language()
     translation = get_translation(key, lang)
 
     # Brug default hvis oversættelse ikke fundet (returnerer [key])
@@ -63,40 +85,91 @@ def t(key, default=None, **kwargs):
     return translation
 
 
-@lru_cache(maxsize=1000)
-def get_translation(key, lang):
-    """Hent oversættelse fra database (cached)"""
+def _get_request_language():
+    """Find sproget én gang per request og genbrug det for alle t()-kald"""
+    if not has_request_context():
+        return get_user_language()
+    lang = getattr(g, '_translation_language', None)
+    if lang is None:
+        lang = get_user_language()
+        g._translation_language = lang
+    return lang
+
+
+def load_translation_catalog():
+    """Indlæs hele translations-tabellen i ét query"""
+    global _catalog, _catalog_version, _catalog_db_path, _catalog_checked_at
+
+    db_path = os.environ.get('DB_PATH', DB_PATH)
+    catalog = {lang: {} for lang in SUPPORTED_LANGUAGES}
+
     with get_db() as conn:
-        row = conn.execute(
-            "SELECT value FROM translations WHERE key = ? AND language = ?",
-            (key, lang)
-        ).fetchone()
+        version = get_cache_version(TRANSLATION_CACHE_NAME, conn, catalog=True)
+        rows = conn.execute("SELECT key, language, value FROM translations").fetchall()
+
+    for key, lang, value in rows:
+        catalog.setdefault(lang, {})[key] = value
+
+    with _catalog_lock:
+        _catalog = catalog
+        _catalog_version = version
+        _catalog_db_path = db_path
+        _catalog_checked_at = time.time()
+
+    return catalog
 
-        if row:
-            return row[0]
 
-        # Fallback til dansk hvis engelsk mangler
-        if lang != DEFAULT_LANGUAGE:
-            row = conn.execute(
-                "SELECT value FROM translations WHERE key = ? AND language = ?",
-                (key, DEFAULT_LANGUAGE)
-            ).fetchone()
-            if row:
-                return row[0]
+def _get_catalog():
+    """Returner kataloget - genindlæs hvis versionen i databasen er ændret"""
+    global _catalog_checked_at
 
-        # Fallback til key hvis ikke fundet
-        return f"[{key}]"
+    db_path = os.environ.get('DB_PATH', DB_PATH)
+    if _catalog is None or _catalog_db_path != db_path:
+        return load_translation_catalog()
+
+    now = time.time()
+    if now - _catalog_checked_at >= TRANSLATION_VERSION_CHECK_INTERVAL:
+        _catalog_checked_at = now
+        if get_cache_version(TRANSLATION_CACHE_NAME, catalog=True) != _catalog_version:
+            return load_translation_catalog()
+
+    return _catalog
+
+
+def get_translation(key, lang):
+    """Hent oversættelse fra in-memory kataloget"""
+    catalog = _get_catalog()
+
+    value = catalog.get(lang, {}).get(key)
+    if value is not None:
+        return value
+
+    # Fallback til dansk hvis engelsk mangler
+    if lang != DEFAULT_LANGUAGE:
+        value = catalog.get(DEFAULT_LANGUAGE, {}).get(key)
+        if value is not None:
+            return value
+
+    # Fallback til key hvis ikke fundet
+    return f"[{key}]"
 
 
 def clear_translation_cache():
-    """Ryd cache når oversættelser opdateres"""
-    get_translation.cache_clear()
+    """Ryd cache når oversættelser opdateres (i alle workers)"""
+    global _catalog
+    try:
+        bump_cache_version(TRANSLATION_CACHE_NAME, catalog=True)
+    finally:
+        with _catalog_lock:
+            _catalog = None
 
 
 def set_language(lang):
     """Sæt brugerens sprogpræference i session"""
     if lang in SUPPORTED_LANGUAGES:
         session['language'] = lang
+        if has_request_context():
+            g._translation_language = lang
 
         # Opdater også i database hvis bruger er logget ind
         if 'user' in session: